@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Account Valuation - Avaliação do saldo da conta em USD num único snapshot de preços
+Todos os ativos do saldo são precificados por uma única chamada fetch_tickers
+no cliente de exchange de longa duração; o que a exchange não cotar (ou se a
+chamada falhar) vem do último preço gravado em prices, numa única consulta.
+O snapshot vai para account_balance com um único executemany e a última
+avaliação fica em memória para o dashboard.
+
+Uso:
+    valuator = AccountValuator(exchange, db_path='memecoin.db')
+    valuation = valuator.refresh()          # fetch_balance + fetch_tickers + gravação
+    valuator.last                           # última avaliação (sem chamar a exchange)
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+log = logging.getLogger("AccountValuation")
+
+STABLECOINS = frozenset({'USDT', 'BUSD', 'USDC', 'FDUSD', 'TUSD', 'DAI'})
+
+
+@dataclass
+class Valuation:
+    """Saldo avaliado em USD: por ativo e total"""
+    balances: Dict[str, Dict]
+    total_usd: float
+    unpriced: List[str]
+    updated_at: str
+    pricing_calls: int = 0
+    elapsed_ms: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'total_usd': self.total_usd,
+            'balances': self.balances,
+            'unpriced': self.unpriced,
+            'updated_at': self.updated_at,
+            'pricing_calls': self.pricing_calls,
+            'elapsed_ms': self.elapsed_ms,
+        }
+
+
+def held_assets(balance: Dict) -> Dict[str, Dict[str, float]]:
+    """{asset: {free, locked, total}} com total > 0, do formato ccxt (free/used/total) ou por ativo"""
+    out = {}
+    totals = balance.get('total')
+    if isinstance(totals, dict):
+        free, used = balance.get('free') or {}, balance.get('used') or {}
+        for asset, total in totals.items():
+            if total and total > 0:
+                out[asset] = {'free': float(free.get(asset) or 0), 'locked': float(used.get(asset) or 0),
+                              'total': float(total)}
+        return out
+    for asset, details in balance.items():
+        if isinstance(details, dict) and (details.get('total') or 0) > 0:
+            out[asset] = {'free': float(details.get('free') or 0), 'locked': float(details.get('used') or 0),
+                          'total': float(details['total'])}
+    return out
+
+
+def db_latest_prices(db_path: str) -> Callable[[Iterable[str]], Dict[str, float]]:
+    """Último preço gravado em prices para vários símbolos ('DOGEUSDT') numa única consulta"""
+
+    def latest(symbols: Iterable[str]) -> Dict[str, float]:
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+        marks = ','.join('?' * len(symbols))
+        try:
+            conn = sqlite3.connect(db_path, timeout=5)
+            try:
+                rows = conn.execute(
+                    f'SELECT symbol, price FROM prices WHERE id IN '
+                    f'(SELECT MAX(id) FROM prices WHERE symbol IN ({marks}) GROUP BY symbol)', symbols
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            log.warning(f"⚠️ Erro ao ler últimos preços: {e}")
+            return {}
+        return {symbol: float(price) for symbol, price in rows if price and price > 0}
+
+    return latest
+
+
+class AccountValuator:
+    """Avalia saldos com um cliente de exchange reaproveitado entre chamadas"""
+
+    def __init__(self, exchange=None, db_path: Optional[str] = None, quote: str = 'USDT',
+                 stablecoins: Iterable[str] = STABLECOINS, exchange_factory: Optional[Callable] = None,
+                 price_cache: Optional[Callable[[Iterable[str]], Dict[str, float]]] = None,
+                 exchange_name: str = 'binance', retention_hours: int = 24):
+        self._exchange = exchange
+        self._exchange_factory = exchange_factory
+        self.db_path = db_path
+        self.quote = quote
+        self.stablecoins = frozenset(stablecoins)
+        self.price_cache = price_cache or (db_latest_prices(db_path) if db_path else None)
+        self.exchange_name = exchange_name
+        self.retention_hours = retention_hours
+        self._lock = threading.Lock()
+        self._last: Optional[Valuation] = None
+
+    @property
+    def exchange(self):
+        """Cliente criado uma vez (exchange_factory) e reaproveitado"""
+        if self._exchange is None and self._exchange_factory is not None:
+            self._exchange = self._exchange_factory()
+        return self._exchange
+
+    @property
+    def last(self) -> Optional[Valuation]:
+        """Última avaliação concluída (para o dashboard, sem chamar a exchange)"""
+        with self._lock:
+            return self._last
+
+    def price_snapshot(self, assets: Iterable[str]) -> Tuple[Dict[str, float], Dict[str, str], int]:
+        """Preço em USD de cada ativo: um fetch_tickers e, para o que faltar, uma consulta ao cache"""
+        prices, sources, calls = {}, {}, 0
+        pending = {f"{a}/{self.quote}": a for a in assets if a not in self.stablecoins}
+        for asset in assets:
+            if asset in self.stablecoins:
+                prices[asset], sources[asset] = 1.0, 'stable'
+
+        exchange = self.exchange
+        if pending and exchange is not None and hasattr(exchange, 'fetch_tickers'):
+            markets = getattr(exchange, 'markets', None)
+            symbols = [s for s in pending if not markets or s in markets]
+            tickers = {}
+            if symbols:
+                calls += 1
+                try:
+                    tickers = exchange.fetch_tickers(symbols)
+                except Exception as e:
+                    log.warning(f"⚠️ fetch_tickers falhou ({e}); usando último preço gravado")
+            for symbol, ticker in tickers.items():
+                asset = pending.pop(symbol, None)
+                last = (ticker or {}).get('last')
+                if asset is not None and last:
+                    prices[asset], sources[asset] = float(last), 'exchange'
+
+        if pending and self.price_cache is not None:
+            cached = self.price_cache([a + self.quote for a in pending.values()])
+            for asset in list(pending.values()):
+                price = cached.get(asset + self.quote)
+                if price:
+                    prices[asset], sources[asset] = price, 'cache'
+        return prices, sources, calls
+
+    def value(self, balance: Dict) -> Valuation:
+        """Avalia um saldo (formato ccxt) e guarda como última avaliação"""
+        start = time.perf_counter()
+        held = held_assets(balance)
+        prices, sources, calls = self.price_snapshot(held)
+        balances, total_usd, unpriced = {}, 0.0, []
+        for asset, amounts in held.items():
+            price = prices.get(asset)
+            if price is None:
+                unpriced.append(asset)
+            usd_value = amounts['total'] * price if price is not None else 0.0
+            balances[asset] = {**amounts, 'price': price, 'usd_value': usd_value, 'source': sources.get(asset)}
+            total_usd += usd_value
+        valuation = Valuation(balances=balances, total_usd=total_usd, unpriced=unpriced,
+                              updated_at=datetime.now().isoformat(), pricing_calls=calls,
+                              elapsed_ms=(time.perf_counter() - start) * 1000)
+        with self._lock:
+            self._last = valuation
+        return valuation
+
+    @staticmethod
+    def _balance_table(conn: sqlite3.Connection) -> bool:
+        """Garante exchange/timestamp em account_balance; True se a chave primária é o ativo.
+
+        Há dois esquemas em uso: o histórico do system_controller (id, exchange, ...)
+        e o do start_complete_system/memecoin.db (asset TEXT PRIMARY KEY, uma linha
+        por ativo). Colunas que faltam são adicionadas.
+        """
+        info = conn.execute('PRAGMA table_info(account_balance)').fetchall()
+        if not info:
+            conn.execute('''
+                CREATE TABLE account_balance (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    exchange TEXT DEFAULT 'binance',
+                    asset TEXT NOT NULL,
+                    free REAL,
+                    locked REAL,
+                    total REAL,
+                    usd_value REAL,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            return False
+        columns = {row[1] for row in info}
+        if 'exchange' not in columns:
+            conn.execute("ALTER TABLE account_balance ADD COLUMN exchange TEXT DEFAULT 'binance'")
+        if 'timestamp' not in columns:
+            conn.execute('ALTER TABLE account_balance ADD COLUMN timestamp DATETIME')
+        return [row[1] for row in info if row[5]] == ['asset']
+
+    def save(self, valuation: Valuation, conn: Optional[sqlite3.Connection] = None):
+        """Grava o snapshot em account_balance (um executemany) e apaga o que passou da retenção"""
+        own = conn is None
+        if own:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            asset_key = self._balance_table(conn)
+            conn.execute("DELETE FROM account_balance WHERE timestamp < datetime('now', ?)",
+                         (f'-{self.retention_hours} hours',))
+            # Mesmo timestamp em todas as linhas: o snapshot é lido por MAX(timestamp)
+            ts = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+            sql = ('INSERT INTO account_balance (exchange, asset, free, locked, total, usd_value, timestamp) '
+                   'VALUES (?, ?, ?, ?, ?, ?, ?)')
+            if asset_key:
+                # Uma linha por ativo: o snapshot novo substitui o anterior
+                sql += (' ON CONFLICT(asset) DO UPDATE SET exchange = excluded.exchange, free = excluded.free, '
+                        'locked = excluded.locked, total = excluded.total, usd_value = excluded.usd_value, '
+                        'timestamp = excluded.timestamp')
+            conn.executemany(sql, [(self.exchange_name, asset, b['free'], b['locked'], b['total'], b['usd_value'], ts)
+                                   for asset, b in valuation.balances.items()])
+            conn.commit()
+        finally:
+            if own:
+                conn.close()
+
+    def refresh(self, persist: bool = True) -> Valuation:
+        """fetch_balance + avaliação + gravação"""
+        valuation = self.value(self.exchange.fetch_balance())
+        if persist and self.db_path:
+            self.save(valuation)
+        return valuation
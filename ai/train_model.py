@@ -30,6 +30,10 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier
 import joblib
 import logging
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from tick_archive import read_ticks
 
 # =====================
 # Configuração & Logging
@@ -47,6 +51,9 @@ class Config:
     model_path: str = os.getenv('MODEL_PATH', 'memecoin_model.pkl')
     scaler_path: str = os.getenv('SCALER_PATH', 'memecoin_scaler.pkl')
 
+    # Dados: resolução dos candles usados no treino (raw = ticks brutos)
+    candle_resolution: str = os.getenv('CANDLE_RESOLUTION', '1m')
+
     # Rotulagem
     label_method: str = os.getenv('LABEL_METHOD', 'threshold')  # 'threshold' | 'triple_barrier'
     future_window: int = int(os.getenv('FUTURE_WINDOW', '15'))  # em "barras" (ex: minutos) à frente
@@ -143,15 +150,34 @@ class TA:
 # 1) Extração de dados
 # =====================
 
-def extract_data_from_db(db_path: str) -> pd.DataFrame:
+def extract_data_from_db(db_path: str, resolution: Optional[str] = None) -> pd.DataFrame:
+    """Lê candles OHLCV (price_candles) na resolução pedida; sem candles, usa os ticks brutos"""
     logger.info("Extraindo dados do banco...")
+    resolution = resolution or cfg.candle_resolution
     con = sqlite3.connect(db_path)
-    q = (
-        "SELECT symbol as coin_id, timestamp, price, volume, "
-        "COALESCE(high, price) as high, COALESCE(low, price) as low, COALESCE(close, price) as close "
-        "FROM prices WHERE price > 0 ORDER BY symbol, timestamp"
-    )
-    df = pd.read_sql_query(q, con)
+    df = pd.DataFrame()
+    if resolution != 'raw':
+        try:
+            df = pd.read_sql_query(
+                "SELECT symbol as coin_id, datetime(bucket, 'unixepoch') as timestamp, close as price, volume, "
+                "high, low, close FROM price_candles WHERE resolution = ? ORDER BY symbol, bucket",
+                con, params=(resolution,)
+            )
+            if not df.empty:
+                logger.info(f"Usando candles {resolution} (high/low reais)")
+        except Exception as e:
+            logger.warning(f"Candles indisponíveis ({e}); usando ticks brutos")
+    if df.empty:
+        # Ticks brutos das duas camadas (SQLite recente + Parquet arquivado)
+        ticks = read_ticks(con)
+        ticks = ticks[ticks['price'] > 0]
+        df = pd.DataFrame({'coin_id': ticks['symbol'], 'timestamp': ticks['timestamp'],
+                           'price': ticks['price'], 'volume': ticks['volume']})
+        # high/low/close = 0 significa ausente nos ticks
+        for col in ('high', 'low', 'close'):
+            values = ticks[col] if col in ticks else ticks['price']
+            df[col] = values.where(values > 0, ticks['price'])
+        df = df.sort_values(['coin_id', 'timestamp'], kind='stable').reset_index(drop=True)
     # Forçar coin_id a ser sempre string e 1D
     if 'coin_id' in df.columns:
         df['coin_id'] = df['coin_id'].apply(lambda x: x[0] if isinstance(x, (list, tuple, np.ndarray, pd.Series)) else x)
@@ -79,8 +79,9 @@ import os
 import json
 import logging
 import math
+import uuid
 import requests  # Adicionado para solução de fallback
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Tuple
 
@@ -88,6 +89,12 @@ import numpy as np
 import aiohttp
 import contextlib
 
+from audit_sink import AuditSink
+from paper_exchange import PaperExchange, ExchangeError
+from order_manager import OrderManager, TERMINAL
+from logging_setup import setup_logging as configure_logging
+from cycle_tracing import CycleTracer
+
 # ==========================
 # Configuração
 # ==========================
@@ -121,6 +128,7 @@ class Settings:
     trail_activation_rr: float = float(os.getenv("MOCOVE_TRAIL_ACT_RR", 1.0))
 
     # Volatilidade / dados
+    price_resolution: str = os.getenv("MOCOVE_PRICE_RESOLUTION", "1m")  # 1m|5m|15m|1h ou raw
     volatility_threshold: float = float(os.getenv("MOCOVE_VOL_THR", 3.0))  # %
     rsi_period: int = 10
     rsi_overbought: float = 65
@@ -135,9 +143,14 @@ class Settings:
 
     # Loop
     monitoring_interval_s: int = int(os.getenv("MOCOVE_MONITOR", 20))
+    order_poll_s: float = float(os.getenv("MOCOVE_ORDER_POLL_S", 1.0))  # consulta de ordem pendente (202)
+    order_timeout_s: float = float(os.getenv("MOCOVE_ORDER_TIMEOUT_S", 120))
 
     # Persistência
     save_dir: str = os.getenv("MOCOVE_SAVE_DIR", "./runtime")
+    audit_segment_mb: float = float(os.getenv("MOCOVE_AUDIT_SEGMENT_MB", 16))
+    audit_flush_s: float = float(os.getenv("MOCOVE_AUDIT_FLUSH_S", 2.0))
+    audit_retention_days: int = int(os.getenv("MOCOVE_AUDIT_RETENTION_DAYS", 90))
 
 
 # ==========================
@@ -145,15 +158,8 @@ class Settings:
 # ==========================
 
 def setup_logging(verbose: bool):
-    level = logging.DEBUG if verbose else logging.INFO
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler("ai_trading_agent.log", encoding="utf-8"),
-        ],
-    )
+    # Fila + thread de gravação (logging_setup); DEBUG pode ser amostrado via MOCOVE_LOG_SAMPLE
+    configure_logging(log_file="ai_trading_agent.log", level="DEBUG" if verbose else "INFO")
 
 
 # ==========================
@@ -244,6 +250,16 @@ class MarketState:
     change_24h_pct: float
     volatility_pct: float
     timestamp: datetime
+    # High/low por candle (vazios quando só há ticks brutos)
+    high_history: List[float] = field(default_factory=list)
+    low_history: List[float] = field(default_factory=list)
+
+    def hlc(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Arrays high/low/close para ATR; sem OHLC usa o close nos três"""
+        close = np.array(self.price_history, dtype=float)
+        if len(self.high_history) == close.size and len(self.low_history) == close.size:
+            return np.array(self.high_history, dtype=float), np.array(self.low_history, dtype=float), close
+        return close, close, close
 
 @dataclass
 class TradingSignal:
@@ -266,11 +282,17 @@ class TradingSignal:
 # ==========================
 
 class ExchangeClient:
-    def __init__(self, api_base: str, session: aiohttp.ClientSession, test_mode: bool):
+    def __init__(self, api_base: str, session: aiohttp.ClientSession, test_mode: bool,
+                 order_poll_s: float = 1.0, order_timeout_s: float = 120.0):
         self.api_base = api_base.rstrip("/")
+        self.order_poll_s, self.order_timeout_s = order_poll_s, order_timeout_s
         self.session = session
         self.test_mode = test_mode
         self.log = logging.getLogger("ExchangeClient")
+        # Modo teste: ordens casadas no motor local (fills, slippage e taxas simulados)
+        self.paper = PaperExchange.from_env() if test_mode else None
+        # Ordens do modo teste passam pelo mesmo gerenciador (estados, latência); sem gravação em trades
+        self.orders = OrderManager(self.paper) if test_mode else None
 
     def _sync_get_json(self, path: str, params: Dict = None, timeout: int = 8) -> Dict:
         """Método síncrono usando requests como fallback robusto"""
@@ -306,24 +328,74 @@ class ExchangeClient:
         # Usar método síncrono via asyncio.to_thread para máxima compatibilidade
         return await asyncio.to_thread(self._sync_post_json, path, payload, timeout, retries)
 
-    async def market_data(self, symbol: str) -> Dict:
-        return await self.get_json("/api/market_data", {"symbol": symbol})
+    def _paper_trade(self, action: str, symbol: str, amount_usd: float, key: str) -> Dict:
+        """Executa a ordem no PaperExchange via OrderManager; {} quando rejeitada (saldo, símbolo sem preço...)"""
+        try:
+            if action == "buy":
+                managed = self.orders.submit(symbol, "buy", quote_amount=amount_usd, idempotency_key=key,
+                                             source="agent_ii")
+            else:
+                base = self.paper.market(symbol)["base"]
+                price = self.paper.fetch_ticker(symbol)["last"]
+                free = self.paper.fetch_balance()["free"].get(base, 0.0)
+                managed = self.orders.submit(symbol, "sell", amount=min(amount_usd / price, free),
+                                             idempotency_key=key, source="agent_ii")
+        except (ExchangeError, ValueError) as e:
+            self.log.warning(f"[PAPER] {action.upper()} ${amount_usd:.2f} {symbol} rejeitada: {e}")
+            return {}
+        managed.wait(30)
+        if not managed.filled:
+            self.log.warning(f"[PAPER] {action.upper()} ${amount_usd:.2f} {symbol} {managed.state}: {managed.error}")
+            return {}
+        order = managed.response
+        self.log.info(f"[PAPER] {action.upper()} {order['filled']:.8f} {symbol} @ {order['average'] or 0:.8f} "
+                      f"| custo ${order['cost']:.2f} | taxa ${order['fee']['cost']:.4f} | {order['status']}")
+        return {"status": "test_ok", "action": action, "symbol": symbol, "amount_usd": amount_usd,
+                "order": order}
 
-    async def prices(self, symbol: str, limit: int = 60) -> List[Dict]:
-        data = await self.get_json("/api/prices", {"symbol": symbol, "limit": limit})
-        if isinstance(data, list):
-            return data
-        return data.get("prices", [])
+    async def market_data(self, symbol: str) -> Dict:
+        data = await self.get_json("/api/market_data", {"symbol": symbol})
+        if self.paper is not None and data and data.get("price"):
+            self.paper.update_price(symbol, float(data["price"]), volume=float(data.get("volume") or 0.0))
+        return data
+
+    async def prices(self, symbol: str, limit: int = 60, resolution: str = "raw") -> List[Dict]:
+        params = {"symbol": symbol, "limit": limit}
+        if resolution and resolution != "raw":
+            params["resolution"] = resolution
+        data = await self.get_json("/api/prices", params)
+        rows = data if isinstance(data, list) else (data or {}).get("prices", [])
+        if not rows and "resolution" in params:
+            # Candles ainda não agregados para o símbolo: usa os ticks brutos
+            return await self.prices(symbol, limit)
+        return rows
 
     async def volatility(self, symbol: str) -> Dict:
         return await self.get_json("/api/volatility", {"symbol": symbol})
 
     async def trade(self, action: str, symbol: str, amount_usd: float) -> Dict:
+        # Mesma chave em todas as tentativas: retry do POST não duplica a ordem
+        key = f"agent2-{uuid.uuid4().hex[:20]}"
         if self.test_mode:
-            self.log.info(f"[TEST MODE] {action.upper()} ${amount_usd:.2f} {symbol}")
-            return {"status": "test_ok", "action": action, "symbol": symbol, "amount_usd": amount_usd}
-        path = "/api/trading/buy" if action == "buy" else "/api/trading/sell"
-        return await self.post_json(path, {"symbol": symbol, "amount": amount_usd})
+            return await asyncio.to_thread(self._paper_trade, action, symbol, amount_usd, key)
+        result = await self.post_json("/api/orders", {"symbol": symbol, "side": action, "quote_amount": amount_usd,
+                                                      "client_order_id": key, "source": "agent_ii", "wait": True})
+        if result and result.get("state") not in TERMINAL:
+            # 202: ordem aceita e ainda pendente no backend; decide só no estado terminal
+            result = await self.wait_order(key, result)
+        return result if result.get("filled") else {}
+
+    async def wait_order(self, key: str, order: Dict) -> Dict:
+        """Consulta /api/orders/<chave> até a ordem chegar a um estado terminal (ou order_timeout_s)"""
+        deadline = time.monotonic() + self.order_timeout_s
+        while order.get("state") not in TERMINAL and time.monotonic() < deadline:
+            await asyncio.sleep(self.order_poll_s)
+            # {} = falha de rede ou worker que não recebeu a ordem: mantém o último estado e tenta de novo
+            order = await self.get_json(f"/api/orders/{key}") or order
+        if order.get("state") not in TERMINAL:
+            self.log.error(f"Ordem {key} ainda {order.get('state')} após {self.order_timeout_s:.0f}s; "
+                           f"executado até agora: {order.get('filled') or 0}")
+        return order
 
 
 # ==========================
@@ -373,8 +445,8 @@ class Strategy:
         rsi = TA.rsi(prices, self.cfg.rsi_period)
         bb_up, bb_mid, bb_lo = TA.bollinger(prices, self.cfg.bb_period, self.cfg.bb_std)
 
-        # Aproximação de ATR usando closes (sem OHLC)
-        atr = TA.atr(prices, prices, prices, self.cfg.atr_period)
+        # ATR com high/low reais dos candles (cai para closes quando não há OHLC)
+        atr = TA.atr(*m.hlc(), self.cfg.atr_period)
 
         reasons = []
         buy_score = 0.0
@@ -584,12 +656,23 @@ class TradingAgent:
         self.trade_history: List[Dict] = []
         ensure_dir(self.cfg.save_dir)
         self.log = logging.getLogger("Agent")
+        # Auditoria bufferizada: runtime/signals/ e runtime/trades/ (rotação + gzip + índice)
+        sink_opts = dict(
+            max_segment_bytes=int(self.cfg.audit_segment_mb * 1024 * 1024),
+            flush_interval_s=self.cfg.audit_flush_s,
+            retention_days=self.cfg.audit_retention_days or None,
+        )
+        self.signal_sink = AuditSink(self.cfg.save_dir, "signals", **sink_opts)
+        self.trade_sink = AuditSink(self.cfg.save_dir, "trades", **sink_opts)
+        # Spans por etapa de run_once (resumo em runtime/trace_agent_ii.json, lido por /api/ai-trading/status)
+        self.tracer = CycleTracer.from_env("agent_ii")
 
     async def _build_market_state(self, client: ExchangeClient, symbol: str) -> Optional[MarketState]:
         """Constrói estado de mercado de forma robusta"""
         try:
             # Obter dados de mercado
-            md = await client.market_data(symbol)
+            with self.tracer.span('http_market_data'):
+                md = await client.market_data(symbol)
             if not md:
                 self.log.warning("Dados de mercado vazios")
                 return None
@@ -599,10 +682,16 @@ class TradingAgent:
             chg = float(md.get("change_24h", 0.0))
 
             # Obter histórico de preços
-            prices = await client.prices(symbol, limit=max(self.cfg.min_price_history, 120))
-            price_hist = []
+            with self.tracer.span('http_prices'):
+                prices = await client.prices(symbol, limit=max(self.cfg.min_price_history, 120),
+                                             resolution=self.cfg.price_resolution)
+            price_hist, high_hist, low_hist = [], [], []
             if prices:
-                price_hist = [float(p.get("price")) for p in prices if p.get("price") is not None]
+                rows = [p for p in prices if p.get("price") is not None]
+                price_hist = [float(p["price"]) for p in rows]
+                if rows and all(p.get("high") and p.get("low") for p in rows):
+                    high_hist = [float(p["high"]) for p in rows]
+                    low_hist = [float(p["low"]) for p in rows]
 
             # Fallback: gerar histórico simulado se necessário
             if len(price_hist) < self.cfg.min_price_history:
@@ -611,10 +700,12 @@ class TradingAgent:
                     return None
                 # Criar série simulada simples
                 price_hist = [price * (1 + 0.001 * i) for i in range(-self.cfg.min_price_history, 0)]
+                high_hist, low_hist = [], []
                 self.log.info(f"Histórico simulado criado: {len(price_hist)} pontos")
 
             # Obter volatilidade
-            vol_resp = await client.volatility(symbol)
+            with self.tracer.span('http_volatility'):
+                vol_resp = await client.volatility(symbol)
             vol_pct = float(vol_resp.get("volatility", 2.0)) if vol_resp else 2.0
 
             return MarketState(
@@ -625,6 +716,8 @@ class TradingAgent:
                 change_24h_pct=chg,
                 volatility_pct=vol_pct,
                 timestamp=utcnow(),
+                high_history=high_hist,
+                low_history=low_hist,
             )
             
         except Exception as e:
@@ -646,18 +739,16 @@ class TradingAgent:
         return 0.0
 
     def _persist(self):
-        # salva JSONs simples para auditoria rápida
-        with open(os.path.join(self.cfg.save_dir, "signals.jsonl"), "a", encoding="utf-8") as f:
-            for s in self.signal_history:
-                f.write(json.dumps({**asdict(s), "timestamp": s.timestamp.isoformat()}) + '\n')
+        # enfileira no sink de auditoria; a gravação em disco ocorre em segundo plano
+        for s in self.signal_history:
+            self.signal_sink.write({**asdict(s), "timestamp": s.timestamp.isoformat()})
         self.signal_history.clear()
 
-        with open(os.path.join(self.cfg.save_dir, "trades.jsonl"), "a", encoding="utf-8") as f:
-            for t in self.trade_history:
-                t2 = dict(t)
-                if isinstance(t2.get("timestamp"), datetime):
-                    t2["timestamp"] = t2["timestamp"].isoformat()
-                f.write(json.dumps(t2) + '\n')
+        for t in self.trade_history:
+            t2 = dict(t)
+            if isinstance(t2.get("timestamp"), datetime):
+                t2["timestamp"] = t2["timestamp"].isoformat()
+            self.trade_sink.write(t2)
         self.trade_history.clear()
 
     def _should_halt_for_daily_loss(self) -> bool:
@@ -669,9 +760,8 @@ class TradingAgent:
     async def _maybe_exit_position(self, client: ExchangeClient, ms: MarketState):
         if self.strategy.current_position != "long":
             return
-        # usa ATR aproximado dos closes
-        prices = np.array(ms.price_history, dtype=float)
-        atr = TA.atr(prices, prices, prices, self.cfg.atr_period)
+        # ATR com high/low dos candles (aproximado pelos closes sem OHLC)
+        atr = TA.atr(*ms.hlc(), self.cfg.atr_period)
         exit_reason = self.strategy.check_exit_signal(ms.current_price, atr)
         if exit_reason:
             # monta sinal sintético de saída
@@ -687,7 +777,8 @@ class TradingAgent:
             )
             self.signal_history.append(sig)
             self.log.info(f"EXIT: {exit_reason.upper()} @ {sig.price:.8f} amt=${sig.amount_usd:.2f}")
-            result = await client.trade("sell", sig.symbol, sig.amount_usd)
+            with self.tracer.span('order', side='sell'):
+                result = await client.trade("sell", sig.symbol, sig.amount_usd)
             if result:
                 pnl = self._calc_pnl("sell", sig.price)
                 self.total_profit_usd += pnl
@@ -708,23 +799,32 @@ class TradingAgent:
 
     async def run_once(self, client: ExchangeClient):
         """Executa um ciclo completo de análise e trading"""
+        with self.tracer.cycle():
+            await self._run_once(client)
+
+    async def _run_once(self, client: ExchangeClient):
+        tracer = self.tracer
         try:
             # 1. Construir estado de mercado
-            ms = await self._build_market_state(client, self.cfg.default_symbol)
+            with tracer.span('market_state'):
+                ms = await self._build_market_state(client, self.cfg.default_symbol)
             if not ms:
                 self.log.warning("Sem dados de mercado válidos para análise")
                 return
 
             # 2. Gerenciar saídas (SL/TP/Trailing)
-            await self._maybe_exit_position(client, ms)
+            with tracer.span('exit_check'):
+                await self._maybe_exit_position(client, ms)
 
             # 3. Gerar sinal de trading
             if model is not None:
                 # Usar modelo AutoML se disponível
-                sig = self._generate_ml_signal(ms)
+                with tracer.span('inference'):
+                    sig = self._generate_ml_signal(ms)
             else:
                 # Usar estratégia tradicional
-                sig = self.strategy.analyze(ms)
+                with tracer.span('indicators'):
+                    sig = self.strategy.analyze(ms)
             
             self.signal_history.append(sig)
             self.log.info(f"Sinal: {sig.action.upper()} | Confiança: {sig.confidence:.2f} | {sig.reason}")
@@ -734,10 +834,12 @@ class TradingAgent:
                 return
 
             # 5. Executar trades se aplicável
-            await self._execute_signal(client, sig)
+            with tracer.span('execute', action=sig.action):
+                await self._execute_signal(client, sig)
 
             # 6. Persistir dados
-            self._persist()
+            with tracer.span('persist'):
+                self._persist()
             
         except Exception as e:
             self.log.error(f"Erro em run_once: {e}", exc_info=True)
@@ -764,7 +866,7 @@ class TradingAgent:
                 # volatilidade
                 np.std(np.diff(np.array(ms.price_history)[-20:])),
                 # atr
-                TA.atr(np.array(ms.price_history), np.array(ms.price_history), np.array(ms.price_history), 14),
+                TA.atr(*ms.hlc(), 14),
                 # volume_z (não disponível, usar 0)
                 0.0,
                 # min24, max24, var24
@@ -827,7 +929,8 @@ class TradingAgent:
             self.strategy.position_usd = sig.amount_usd
             
             self.log.info(f"EXECUTANDO BUY: {sig.symbol} | Preço: {sig.price:.8f} | Valor: ${sig.amount_usd:.2f}")
-            result = await client.trade("buy", sig.symbol, sig.amount_usd)
+            with self.tracer.span('order', side='buy'):
+                result = await client.trade("buy", sig.symbol, sig.amount_usd)
             executed = bool(result)
             
             if executed:
@@ -848,7 +951,8 @@ class TradingAgent:
                 
         elif sig.action == "sell" and self.strategy.current_position == "long":
             self.log.info(f"EXECUTANDO SELL: {sig.symbol} | Preço: {sig.price:.8f} | Valor: ${self.strategy.position_usd:.2f}")
-            result = await client.trade("sell", sig.symbol, self.strategy.position_usd)
+            with self.tracer.span('order', side='sell'):
+                result = await client.trade("sell", sig.symbol, self.strategy.position_usd)
             
             if result:
                 pnl = self._calc_pnl("sell", sig.price)
@@ -894,7 +998,7 @@ class TradingAgent:
                 # volatilidade
                 np.std(np.diff(np.array(ms.price_history)[-20:])),
                 # atr
-                TA.atr(np.array(ms.price_history), np.array(ms.price_history), np.array(ms.price_history), 14),
+                TA.atr(*ms.hlc(), 14),
                 # volume_z (não disponível, usar 0)
                 0.0,
                 # min24, max24, var24
@@ -1009,7 +1113,8 @@ class TradingAgent:
             timeout = aiohttp.ClientTimeout(total=10, connect=5)
             
             async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-                client = ExchangeClient(self.cfg.api_base, session, self.cfg.test_mode)
+                client = ExchangeClient(self.cfg.api_base, session, self.cfg.test_mode,
+                                        self.cfg.order_poll_s, self.cfg.order_timeout_s)
                 self.log.info(f"Configuração: {self.cfg.default_symbol} | Intervalo: {self.cfg.monitoring_interval_s}s | Modo: {'TESTE' if self.cfg.test_mode else 'REAL'}")
                 
                 cycle_count = 0
@@ -1019,7 +1124,7 @@ class TradingAgent:
                     
                     try:
                         await self.run_once(client)
-                        self.log.info(f"Ciclo {cycle_count} completado com sucesso")
+                        self.log.info(f"Ciclo {cycle_count} completado com sucesso | {self.tracer.breakdown()}")
                         
                         # Status resumido a cada 10 ciclos
                         if cycle_count % 10 == 0:
@@ -1037,6 +1142,8 @@ class TradingAgent:
         finally:
             self.log.info("Finalizando agente...")
             self._persist()
+            self.signal_sink.close()
+            self.trade_sink.close()
             self.print_status()
 
     def stop(self):
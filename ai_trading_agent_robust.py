@@ -22,6 +22,15 @@ except ImportError:
     print("⚠️ Portfolio Monitor não disponível")
     PORTFOLIO_MONITOR_AVAILABLE = False
 
+from watchlist_scanner import WatchlistScanner, build_session
+from position_state import PositionState
+from logging_setup import setup_logging
+from opportunity_scoring import CrossSectionalScorer, build_feature_matrix, matrix_from_tickers
+from exchange_config import apply_exchange_url
+from order_manager import OrderManager, FILLED
+from position_store import DEFAULT_DB_PATH
+from cycle_tracing import CycleTracer
+
 # Carregar variáveis de ambiente do arquivo .env
 try:
     from dotenv import load_dotenv
@@ -32,47 +41,32 @@ except ImportError:
 except Exception as e:
     print(f"⚠️ Erro ao carregar .env: {e}")
 
-# Setup básico de logging com flush imediato
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("ai_trading_agent_robust.log", encoding="utf-8", mode="a"),
-    ],
-    force=True  # Force reconfiguration if already configured
-)
-
-# Configurar o logger para fazer flush imediato
+# Logging não bloqueante: fila + thread de gravação, arquivo JSON rotativo
+setup_logging(log_file="ai_trading_agent_robust.log")
 log = logging.getLogger("AITradingAgent")
 log.setLevel(logging.INFO)
 
-# Garantir que os handlers façam flush imediato
-for handler in log.handlers:
-    if isinstance(handler, logging.FileHandler):
-        handler.flush()
-
-# Também configurar o handler de arquivo para fazer flush automático
-file_handler = None
-for handler in logging.getLogger().handlers:
-    if isinstance(handler, logging.FileHandler):
-        file_handler = handler
-        break
-
-if file_handler:
-    # Forçar flush a cada log
-    original_emit = file_handler.emit
-    def flush_emit(record):
-        original_emit(record)
-        file_handler.flush()
-    file_handler.emit = flush_emit
-
 class SimpleAgent:
     def __init__(self):
-        self.api_base = "http://localhost:5000"
+        self.api_base = os.getenv("MOCOVE_API_BASE", "http://localhost:5000")
         self.is_running = True
         self.cycle_count = 0
         
+        # Varredura concorrente da watchlist (sessão HTTP keep-alive compartilhada)
+        self.scan_workers = int(os.getenv('SCAN_WORKERS', 8))
+        self.symbol_timeout = float(os.getenv('SCAN_SYMBOL_TIMEOUT', 5))
+        self.scan_deadline = float(os.getenv('SCAN_DEADLINE', 15))
+        self.session = build_session(self.scan_workers)
+        self.scanner = WatchlistScanner(self.scan_symbol, self.scan_workers, self.scan_deadline)
+        
+        # Pontuação cross-sectional ('rules' reproduz analyze_market) e universo de varredura
+        self.scorer = CrossSectionalScorer(os.getenv('SCAN_SCORER', 'rules'))
+        self.scan_universe = os.getenv('SCAN_UNIVERSE', 'watchlist')  # 'watchlist' | 'binance_usdt'
+        self.min_quote_volume = float(os.getenv('SCAN_MIN_QUOTE_VOLUME', 1000000))
+        
+        # Spans por etapa do ciclo (percentis em runtime/trace_agent_robust.json, ciclos lentos em .slow.jsonl)
+        self.tracer = CycleTracer.from_env('agent_robust')
+                
         # Verificar se backend está disponível antes de continuar
         self.validate_backend_connection()
         
@@ -92,15 +86,13 @@ class SimpleAgent:
         self.active_coins = []
         self.load_watchlist()
         
-        # 🛡️ Controle de moedas já compradas - NOVA FUNCIONALIDADE
-        self.purchased_coins = set()  # Set para evitar compras duplicadas
-        # Controle de moedas já compradas - NOVA FUNCIONALIDADE
-        self.purchased_coins = set()  # Set para evitar compras duplicadas
+        # 🛡️ Estado das posições abertas (fonte única para controle de duplicatas)
+        self.position_state = PositionState(legacy_json='portfolio_positions.json')
         
         # 📊 Monitor de Performance do Portfólio
         if PORTFOLIO_MONITOR_AVAILABLE:
             try:
-                self.portfolio_monitor = PortfolioMonitor(self.api_base)
+                self.portfolio_monitor = PortfolioMonitor(self.api_base, state=self.position_state)
                 log.info("📊 Portfolio Monitor inicializado")
             except Exception as e:
                 log.warning(f"📊 Erro ao inicializar Portfolio Monitor: {e}")
@@ -109,8 +101,11 @@ class SimpleAgent:
             self.portfolio_monitor = None
             log.warning("📊 Portfolio Monitor não disponível")
             
-        # Carregar histórico após inicializar portfolio monitor
-        self.load_purchased_coins()  # Carrega moedas já compradas do histórico
+        if self.position_state.symbols():
+            log.info(f"🛡️ Controle de duplicatas: {len(self.position_state)} moedas em carteira: "
+                     f"{', '.join(self.position_state.symbols()[:5])}...")
+        else:
+            log.info("🛡️ Controle de duplicatas: Nenhuma posição aberta")
 
         if ccxt is None:
             log.error("ccxt não disponível. Trading real desabilitado.")
@@ -123,7 +118,7 @@ class SimpleAgent:
         else:
             try:
                 log.info(f"🔗 Inicializando conexão Binance (Testnet: {self.use_testnet})...")
-                self.binance = ccxt.binance({
+                self.binance = apply_exchange_url(ccxt.binance({
                     'apiKey': self.api_key,
                     'secret': self.api_secret,
                     'sandbox': self.use_testnet,
@@ -135,7 +130,7 @@ class SimpleAgent:
                             'private': 'https://testnet.binance.vision/api' if self.use_testnet else 'https://api.binance.com/api'
                         }
                     } if self.use_testnet else {}
-                })
+                }))
                 # Testar conexão
                 balance = self.binance.fetch_balance()
                 usdt_balance = balance.get('USDT', {}).get('free', 0)
@@ -146,6 +141,11 @@ class SimpleAgent:
                 self.binance = None
                 self.can_trade = False
         self.trade_amount = float(os.getenv('DEFAULT_AMOUNT', 10.0))
+        self._public_client = None  # cliente ccxt sem credenciais, criado no primeiro ciclo binance_usdt
+        
+        # Ordens reais: envio não bloqueante, conciliação e gravação em lote na tabela trades
+        self.order_manager = OrderManager(self.binance, db_path=DEFAULT_DB_PATH,
+                                          on_done=self.on_order_done) if self.binance else None
         
     def validate_backend_connection(self):
         """Valida se o backend está disponível antes de iniciar o agent"""
@@ -199,60 +199,22 @@ class SimpleAgent:
             # Fallback para moedas padrão
             self.active_coins = ["DOGEUSDT", "BTCUSDT", "ETHUSDT", "SOLUSDT", "ADAUSDT"]
     
-    def load_purchased_coins(self):
-        """Carrega lista de moedas já compradas do histórico de trades"""
-        log.info("🛡️ Carregando moedas já compradas do histórico...")
-        try:
-            # Fazer várias tentativas de conexão com delays curtos
-            for attempt in range(2):  # Reduzir para 2 tentativas para não travar a inicialização
-                try:
-                    response = requests.get(f"{self.api_base}/api/trades", timeout=5)  # Timeout menor
-                    if response.status_code == 200:
-                        trades = response.json()
-                        # Adicionar todas as moedas que tiveram compras (buy) na lista de compradas
-                        for trade in trades:
-                            if trade.get('type') == 'buy':
-                                symbol = trade.get('symbol')
-                                if symbol:
-                                    self.purchased_coins.add(symbol)
-                                    
-                        if self.purchased_coins:
-                            log.info(f"🛡️ Controle de duplicatas: {len(self.purchased_coins)} moedas já compradas: {', '.join(list(self.purchased_coins)[:5])}...")
-                        else:
-                            log.info("🛡️ Controle de duplicatas: Nenhuma moeda comprada anteriormente")
-                        return  # Sucesso, sair da função
-                    else:
-                        log.warning(f"Tentativa {attempt+1}: API retornou status {response.status_code}")
-                        
-                except requests.exceptions.ConnectionError as e:
-                    log.warning(f"Tentativa {attempt+1}: Backend não disponível no momento")
-                    if attempt < 1:  # Se não é a última tentativa
-                        time.sleep(2)  # Esperar menos tempo
-                    
-                except Exception as e:
-                    log.warning(f"Tentativa {attempt+1}: Erro inesperado: {e}")
-                    break
-                    
-        except Exception as e:
-            log.warning(f"Erro geral ao carregar moedas compradas: {e}")
-            
-        log.info("🛡️ Controle de duplicatas: Iniciando com lista vazia (backend indisponível)")
-    
-    def add_purchased_coin(self, symbol):
-        """Adiciona uma moeda à lista de compradas"""
-        self.purchased_coins.add(symbol)
-        log.info(f"🛡️ {symbol} adicionada à lista de moedas compradas")
+    @property
+    def purchased_coins(self):
+        """Moedas com posição aberta (visão do PositionState)"""
+        return set(self.position_state.symbols())
     
     def reset_purchased_coins(self):
-        """Limpa a lista de moedas compradas (útil para reiniciar o controle)"""
-        self.purchased_coins.clear()
+        """Fecha todas as posições registradas (útil para reiniciar o controle)"""
+        for symbol in self.position_state.symbols():
+            self.remove_purchased_coin(symbol)
         log.info("🛡️ Lista de moedas compradas foi resetada")
         
     def get_market_data(self, symbol="DOGEUSDT"):
         """Obtém dados de mercado com fallback para dados históricos"""
         try:
             url = f"{self.api_base}/api/market_data"
-            response = requests.get(url, params={"symbol": symbol}, timeout=5)
+            response = self.session.get(url, params={"symbol": symbol}, timeout=self.symbol_timeout)
             response.raise_for_status()
             data = response.json()
             
@@ -313,7 +275,7 @@ class SimpleAgent:
         """Obtém histórico de preços"""
         try:
             url = f"{self.api_base}/api/prices"
-            response = requests.get(url, params={"symbol": symbol, "limit": limit}, timeout=5)
+            response = self.session.get(url, params={"symbol": symbol, "limit": limit}, timeout=self.symbol_timeout)
             response.raise_for_status()
             data = response.json()
             if isinstance(data, list):
@@ -324,107 +286,79 @@ class SimpleAgent:
             return []
     
     def analyze_market(self, market_data, prices):
-        """Análise melhorada de mercado"""
-        if not market_data or not prices:
-            return "hold", 0.0, "Dados insuficientes"
-        
-        current_price = float(market_data.get("price", 0))
-        change_24h = float(market_data.get("change_24h", 0))
-        volume = float(market_data.get("volume", 0))
-        
-        # Análise de tendência com mais fatores
-        confidence = 0.0
-        
-        # Fator 1: Mudança de preço
-        if abs(change_24h) > 5:
-            confidence += 0.4
-        elif abs(change_24h) > 2:
-            confidence += 0.2
-        
-        # Fator 2: Volume (se disponível)
-        if volume > 1000000:  # Volume alto
-            confidence += 0.2
-        
-        # Fator 3: Análise de preços recentes
-        if len(prices) >= 3:
-            try:
-                # Garantir que temos valores numéricos
-                numeric_prices = []
-                for p in prices[-3:]:
-                    if isinstance(p, dict):
-                        # Se o preço é um dicionário, tentar extrair o valor do preço
-                        price_val = p.get('price', p.get('close', p.get('value', 0)))
-                    else:
-                        price_val = p
-                    
-                    try:
-                        numeric_prices.append(float(price_val))
-                    except (ValueError, TypeError):
-                        pass
-                
-                if len(numeric_prices) >= 3:
-                    recent_trend = (numeric_prices[-1] - numeric_prices[-3]) / numeric_prices[-3] * 100
-                    if abs(recent_trend) > 1:
-                        confidence += 0.2
-                        
-            except Exception as e:
-                log.warning(f"Erro ao calcular tendência: {e}")
-        
-        # Decisão baseada em múltiplos fatores - MELHORADA PARA DETECTAR OPORTUNIDADES
-        
-        # Detectar oportunidades de alta (como 9% que você viu na Binance)
-        if change_24h >= 8:
-            return "buy", min(confidence + 0.3, 0.9), f"🚀 ALTA FORTE: {change_24h:.2f}% - Oportunidade detectada!"
-        elif change_24h >= 5:
-            return "buy", min(confidence + 0.2, 0.8), f"📈 Alta significativa: {change_24h:.2f}%"
-        elif change_24h >= 3:
-            return "buy", confidence, f"📊 Alta moderada: {change_24h:.2f}%"
+        """Análise melhorada de mercado (uma moeda, mesmo motor vetorizado do ciclo)"""
+        table = self.scorer.score(build_feature_matrix({'_': (market_data, prices)}))
+        return table.action(0), float(table.confidence[0]), table.reason(0)
+    
+    def scan_symbol(self, symbol):
+        """Obtém market data e histórico de uma moeda (executado no pool do scanner)"""
+        market_data = self.get_market_data(symbol)
+        if not market_data:
+            return None
+        return market_data, self.get_prices(symbol)
+    
+    def market_client(self):
+        """Cliente ccxt para dados de mercado: o autenticado, ou um público reutilizado entre ciclos"""
+        if self.binance is not None:
+            return self.binance
+        if self._public_client is None:
+            self._public_client = apply_exchange_url(ccxt.binance({'enableRateLimit': True}))
+        return self._public_client
+    
+    def build_universe(self):
+        """Monta a matriz de features do universo a analisar neste ciclo"""
+        if self.scan_universe == 'binance_usdt' and ccxt is not None:
+            # Um único fetch_tickers cobre centenas de pares USDT
+            with self.tracer.span('fetch_tickers'):
+                tickers = self.market_client().fetch_tickers()
+            with self.tracer.span('features'):
+                return matrix_from_tickers(tickers, 'USDT', self.min_quote_volume)
         
-        # Detectar quedas para possível venda (mais conservador)
-        elif change_24h <= -2:
-            return "sell", min(confidence + 0.4, 0.9), f"� PROTEÇÃO: {change_24h:.2f}% - Venda preventiva!"
-        elif change_24h <= -1:
-            return "sell", min(confidence + 0.3, 0.8), f"⚠️ ALERTA: {change_24h:.2f}% - Minimizar perdas!"
-        elif change_24h <= -0.5:
-            return "sell", min(confidence + 0.2, 0.7), f"📉 Declínio: {change_24h:.2f}% - Monitorar de perto"
+        # Analisar a watchlist concorrentemente (resultados parciais se houver timeout)
+        with self.tracer.span('http_scan', symbols=len(self.active_coins)):
+            scan = self.scanner.scan(self.active_coins)
+        for symbol, error in scan.errors.items():
+            log.error(f"Erro ao analisar {symbol}: {error}")
+        log.info(f"⏱️ Varredura: {scan.completed}/{len(self.active_coins)} moedas em {scan.elapsed_s:.2f}s")
         
-        # Movimento lateral
-        elif abs(change_24h) > 1:
-            return "hold", confidence * 0.3, f"📍 Movimento lateral: {change_24h:.2f}%"
-        else:
-            return "hold", 0.1, f"😴 Mercado estável: {change_24h:.2f}%"
+        snapshots = {s: scan.results[s] for s in self.active_coins if scan.results.get(s)}
+        with self.tracer.span('features'):
+            return build_feature_matrix(snapshots)
     
     def run_cycle(self):
         """Executa um ciclo de análise em múltiplas moedas"""
+        with self.tracer.cycle():
+            self._run_cycle()
+    
+    def _run_cycle(self):
         self.cycle_count += 1
-        log.info(f"=== CICLO {self.cycle_count} - Analisando {len(self.active_coins)} moedas ===")
-        
-        opportunities = []
+        universe = 'Binance USDT' if self.scan_universe == 'binance_usdt' else f"{len(self.active_coins)} moedas"
+        log.info(f"=== CICLO {self.cycle_count} - Analisando {universe} ===")
         
         try:
-            # Analisar cada moeda da watchlist
-            for symbol in self.active_coins:
-                try:
-                    # Obter dados
-                    market_data = self.get_market_data(symbol)
-                    if not market_data:
-                        continue
-                        
-                    prices = self.get_prices(symbol)
-                    
-                    # Análise
-                    action, confidence, reason = self.analyze_market(market_data, prices)
-                    price = market_data.get("price", 0)
-                    change_24h = market_data.get("change_24h", 0)
-                    
-                    log.info(f"{symbol}: ${price:.8f} | {change_24h:+.2f}% | {action.upper()} ({confidence:.2f}) - {reason}")
-                    
+            with self.tracer.span('scan'):
+                features = self.build_universe()
+            with self.tracer.span('score', symbols=len(features.symbols)):
+                table = self.scorer.score(features)
+            verbose = len(features.symbols) <= 100
+            
+            opportunities = []
+            with self.tracer.span('select'):
+                for i in table.order():
+                    symbol = features.symbols[i]
+                    action, confidence = table.action(i), float(table.confidence[i])
+                    price = float(features.column('price')[i])
+                    change_24h = float(features.column('change_24h')[i])
+                
+                    if verbose:
+                        log.info(f"{symbol}: ${price:.8f} | {change_24h:+.2f}% | {action.upper()} ({confidence:.2f}) - {table.reason(i)}")
+                
                     # 🛡️ CONTROLE DE COMPRAS DUPLICADAS - Se é uma compra, verificar se já compramos esta moeda
-                    if action == "buy" and symbol in self.purchased_coins:
+                    if action == "buy" and symbol in self.position_state:
                         log.info(f"🚫 {symbol}: JÁ COMPRADA - Pulando para evitar duplicata")
                         continue
-                    
-                    # Coletar oportunidades
+                
+                    # Coletar oportunidades (já ordenadas por confiança)
                     if action in ["buy", "sell"] and confidence >= 0.6:
                         opportunities.append({
                             'symbol': symbol,
@@ -432,16 +366,11 @@ class SimpleAgent:
                             'confidence': confidence,
                             'price': price,
                             'change_24h': change_24h,
-                            'reason': reason
+                            'reason': table.reason(i)
                         })
-                        
-                except Exception as e:
-                    log.error(f"Erro ao analisar {symbol}: {e}")
-                    continue
             
-            # Processar oportunidades (ordenar por confiança)
+            # Processar oportunidades
             if opportunities:
-                opportunities.sort(key=lambda x: x['confidence'], reverse=True)
                 log.info(f"=== ENCONTRADAS {len(opportunities)} OPORTUNIDADES ===")
                 
                 for i, opp in enumerate(opportunities[:3], 1):  # Top 3 oportunidades
@@ -452,7 +381,8 @@ class SimpleAgent:
                 
                 # Executar apenas a melhor oportunidade
                 best_opp = opportunities[0]
-                self.execute_trade(best_opp)
+                with self.tracer.span('execute', symbol=best_opp['symbol'], action=best_opp['action']):
+                    self.execute_trade(best_opp)
             else:
                 log.info("Nenhuma oportunidade de trading encontrada neste ciclo.")
                 
@@ -512,7 +442,8 @@ class SimpleAgent:
                 return
             
             # Verificar saldo antes de executar
-            balance = self.binance.fetch_balance()
+            with self.tracer.span('fetch_balance'):
+                balance = self.binance.fetch_balance()
             usdt_balance = balance.get('USDT', {}).get('free', 0)
             
             if action == 'buy' and usdt_balance < self.trade_amount:
@@ -527,8 +458,7 @@ class SimpleAgent:
                     return
                 log.info(f"✅ Saldo disponível para venda: {coin_balance} {coin_symbol}")
             
-            # Preparar ordem
-            order_type = 'market'
+            # Preparar ordem (a mercado)
             side = 'buy' if action == 'buy' else 'sell'
             
             # Garantir que é um par USDT válido
@@ -572,78 +502,60 @@ class SimpleAgent:
                 log.info(f"   Valor estimado: ${estimated_value:.2f} USDT (VENDA TOTAL)")
             log.info(f"   Confiança: {confidence:.2f}")
             
-            # Executar ordem na Binance
-            result = self.binance.create_order(
-                symbol=symbol,
-                type=order_type,
-                side=side,
-                amount=round(amount, 6),  # Mais precisão
-                params={'test': False}  # Garantir que não é teste
-            )
-            
-            # Log de sucesso
-            log.info(f"✅ ORDEM EXECUTADA COM SUCESSO!")
-            log.info(f"   ID: {result.get('id', 'N/A')}")
-            log.info(f"   Status: {result.get('status', 'N/A')}")
-            log.info(f"   Quantidade: {result.get('amount', 'N/A')}")
-            log.info(f"   Valor: ${result.get('cost', 'N/A')}")
-            
-            # Salvar trade no banco de dados
-            self.save_trade_to_db(symbol, action, amount, price, self.trade_amount, result)
+            # Enviar pelo gerenciador de ordens (uma ordem por símbolo/lado/ciclo)
+            with self.tracer.span('submit_order'):
+                order = self.order_manager.submit(
+                    symbol, side, amount=round(amount, 6),  # Mais precisão
+                    idempotency_key=f"robust-{self.cycle_count}-{symbol}-{side}", source='agent_robust'
+                )
+            log.info(f"📨 Ordem {order.key} enviada ({order.state}); resultado em on_order_done")
             
         except Exception as e:
             log.error(f"❌ ERRO AO EXECUTAR ORDEM REAL: {e}")
             log.info(f"💰 [SIMULAÇÃO FALLBACK] {action.upper()} {symbol} (confiança: {confidence:.2f})")
     
-    def save_trade_to_db(self, symbol, action, amount, price, total, order_result):
-        """Salva o trade executado no banco de dados"""
+    def on_order_done(self, order):
+        """Ordem terminou (thread do gerenciador): log e estado de posições"""
+        if not order.filled:
+            log.error(f"❌ ERRO AO EXECUTAR ORDEM REAL: {order.side.upper()} {order.symbol} "
+                      f"{order.state}: {order.error}")
+            return
+        log.info(f"✅ ORDEM EXECUTADA COM SUCESSO!" if order.state == FILLED else
+                 f"⚠️ ORDEM PARCIALMENTE EXECUTADA ({order.state})")
+        log.info(f"   ID: {order.exchange_order_id or 'N/A'}")
+        log.info(f"   Quantidade: {order.filled} | Preço médio: {order.average}")
+        log.info(f"   Valor: ${order.cost:.2f} | Latência: {order.latency_ms:.0f} ms")
+        # Trade gravado em lote pelo gerenciador; aqui só o estado de posições
+        self.on_fill(order.symbol, order.side, order.filled, order.average, datetime.now().isoformat(),
+                     order.exchange_order_id or order.client_order_id)
+    
+    def on_fill(self, symbol, action, amount, price, date, trade_id):
+        """Aplica uma execução ao estado de posições e ao Portfolio Monitor"""
         try:
-            import requests
-            from datetime import datetime
-            
-            # Dados do trade para enviar ao backend
-            trade_data = {
-                'date': datetime.now().isoformat(),
-                'type': action,
-                'symbol': symbol,
-                'amount': float(amount),
-                'price': float(price), 
-                'total': float(total),
-                'status': 'completed'
-            }
-            
-            # Enviar para o backend via API
-            response = requests.post(f"{self.api_base}/api/trades", json=trade_data, timeout=5)
+            if action == 'buy':
+                # 📊 Adicionar posição ao Portfolio Monitor (grava no PositionState compartilhado)
+                if self.portfolio_monitor:
+                    self.portfolio_monitor.add_position(
+                        symbol=symbol,
+                        buy_price=float(price),
+                        quantity=float(amount),
+                        buy_date=date,
+                        trade_id=trade_id
+                    )
+                    log.info(f"📊 Posição adicionada ao Portfolio Monitor: {symbol}")
+                    log.info(f"   🚀 Trailing Stop ativo: 1% de queda do pico máximo")
+                else:
+                    self.position_state.on_fill(symbol, 'buy', float(price), float(amount), trade_id=trade_id, date=date)
+                log.info(f"🛡️ {symbol} adicionada à lista de moedas compradas")
             
-            if response.status_code == 201:
-                log.info(f"💾 Trade salvo no banco: {action.upper()} {symbol} - ${total:.2f}")
-                
-                # 🛡️ Se foi uma compra bem-sucedida, adicionar à lista de moedas compradas
-                if action == 'buy':
-                    self.add_purchased_coin(symbol)
-                    
-                    # 📊 Adicionar posição ao Portfolio Monitor
-                    if self.portfolio_monitor:
-                        self.portfolio_monitor.add_position(
-                            symbol=symbol,
-                            buy_price=float(price),
-                            quantity=float(amount),
-                            buy_date=trade_data['date'],
-                            trade_id=order_result.get('id', str(int(time.time())))
-                        )
-                        log.info(f"📊 Posição adicionada ao Portfolio Monitor: {symbol}")
-                        log.info(f"   🚀 Trailing Stop ativo: 1% de queda do pico máximo")
-                
-                # 📊 Se foi uma venda, remover posição do Portfolio Monitor
-                elif action == 'sell' and self.portfolio_monitor:
-                    self.portfolio_monitor.remove_position(symbol)
-                    log.info(f"📊 Posição removida do Portfolio Monitor: {symbol}")
-                    
-            else:
-                log.error(f"❌ Erro ao salvar trade: {response.status_code}")
-                
+            elif action == 'sell':
+                # 📊 Venda reduz a posição pela quantidade executada (fecha quando zera)
+                if self.portfolio_monitor and symbol in self.portfolio_monitor.positions:
+                    self.portfolio_monitor.reduce_position(symbol, float(amount), float(price))
+                else:
+                    self.position_state.on_fill(symbol, 'sell', float(price), float(amount), trade_id=trade_id, date=date)
         except Exception as e:
-            log.error(f"❌ Erro ao salvar trade no banco: {e}")
+            log.error(f"❌ Erro ao atualizar estado de posições: {e}")
     
     def run(self):
         """Loop principal do agente"""
@@ -655,20 +567,25 @@ class SimpleAgent:
         try:
             while self.is_running:
                 try:
-                    self.run_cycle()
-                    retry_count = 0  # Reset contador se ciclo foi bem-sucedido
-                    
-                    # Status e verificações periódicas
-                    if self.cycle_count % 5 == 0:
-                        # Verificar alertas de portfolio a cada 5 ciclos (CRÍTICO para stop-loss 1%)
-                        alerts = self.check_portfolio_alerts()
-                        if alerts:
-                            log.warning(f"🚨 {len(alerts)} alertas de portfolio verificados!")
-                    
-                    if self.cycle_count % 10 == 0:
-                        # Mostrar performance completa a cada 10 ciclos
-                        log.info(f"Status: {self.cycle_count} ciclos completados")
-                        self.show_portfolio_performance()
+                    # Um trace por iteração: ciclo de análise + verificações periódicas
+                    with self.tracer.cycle():
+                        self.run_cycle()
+                        retry_count = 0  # Reset contador se ciclo foi bem-sucedido
+                        
+                        # Status e verificações periódicas
+                        if self.cycle_count % 5 == 0:
+                            # Verificar alertas de portfolio a cada 5 ciclos (CRÍTICO para stop-loss 1%)
+                            with self.tracer.span('portfolio_alerts'):
+                                alerts = self.check_portfolio_alerts()
+                            if alerts:
+                                log.warning(f"🚨 {len(alerts)} alertas de portfolio verificados!")
+                        
+                        if self.cycle_count % 10 == 0:
+                            # Mostrar performance completa a cada 10 ciclos
+                            log.info(f"Status: {self.cycle_count} ciclos completados")
+                            with self.tracer.span('portfolio_report'):
+                                self.show_portfolio_performance()
+                    log.info(f"⏱️ {self.tracer.breakdown()}")
                     
                     # Aguardar próximo ciclo
                     log.info("Aguardando 20 segundos...")
@@ -695,20 +612,27 @@ class SimpleAgent:
             log.error(f"Erro crítico: {e}")
         finally:
             self.is_running = False
+            self.scanner.shutdown()
+            if self.order_manager:
+                self.order_manager.close()  # grava execuções ainda no lote
             log.info("=== AGENTE FINALIZADO ===")
     
     def show_purchased_coins(self):
         """Mostra a lista atual de moedas compradas"""
-        if self.purchased_coins:
-            log.info(f"🛡️ Moedas compradas ({len(self.purchased_coins)}): {', '.join(sorted(self.purchased_coins))}")
+        symbols = self.position_state.symbols()
+        if symbols:
+            log.info(f"🛡️ Moedas compradas ({len(symbols)}): {', '.join(symbols)}")
         else:
             log.info("🛡️ Nenhuma moeda comprada registrada")
-        return list(self.purchased_coins)
+        return symbols
     
     def remove_purchased_coin(self, symbol):
         """Remove uma moeda da lista de compradas (permite recompra)"""
-        if symbol in self.purchased_coins:
-            self.purchased_coins.remove(symbol)
+        if symbol in self.position_state:
+            if self.portfolio_monitor and symbol in self.portfolio_monitor.positions:
+                self.portfolio_monitor.remove_position(symbol)
+            else:
+                self.position_state.close(symbol)
             log.info(f"🛡️ {symbol} removida da lista de moedas compradas - recompra permitida")
             return True
         else:
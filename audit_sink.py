@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Audit Sink - Gravação bufferizada de sinais e trades em JSONL
+Os registros são acumulados em memória e gravados por uma thread de fundo
+quando atingem o tamanho do lote ou o intervalo de flush. Os segmentos giram
+por tamanho e por dia, e os segmentos fechados são comprimidos em blocos gzip.
+
+Cada segmento tem um índice (.idx) com um bloco por linha:
+    {"ts_min": ..., "ts_max": ..., "offset": ..., "length": ..., "count": ...}
+O AuditReader usa o índice para ler apenas os blocos que cruzam o intervalo
+de tempo pedido, sem varrer os arquivos inteiros.
+
+Layout em disco (diretório base, ex. ./runtime):
+    signals/signals-20250818-0000.jsonl.gz + .idx   (fechado)
+    signals/signals-20250818-0001.jsonl    + .idx   (ativo)
+"""
+
+import os
+import re
+import json
+import gzip
+import zlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+log = logging.getLogger("AuditSink")
+
+SEGMENT_RE = re.compile(r'^(?P<stream>.+)-(?P<day>\d{8})-(?P<seq>\d{4})\.jsonl(?P<gz>\.gz)?$')
+
+# Registros por bloco gzip ao comprimir um segmento fechado
+COMPRESSED_BLOCK_RECORDS = 1000
+
+
+def _timestamp_of(record: Dict) -> str:
+    ts = record.get('timestamp')
+    if isinstance(ts, datetime):
+        return ts.isoformat()
+    if ts is None:
+        return datetime.now().isoformat()
+    return str(ts)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, 'item'):  # escalares NumPy
+        return value.item()
+    return str(value)
+
+
+class AuditSink:
+    """Escritor JSONL bufferizado com rotação e compressão"""
+
+    def __init__(self, base_dir: str, stream: str, max_segment_bytes: int = 16 * 1024 * 1024,
+                 flush_interval_s: float = 2.0, max_batch: int = 500,
+                 retention_days: Optional[int] = None):
+        self.stream = stream
+        self.directory = os.path.join(base_dir, stream)
+        self.max_segment_bytes = max_segment_bytes
+        self.flush_interval_s = flush_interval_s
+        self.max_batch = max_batch
+        self.retention_days = retention_days
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._buffer: List[Dict] = []
+        self._buffer_lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        self._segment_path: Optional[str] = None
+        self._segment_day: Optional[str] = None
+        self._segment_size = 0
+
+        # Segmentos brutos que ficaram de uma execução anterior são fechados agora
+        self._seal_leftovers()
+
+        self._thread = threading.Thread(target=self._run, name=f"audit-{stream}", daemon=True)
+        self._thread.start()
+
+    # ===== API =====
+
+    def write(self, record: Dict):
+        """Enfileira um registro (não bloqueia em I/O).
+
+        A serialização acontece na thread de gravação: o registro não deve ser
+        alterado pelo chamador depois de enfileirado.
+        """
+        if self._closed:
+            raise RuntimeError(f"AuditSink '{self.stream}' já foi fechado")
+        with self._buffer_lock:
+            self._buffer.append(record)
+            full = len(self._buffer) >= self.max_batch
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """Grava imediatamente o que estiver no buffer"""
+        self._drain()
+
+    def close(self):
+        """Grava o buffer, fecha e comprime o segmento ativo"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout=10)
+        self._drain()
+        with self._io_lock:
+            self._seal_active()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ===== Thread de gravação =====
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval_s)
+            self._wakeup.clear()
+            try:
+                self._drain()
+            except Exception as e:
+                log.error(f"❌ Erro ao gravar auditoria '{self.stream}': {e}")
+
+    def _drain(self):
+        # io_lock antes de esvaziar o buffer mantém a ordem dos lotes entre flush() e a thread
+        with self._io_lock:
+            with self._buffer_lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+
+            day = datetime.now().strftime('%Y%m%d')
+            if self._segment_path and (day != self._segment_day or self._segment_size >= self.max_segment_bytes):
+                self._seal_active()
+            if self._segment_path is None:
+                self._open_segment(day)
+
+            data = ''.join(json.dumps(r, default=_json_default, ensure_ascii=False) + '\n'
+                           for r in batch).encode('utf-8')
+            timestamps = [_timestamp_of(r) for r in batch]
+            with open(self._segment_path, 'ab') as f:
+                offset = f.tell()
+                f.write(data)
+            with open(self._segment_path + '.idx', 'a', encoding='utf-8') as f:
+                f.write(json.dumps({
+                    'ts_min': min(timestamps), 'ts_max': max(timestamps),
+                    'offset': offset, 'length': len(data), 'count': len(batch),
+                }) + '\n')
+            self._segment_size = offset + len(data)
+
+    # ===== Segmentos =====
+
+    def _segments(self) -> List[Tuple[str, int, str]]:
+        return _list_segments(self.directory, self.stream)
+
+    def _open_segment(self, day: str):
+        seqs = [seq for d, seq, _ in self._segments() if d == day]
+        seq = max(seqs) + 1 if seqs else 0
+        self._segment_path = os.path.join(self.directory, f"{self.stream}-{day}-{seq:04d}.jsonl")
+        self._segment_day = day
+        self._segment_size = 0
+
+    def _seal_active(self):
+        if self._segment_path and os.path.exists(self._segment_path):
+            compress_segment(self._segment_path)
+        self._segment_path = None
+        self._segment_size = 0
+        self._apply_retention()
+
+    def _seal_leftovers(self):
+        for _, _, path in self._segments():
+            if not path.endswith('.gz'):
+                compress_segment(path)
+        self._apply_retention()
+
+    def _apply_retention(self):
+        if not self.retention_days:
+            return
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime('%Y%m%d')
+        for day, _, path in self._segments():
+            if day < cutoff and path.endswith('.gz'):
+                for p in (path, path + '.idx'):
+                    if os.path.exists(p):
+                        os.remove(p)
+
+
+def _list_segments(directory: str, stream: str) -> List[Tuple[str, int, str]]:
+    """Segmentos do stream ordenados por (dia, sequência)"""
+    if not os.path.isdir(directory):
+        return []
+    segments = []
+    for name in os.listdir(directory):
+        m = SEGMENT_RE.match(name)
+        if m and m.group('stream') == stream:
+            segments.append((m.group('day'), int(m.group('seq')), os.path.join(directory, name)))
+    return sorted(segments)
+
+
+def compress_segment(path: str, block_records: int = COMPRESSED_BLOCK_RECORDS) -> str:
+    """Comprime um segmento bruto em blocos gzip independentes e reescreve o índice"""
+    gz_path = path + '.gz'
+    index = []
+    with open(path, 'rb') as src, open(gz_path + '.tmp', 'wb') as dst:
+        lines = src.read().splitlines(keepends=True)
+        for i in range(0, len(lines), block_records):
+            block = [l for l in lines[i:i + block_records] if l.strip()]
+            timestamps = []
+            for l in block:
+                try:
+                    timestamps.append(_timestamp_of(json.loads(l)))
+                except json.JSONDecodeError:
+                    pass
+            if not timestamps:
+                continue
+            payload = gzip.compress(b''.join(block), compresslevel=6)
+            index.append({
+                'ts_min': min(timestamps), 'ts_max': max(timestamps),
+                'offset': dst.tell(), 'length': len(payload), 'count': len(block),
+            })
+            dst.write(payload)
+
+    with open(gz_path + '.idx.tmp', 'w', encoding='utf-8') as f:
+        for entry in index:
+            f.write(json.dumps(entry) + '\n')
+    os.replace(gz_path + '.tmp', gz_path)
+    os.replace(gz_path + '.idx.tmp', gz_path + '.idx')
+    for p in (path, path + '.idx'):
+        if os.path.exists(p):
+            os.remove(p)
+    return gz_path
+
+
+class AuditReader:
+    """Leitura indexada dos segmentos de um stream de auditoria"""
+
+    def __init__(self, base_dir: str, stream: str):
+        self.stream = stream
+        self.directory = os.path.join(base_dir, stream)
+
+    def read(self, start: Optional[str] = None, end: Optional[str] = None,
+             reverse: bool = False) -> Iterator[Dict]:
+        """Itera registros com start <= timestamp <= end (ISO-8601)"""
+        segments = _list_segments(self.directory, self.stream)
+        if reverse:
+            segments = segments[::-1]
+
+        for _, _, path in segments:
+            blocks = [b for b in self._index(path)
+                      if (start is None or b['ts_max'] >= start) and (end is None or b['ts_min'] <= end)]
+            if not blocks:
+                continue
+            if reverse:
+                blocks = blocks[::-1]
+            with open(path, 'rb') as f:
+                for block in blocks:
+                    records = self._read_block(f, block, path.endswith('.gz'))
+                    if reverse:
+                        records = records[::-1]
+                    for record in records:
+                        ts = _timestamp_of(record)
+                        if (start is None or ts >= start) and (end is None or ts <= end):
+                            yield record
+
+    def tail(self, limit: int = 100, start: Optional[str] = None, end: Optional[str] = None,
+             where=None) -> List[Dict]:
+        """Últimos registros (mais recentes primeiro), lendo só os blocos necessários"""
+        result = []
+        for record in self.read(start=start, end=end, reverse=True):
+            if where is None or where(record):
+                result.append(record)
+                if len(result) >= limit:
+                    break
+        return result
+
+    @staticmethod
+    def _index(path: str) -> List[Dict]:
+        try:
+            with open(path + '.idx', 'r', encoding='utf-8') as f:
+                entries = []
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Linha parcial do índice de um segmento ativo
+                        continue
+                return entries
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _read_block(f, block: Dict, compressed: bool) -> List[Dict]:
+        f.seek(block['offset'])
+        data = f.read(block['length'])
+        if compressed:
+            data = zlib.decompress(data, wbits=31)
+        records = []
+        for line in data.splitlines():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return records
@@ -2,7 +2,7 @@
 """
 Auto Trainer MoCoVe: coleta histórico Binance, engenharia de features, labeling, treino, salva modelo e thresholds para uso direto pelo Agente Pro.
 - Coleta candles 1m, 5m, 15m das memecoins (lista editável)
-- Salva no memecoin.db
+- Backfill retomável na tabela klines do memecoin.db (kline_backfill.py)
 - Feature engineering completa
 - Labeling triple-barrier
 - Treina (XGBoost se disponível, senão RandomForest)
@@ -19,11 +19,7 @@ import pandas as pd
 import numpy as np
 import logging
 
-# Binance
-try:
-    from binance.client import Client
-except ImportError:
-    raise ImportError("python-binance não instalado. Instale com: pip install python-binance")
+from kline_backfill import KlineBackfill, load_klines
 
 # ML
 try:
@@ -44,33 +40,23 @@ DB_PATH = str(Path("memecoin.db").absolute())
 SYMBOLS = ["DOGEUSDT", "PEPEUSDT", "SHIBUSDT", "FLOKIUSDT", "BONKUSDT"]  # Edite aqui
 INTERVALS = ["1m", "5m", "15m"]
 START_DAYS = 30  # Quantos dias de histórico buscar
-API_KEY = os.getenv("BINANCE_API_KEY", "")
-API_SECRET = os.getenv("BINANCE_API_SECRET", "")
 
 # Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("auto_trainer")
 
 # --- Coleta de dados Binance ---
-def fetch_binance(symbol, interval, start_days=30):
-    client = Client(API_KEY, API_SECRET)
-    end = int(time.time() * 1000)
-    start = int((datetime.utcnow() - timedelta(days=start_days)).timestamp() * 1000)
-    klines = client.get_historical_klines(symbol, interval, start_str=start, end_str=end)
-    df = pd.DataFrame(klines, columns=[
-        'open_time','open','high','low','close','volume','close_time','quote_asset_vol','num_trades','taker_buy_base','taker_buy_quote','ignore'])
-    df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
-    df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
-    for col in ['open','high','low','close','volume']:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    df['symbol'] = symbol
-    df['interval'] = interval
-    return df[['symbol','interval','open_time','open','high','low','close','volume']]
-
-def save_to_sqlite(df):
+def fetch_binance(symbols, intervals, start_days=30):
+    """Backfill retomável (só baixa o que falta) e leitura das klines do período"""
+    start = datetime.utcnow() - timedelta(days=start_days)
+    report = KlineBackfill(DB_PATH).run(symbols, intervals, start)
+    if report.failed:
+        logger.warning(f"{len(report.failed)} blocos de klines falharam; serão refeitos na próxima execução")
     conn = sqlite3.connect(DB_PATH)
-    df.to_sql('prices', conn, if_exists='append', index=False)
-    conn.close()
+    try:
+        return [load_klines(conn, symbol, interval, start) for symbol in symbols for interval in intervals]
+    finally:
+        conn.close()
 
 # --- Feature Engineering ---
 def add_features(df):
@@ -187,13 +173,8 @@ def daily_scheduler():
 
 # --- Main ---
 def main():
-    all_dfs = []
-    for symbol in SYMBOLS:
-        for interval in INTERVALS:
-            logging.info(f"Baixando {symbol} {interval}...")
-            df = fetch_binance(symbol, interval, START_DAYS)
-            save_to_sqlite(df)
-            all_dfs.append(df)
+    logging.info(f"Baixando {len(SYMBOLS)} símbolos x {len(INTERVALS)} intervalos...")
+    all_dfs = fetch_binance(SYMBOLS, INTERVALS, START_DAYS)
     df = pd.concat(all_dfs, ignore_index=True)
     df = add_features(df)
     df = add_sentiment(df)
@@ -11,6 +11,15 @@ import requests
 from datetime import datetime, timedelta
 import sqlite3
 import logging
+import sys
+
+# Módulos compartilhados ficam na raiz do projeto
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from audit_sink import AuditReader
+from pnl_ledger import PnLLedger
 
 # Blueprint para as novas APIs
 api_ext = Blueprint('api_ext', __name__)
@@ -19,6 +28,19 @@ logger = logging.getLogger(__name__)
 # Configurações
 CONFIG_FILE = "ai_agent_config.json"
 SENTIMENT_CACHE_FILE = "sentiment_cache.json"
+# Diretório de auditoria do agente (runtime/signals, runtime/trades)
+AUDIT_DIR = os.getenv("MOCOVE_SAVE_DIR", os.path.join(PROJECT_ROOT, "runtime"))
+# Banco de trades (mesmo do backend) e livro de P&L criado no primeiro uso
+DB_PATH = os.getenv("DB_PATH", os.path.join(PROJECT_ROOT, "memecoin.db"))
+_pnl_ledger = None
+
+def get_pnl_ledger() -> PnLLedger:
+    """Livro de P&L sincronizado com a tabela trades"""
+    global _pnl_ledger
+    if _pnl_ledger is None:
+        _pnl_ledger = PnLLedger(DB_PATH)
+    _pnl_ledger.sync()
+    return _pnl_ledger
 
 class AgentConfigManager:
     """Gerenciador de configurações do agente"""
@@ -382,68 +404,48 @@ def update_watchlist():
 
 @api_ext.route('/api/trades/stats', methods=['GET'])
 def get_trade_stats():
-    """Obtém estatísticas detalhadas dos trades"""
+    """Obtém estatísticas detalhadas dos trades (agregados diários do livro de P&L)"""
     try:
-        conn = sqlite3.connect('memecoin.db')
-        cursor = conn.cursor()
+        ledger = get_pnl_ledger()
+        today = ledger.days_ago(0)
+        days = ledger.buckets('day', since=ledger.days_ago(30))
         
         # Trades de hoje
-        today = datetime.now().date().isoformat()
-        cursor.execute('''
-            SELECT type, COUNT(*), AVG(price), SUM(amount), MIN(timestamp), MAX(timestamp)
-            FROM trades 
-            WHERE DATE(timestamp) = ?
-            GROUP BY type
-        ''', (today,))
-        
-        today_stats = {}
-        for row in cursor.fetchall():
-            today_stats[row[0]] = {
-                'count': row[1],
-                'avg_price': row[2],
-                'total_amount': row[3],
-                'first_trade': row[4],
-                'last_trade': row[5]
+        today_stats = {
+            row['side']: {
+                'count': row['trades'],
+                'avg_price': row['price_sum'] / row['trades'],
+                'total_amount': row['amount'],
+                'realized_pnl': row['realized_pnl'],
+                'first_trade': row['first_trade'],
+                'last_trade': row['last_trade']
             }
+            for row in days if row['bucket'] == today
+        }
         
         # Estatísticas gerais (últimos 30 dias)
-        thirty_days_ago = (datetime.now() - timedelta(days=30)).date().isoformat()
-        cursor.execute('''
-            SELECT COUNT(*), AVG(price), SUM(amount)
-            FROM trades 
-            WHERE DATE(timestamp) >= ?
-        ''', (thirty_days_ago,))
-        
-        general_stats = cursor.fetchone()
+        total_trades = sum(row['trades'] for row in days)
         
         # Trades por dia (últimos 7 dias)
-        cursor.execute('''
-            SELECT DATE(timestamp), COUNT(*), SUM(amount)
-            FROM trades 
-            WHERE DATE(timestamp) >= DATE('now', '-7 days')
-            GROUP BY DATE(timestamp)
-            ORDER BY DATE(timestamp)
-        ''', )
-        
-        daily_stats = [
-            {
-                'date': row[0],
-                'count': row[1],
-                'total_amount': row[2]
-            }
-            for row in cursor.fetchall()
-        ]
-        
-        conn.close()
+        week_start = ledger.days_ago(7)
+        daily = {}
+        for row in days:
+            if row['bucket'] >= week_start:
+                day = daily.setdefault(row['bucket'], {'date': row['bucket'], 'count': 0, 'total_amount': 0,
+                                                       'realized_pnl': 0})
+                day['count'] += row['trades']
+                day['total_amount'] += row['amount']
+                day['realized_pnl'] += row['realized_pnl']
         
         return jsonify({
             'today': today_stats,
             'last_30_days': {
-                'total_trades': general_stats[0] or 0,
-                'avg_price': general_stats[1] or 0,
-                'total_amount': general_stats[2] or 0
+                'total_trades': total_trades,
+                'avg_price': sum(row['price_sum'] for row in days) / total_trades if total_trades else 0,
+                'total_amount': sum(row['amount'] for row in days),
+                'realized_pnl': sum(row['realized_pnl'] for row in days)
             },
-            'daily_breakdown': daily_stats
+            'daily_breakdown': list(daily.values())
         })
         
     except Exception as e:
@@ -452,50 +454,52 @@ def get_trade_stats():
 
 @api_ext.route('/api/signals/history', methods=['GET'])
 def get_signals_history():
-    """Obtém histórico de sinais do agente"""
-    # Em produção, ler de arquivo de log ou banco de dados
-    # Por enquanto, retornar dados simulados
-    signals = []
-    
-    for i in range(10):
-        signals.append({
-            'timestamp': (datetime.now() - timedelta(hours=i)).isoformat(),
-            'symbol': 'DOGEUSDT',
-            'action': ['buy', 'sell', 'hold'][i % 3],
-            'confidence': round(0.5 + (i % 5) * 0.1, 2),
-            'price': 0.224 + (i % 3 - 1) * 0.001,
-            'reason': f'Sinal #{i+1} - Análise técnica',
-            'executed': i % 2 == 0
-        })
-    
-    return jsonify(signals)
+    """Obtém histórico de sinais do agente a partir dos segmentos de auditoria.
+
+    Parâmetros: limit (padrão 50, máx. 1000), symbol, start, end (ISO-8601).
+    Só os blocos do índice que cruzam o intervalo são lidos.
+    """
+    try:
+        limit = min(int(request.args.get('limit', 50)), 1000)
+        symbol = request.args.get('symbol')
+        start = request.args.get('start')
+        end = request.args.get('end')
+        
+        where = (lambda r: r.get('symbol') == symbol) if symbol else None
+        signals = AuditReader(AUDIT_DIR, 'signals').tail(limit, start=start, end=end, where=where)
+        
+        # Marcar como executados os sinais que geraram trade no mesmo instante
+        executed = set()
+        if signals:
+            oldest = min(s['timestamp'] for s in signals)
+            for trade in AuditReader(AUDIT_DIR, 'trades').read(start=oldest, end=end):
+                executed.add((trade.get('symbol'), trade.get('timestamp')))
+        
+        return jsonify([{
+            'timestamp': s.get('timestamp'),
+            'symbol': s.get('symbol'),
+            'action': s.get('action'),
+            'confidence': s.get('confidence'),
+            'price': s.get('price'),
+            'reason': s.get('reason'),
+            'executed': (s.get('symbol'), s.get('timestamp')) in executed
+        } for s in signals])
+        
+    except ValueError as e:
+        return jsonify({'error': f'Parâmetro inválido: {e}'}), 400
+    except Exception as e:
+        logger.error(f"Erro ao ler histórico de sinais: {e}")
+        return jsonify({'error': str(e)}), 500
 
 @api_ext.route('/api/performance', methods=['GET'])
 def get_performance_metrics():
-    """Obtém métricas de performance do agente"""
-    # Em produção, calcular métricas reais
-    return jsonify({
-        'total_trades': 45,
-        'profitable_trades': 32,
-        'win_rate': 71.1,
-        'total_profit': 247.83,
-        'best_trade': 45.20,
-        'worst_trade': -12.50,
-        'avg_trade_duration': 2.4,  # horas
-        'sharpe_ratio': 1.34,
-        'max_drawdown': 8.2,
-        'current_streak': 5,  # trades consecutivos lucrativos
-        'daily_pnl': [
-            {'date': '2025-08-01', 'pnl': 23.45},
-            {'date': '2025-08-02', 'pnl': -5.20},
-            {'date': '2025-08-03', 'pnl': 31.80},
-            {'date': '2025-08-04', 'pnl': 15.60},
-            {'date': '2025-08-05', 'pnl': 8.90},
-            {'date': '2025-08-06', 'pnl': -2.10},
-            {'date': '2025-08-07', 'pnl': 19.30},
-            {'date': '2025-08-08', 'pnl': 12.75}
-        ]
-    })
+    """Obtém métricas de performance do agente (acumulados do livro de P&L)"""
+    try:
+        days = min(max(request.args.get('days', default=30, type=int), 1), 365)
+        return jsonify(get_pnl_ledger().performance(days))
+    except Exception as e:
+        logger.error(f"Erro ao calcular métricas de performance: {e}")
+        return jsonify({'error': str(e)}), 500
 
 # Função para registrar as rotas no app principal
 def register_extensions(app):
@@ -7,7 +7,7 @@ import os
 import sqlite3
 import json
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context, url_for
 from flask_cors import CORS
 import ccxt
 import pandas as pd
@@ -19,28 +19,165 @@ from dotenv import load_dotenv
 # Carregar variáveis de ambiente do arquivo .env
 load_dotenv()
 
-# Configuração de logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
 # Configurações
+import sys
 import pathlib
 PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+# Logging configurado por quem inicia o processo: __main__ abaixo ou wsgi.py (um arquivo por worker)
+from logging_setup import setup_logging, render_log_line
+from candles import RESOLUTIONS, get_candles, init_candle_tables, update_candles
+from tick_archive import read_ticks
+from price_export import FORMATS as EXPORT_FORMATS, stream_export
+from exchange_config import apply_exchange_url
+from paper_exchange import PaperExchange, db_price_source
+from account_valuation import AccountValuator
+from pnl_ledger import PnLLedger, ensure_fee_column
+from order_manager import TERMINAL, OrderManager, OrderStateStore, SimulatedFillExchange
+from shared_state import SharedState
+from http_cache import DataVersions, ResponseCache, file_version, time_bucket
+from history_pages import (PRICES, TRADES, fetch_page, format_timestamp, init_history_indexes, iter_ndjson,
+                           normalize_stored_times, parse_page_query)
+from cycle_tracing import load_summaries as load_trace_summaries
+from instrumentation import (METRICS_DIR_ENV, MetricsRegistry, InstrumentedExchange, SystemSampler, instrument_app,
+                             render_workers, slowest_routes, write_snapshot, connect as metered_connect)
+logger = logging.getLogger(__name__)
 DB_PATH = os.getenv('DB_PATH', str(PROJECT_ROOT / 'memecoin.db'))
 BINANCE_API_KEY = os.getenv('BINANCE_API_KEY', '')
 BINANCE_API_SECRET = os.getenv('BINANCE_API_SECRET', '')
 USE_TESTNET = os.getenv('USE_TESTNET', 'true').lower() == 'true'
+# MOCOVE_EXCHANGE=paper: ordens casadas localmente (paper_exchange) sobre os preços gravados
+PAPER_TRADING = os.getenv('MOCOVE_EXCHANGE', 'binance').lower() == 'paper'
 
 app = Flask(__name__)
 CORS(app)
 
-# Configurar Binance (Testnet)
-exchange = ccxt.binance({
-    'apiKey': BINANCE_API_KEY,
-    'secret': BINANCE_API_SECRET,
-    'sandbox': USE_TESTNET,  # True para testnet
-    'enableRateLimit': True,
+# Métricas (Prometheus em /metrics): latência por rota, SQLite, exchange, caches e sistema.
+# MOCOVE_METRICS_DIR (definido por serve_backend.py): snapshots por worker, agregados em /metrics
+METRICS_DIR = os.getenv(METRICS_DIR_ENV)
+metrics = MetricsRegistry()
+instrument_app(app, metrics)
+system_sampler = SystemSampler(metrics, interval_s=float(os.getenv('METRICS_SAMPLE_INTERVAL_S', 5)),
+                               snapshot_dir=METRICS_DIR)
+
+# Configurar Binance (Testnet); MOCOVE_EXCHANGE_URL aponta para a exchange do replay
+def build_exchange(testnet: bool):
+    """Cliente ccxt da Binance no modo pedido"""
+    return InstrumentedExchange(apply_exchange_url(ccxt.binance({
+        'apiKey': BINANCE_API_KEY,
+        'secret': BINANCE_API_SECRET,
+        'sandbox': testnet,  # True para testnet
+        'enableRateLimit': True,
+    })), metrics)
+
+if PAPER_TRADING:
+    exchange = InstrumentedExchange(PaperExchange.from_env(price_source=db_price_source(DB_PATH)), metrics, 'paper')
+else:
+    exchange = build_exchange(USE_TESTNET)
+
+# Estado compartilhado entre workers (modo de trading, chaves de ordem); ver serve_backend.py
+shared_state = SharedState(DB_PATH)
+metrics.track_cache('shared_state', shared_state)
+
+# ETag/304 e compressão para os endpoints consultados pelo dashboard (ver http_cache.py)
+data_versions = DataVersions(DB_PATH, {
+    'trades': 'SELECT MAX(id) FROM trades',  # append-only
+    'prices': 'SELECT MIN(id), MAX(id) FROM prices',  # MIN muda quando o arquivamento remove ticks
+    'positions': 'SELECT COUNT(*), MAX(last_update), TOTAL(current_price), TOTAL(quantity), '
+                 'TOTAL(peak_price) FROM portfolio_positions',
 })
+response_cache = ResponseCache(enabled=os.getenv('HTTP_CACHE', 'true').lower() == 'true')
+response_cache.init_app(app)
+metrics.track_cache('http_responses', response_cache)
+metrics.track_cache('data_versions', data_versions)
+# Performance do portfólio usa preço ao vivo: a versão também vence a cada N segundos
+PORTFOLIO_ETAG_TTL_S = float(os.getenv('PORTFOLIO_ETAG_TTL_S', 10))
+WATCHLIST_ETAG_TTL_S = float(os.getenv('WATCHLIST_ETAG_TTL_S', 30))
+MODEL_METADATA_FILE = os.path.join(PROJECT_ROOT, 'artifacts', 'memecoin_model_metadata.json')
+
+# Avaliação do saldo em USD: um fetch_tickers por consulta, última avaliação em memória
+valuator = AccountValuator(exchange, db_path=DB_PATH, exchange_name='paper' if PAPER_TRADING else 'binance')
+
+# Livro de P&L realizado (custo médio), criado no primeiro uso e sincronizado a cada trade gravado
+_pnl_ledger: Optional[PnLLedger] = None
+
+def get_pnl_ledger() -> PnLLedger:
+    """Retorna o livro de P&L já sincronizado com a tabela trades"""
+    global _pnl_ledger
+    if _pnl_ledger is None:
+        _pnl_ledger = PnLLedger(DB_PATH)
+    _pnl_ledger.sync()
+    return _pnl_ledger
+
+# Ordens: envio em segundo plano, estados conciliados e trades gravados em lote.
+# Testnet sem paper trading: execução simulada pelo último preço, como antes.
+# Estados gravados em order_states: qualquer worker responde por uma ordem recebida por outro.
+ORDER_WAIT_S = float(os.getenv('ORDER_WAIT_S', 10))
+order_states = OrderStateStore(DB_PATH)
+order_manager = OrderManager(
+    exchange_factory=lambda: SimulatedFillExchange(exchange) if USE_TESTNET and not PAPER_TRADING else exchange,
+    db_path=DB_PATH,
+    max_in_flight=int(os.getenv('ORDER_MAX_IN_FLIGHT', 32)),
+    on_persist=lambda _: get_pnl_ledger(),
+    state_store=order_states,
+)
+
+def apply_trading_mode(testnet: bool):
+    """Troca o modo deste worker (cliente ccxt e avaliador de saldo)"""
+    global USE_TESTNET, exchange, valuator
+    USE_TESTNET = testnet
+    if not PAPER_TRADING:
+        exchange = build_exchange(testnet)
+        valuator = AccountValuator(exchange, db_path=DB_PATH, exchange_name='binance')
+    logger.info(f"Modo de trading do worker {os.getpid()}: {'testnet' if testnet else 'real'}")
+
+@app.before_request
+def start_system_sampler():
+    system_sampler.ensure_started()  # uma thread por worker, criada após o fork
+
+@app.before_request
+def sync_trading_mode():
+    """Aplica o modo gravado por outro worker (leitura em memória se nada mudou)"""
+    try:
+        testnet = shared_state.get('use_testnet')
+    except sqlite3.Error as e:
+        logger.warning(f"Estado compartilhado indisponível: {e}")
+        return
+    if testnet is not None and testnet != USE_TESTNET:
+        apply_trading_mode(testnet)
+
+def order_response(state: Dict):
+    """Resposta de /api/orders: 200 no estado terminal, 202 com a ordem ainda em andamento"""
+    return jsonify(state), 200 if state['state'] in TERMINAL else 202
+
+def trade_response(state: Dict, raw: Optional[Dict] = None):
+    """Resposta de /api/execute_trade a partir do estado da ordem (deste worker ou gravado por outro)"""
+    if state['state'] not in TERMINAL:
+        return jsonify({'success': False, 'order_state': state,
+                        'message': 'Ordem enviada, execução ainda pendente'}), 202
+    if not state['filled']:
+        return jsonify({'error': state['error'] or f"Ordem {state['state']} sem execução",
+                        'order_state': state}), 500
+    return jsonify({
+        'success': True,
+        'order': raw,
+        'order_state': state,
+        'message': f"Ordem de {state['side']} executada com sucesso"
+    })
+
+def claim_order_key(key: Optional[str], respond=order_response):
+    """None se a chave é deste worker; senão a resposta com a ordem do outro worker (409 se ainda não gravada)"""
+    if not key or order_manager.get(key) is not None:
+        return None
+    owner = shared_state.claim(f"order:{key}", os.getpid())
+    if owner is None or owner == os.getpid():
+        return None
+    state = order_states.get(key)
+    if state is None:
+        return jsonify({'error': f'Ordem {key} já recebida pelo worker {owner}', 'key': key}), 409
+    return respond(state)
 
 # Inicializar banco de dados
 def init_database():
@@ -71,9 +208,11 @@ def init_database():
             price REAL NOT NULL,
             total REAL NOT NULL,
             status TEXT DEFAULT 'completed',
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            fee REAL DEFAULT 0
         )
     ''')
+    ensure_fee_column(cursor.connection)  # bancos criados antes da coluna de taxa
     
     # Tabela de configurações
     cursor.execute('''
@@ -94,18 +233,55 @@ def init_database():
             INSERT INTO settings (symbol, amount, volatility_threshold)
             VALUES ('DOGE/BUSD', 100, 0.05)
         ''')
-    
+
+    # Candles OHLCV agregados a partir dos ticks (catch-up do que ficou pendente)
+    init_candle_tables(conn)
+    # Índices da paginação por cursor (trades/preços); datas antigas com 'T' migradas uma única vez
+    init_history_indexes(conn)
+    normalize_stored_times(conn)
+    conn.commit()
+    update_candles(conn)
+
     conn.commit()
     conn.close()
     logger.info("Banco de dados inicializado com sucesso")
 
 # Funções auxiliares
 def get_db_connection():
-    """Retorna conexão com o banco de dados"""
-    conn = sqlite3.connect(DB_PATH)
+    """Retorna conexão com o banco de dados (tempo de consulta nas métricas)"""
+    conn = metered_connect(DB_PATH, metrics)
     conn.row_factory = sqlite3.Row  # Para acessar colunas por nome
     return conn
 
+def history_page_response(source, default_limit=50, max_limit=500):
+    """Página do histórico (JSON) ou o histórico inteiro em NDJSON (format=ndjson).
+
+    Na resposta JSON o cursor da próxima página vai nos cabeçalhos X-Next-Cursor
+    e Link (rel="next"), preservando o corpo em lista dos clientes antigos.
+    """
+    if request.args.get('format') == 'ndjson':
+        query = parse_page_query(source, request.args, default_limit=None, max_limit=None)
+        return Response(stream_with_context(iter_ndjson(DB_PATH, source, query)),
+                        mimetype='application/x-ndjson')
+    query = parse_page_query(source, request.args, default_limit, max_limit)
+    conn = get_db_connection()
+    try:
+        rows, next_cursor = fetch_page(conn, source, query)
+    finally:
+        conn.close()
+    response = jsonify(rows)
+    set_next_cursor(response, next_cursor)
+    return response
+
+def set_next_cursor(response, next_cursor):
+    """Cabeçalhos X-Next-Cursor e Link para a próxima página"""
+    if next_cursor:
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+    return response
+
 def calculate_volatility(prices: List[float]) -> float:
     """Calcula volatilidade baseada nos últimos preços"""
     if len(prices) < 2:
@@ -139,38 +315,18 @@ def get_latest_prices(symbol: str, limit: int = 10) -> List[float]:
 # Endpoints da API
 
 @app.route('/api/trades', methods=['GET'])
+@response_cache.conditional(lambda: data_versions.get('trades'))
 def get_trades():
-    """Retorna lista de negociações"""
-    try:
-        # Pega o parâmetro 'limit' da query string, padrão 50
-        limit = request.args.get('limit', default=50, type=int)
-        if not limit or limit < 1 or limit > 500:
-            limit = 50
-
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(f'''
-            SELECT * FROM trades 
-            ORDER BY date DESC 
-            LIMIT ?
-        ''', (limit,))
-
-        trades = []
-        for row in cursor.fetchall():
-            trades.append({
-                'id': row['id'],
-                'date': row['date'],
-                'type': row['type'],
-                'symbol': row['symbol'],
-                'amount': row['amount'],
-                'price': row['price'],
-                'total': row['total'],
-                'status': row['status']
-            })
-
-        conn.close()
-        return jsonify(trades)
+    """Retorna lista de negociações (mais recentes primeiro).
 
+    Paginação por cursor: limit (1-500, padrão 50), cursor (de X-Next-Cursor),
+    fields=id,date,..., start/end, symbol/type/status, order=asc|desc e
+    format=ndjson para o histórico inteiro em streaming.
+    """
+    try:
+        return history_page_response(TRADES)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Erro ao buscar negociações: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -193,24 +349,27 @@ def create_trade():
         
         conn = get_db_connection()
         cursor = conn.cursor()
+        ensure_fee_column(conn)
         
-        # Inserir trade
+        # Inserir trade (fee opcional, na moeda de cotação)
         cursor.execute('''
-            INSERT INTO trades (date, type, symbol, amount, price, total, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO trades (date, type, symbol, amount, price, total, status, fee)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
-            data['date'],
+            format_timestamp(data['date']),  # clientes mandam isoformat() com 'T'
             data['type'],
             data['symbol'],
             data['amount'],
             data['price'],
             data['total'],
-            data.get('status', 'completed')
+            data.get('status', 'completed'),
+            float(data.get('fee') or 0)
         ))
         
         trade_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        get_pnl_ledger()
         
         logger.info(f"Trade criado: {data['type'].upper()} {data['symbol']} - ${data['total']}")
         return jsonify({'id': trade_id, 'message': 'Trade criado com sucesso'}), 201
@@ -221,44 +380,25 @@ def create_trade():
 
 @app.route('/api/trades/daily-performance', methods=['GET'])
 def get_daily_performance():
-    """Retorna performance diária de trading"""
+    """Retorna performance diária de trading (P&L realizado a custo médio, do livro de P&L)"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        today = get_pnl_ledger().day_totals()
         
-        # Buscar trades de hoje
-        cursor.execute('''
-            SELECT type, total FROM trades 
-            WHERE date(date) = date('now', 'localtime')
-            ORDER BY date DESC
-        ''')
-        
-        trades_today = cursor.fetchall()
-        
-        total_trades = len(trades_today)
-        total_profit = 0
-        winning_trades = 0
-        
-        # Calcular P&L simples (vendas - compras)
-        for trade in trades_today:
-            if trade['type'] == 'sell':
-                total_profit += trade['total']
-                if trade['total'] > 0:
-                    winning_trades += 1
-            elif trade['type'] == 'buy':
-                total_profit -= trade['total']
-        
-        win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
+        total_trades = int(today['trades'])
+        winning_trades = int(today['wins'])
+        losing_trades = int(today['losses'])
+        closed_trades = winning_trades + losing_trades
+        win_rate = (winning_trades / closed_trades * 100) if closed_trades > 0 else 0
         
         performance = {
             'total_trades': total_trades,
-            'total_profit': round(total_profit, 2),
+            'total_profit': round(today['realized_pnl'], 2),
+            'fees': round(today['fees'], 2),
             'win_rate': round(win_rate, 2),
             'winning_trades': winning_trades,
-            'losing_trades': total_trades - winning_trades
+            'losing_trades': losing_trades
         }
         
-        conn.close()
         return jsonify({
             'success': True,
             'performance': performance
@@ -268,7 +408,22 @@ def get_daily_performance():
         logger.error(f"Erro ao calcular performance diária: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/performance', methods=['GET'])
+@response_cache.conditional(lambda: (data_versions.get('trades'), datetime.now().date()))
+def get_performance_metrics():
+    """Métricas de performance do histórico inteiro (acumulados do livro de P&L, custo fixo).
+
+    days: janela do P&L líquido diário (padrão 30, máx. 365).
+    """
+    try:
+        days = min(max(request.args.get('days', default=30, type=int), 1), 365)
+        return jsonify({'success': True, 'performance': get_pnl_ledger().performance(days)})
+    except Exception as e:
+        logger.error(f"Erro ao calcular métricas de performance: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/portfolio/performance', methods=['GET'])
+@response_cache.conditional(lambda: (data_versions.get('positions'), time_bucket(PORTFOLIO_ETAG_TTL_S)))
 def get_portfolio_performance():
     """Retorna performance detalhada do portfólio baseada no preço de compra"""
     try:
@@ -387,39 +542,91 @@ def ai_config():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/prices', methods=['GET'])
+@response_cache.conditional(lambda: data_versions.get('prices'))
 def get_prices():
-    """Retorna histórico de preços"""
+    """Retorna histórico de preços.
+
+    Sem `resolution` (ou resolution=raw) devolve os ticks brutos, inclusive os
+    já arquivados em Parquet; com resolution=1m|5m|15m|1h devolve candles OHLCV.
+    start/end opcionais (ISO-8601) nos dois casos.
+
+    Com cursor, fields, order ou format=ndjson, os ticks da camada SQLite saem
+    paginados por cursor (ver history_pages; limit até 5000, mais recentes
+    primeiro por padrão).
+    """
     try:
+        if request.args.get('resolution', 'raw') == 'raw' and any(
+                name in request.args for name in ('cursor', 'fields', 'order', 'format')):
+            return history_page_response(PRICES, max_limit=5000)
+
         symbol = request.args.get('symbol', 'DOGE/BUSD')
         limit = int(request.args.get('limit', 50))
-        
+        resolution = request.args.get('resolution', 'raw')
+
+        if resolution != 'raw':
+            if resolution not in RESOLUTIONS:
+                return jsonify({'error': f"Resolução inválida: {resolution} (use raw, {', '.join(RESOLUTIONS)})"}), 400
+            conn = get_db_connection()
+            try:
+                candles = get_candles(conn, symbol, resolution, limit=limit,
+                                      start=request.args.get('start'), end=request.args.get('end'))
+            finally:
+                conn.close()
+            return jsonify(candles)
+
+        # Ticks brutos: SQLite recente + partições Parquet arquivadas
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM prices 
-            WHERE symbol = ?
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        ''', (symbol, limit))
-        
-        prices = []
-        for row in cursor.fetchall():
-            prices.append({
-                'id': row['id'],
-                'symbol': row['symbol'],
-                'timestamp': row['timestamp'],
-                'price': row['price'],
-                'volume': row['volume']
-            })
-        
-        conn.close()
-        return jsonify(prices[::-1])  # Ordem cronológica
-        
+        try:
+            ticks = read_ticks(conn, symbol, start=request.args.get('start'),
+                               end=request.args.get('end'), limit=limit)
+        finally:
+            conn.close()
+
+        prices = [{
+            'id': int(tick_id),
+            'symbol': symbol,
+            'timestamp': ts.isoformat(sep=' '),
+            'price': None if pd.isna(price) else price,
+            'volume': None if pd.isna(volume) else volume
+        } for tick_id, ts, price, volume in zip(ticks['id'], ticks['timestamp'], ticks['price'], ticks['volume'])]
+        return jsonify(prices)  # Ordem cronológica
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Erro ao buscar preços: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/prices/export', methods=['GET'])
+def export_prices():
+    """Exportação em lote do histórico de preços, em streaming.
+
+    Parâmetros: symbols (separados por vírgula; vazio = todos), start/end
+    (ISO-8601), resolution (raw|1m|5m|15m|1h) e format (arrow|parquet).
+    """
+    symbols = [s.strip() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    resolution = request.args.get('resolution', 'raw')
+    fmt = request.args.get('format', 'arrow')
+    start, end = request.args.get('start'), request.args.get('end')
+
+    if resolution != 'raw' and resolution not in RESOLUTIONS:
+        return jsonify({'error': f"Resolução inválida: {resolution} (use raw, {', '.join(RESOLUTIONS)})"}), 400
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Formato inválido: {fmt} (use {', '.join(EXPORT_FORMATS)})"}), 400
+    for value in (start, end):
+        try:
+            if value is not None and pd.Timestamp(value).tzinfo is not None:
+                raise ValueError
+        except ValueError:
+            return jsonify({'error': f"Data inválida: {value} (ISO-8601 sem fuso)"}), 400
+
+    filename = f"prices-{resolution}.{fmt}"
+    return Response(
+        stream_with_context(stream_export(DB_PATH, symbols or None, start, end, resolution, fmt)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
 @app.route('/api/volatility', methods=['GET'])
 def get_volatility():
     """Retorna volatilidade atual"""
@@ -526,58 +733,66 @@ def execute_trade():
         if not trade_type or amount <= 0:
             return jsonify({'error': 'Tipo de negociação e quantidade são obrigatórios'}), 400
         
-        # Buscar preço atual (simulado para testnet)
-        ticker = exchange.fetch_ticker(symbol.replace('/', ''))
-        current_price = ticker['last']
-        
-        if not current_price:
-            return jsonify({'error': 'Não foi possível obter o preço atual'}), 500
-        
-        # Para testnet, simular ordem
-        if USE_TESTNET:
-            order = {
-                'id': f'test_{datetime.now().timestamp()}',
-                'symbol': symbol,
-                'type': 'market',
-                'side': trade_type,
-                'amount': amount,
-                'price': current_price,
-                'status': 'closed',
-                'filled': amount,
-                'cost': amount * current_price
-            }
-        else:
-            # Para produção, executar ordem real
-            if trade_type == 'buy':
-                order = exchange.create_market_buy_order(symbol, amount)
-            else:
-                order = exchange.create_market_sell_order(symbol, amount)
-        
-        # Registrar no banco de dados
-        total = amount * current_price
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO trades (date, type, symbol, amount, price, total)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (datetime.now(), trade_type, symbol, amount, current_price, total))
-        
-        conn.commit()
-        conn.close()
-        
-        logger.info(f"Negociação executada: {trade_type} {amount} {symbol} @ {current_price}")
-        
-        return jsonify({
-            'success': True,
-            'order': order,
-            'message': f'Ordem de {trade_type} executada com sucesso'
-        })
+        # Envio pelo gerenciador de ordens (Idempotency-Key evita ordem dupla em reenvio)
+        key = request.headers.get('Idempotency-Key') or data.get('client_order_id')
+        conflict = claim_order_key(key, respond=trade_response)
+        if conflict:
+            return conflict
+        order = order_manager.submit(symbol, trade_type, amount=amount, source='api', idempotency_key=key)
+        if order.wait(ORDER_WAIT_S) and order.filled:
+            # Registrar no banco de dados já (quantidade e preço efetivamente executados)
+            order_manager.flush()
+            logger.info(f"Negociação executada: {trade_type} {order.filled} {symbol} @ {order.average}")
+        return trade_response(order.to_dict(), order.response)
         
     except Exception as e:
         logger.error(f"Erro ao executar negociação: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/orders', methods=['POST'])
+def submit_order():
+    """Envia ordem a mercado sem bloquear (202); wait=true espera o estado terminal
+    
+    Corpo: symbol, side, amount (base) ou quote_amount (quote), client_order_id,
+    source. O cabeçalho Idempotency-Key tem precedência sobre client_order_id.
+    """
+    try:
+        data = request.get_json() or {}
+        key = request.headers.get('Idempotency-Key') or data.get('client_order_id')
+        conflict = claim_order_key(key)
+        if conflict:
+            return conflict
+        order = order_manager.submit(
+            data.get('symbol', ''), data.get('side', ''),
+            amount=float(data['amount']) if data.get('amount') else None,
+            quote_amount=float(data['quote_amount']) if data.get('quote_amount') else None,
+            idempotency_key=key,
+            source=data.get('source', 'api'),
+        )
+        if str(data.get('wait', request.args.get('wait', ''))).lower() == 'true':
+            order.wait(ORDER_WAIT_S)
+        return order_response(order.to_dict())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erro ao enviar ordem: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/orders/stats', methods=['GET'])
+def get_order_stats():
+    """Estados, ordens em voo, latência e vazão do gerenciador deste worker; all_workers soma os
+    estados gravados por todos os workers (order_states)"""
+    return jsonify({**order_manager.stats(), 'all_workers': order_states.stats()})
+
+@app.route('/api/orders/<key>', methods=['GET'])
+def get_order(key):
+    """Estado de uma ordem pela chave de idempotência (ou client_order_id gerado)"""
+    order = order_manager.get(key)
+    state = order.to_dict() if order is not None else order_states.get(key)  # recebida por outro worker
+    if state is None:
+        return jsonify({'error': f'Ordem {key} não encontrada'}), 404
+    return jsonify(state)
+
 @app.route('/api/market_data', methods=['GET'])
 def get_market_data():
     """Retorna dados de mercado em tempo real"""
@@ -607,8 +822,9 @@ def get_market_data():
             INSERT INTO prices (symbol, timestamp, price, volume)
             VALUES (?, ?, ?, ?)
         ''', (symbol, datetime.now(), ticker['last'], ticker['baseVolume'] or 0))
-        
+
         conn.commit()
+        update_candles(conn)
         conn.close()
         
         return jsonify({
@@ -654,6 +870,7 @@ def get_status():
             'status': 'online',
             'exchange_connected': exchange_status,
             'testnet_mode': USE_TESTNET,
+            'paper_trading': PAPER_TRADING,
             'database': {
                 'prices_count': prices_count,
                 'trades_count': trades_count
@@ -718,7 +935,7 @@ def get_system_status():
 def get_balance():
     """Retorna saldo da conta"""
     try:
-        if USE_TESTNET:
+        if USE_TESTNET and not PAPER_TRADING:
             # Simular saldo para testnet com mais moedas
             balance_data = {
                 'USDT': {'free': 1000.0, 'used': 50.0, 'total': 1050.0},
@@ -740,9 +957,15 @@ def get_balance():
             elif isinstance(details, (int, float)):
                 simplified_balances[coin] = details
         
+        # Todos os ativos precificados num único snapshot (fetch_tickers / último preço gravado)
+        valuation = valuator.value(balance_data)
+        
         return jsonify({
             'success': True,
             'balances': simplified_balances,
+            'total_usd': valuation.total_usd,
+            'usd_values': {asset: b['usd_value'] for asset, b in valuation.balances.items()},
+            'unpriced': valuation.unpriced,
             'timestamp': datetime.now().isoformat()
         })
         
@@ -750,7 +973,18 @@ def get_balance():
         logger.error(f"Erro ao obter saldo: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/balance/valuation', methods=['GET'])
+def get_balance_valuation():
+    """Última avaliação do saldo em USD, sem chamar a exchange (para o dashboard)"""
+    last = valuator.last
+    return jsonify({
+        'success': True,
+        'valuation': last.to_dict() if last is not None else None,
+        'timestamp': datetime.now().isoformat()
+    })
+
 @app.route('/api/watchlist/summary', methods=['GET'])
+@response_cache.conditional(lambda: time_bucket(WATCHLIST_ETAG_TTL_S))
 def get_watchlist_summary():
     """Retorna resumo da watchlist"""
     try:
@@ -908,7 +1142,8 @@ def get_ai_robust_log():
             lines = log_content.split('\n')
             if len(lines) > 2000:
                 lines = lines[-2000:]
-                log_content = '\n'.join(lines)
+            # O arquivo é gravado em JSON Lines; o dashboard exibe o formato texto
+            log_content = '\n'.join(render_log_line(line) for line in lines)
             
             return jsonify({
                 'success': True,
@@ -929,10 +1164,11 @@ def get_ai_robust_log():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/model/info', methods=['GET'])
+@response_cache.conditional(lambda: file_version(MODEL_METADATA_FILE))
 def get_model_info():
-    """Retorna informações sobre o modelo treinado"""
+    """Retorna informações sobre o modelo treinado (JSON relido só quando o arquivo muda)"""
     try:
-        metadata_file = os.path.join(PROJECT_ROOT, 'artifacts', 'memecoin_model_metadata.json')
+        metadata_file = MODEL_METADATA_FILE
         
         if os.path.exists(metadata_file):
             with open(metadata_file, 'r', encoding='utf-8') as f:
@@ -961,41 +1197,29 @@ def get_model_info():
 
 @app.route('/api/trading/history', methods=['GET'])
 def get_trading_history():
-    """Retorna histórico de trades executados"""
+    """Retorna histórico de trades executados (paginado por cursor, como /api/trades)"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Buscar trades mais recentes
-        cursor.execute('''
-            SELECT id, symbol, side, amount, price, timestamp, status, profit_loss
-            FROM trades 
-            ORDER BY timestamp DESC 
-            LIMIT 50
-        ''')
-        
-        trades = []
-        for row in cursor.fetchall():
-            trades.append({
-                'id': row[0],
-                'symbol': row[1],
-                'side': row[2],
-                'amount': row[3],
-                'price': row[4],
-                'timestamp': row[5],
-                'status': row[6],
-                'profit_loss': row[7]
-            })
-        
-        conn.close()
-        
+        query = parse_page_query(TRADES, request.args)
+        conn = get_db_connection()
+        try:
+            rows, next_cursor = fetch_page(conn, TRADES, query)
+        finally:
+            conn.close()
+
+        # Nomes históricos deste endpoint: side = type, timestamp = date
+        renamed = {'type': 'side', 'date': 'timestamp'}
+        trades = [{renamed.get(name, name): value for name, value in row.items()} for row in rows]
+
         return jsonify({
             'success': True,
             'trades': trades,
             'count': len(trades),
+            'next_cursor': next_cursor,
             'timestamp': datetime.now().isoformat()
         })
-        
+
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Erro ao obter histórico de trades: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -1046,6 +1270,16 @@ def get_market_data_by_symbol(symbol):
         logger.error(f"Erro ao obter dados de mercado para {symbol}: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Métricas no formato de texto do Prometheus (de todos os workers com MOCOVE_METRICS_DIR)"""
+    if METRICS_DIR:
+        write_snapshot(metrics, METRICS_DIR)  # a parte deste worker sempre atualizada
+        text = render_workers(METRICS_DIR, metrics.prefix)
+    else:
+        text = metrics.render()
+    return Response(text, mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/api/system/metrics', methods=['GET'])
 def get_system_metrics():
     """Retorna métricas detalhadas do sistema"""
@@ -1066,7 +1300,7 @@ def get_system_metrics():
         successful_trades = 0
         
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = metered_connect(DB_PATH, metrics)
             cursor = conn.cursor()
             
             cursor.execute('SELECT COUNT(*) FROM trades')
@@ -1079,21 +1313,30 @@ def get_system_metrics():
         except:
             pass
         
-        metrics = {
+        # Amostra real do sistema (thread em segundo plano); a primeira requisição amostra na hora
+        system = system_sampler.last or system_sampler.sample()
+        
+        system_metrics = {
             'uptime_hours': round(uptime_hours, 2),
             'last_activity': last_activity,
             'total_trades': total_trades,
             'successful_trades': successful_trades,
             'success_rate': round((successful_trades / max(total_trades, 1)) * 100, 2),
             'ai_cycles_completed': max(total_trades, 0),
-            'system_load': round(np.random.random() * 30 + 10, 2),  # Simulated
-            'memory_usage': round(np.random.random() * 40 + 30, 2),  # Simulated
+            'system_load': None if system['cpu_percent'] is None else round(system['cpu_percent'], 2),
+            'memory_usage': None if system['memory_percent'] is None else round(system['memory_percent'], 2),
+            'load_average_1m': system['load1'],
+            'process_rss_mb': None if system['process_rss_bytes'] is None else round(system['process_rss_bytes'] / 2**20, 1),
+            'system_source': system['source'],
+            'sampled_at': datetime.fromtimestamp(system['sampled_at']).isoformat(),
+            'slowest_routes': slowest_routes(metrics),
+            'caches': metrics.cache_stats(),
             'timestamp': datetime.now().isoformat()
         }
         
         return jsonify({
             'success': True,
-            'metrics': metrics,
+            'metrics': system_metrics,
             'timestamp': datetime.now().isoformat()
         })
         
@@ -1198,6 +1441,9 @@ def get_ai_trading_status():
             else:
                 status['message'] = f'AI Agent inativo - última atividade há {int(time_diff / 60)} minutos'
         
+        # Percentis por etapa do ciclo gravados pelos agentes (cycle_tracing)
+        status['tracing'] = load_trace_summaries()
+        
         return jsonify({
             'success': True,
             'status': status
@@ -1210,7 +1456,6 @@ def get_ai_trading_status():
 @app.route('/api/trading/mode', methods=['GET', 'POST'])
 def trading_mode():
     """GET: Retorna modo atual / POST: Altera modo de trading"""
-    global USE_TESTNET, exchange  # Declarar no início da função
     
     try:
         if request.method == 'GET':
@@ -1238,16 +1483,10 @@ def trading_mode():
             
             # Alterar o modo de trading dinamicamente
             try:
-                # Atualizar variável global
-                USE_TESTNET = new_testnet_mode
-                
-                # Reconfigurar o exchange com o novo modo
-                exchange = ccxt.binance({
-                    'apiKey': BINANCE_API_KEY,
-                    'secret': BINANCE_API_SECRET,
-                    'sandbox': USE_TESTNET,
-                    'enableRateLimit': True,
-                })
+                # Gravar no estado compartilhado (os outros workers aplicam na próxima requisição)
+                # e reconfigurar este worker (paper trading mantém o motor local)
+                shared_state.set('use_testnet', bool(new_testnet_mode))
+                apply_trading_mode(bool(new_testnet_mode))
                 
                 # Atualizar arquivo .env para persistir a mudança
                 env_path = os.path.join(PROJECT_ROOT, '.env')
@@ -1317,6 +1556,8 @@ def serve_static(filename):
 
 # Inicialização
 if __name__ == '__main__':
+    # Servidor de desenvolvimento (um processo); com workers o logging é configurado em wsgi.py
+    setup_logging(log_file=os.getenv('BACKEND_LOG_FILE'))
     init_database()
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('DEBUG', 'false').lower() == 'true'
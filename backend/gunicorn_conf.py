@@ -0,0 +1,45 @@
+"""
+Configuração do gunicorn para o backend (use via serve_backend.py, que
+inicializa o banco uma vez antes de subir os workers). Com MOCOVE_EXCHANGE=paper
+o número de workers é forçado a 1, mesmo com -w na linha de comando.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logging_setup import WORKER_ID_ENV, next_worker_id
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1))
+threads = int(os.getenv('WEB_THREADS', 4))
+worker_class = 'gthread'
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
+preload_app = False  # cada worker importa o app depois do fork
+
+
+def on_starting(server):
+    # A PaperExchange guarda ordens e saldo na memória do worker: um só processo
+    if os.getenv('MOCOVE_EXCHANGE', 'binance').lower() == 'paper' and server.num_workers > 1:
+        server.log.warning(f"MOCOVE_EXCHANGE=paper: usando 1 worker em vez de {server.num_workers}")
+        server.num_workers = 1
+
+
+def pre_fork(server, worker):
+    # Número estável por worker (arquivo de log próprio); o substituto herda o do que saiu
+    worker.worker_id = next_worker_id(getattr(w, 'worker_id', -1) for w in server.WORKERS.values())
+
+
+def post_fork(server, worker):
+    os.environ[WORKER_ID_ENV] = str(worker.worker_id)
+
+
+def post_worker_init(worker):
+    from wsgi import warm_up
+    warm_up()
+
+
+def worker_exit(server, worker):
+    from wsgi import shutdown
+    shutdown()
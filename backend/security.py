@@ -4,13 +4,57 @@ Implementa limitações e verificações para conta Binance real
 """
 
 import os
-import sqlite3
+import sys
+import time
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Any, Tuple, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Callable, Tuple, Optional
+
+# Módulos compartilhados ficam na raiz do projeto
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from pnl_ledger import PnLLedger
 
 logger = logging.getLogger(__name__)
 
+class TTLCache:
+    """Cache por chave com validade curta; falhas do loader não são guardadas"""
+    
+    def __init__(self, ttl_s: float, clock: Callable[[], float] = time.monotonic):
+        self.ttl_s = ttl_s
+        self.clock = clock
+        self._entries: Dict[Any, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key, loader: Callable[[], Any]):
+        """Valor em cache se ainda válido; senão chama loader() e guarda o resultado"""
+        if self.ttl_s > 0:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and self.clock() - entry[0] < self.ttl_s:
+                    self.hits += 1
+                    return entry[1]
+        self.misses += 1
+        value = loader()
+        if self.ttl_s > 0:
+            with self._lock:
+                self._entries[key] = (self.clock(), value)
+        return value
+    
+    def invalidate(self, key=None):
+        """Remove uma chave (ou todas)"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
 class TradingSecurityManager:
     """Gerencia segurança e limitações para trading real"""
     
@@ -19,6 +63,33 @@ class TradingSecurityManager:
         self.max_trade_amount = float(os.getenv('MAX_TRADE_AMOUNT', 100.0))
         self.daily_loss_limit = float(os.getenv('DAILY_LOSS_LIMIT', 50.0))
         self.min_balance_usdt = float(os.getenv('MIN_BALANCE_USDT', 10.0))
+        # Exposição máxima por símbolo a custo médio (0 = sem limite)
+        self.max_symbol_exposure = float(os.getenv('MAX_SYMBOL_EXPOSURE', 0.0))
+        self._ledger: Optional[PnLLedger] = None
+        # Pipeline pré-trade: checagens de exchange em paralelo e com cache curto (0 = sem cache)
+        self.parallel_checks = os.getenv('RISK_PARALLEL_CHECKS', 'true').lower() == 'true'
+        self.balance_cache = TTLCache(float(os.getenv('RISK_BALANCE_TTL_S', 3.0)))
+        self.ticker_cache = TTLCache(float(os.getenv('RISK_TICKER_TTL_S', 10.0)))
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Pool das checagens de exchange (criado no primeiro uso)"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="risk")
+        return self._executor
+    
+    def invalidate_caches(self):
+        """Descarta saldo e tickers em cache (chamado após cada tentativa de execução)"""
+        self.balance_cache.invalidate()
+        self.ticker_cache.invalidate()
+    
+    @property
+    def ledger(self) -> PnLLedger:
+        """Livro de P&L do banco (criado no primeiro uso)"""
+        if self._ledger is None:
+            self._ledger = PnLLedger(self.db_path)
+        return self._ledger
         
     def validate_trade_amount(self, amount: float, symbol: str) -> Tuple[bool, str]:
         """Valida se o valor do trade está dentro dos limites"""
@@ -59,63 +130,35 @@ class TradingSecurityManager:
             return False, f"Erro na verificação: {str(e)}", 0.0
     
     def calculate_daily_pnl(self) -> float:
-        """Calcula P&L do dia atual"""
+        """P&L realizado do dia atual (custo médio, incluindo posições abertas em dias anteriores)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Data de hoje
-            today = datetime.now().strftime('%Y-%m-%d')
-            
-            # Buscar trades do dia
-            cursor.execute('''
-                SELECT type, quantity, price, total
-                FROM trades 
-                WHERE DATE(timestamp) = ?
-                ORDER BY timestamp
-            ''', (today,))
-            
-            trades = cursor.fetchall()
-            conn.close()
-            
-            total_pnl = 0.0
-            position = 0.0  # Posição atual
-            avg_price = 0.0  # Preço médio de compra
-            
-            for trade_type, quantity, price, total in trades:
-                if trade_type.upper() == 'BUY':
-                    # Compra: adicionar à posição
-                    if position == 0:
-                        avg_price = price
-                    else:
-                        # Recalcular preço médio
-                        total_cost = (position * avg_price) + (quantity * price)
-                        total_quantity = position + quantity
-                        avg_price = total_cost / total_quantity if total_quantity > 0 else price
-                    
-                    position += quantity
-                    
-                elif trade_type.upper() == 'SELL':
-                    # Venda: reduzir posição e calcular P&L
-                    if position > 0:
-                        sold_quantity = min(quantity, position)
-                        pnl = sold_quantity * (price - avg_price)
-                        total_pnl += pnl
-                        position -= sold_quantity
-            
-            return total_pnl
-            
+            self.ledger.sync()
+            return self.ledger.daily_realized()
         except Exception as e:
             logger.error(f"Erro ao calcular P&L diário: {e}")
             return 0.0
     
+    def check_symbol_exposure(self, symbol: str, amount: float, action: str = 'BUY') -> Tuple[bool, str, float]:
+        """Verifica se a compra mantém a exposição do símbolo dentro do limite"""
+        try:
+            exposure = self.ledger.exposure(symbol)['cost_basis']
+            if action.upper() != 'BUY' or self.max_symbol_exposure <= 0:
+                return True, f"Exposição em {symbol}: ${exposure:.2f}", exposure
+            if exposure + amount > self.max_symbol_exposure:
+                return False, (f"Exposição acima do limite em {symbol}: ${exposure + amount:.2f} > "
+                               f"${self.max_symbol_exposure:.2f}"), exposure
+            return True, f"Exposição em {symbol}: ${exposure + amount:.2f} após o trade", exposure
+        except Exception as e:
+            logger.error(f"Erro ao verificar exposição: {e}")
+            return False, f"Erro na verificação de exposição: {str(e)}", 0.0
+    
     def verify_account_balance(self, exchange, min_usdt: Optional[float] = None) -> Tuple[bool, str, Dict]:
         """Verifica saldos da conta"""
         try:
             if min_usdt is None:
                 min_usdt = self.min_balance_usdt
                 
-            balance = exchange.fetch_balance()
+            balance = self.balance_cache.get(id(exchange), exchange.fetch_balance)
             
             usdt_balance = balance.get('USDT', {}).get('free', 0)
             busd_balance = balance.get('BUSD', {}).get('free', 0)
@@ -141,7 +184,7 @@ class TradingSecurityManager:
         """Valida condições de mercado antes do trade"""
         try:
             # Obter ticker atual
-            ticker = exchange.fetch_ticker(symbol)
+            ticker = self.ticker_cache.get((id(exchange), symbol), lambda: exchange.fetch_ticker(symbol))
             
             # Verificar se mercado está ativo
             if not ticker.get('last'):
@@ -163,8 +206,20 @@ class TradingSecurityManager:
             logger.error(f"Erro ao validar condições de mercado: {e}")
             return False, f"Erro na validação de mercado: {str(e)}"
     
+    @staticmethod
+    def _timed(check: Callable[[], Any]) -> Tuple[Any, float]:
+        start = time.perf_counter()
+        result = check()
+        return result, (time.perf_counter() - start) * 1000
+    
     def comprehensive_risk_check(self, trade_data: Dict[str, Any], exchange) -> Dict[str, Any]:
-        """Executa verificação completa de riscos"""
+        """Executa verificação completa de riscos
+        
+        Saldo e condições de mercado (exchange) rodam em paralelo com as checagens
+        locais (valor, P&L diário, exposição); o resultado é montado sempre na mesma
+        ordem, então o veredito não depende da concorrência. Cada validação traz
+        latency_ms.
+        """
         
         checks = {
             'timestamp': datetime.now().isoformat(),
@@ -174,27 +229,38 @@ class TradingSecurityManager:
             'warnings': [],
             'errors': []
         }
+        start = time.perf_counter()
+        symbol = trade_data.get('symbol', '')
+        amount = trade_data.get('amount', 0)
         
         try:
+            # Checagens de exchange primeiro, para sobrepor a latência de rede às locais
+            balance_check = lambda: self.verify_account_balance(exchange)
+            market_check = lambda: self.validate_market_conditions(symbol, exchange)
+            if self.parallel_checks:
+                balance_future = self.executor.submit(self._timed, balance_check)
+                market_future = self.executor.submit(self._timed, market_check)
+            
             # 1. Validar valor do trade
-            amount_valid, amount_msg = self.validate_trade_amount(
-                trade_data.get('amount', 0), 
-                trade_data.get('symbol', '')
+            (amount_valid, amount_msg), amount_ms = self._timed(
+                lambda: self.validate_trade_amount(amount, symbol)
             )
             checks['validations']['amount'] = {
                 'status': 'PASS' if amount_valid else 'FAIL',
-                'message': amount_msg
+                'message': amount_msg,
+                'latency_ms': round(amount_ms, 3)
             }
             
             if not amount_valid:
                 checks['errors'].append(amount_msg)
             
             # 2. Verificar limites diários
-            daily_ok, daily_msg, daily_pnl = self.check_daily_limits()
+            (daily_ok, daily_msg, daily_pnl), daily_ms = self._timed(self.check_daily_limits)
             checks['validations']['daily_limits'] = {
                 'status': 'PASS' if daily_ok else 'FAIL',
                 'message': daily_msg,
-                'current_pnl': daily_pnl
+                'current_pnl': daily_pnl,
+                'latency_ms': round(daily_ms, 3)
             }
             
             if not daily_ok:
@@ -202,24 +268,44 @@ class TradingSecurityManager:
             elif 'AVISO' in daily_msg:
                 checks['warnings'].append(daily_msg)
             
+            # 2b. Exposição do símbolo (posição a custo médio do ledger, já sincronizado acima)
+            (exposure_ok, exposure_msg, exposure), exposure_ms = self._timed(
+                lambda: self.check_symbol_exposure(symbol, amount, trade_data.get('action', 'BUY'))
+            )
+            checks['validations']['exposure'] = {
+                'status': 'PASS' if exposure_ok else 'FAIL',
+                'message': exposure_msg,
+                'current_exposure': exposure,
+                'latency_ms': round(exposure_ms, 3)
+            }
+            
+            if not exposure_ok:
+                checks['errors'].append(exposure_msg)
+            
             # 3. Verificar saldo da conta
-            balance_ok, balance_msg, balance_info = self.verify_account_balance(exchange)
+            if self.parallel_checks:
+                (balance_ok, balance_msg, balance_info), balance_ms = balance_future.result()
+            else:
+                (balance_ok, balance_msg, balance_info), balance_ms = self._timed(balance_check)
             checks['validations']['balance'] = {
                 'status': 'PASS' if balance_ok else 'FAIL',
                 'message': balance_msg,
-                'balance_info': balance_info
+                'balance_info': balance_info,
+                'latency_ms': round(balance_ms, 3)
             }
             
             if not balance_ok:
                 checks['errors'].append(balance_msg)
             
             # 4. Validar condições de mercado
-            market_ok, market_msg = self.validate_market_conditions(
-                trade_data.get('symbol', ''), exchange
-            )
+            if self.parallel_checks:
+                (market_ok, market_msg), market_ms = market_future.result()
+            else:
+                (market_ok, market_msg), market_ms = self._timed(market_check)
             checks['validations']['market'] = {
                 'status': 'PASS' if market_ok else 'FAIL',
-                'message': market_msg
+                'message': market_msg,
+                'latency_ms': round(market_ms, 3)
             }
             
             if not market_ok:
@@ -233,8 +319,11 @@ class TradingSecurityManager:
             else:
                 checks['overall_status'] = 'APPROVED'
             
+            checks['latency_ms'] = round((time.perf_counter() - start) * 1000, 3)
+            
             # Log do resultado
-            logger.info(f"Risk check completed: {checks['overall_status']} for {trade_data}")
+            logger.info(f"Risk check completed: {checks['overall_status']} in {checks['latency_ms']:.1f} ms "
+                        f"for {trade_data}")
             
             return checks
             
@@ -304,6 +393,9 @@ def execute_secure_trade(trade_data: Dict[str, Any], exchange) -> Dict[str, Any]
                 trade_data['amount'] / trade_data['price']  # Quantidade em base currency
             )
         
+        # A ordem muda saldo e posição: a próxima verificação busca dados novos
+        security_manager.invalidate_caches()
+        
         # Log de sucesso
         security_manager.log_security_event(
             'TRADE_EXECUTED',
@@ -320,6 +412,8 @@ def execute_secure_trade(trade_data: Dict[str, Any], exchange) -> Dict[str, Any]
         }
         
     except Exception as e:
+        # Falha pode ter sido parcial (ordem aceita, resposta perdida)
+        security_manager.invalidate_caches()
         security_manager.log_security_event(
             'TRADE_ERROR',
             f"Erro na execução do trade: {str(e)}",
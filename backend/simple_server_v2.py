@@ -199,7 +199,7 @@ class MoCoVeHandler(BaseHTTPRequestHandler):
                                 INSERT INTO trades (date, type, symbol, amount, price, total)
                                 VALUES (?, ?, ?, ?, ?, ?)
                             ''', (
-                                datetime.now().isoformat(),
+                                datetime.now().isoformat(sep=' '),
                                 trade_data.get('type', 'buy'),
                                 trade_data.get('symbol', 'DOGE/BUSD'),
                                 trade_data.get('amount', 100),
@@ -272,8 +272,8 @@ def init_database():
     cursor.execute('SELECT COUNT(*) FROM trades')
     if cursor.fetchone()[0] == 0:
         sample_trades = [
-            (datetime.now().isoformat(), 'buy', 'DOGE/BUSD', 1000, 0.08, 80),
-            (datetime.now().isoformat(), 'sell', 'DOGE/BUSD', 500, 0.082, 41),
+            (datetime.now().isoformat(sep=' '), 'buy', 'DOGE/BUSD', 1000, 0.08, 80),
+            (datetime.now().isoformat(sep=' '), 'sell', 'DOGE/BUSD', 500, 0.082, 41),
         ]
         cursor.executemany(
             'INSERT INTO trades (date, type, symbol, amount, price, total) VALUES (?, ?, ?, ?, ?, ?)',
@@ -0,0 +1,54 @@
+"""
+MoCoVe - Ponto de entrada WSGI do backend para servidores multi-worker
+Cada worker importa este módulo depois do fork (sem preload): clientes ccxt,
+conexões SQLite e a thread de logging são do próprio processo. O estado que
+precisa ser igual entre workers (modo de trading, chaves de ordem) fica no
+SharedState; caches (ledger, avaliação, TTL de risco) são por worker e
+reconstruídos a partir do banco. O logging é configurado aqui, antes do app:
+cada worker grava em BACKEND_LOG_FILE com o sufixo .w<MOCOVE_WORKER_ID>.
+
+    python serve_backend.py --workers 4                       # launcher (gunicorn; --server prefork sem ele)
+    gunicorn -c backend/gunicorn_conf.py --chdir backend wsgi:application
+"""
+
+import os
+import sys
+import time
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from logging_setup import setup_logging, worker_log_file
+
+load_dotenv()
+setup_logging(log_file=worker_log_file(os.getenv('BACKEND_LOG_FILE')))
+
+from app import app, get_pnl_ledger, order_manager, metrics, METRICS_DIR
+from instrumentation import write_snapshot
+
+application = app
+logger = logging.getLogger(__name__)
+
+
+def warm_up() -> float:
+    """Aquece o worker antes de aceitar conexões; retorna o tempo gasto em ms"""
+    start = time.perf_counter()
+    try:
+        get_pnl_ledger()
+        with app.test_client() as client:
+            client.get('/api/trades?limit=1')
+            client.get('/api/trading/mode')
+    except Exception as e:
+        logger.warning(f"Aquecimento do worker {os.getpid()} incompleto: {e}")
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.info(f"Worker {os.getpid()} aquecido em {elapsed_ms:.0f} ms")
+    return elapsed_ms
+
+
+def shutdown():
+    """Encerramento gracioso do worker: espera ordens em andamento, grava o lote pendente e as métricas"""
+    order_manager.close()
+    if METRICS_DIR:
+        write_snapshot(metrics, METRICS_DIR)  # contadores do worker continuam somados em /metrics
@@ -0,0 +1,591 @@
+#!/usr/bin/env python3
+"""
+Backtest - Backtesting vetorizado (walk-forward) da Strategy e dos sinais de ML
+Reproduz, sobre candles históricos, o ciclo do ai_trading_agent_II:
+saídas (check_exit_signal: SL/TP/trailing) -> analyze -> limite de perda
+diária -> should_execute/set_oco_levels ou venda por sinal, com taxas.
+
+Os indicadores (SMA/EMA/RSI/Bollinger/ATR, tendência, variação 24h e
+volatilidade) são calculados de uma vez como séries NumPy, com a mesma
+janela que o TA do agente usa a cada ciclo; só a máquina de estados da
+posição (stops, limites diários, cooldown) roda barra a barra, sobre listas
+de floats já prontas.
+
+Diferenças em relação ao agente ao vivo:
+- cada candle fechado é um ciclo do agente (current_price = close);
+- a variação 24h vem dos próprios candles (o backend usa o ticker) e a
+  volatilidade é a média de |retorno| dos últimos 10 closes, na mesma
+  escala (fração) que /api/volatility devolve;
+- compra com posição aberta é ignorada (o agente sobrescreveria a posição);
+- a EMA usa a série inteira; o agente recomeça a cada 120 candles, diferença
+  menor que 1e-8 depois do aquecimento.
+
+Sinais de ML (--mode ml): walk-forward com as features e os rótulos de
+ai/train_model; a cada test_bars o modelo é retreinado nas train_bars
+anteriores (sem as future_window últimas, cujo rótulo olha para o teste).
+
+Vários símbolos / conjuntos de parâmetros rodam em paralelo num pool de
+processos (run_many).
+
+Uso:
+    python backtest.py --symbols DOGEUSDT,PEPEUSDT --resolution 1m --workers 4
+    python backtest.py --symbols DOGEUSDT --mode ml --train-bars 3000 --test-bars 500
+"""
+
+import os
+import json
+import math
+import sqlite3
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict, fields, replace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+log = logging.getLogger("Backtest")
+
+DEFAULT_DB_PATH = os.getenv(
+    'DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'memecoin.db')
+)
+
+# Segundos por candle (price_candles e klines)
+RESOLUTION_S = {'1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800, '1h': 3600, '4h': 14400, '1d': 86400}
+
+# Códigos de ação nas séries de sinais
+HOLD, BUY, SELL = 0, 1, -1
+
+
+@dataclass
+class StrategyParams:
+    """Parâmetros da Strategy: mesmos nomes e padrões de ai_trading_agent_II.Settings
+    (o módulo do agente não é importado: ele inicia o auto-treino na importação)"""
+    min_confidence: float = 0.45
+    max_daily_trades: int = 20
+    min_trade_interval_s: int = 180
+    max_position_usd: float = 25.0
+    risk_per_trade_usd: float = 2.5
+    maker_taker_fee_pct: float = 0.001
+    daily_loss_limit_usd: float = 15.0
+    cooldown_after_loss_s: int = 300
+    use_atr_sl_tp: bool = True
+    atr_period: int = 14
+    sl_atr_mult: float = 1.5
+    tp_rr: float = 1.6
+    use_trailing_stop: bool = True
+    trail_atr_mult: float = 1.0
+    trail_activation_rr: float = 1.0
+    volatility_threshold: float = 3.0
+    rsi_period: int = 10
+    rsi_overbought: float = 65
+    rsi_oversold: float = 35
+    sma_fast: int = 5
+    sma_slow: int = 10
+    ema_fast: int = 6
+    ema_slow: int = 12
+    bb_period: int = 15
+    bb_std: float = 2.0
+    min_price_history: int = 30
+
+    @classmethod
+    def from_settings(cls, settings) -> 'StrategyParams':
+        """Copia os campos correspondentes de um Settings (ou qualquer objeto com os mesmos atributos)"""
+        return cls(**{f.name: getattr(settings, f.name) for f in fields(cls) if hasattr(settings, f.name)})
+
+
+@dataclass
+class BacktestResult:
+    """Resultado de um backtest: curvas por candle, trades e métricas"""
+    symbol: str
+    mode: str
+    params: Dict
+    timestamps: np.ndarray
+    equity: np.ndarray
+    drawdown: np.ndarray
+    trades: List[Dict] = field(default_factory=list)
+    metrics: Dict = field(default_factory=dict)
+    folds: List[Dict] = field(default_factory=list)
+
+    def to_dict(self, curves: bool = False) -> Dict:
+        out = {'symbol': self.symbol, 'mode': self.mode, 'params': self.params,
+               'metrics': self.metrics, 'trades': self.trades, 'folds': self.folds}
+        if curves:
+            out.update(timestamps=self.timestamps.tolist(), equity=self.equity.tolist(),
+                       drawdown=self.drawdown.tolist())
+        return out
+
+
+# ===== Dados =====
+
+def load_candles(conn: sqlite3.Connection, symbol: str, resolution: str = '1m',
+                 start: Optional[float] = None, end: Optional[float] = None) -> pd.DataFrame:
+    """Candles OHLCV (ts = abertura em epoch s) de price_candles; sem candles, da tabela klines"""
+    bounds, params = '', []
+    if start is not None:
+        bounds += ' AND t >= ?'
+        params.append(float(start))
+    if end is not None:
+        bounds += ' AND t < ?'
+        params.append(float(end))
+    queries = (
+        'SELECT * FROM (SELECT bucket AS t, open, high, low, close, volume FROM price_candles '
+        'WHERE symbol = ? AND resolution = ?) WHERE 1 = 1',
+        'SELECT * FROM (SELECT open_time / 1000.0 AS t, open, high, low, close, volume FROM klines '
+        'WHERE symbol = ? AND interval = ?) WHERE 1 = 1',
+    )
+    for query in queries:
+        try:
+            rows = conn.execute(query + bounds + ' ORDER BY t', [symbol, resolution, *params]).fetchall()
+        except sqlite3.OperationalError:
+            continue  # tabela inexistente
+        if rows:
+            df = pd.DataFrame(rows, columns=['ts', 'open', 'high', 'low', 'close', 'volume'])
+            return df.astype(float)
+    return pd.DataFrame(columns=['ts', 'open', 'high', 'low', 'close', 'volume'], dtype=float)
+
+
+# ===== Indicadores vetorizados (mesma janela do TA do agente) =====
+
+def _windows(x: np.ndarray, n: int) -> np.ndarray:
+    """Janelas [i-n+1, i] para i >= n-1 (visão, sem cópia)"""
+    return sliding_window_view(x, n) if x.size >= n else np.empty((0, n))
+
+
+def _tail_stat(x: np.ndarray, n: int, stat: str, fill) -> np.ndarray:
+    """stat das últimas n posições em cada i; fill (array ou escalar) onde ainda não há n valores"""
+    out = np.array(np.broadcast_to(fill, x.shape), dtype=float)
+    if x.size >= n:
+        out[n - 1:] = getattr(_windows(x, n), stat)(axis=1)
+    return out
+
+
+def sma_series(close: np.ndarray, period: int) -> np.ndarray:
+    return _tail_stat(close, period, 'mean', close)
+
+
+def ema_series(close: np.ndarray, period: int) -> np.ndarray:
+    ema = pd.Series(close).ewm(span=period, adjust=False).mean().to_numpy()
+    return np.where(np.arange(close.size) + 1 < period, close, ema)
+
+
+def rsi_series(close: np.ndarray, period: int) -> np.ndarray:
+    diff = np.diff(close)
+    out = np.full(close.size, 50.0)
+    if diff.size >= period:
+        gains = _windows(np.clip(diff, 0, None), period).mean(axis=1)
+        losses = _windows(-np.clip(diff, None, 0), period).mean(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(losses == 0, 100.0, 100 - 100 / (1 + gains / losses))
+        out[period:] = rsi
+    return out
+
+
+def bollinger_series(close: np.ndarray, period: int, std_mult: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    mid = _tail_stat(close, period, 'mean', close)
+    std = _tail_stat(close, period, 'std', 0.0)
+    return mid + std_mult * std, mid, mid - std_mult * std
+
+
+def atr_series(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    out = np.zeros(close.size)
+    if close.size < period:
+        return out
+    prev_close = close[:-1]
+    tr = np.maximum(high[1:] - low[1:], np.maximum(np.abs(high[1:] - prev_close), np.abs(low[1:] - prev_close)))
+    if tr.size >= period:
+        out[period:] = _windows(tr, period).mean(axis=1)
+    # Exatamente `period` candles: média das variações absolutas do close
+    out[period - 1] = np.abs(np.diff(close[:period])).mean() if period > 1 else 0.0
+    return out
+
+
+def change_24h_series(ts: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """Variação % contra o close de 24h antes (ou o mais antigo disponível)"""
+    ref = close[np.searchsorted(ts, ts - 86400, side='left')]
+    return (close - ref) / ref * 100
+
+
+def volatility_series(close: np.ndarray, n: int = 10) -> np.ndarray:
+    """Média de |retorno| dos últimos n closes (fração, como /api/volatility)"""
+    ret = np.abs(np.diff(close) / close[:-1])
+    vol = pd.Series(ret).rolling(n - 1, min_periods=1).mean().to_numpy()
+    return np.concatenate([[0.0], vol])
+
+
+# ===== Sinais =====
+
+def strategy_signals(candles: pd.DataFrame, params: StrategyParams,
+                     cache: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+    """Strategy.analyze para todos os candles de uma vez (antes do cooldown, aplicado na simulação).
+    cache: dict por conjunto de candles; guarda as séries por (indicador, período) entre chamadas"""
+    ts = candles['ts'].to_numpy(float)
+    close = candles['close'].to_numpy(float)
+    high = candles['high'].to_numpy(float)
+    low = candles['low'].to_numpy(float)
+    n = close.size
+    p = params
+
+    def series(key, fn, *args):
+        if cache is None:
+            return fn(*args)
+        if key not in cache:
+            cache[key] = fn(*args)
+        return cache[key]
+
+    sma_f = series(('sma', p.sma_fast), sma_series, close, p.sma_fast)
+    sma_s = series(('sma', p.sma_slow), sma_series, close, p.sma_slow)
+    ema_f = series(('ema', p.ema_fast), ema_series, close, p.ema_fast)
+    ema_s = series(('ema', p.ema_slow), ema_series, close, p.ema_slow)
+    rsi = series(('rsi', p.rsi_period), rsi_series, close, p.rsi_period)
+    bb_up, _, bb_lo = series(('bb', p.bb_period, p.bb_std), bollinger_series, close, p.bb_period, p.bb_std)
+    atr = series(('atr', p.atr_period), atr_series, high, low, close, p.atr_period)
+    chg = series(('chg',), change_24h_series, ts, close)
+    vol = series(('vol',), volatility_series, close)
+
+    buy = np.zeros(n)
+    sell = np.zeros(n)
+    # 1) Crossovers
+    buy += 3.0 * ((sma_f > sma_s) & (ema_f > ema_s))
+    sell += 3.0 * ((sma_f < sma_s) & (ema_f < ema_s))
+    # 2) RSI
+    buy += 2.0 * (rsi < p.rsi_oversold)
+    sell += 2.0 * (rsi > p.rsi_overbought)
+    # 3) Bollinger
+    bb_pos = (close - bb_lo) / np.maximum(bb_up - bb_lo, 1e-12)
+    buy += 2.0 * (bb_pos <= 0.2)
+    sell += 2.0 * (bb_pos >= 0.8)
+    # 4) Tendência curta (3 candles)
+    trend = np.zeros(n)
+    trend[2:] = (close[2:] - close[:-2]) / close[:-2] * 100
+    buy += 2.0 * (trend > 0.5)
+    sell += 2.0 * (trend < -0.5)
+    total = np.where(np.arange(n) >= 2, 10.0, 8.0)
+    # 5) Mudança 24h
+    buy += 1.0 * (chg > 1)
+    sell += 1.0 * (chg < -1)
+
+    action = np.where(buy > sell, BUY, np.where(sell > buy, SELL, HOLD))
+    conf = np.where(action == BUY, buy / total, np.where(action == SELL, sell / total, 0.5))
+    high_vol = vol > p.volatility_threshold
+    conf = np.where(high_vol, conf * 0.8, conf)
+
+    stop_distance = np.maximum(atr * p.sl_atr_mult if p.use_atr_sl_tp else close * 0.015, 1e-12)
+    amount = np.minimum(p.risk_per_trade_usd / stop_distance * close, p.max_position_usd)
+    amount = np.where(high_vol, amount * 0.7, amount)
+    return {'action': action, 'confidence': conf, 'amount_usd': amount, 'entry_atr': atr, 'atr': atr,
+            'cooldown': np.ones(n, dtype=bool)}
+
+
+def default_model_factory():
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(n_estimators=100, max_depth=8, min_samples_leaf=2,
+                                  class_weight='balanced', random_state=42, n_jobs=1)
+
+
+def ml_signals(candles: pd.DataFrame, params: StrategyParams, train_bars: int = 3000, test_bars: int = 500,
+               future_window: int = 15, buy_threshold: float = 0.02, sell_threshold: float = -0.02,
+               buy_p: float = 0.5, sell_p: float = 0.5,
+               model_factory: Optional[Callable] = None) -> Tuple[Dict[str, np.ndarray], List[Dict]]:
+    """Sinais do modelo em walk-forward (features/rótulos de ai/train_model); devolve (sinais, folds)"""
+    from ai.train_model import FEATURES, calculate_features, label_threshold
+
+    model_factory = model_factory or default_model_factory
+    n = len(candles)
+    frame = pd.DataFrame({
+        'coin_id': 'bt', 'timestamp': pd.to_datetime(candles['ts'].to_numpy(float), unit='s', utc=True),
+        'price': candles['close'].to_numpy(float), 'volume': candles['volume'].to_numpy(float),
+        'high': candles['high'].to_numpy(float), 'low': candles['low'].to_numpy(float),
+        'close': candles['close'].to_numpy(float),
+    })
+    logging.getLogger("moco_train").setLevel(logging.WARNING)
+    feats = calculate_features(frame)
+    labels, future_ret = label_threshold(feats, future_window, buy_threshold, sell_threshold)
+    X = feats[FEATURES].replace([np.inf, -np.inf], np.nan).fillna(0).to_numpy(float)
+    y = labels.to_numpy()
+    has_label = future_ret.notna().to_numpy()
+
+    close = candles['close'].to_numpy(float)
+    atr = atr_series(candles['high'].to_numpy(float), candles['low'].to_numpy(float), close, params.atr_period)
+    action = np.zeros(n, dtype=int)
+    conf = np.zeros(n)
+    folds = []
+    for start in range(train_bars, n, test_bars):
+        end = min(start + test_bars, n)
+        # Purga: rótulos das últimas future_window barras de treino dependem de preços do teste
+        train = np.arange(start - train_bars, start - future_window)
+        train = train[has_label[train]]
+        fold = {'train_start': float(candles['ts'].iat[start - train_bars]), 'test_start': float(candles['ts'].iat[start]),
+                'test_end': float(candles['ts'].iat[end - 1]), 'train_rows': int(train.size)}
+        classes = np.unique(y[train])
+        if classes.size < 2:
+            folds.append({**fold, 'classes': classes.tolist(), 'skipped': True})
+            continue
+        model = model_factory()
+        model.fit(X[train], y[train])
+        proba = model.predict_proba(X[start:end])
+        classes = list(model.classes_)
+        p_buy = proba[:, classes.index(1)] if 1 in classes else np.zeros(end - start)
+        p_sell = proba[:, classes.index(-1)] if -1 in classes else np.zeros(end - start)
+        # Mesma resolução de conflito do agente (_generate_ml_signal)
+        is_buy, is_sell = p_buy >= buy_p, p_sell >= sell_p
+        action[start:end] = np.where(is_buy & is_sell, np.where(p_buy >= p_sell, BUY, SELL),
+                                     np.where(is_buy, BUY, np.where(is_sell, SELL, HOLD)))
+        conf[start:end] = np.maximum(p_buy, p_sell)
+        folds.append({**fold, 'classes': [int(c) for c in classes], 'skipped': False,
+                      'buy_signals': int((action[start:end] == BUY).sum())})
+
+    signals = {'action': action, 'confidence': conf,
+               'amount_usd': np.where(action != HOLD, params.risk_per_trade_usd, 0.0),
+               'entry_atr': np.zeros(n),  # sinal de ML não traz atr: set_oco_levels usa stop de 1,5%
+               'atr': atr, 'cooldown': np.zeros(n, dtype=bool)}
+    return signals, folds
+
+
+# ===== Simulação =====
+
+def simulate(candles: pd.DataFrame, signals: Dict[str, np.ndarray], params: StrategyParams,
+             symbol: str = '', mode: str = 'strategy', initial_equity: float = 1000.0,
+             slippage_pct: float = 0.0) -> BacktestResult:
+    """Máquina de estados do agente (saídas, limites, entradas) candle a candle"""
+    p = params
+    ts_arr = candles['ts'].to_numpy(float)
+    ts, close = ts_arr.tolist(), candles['close'].to_numpy(float).tolist()
+    action, conf_arr = signals['action'].tolist(), signals['confidence'].tolist()
+    amount_arr, entry_atr, atr_arr = (signals['amount_usd'].tolist(), signals['entry_atr'].tolist(),
+                                      signals['atr'].tolist())
+    cooldown_arr = signals['cooldown'].tolist()
+    n = len(close)
+    fee_pct = p.maker_taker_fee_pct
+    warmup = max(p.min_price_history - 1, 0)
+
+    long = False
+    entry = qty = position_usd = 0.0
+    stop = take = trailing = max_fav = None
+    entry_ts = 0.0
+    day = None
+    daily_count, daily_pnl = 0, 0.0
+    last_trade = last_loss = -math.inf
+    realized = fees = turnover = 0.0
+    bars_in_position = 0
+    trades: List[Dict] = []
+    equity = [initial_equity] * n
+
+    def close_position(i: int, reason: str):
+        nonlocal long, entry, qty, position_usd, stop, take, trailing, max_fav
+        nonlocal realized, fees, turnover, daily_pnl, last_trade, last_loss
+        exit_price = close[i] * (1 - slippage_pct)
+        fee = position_usd * fee_pct * 2  # entrada + saída, como _calc_pnl
+        pnl = (exit_price - entry) * qty - fee
+        trades.append({'entry_ts': entry_ts, 'exit_ts': ts[i], 'entry_price': entry, 'exit_price': exit_price,
+                       'amount_usd': position_usd, 'pnl': pnl, 'reason': reason})
+        realized += pnl
+        fees += fee
+        turnover += qty * exit_price
+        daily_pnl += pnl
+        last_trade = ts[i]
+        if pnl < 0:
+            last_loss = ts[i]
+        long = False
+        entry = qty = position_usd = 0.0
+        stop = take = trailing = max_fav = None
+
+    for i in range(warmup, n):
+        t, price = ts[i], close[i]
+
+        # 1) Saídas (check_exit_signal)
+        if long and stop is not None and take is not None:
+            if max_fav is None or price > max_fav:
+                max_fav = price
+            if p.use_trailing_stop and max_fav and stop:
+                risk = entry - stop
+                if risk > 0 and (max_fav - entry) >= p.trail_activation_rr * risk:
+                    atr = atr_arr[i]
+                    trail_dist = p.trail_atr_mult * atr if (p.use_atr_sl_tp and atr > 0) else max(entry * 0.01, 1e-12)
+                    new_trail = max_fav - trail_dist
+                    if trailing is None or new_trail > trailing:
+                        trailing = new_trail
+            effective_stop = trailing if trailing is not None else stop
+            if price <= effective_stop:
+                close_position(i, 'stop')
+            elif price >= take:
+                close_position(i, 'take')
+
+        # 2) analyze: reset diário e cooldown pós-perda
+        d = int(t // 86400)
+        if d != day:
+            day, daily_count, daily_pnl = d, 0, 0.0
+        conf = conf_arr[i]
+        if cooldown_arr[i] and t - last_loss < p.cooldown_after_loss_s:
+            conf *= 0.85
+
+        # 3) Limite de perda diária; 4) execução
+        if daily_pnl > -abs(p.daily_loss_limit_usd):
+            act = action[i]
+            if (act == BUY and not long and conf >= p.min_confidence and daily_count < p.max_daily_trades
+                    and t - last_trade >= p.min_trade_interval_s and amount_arr[i] > 0):
+                fill = price * (1 + slippage_pct)
+                # set_oco_levels
+                atr = entry_atr[i]
+                stop_dist = p.sl_atr_mult * atr if (p.use_atr_sl_tp and atr > 0) else max(fill * 0.015, 1e-12)
+                stop = max(fill - stop_dist, 0.0)
+                take = fill + p.tp_rr * (fill - stop)
+                trailing, max_fav = None, fill
+                long, entry, entry_ts = True, fill, t
+                position_usd = amount_arr[i]
+                qty = position_usd / fill
+                turnover += position_usd
+                daily_count += 1
+                last_trade = t
+            elif act == SELL and long:
+                close_position(i, 'signal')
+
+        if long:
+            bars_in_position += 1
+            equity[i] = initial_equity + realized + (price - entry) * qty - position_usd * fee_pct
+        else:
+            equity[i] = initial_equity + realized
+
+    equity_arr = np.asarray(equity, dtype=float)
+    peak = np.maximum.accumulate(equity_arr) if n else equity_arr
+    drawdown = equity_arr - peak
+    metrics = _metrics(ts_arr, equity_arr, drawdown, peak, trades, initial_equity, fees, turnover,
+                       bars_in_position, max(n - warmup, 0), open_position=long)
+    return BacktestResult(symbol=symbol, mode=mode, params=asdict(p), timestamps=ts_arr,
+                          equity=equity_arr, drawdown=drawdown, trades=trades, metrics=metrics)
+
+
+def _metrics(ts, equity, drawdown, peak, trades, initial_equity, fees, turnover, bars_in_position,
+             active_bars, open_position) -> Dict:
+    pnls = np.array([t['pnl'] for t in trades], dtype=float)
+    returns = np.diff(equity) / equity[:-1] if equity.size > 1 else np.zeros(0)
+    span_days = float(ts[-1] - ts[0]) / 86400 if ts.size > 1 else 0.0
+    bar_s = float(np.median(np.diff(ts))) if ts.size > 1 else 0.0
+    sharpe = 0.0
+    if returns.size > 1 and returns.std() > 0 and bar_s > 0:
+        sharpe = float(returns.mean() / returns.std() * math.sqrt(365 * 86400 / bar_s))
+    final = float(equity[-1]) if equity.size else initial_equity
+    return {
+        'final_equity': final,
+        'pnl_usd': final - initial_equity,
+        'return_pct': (final / initial_equity - 1) * 100,
+        'trades': int(pnls.size),
+        'win_rate': float((pnls > 0).mean()) if pnls.size else 0.0,
+        'avg_trade_usd': float(pnls.mean()) if pnls.size else 0.0,
+        'max_drawdown_usd': float(-drawdown.min()) if drawdown.size else 0.0,
+        'max_drawdown_pct': float(-(drawdown / peak).min() * 100) if drawdown.size else 0.0,
+        'fees_usd': fees,
+        'turnover_usd': turnover,
+        'turnover_ratio': turnover / initial_equity,
+        'turnover_per_day_usd': turnover / span_days if span_days > 0 else 0.0,
+        'exposure': bars_in_position / active_bars if active_bars else 0.0,
+        'sharpe': sharpe,
+        'open_position': bool(open_position),
+    }
+
+
+def backtest(candles: pd.DataFrame, params: Optional[StrategyParams] = None, symbol: str = '',
+             mode: str = 'strategy', initial_equity: float = 1000.0, slippage_pct: float = 0.0,
+             **ml_kwargs) -> BacktestResult:
+    """Backtest de um símbolo com a Strategy (mode='strategy') ou com sinais de ML em walk-forward"""
+    params = params or StrategyParams()
+    folds: List[Dict] = []
+    if mode == 'strategy':
+        signals = strategy_signals(candles, params)
+    elif mode == 'ml':
+        signals, folds = ml_signals(candles, params, **ml_kwargs)
+    else:
+        raise ValueError(f"Modo inválido: {mode} (use strategy ou ml)")
+    result = simulate(candles, signals, params, symbol=symbol, mode=mode,
+                      initial_equity=initial_equity, slippage_pct=slippage_pct)
+    result.folds = folds
+    return result
+
+
+# ===== Execução paralela =====
+
+_WORKER_CANDLES: Dict[str, pd.DataFrame] = {}
+
+
+def _init_worker(candles_by_symbol: Dict[str, pd.DataFrame]):
+    global _WORKER_CANDLES
+    _WORKER_CANDLES = candles_by_symbol
+
+
+def _run_job(job: Tuple[str, StrategyParams, Dict]) -> BacktestResult:
+    symbol, params, kwargs = job
+    return backtest(_WORKER_CANDLES[symbol], params, symbol=symbol, **kwargs)
+
+
+def run_many(candles_by_symbol: Dict[str, pd.DataFrame], param_sets: Sequence[StrategyParams],
+             workers: Optional[int] = None, **kwargs) -> List[BacktestResult]:
+    """Backtest de cada (símbolo, parâmetros) num pool de processos; resultados na ordem dos jobs.
+    Os candles vão uma vez para cada processo (initializer), não a cada job."""
+    jobs = [(symbol, params, kwargs) for symbol in candles_by_symbol for params in param_sets]
+    workers = min(workers or os.cpu_count() or 1, len(jobs)) if jobs else 1
+    if workers <= 1:
+        _init_worker(candles_by_symbol)
+        return [_run_job(job) for job in jobs]
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(candles_by_symbol,)) as pool:
+        return list(pool.map(_run_job, jobs, chunksize=chunksize))
+
+
+def main():
+    """Backtest pela linha de comando"""
+    import argparse
+    from candles import to_epoch
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Backtest vetorizado da Strategy / sinais de ML")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='Caminho do banco SQLite')
+    parser.add_argument('--symbols', required=True, help='Lista separada por vírgula')
+    parser.add_argument('--resolution', default='1m', choices=sorted(RESOLUTION_S))
+    parser.add_argument('--start', default=None, help='Início (ISO-8601)')
+    parser.add_argument('--end', default=None, help='Fim (ISO-8601)')
+    parser.add_argument('--mode', default='strategy', choices=['strategy', 'ml'])
+    parser.add_argument('--equity', type=float, default=1000.0, help='Capital inicial (USD)')
+    parser.add_argument('--slippage', type=float, default=0.0, help='Slippage por lado (fração)')
+    parser.add_argument('--train-bars', type=int, default=3000)
+    parser.add_argument('--test-bars', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--set', action='append', default=[], metavar='CAMPO=VALOR',
+                        help='Sobrescreve um parâmetro da Strategy (repetível)')
+    parser.add_argument('--out', default=None, help='JSON com métricas, trades e curvas')
+    args = parser.parse_args()
+
+    params = StrategyParams()
+    for item in args.set:
+        name, value = item.split('=', 1)
+        current = getattr(params, name)
+        value = value.lower() == 'true' if isinstance(current, bool) else type(current)(value)
+        params = replace(params, **{name: value})
+
+    conn = sqlite3.connect(args.db)
+    start = to_epoch(args.start) if args.start else None
+    end = to_epoch(args.end) if args.end else None
+    candles = {s: load_candles(conn, s, args.resolution, start, end) for s in args.symbols.split(',')}
+    conn.close()
+    for symbol, df in list(candles.items()):
+        if len(df) <= params.min_price_history:
+            log.warning(f"⚠️ {symbol}: {len(df)} candles {args.resolution}, insuficiente")
+            del candles[symbol]
+
+    kwargs = dict(mode=args.mode, initial_equity=args.equity, slippage_pct=args.slippage)
+    if args.mode == 'ml':
+        kwargs.update(train_bars=args.train_bars, test_bars=args.test_bars)
+    results = run_many(candles, [params], workers=args.workers, **kwargs)
+    for r in results:
+        m = r.metrics
+        print(f"📈 {r.symbol}: {m['trades']} trades | PnL ${m['pnl_usd']:.2f} ({m['return_pct']:.2f}%) | "
+              f"win {m['win_rate'] * 100:.0f}% | DD ${m['max_drawdown_usd']:.2f} | "
+              f"turnover ${m['turnover_usd']:.0f} | exposição {m['exposure'] * 100:.0f}%")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump([r.to_dict(curves=True) for r in results], f)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Candles - Agregação incremental de ticks em candles OHLCV
+Os ticks brutos da tabela prices são agregados em price_candles nas
+resoluções 1m/5m/15m/1h. A agregação é incremental: um watermark guarda o
+último id de prices já processado e cada update() agrega só as linhas novas.
+
+O merge no banco é independente da ordem de chegada (open pelo menor
+timestamp, close pelo maior, high/low por máximo/mínimo), então ticks
+atrasados caem no candle certo. rebuild() recalcula um intervalo a partir
+dos ticks brutos e pode ser executado quantas vezes for preciso.
+
+Semântica de volume: os ticks guardam o volume 24h do ticker, então o volume
+do candle é o último snapshot observado no intervalo.
+
+Timestamps sem fuso são tratados como UTC (mesma convenção do SQLite).
+"""
+
+import os
+import sqlite3
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+log = logging.getLogger("Candles")
+
+DEFAULT_DB_PATH = os.getenv(
+    'DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'memecoin.db')
+)
+
+# Resolução -> segundos por candle
+RESOLUTIONS = {'1m': 60, '5m': 300, '15m': 900, '1h': 3600}
+
+# Ticks lidos por lote durante o catch-up
+BATCH_SIZE = 50000
+
+# Epoch (s, com fração) de um timestamp do SQLite; arredondado ao ms porque o
+# julianday em ponto flutuante joga 10:15:00 para 10:14:59.9999 (bucket errado)
+_EPOCH_SQL = "ROUND((julianday(timestamp) - 2440587.5) * 86400.0, 3)"
+
+_UPSERT_SQL = '''
+    INSERT INTO price_candles
+        (symbol, resolution, bucket, open, high, low, close, volume, ticks, first_ts, last_ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(symbol, resolution, bucket) DO UPDATE SET
+        open = CASE WHEN excluded.first_ts < price_candles.first_ts
+                    THEN excluded.open ELSE price_candles.open END,
+        high = MAX(price_candles.high, excluded.high),
+        low = MIN(price_candles.low, excluded.low),
+        close = CASE WHEN excluded.last_ts >= price_candles.last_ts
+                     THEN excluded.close ELSE price_candles.close END,
+        volume = CASE WHEN excluded.last_ts >= price_candles.last_ts
+                      THEN excluded.volume ELSE price_candles.volume END,
+        ticks = price_candles.ticks + excluded.ticks,
+        first_ts = MIN(price_candles.first_ts, excluded.first_ts),
+        last_ts = MAX(price_candles.last_ts, excluded.last_ts)
+'''
+
+
+def init_candle_tables(conn: sqlite3.Connection):
+    """Cria as tabelas de candles e watermark se não existirem"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS price_candles (
+            symbol TEXT NOT NULL,
+            resolution TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            volume REAL DEFAULT 0,
+            ticks INTEGER DEFAULT 0,
+            first_ts REAL NOT NULL,
+            last_ts REAL NOT NULL,
+            PRIMARY KEY (symbol, resolution, bucket)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS candle_watermark (
+            name TEXT PRIMARY KEY,
+            last_price_id INTEGER NOT NULL
+        )
+    ''')
+
+
+def price_columns(conn: sqlite3.Connection) -> Set[str]:
+    """Colunas da tabela prices (o schema do backend não tem coin_id/high/low)"""
+    return {row[1] for row in conn.execute('PRAGMA table_info(prices)')}
+
+
+def symbol_sql(columns: Set[str]) -> str:
+    """Expressão do símbolo de um tick: ticks antigos guardam o símbolo em coin_id"""
+    return 'COALESCE(symbol, coin_id)' if 'coin_id' in columns else 'symbol'
+
+
+def _tick_query(conn: sqlite3.Connection, where: str = '') -> str:
+    columns = price_columns(conn)
+    symbol = symbol_sql(columns)
+    # high/low = 0 significa ausente
+    hl = ', '.join(f'NULLIF({col}, 0) AS {col}' if col in columns else f'NULL AS {col}' for col in ('high', 'low'))
+    return f'''
+        SELECT id, {symbol} AS symbol, {_EPOCH_SQL} AS ts, price, {hl}, volume
+        FROM prices
+        WHERE price > 0 AND {symbol} IS NOT NULL {where}
+    '''
+
+
+def aggregate_ticks(rows: Iterable[Tuple]) -> Dict[Tuple[str, str, int], List]:
+    """Agrega ticks (id, symbol, ts, price, high, low, volume) por (symbol, resolução, bucket).
+
+    Retorna {chave: [open, high, low, close, volume, ticks, first_ts, last_ts]}.
+    """
+    candles: Dict[Tuple[str, str, int], List] = {}
+    for _, symbol, ts, price, high, low, volume in rows:
+        if ts is None:
+            continue
+        hi = max(price, high) if high else price
+        lo = min(price, low) if low else price
+        for resolution, seconds in RESOLUTIONS.items():
+            key = (symbol, resolution, int(ts // seconds) * seconds)
+            c = candles.get(key)
+            if c is None:
+                candles[key] = [price, hi, lo, price, volume or 0.0, 1, ts, ts]
+                continue
+            if ts < c[6]:
+                c[0], c[6] = price, ts
+            if ts >= c[7]:
+                c[3], c[4], c[7] = price, volume or 0.0, ts
+            c[1] = max(c[1], hi)
+            c[2] = min(c[2], lo)
+            c[5] += 1
+    return candles
+
+
+def _merge(conn: sqlite3.Connection, candles: Dict[Tuple[str, str, int], List]):
+    conn.executemany(_UPSERT_SQL, [(*key, *values) for key, values in candles.items()])
+
+
+def _get_watermark(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT last_price_id FROM candle_watermark WHERE name = 'prices'").fetchone()
+    return row[0] if row else 0
+
+
+def _set_watermark(conn: sqlite3.Connection, last_id: int):
+    conn.execute('''
+        INSERT INTO candle_watermark (name, last_price_id) VALUES ('prices', ?)
+        ON CONFLICT(name) DO UPDATE SET last_price_id = excluded.last_price_id
+    ''', (last_id,))
+
+
+def update_candles(conn: sqlite3.Connection, batch_size: int = BATCH_SIZE) -> int:
+    """Agrega os ticks inseridos desde o último update. Retorna quantos ticks foram lidos.
+
+    Deve ser chamado pelo escritor logo após inserir em prices (mesma conexão;
+    uma transação aberta é confirmada antes). Cada lote lê o watermark, agrega
+    e o avança dentro de um BEGIN IMMEDIATE: escritores concorrentes (workers
+    do backend, coletor, ingestão) nunca agregam a mesma faixa de ids duas vezes.
+    """
+    init_candle_tables(conn)
+    if conn.in_transaction:
+        conn.commit()
+    processed = 0
+    while True:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            watermark = _get_watermark(conn)
+            max_id = conn.execute('SELECT MAX(id) FROM prices WHERE id > ?', (watermark,)).fetchone()[0]
+            if max_id is None:
+                conn.commit()
+                break
+            upper = min(max_id, watermark + batch_size)
+            rows = conn.execute(_tick_query(conn, 'AND id > ? AND id <= ?'), (watermark, upper)).fetchall()
+            _merge(conn, aggregate_ticks(rows))
+            _set_watermark(conn, upper)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        processed += len(rows)
+        if upper >= max_id:
+            break
+    return processed
+
+
+def rebuild_candles(conn: sqlite3.Connection, symbol: Optional[str] = None,
+                    start: Optional[str] = None, end: Optional[str] = None) -> int:
+    """Recalcula candles de um intervalo a partir dos ticks brutos (idempotente).
+
+    O intervalo é alinhado à maior resolução para que nenhum candle fique parcial
+    e começa no tick mais antigo ainda presente em prices.
+    """
+    # Catch-up primeiro: o recálculo cobre exatamente os ticks até o watermark
+    update_candles(conn)
+    widest = max(RESOLUTIONS.values())
+    lo = (int(to_epoch(start)) // widest * widest) if start else None
+    hi = ((int(to_epoch(end)) // widest + 1) * widest) if end else None
+
+    # Ticks arquivados (tick_archive) já saíram de prices: o recálculo nunca apaga
+    # candles anteriores ao tick mais antigo que ainda está no SQLite
+    symbol_column = symbol_sql(price_columns(conn))
+    oldest = conn.execute(
+        f"SELECT MIN({_EPOCH_SQL}) FROM prices WHERE price > 0"
+        + (f" AND {symbol_column} = ?" if symbol else ""),
+        (symbol,) if symbol else ()
+    ).fetchone()[0]
+    if oldest is None:
+        return 0
+    kept_from = int(oldest) // widest * widest
+    lo = kept_from if lo is None else max(lo, kept_from)
+
+    # Watermark, leitura dos ticks e troca dos candles na mesma transação: um
+    # update_candles concorrente não avança o watermark no meio do recálculo
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        tick_where, tick_params = ['AND id <= ?'], [_get_watermark(conn)]
+        candle_where, candle_params = [], []
+        if symbol:
+            tick_where.append(f'AND {symbol_column} = ?')
+            tick_params.append(symbol)
+            candle_where.append('symbol = ?')
+            candle_params.append(symbol)
+        if lo is not None:
+            tick_where.append(f'AND {_EPOCH_SQL} >= ?')
+            tick_params.append(lo)
+            candle_where.append('bucket >= ?')
+            candle_params.append(lo)
+        if hi is not None:
+            tick_where.append(f'AND {_EPOCH_SQL} < ?')
+            tick_params.append(hi)
+            candle_where.append('bucket < ?')
+            candle_params.append(hi)
+
+        rows = conn.execute(_tick_query(conn, ' '.join(tick_where)), tick_params).fetchall()
+        conn.execute(f"DELETE FROM price_candles {'WHERE ' + ' AND '.join(candle_where) if candle_where else ''}",
+                     candle_params)
+        _merge(conn, aggregate_ticks(rows))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return len(rows)
+
+
+def to_epoch(value) -> float:
+    """Converte ISO-8601/datetime/número em epoch (s); sem fuso = UTC"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    dt = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def get_candles(conn: sqlite3.Connection, symbol: str, resolution: str = '1m', limit: int = 500,
+                start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+    """Retorna candles em ordem cronológica (os `limit` mais recentes do intervalo)"""
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Resolução inválida: {resolution} (use {', '.join(RESOLUTIONS)})")
+    try:
+        query = '''
+            SELECT datetime(bucket, 'unixepoch'), open, high, low, close, volume, ticks FROM price_candles
+            WHERE symbol = ? AND resolution = ?
+        '''
+        params: list = [symbol, resolution]
+        if start:
+            query += ' AND bucket >= ?'
+            params.append(int(to_epoch(start)) // RESOLUTIONS[resolution] * RESOLUTIONS[resolution])
+        if end:
+            query += ' AND bucket <= ?'
+            params.append(int(to_epoch(end)))
+        query += ' ORDER BY bucket DESC LIMIT ?'
+        params.append(limit)
+        rows = conn.execute(query, params).fetchall()
+    except sqlite3.OperationalError:
+        # Tabela ainda não criada
+        return []
+
+    return [{
+        'symbol': symbol,
+        'timestamp': ts,
+        'open': o, 'high': h, 'low': l, 'close': c,
+        'price': c,
+        'volume': v,
+        'ticks': n,
+    } for ts, o, h, l, c, v, n in reversed(rows)]
+
+
+def main():
+    """Atualiza ou reconstrói os candles do memecoin.db"""
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Agregação de ticks em candles OHLCV")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='Caminho do banco SQLite')
+    parser.add_argument('--rebuild', action='store_true', help='Recalcular a partir dos ticks brutos')
+    parser.add_argument('--symbol', default=None)
+    parser.add_argument('--start', default=None, help='Início (ISO-8601) para --rebuild')
+    parser.add_argument('--end', default=None, help='Fim (ISO-8601) para --rebuild')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    try:
+        if args.rebuild:
+            n = rebuild_candles(conn, args.symbol, args.start, args.end)
+            print(f"🕯️ {n} ticks reagregados")
+        n = update_candles(conn)
+        print(f"🕯️ {n} ticks novos agregados")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
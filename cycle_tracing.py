@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Cycle Tracing - Spans cronometrados por ciclo dos agentes de trading
+Cada ciclo (run_cycle / run_once) vira um trace com spans por etapa
+(requisições HTTP, indicadores, inferência, envio de ordens, gravação).
+Mantém em memória uma janela dos últimos ciclos com percentis por etapa,
+grava os ciclos lentos (JSON Lines) e, opcionalmente, exporta os últimos
+ciclos no formato Chrome trace-event (abrir em chrome://tracing ou Perfetto).
+
+Desligado (MOCOVE_TRACE=false), cycle() e span() devolvem um contexto vazio
+compartilhado: o custo é uma chamada de função por etapa.
+
+Funciona em código síncrono e assíncrono (o ciclo atual fica num ContextVar):
+
+    tracer = CycleTracer.from_env('agent_robust')
+    with tracer.cycle():
+        with tracer.span('scan'):
+            ...
+        with tracer.span('execute', symbol='DOGEUSDT'):
+            ...
+    tracer.summary()   # percentis por etapa; também gravado em runtime/trace_<agente>.json
+
+Variáveis de ambiente:
+    MOCOVE_TRACE            true/false (padrão true)
+    MOCOVE_TRACE_WINDOW     ciclos na janela de percentis (padrão 200)
+    MOCOVE_TRACE_SLOW_MS    ciclo a partir do qual o trace vai para o arquivo de lentos (padrão 5000)
+    MOCOVE_TRACE_DIR        pasta dos arquivos (padrão ./runtime)
+    MOCOVE_TRACE_CHROME     true para exportar runtime/trace_<agente>.chrome.json
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+log = logging.getLogger("CycleTracing")
+
+TRACE_DIR = os.getenv('MOCOVE_TRACE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runtime'))
+
+_NULL = nullcontext()
+_current: contextvars.ContextVar = contextvars.ContextVar('mocove_trace', default=None)
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Percentil por interpolação linear (lista já ordenada, não vazia)"""
+    pos = (len(sorted_values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+class Trace:
+    """Um ciclo: spans com início relativo, duração, profundidade e atributos"""
+
+    __slots__ = ('cycle_id', 'started_at', 'start', 'spans', 'depth', 'duration_ms', 'error')
+
+    def __init__(self, cycle_id: int, start: float):
+        self.cycle_id = cycle_id
+        self.started_at = time.time()
+        self.start = start
+        self.spans: List[Dict[str, Any]] = []
+        self.depth = 0
+        self.duration_ms = 0.0
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'cycle': self.cycle_id,
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(),
+            'duration_ms': round(self.duration_ms, 3),
+            'error': self.error,
+            'spans': self.spans,
+        }
+
+
+class CycleTracer:
+    """Traces por ciclo com janela de percentis, arquivo de ciclos lentos e exportação Chrome"""
+
+    def __init__(self, name: str, enabled: bool = True, window: int = 200, slow_ms: Optional[float] = 5000,
+                 trace_dir: Optional[str] = None, chrome: bool = False, chrome_cycles: int = 50,
+                 status_file: bool = True, clock: Callable[[], float] = time.perf_counter):
+        self.name = name
+        self.enabled = enabled
+        self.window = window
+        self.slow_ms = slow_ms
+        self.trace_dir = trace_dir or TRACE_DIR
+        self.clock = clock
+        self.cycles = 0
+        self.slow_cycles = 0
+        self.last: Optional[Trace] = None
+        self._lock = threading.Lock()
+        self._totals: Deque[float] = deque(maxlen=window)
+        self._stages: Dict[str, Deque[float]] = {}
+        self._depths: Dict[str, int] = {}
+        self._chrome: Optional[Deque[Trace]] = deque(maxlen=chrome_cycles) if chrome else None
+        self.slow_path = os.path.join(self.trace_dir, f"trace_{name}.slow.jsonl")
+        self.chrome_path = os.path.join(self.trace_dir, f"trace_{name}.chrome.json")
+        self.status_path = os.path.join(self.trace_dir, f"trace_{name}.json") if status_file else None
+
+    @classmethod
+    def from_env(cls, name: str, **kwargs) -> 'CycleTracer':
+        slow_ms = float(os.getenv('MOCOVE_TRACE_SLOW_MS', 5000))
+        return cls(
+            name,
+            enabled=os.getenv('MOCOVE_TRACE', 'true').lower() == 'true',
+            window=int(os.getenv('MOCOVE_TRACE_WINDOW', 200)),
+            slow_ms=slow_ms if slow_ms > 0 else None,
+            chrome=os.getenv('MOCOVE_TRACE_CHROME', 'false').lower() == 'true',
+            **kwargs,
+        )
+
+    # ------------------------------------------------------------ spans
+
+    def cycle(self):
+        """Contexto de um ciclo completo (ignorado se já há um ciclo ativo neste contexto)"""
+        if not self.enabled or _current.get() is not None:
+            return _NULL
+        return self._cycle()
+
+    @contextmanager
+    def _cycle(self):
+        self.cycles += 1
+        trace = Trace(self.cycles, self.clock())
+        token = _current.set(trace)
+        try:
+            yield trace
+        except BaseException as e:
+            trace.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current.reset(token)
+            trace.duration_ms = (self.clock() - trace.start) * 1000
+            self._finish(trace)
+
+    def span(self, name: str, **attrs):
+        """Contexto de uma etapa do ciclo atual (sem ciclo ativo ou desligado: nada é medido)"""
+        if not self.enabled:
+            return _NULL
+        trace = _current.get()
+        if trace is None:
+            return _NULL
+        return self._span(trace, name, attrs)
+
+    @contextmanager
+    def _span(self, trace: Trace, name: str, attrs: Dict[str, Any]):
+        record = {'name': name, 'depth': trace.depth, 'start_ms': 0.0, 'duration_ms': 0.0}
+        if attrs:
+            record['attrs'] = attrs
+        trace.spans.append(record)
+        trace.depth += 1
+        start = self.clock()
+        record['start_ms'] = round((start - trace.start) * 1000, 3)
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record['duration_ms'] = round((self.clock() - start) * 1000, 3)
+            trace.depth -= 1
+
+    # ------------------------------------------------------- fim do ciclo
+
+    def _finish(self, trace: Trace):
+        per_stage: Dict[str, float] = {}
+        with self._lock:
+            self.last = trace
+            self._totals.append(trace.duration_ms)
+            for span in trace.spans:
+                per_stage[span['name']] = per_stage.get(span['name'], 0.0) + span['duration_ms']
+                self._depths.setdefault(span['name'], span['depth'])
+            for stage, duration in per_stage.items():
+                window = self._stages.get(stage)
+                if window is None:
+                    window = self._stages[stage] = deque(maxlen=self.window)
+                window.append(duration)
+            if self._chrome is not None:
+                self._chrome.append(trace)
+            slow = self.slow_ms is not None and trace.duration_ms >= self.slow_ms
+            if slow:
+                self.slow_cycles += 1
+
+        try:
+            if slow:
+                self._append_slow(trace)
+            if self._chrome is not None:
+                self.export_chrome()
+            if self.status_path:
+                self._write_json(self.status_path, self.summary())
+        except OSError as e:
+            log.warning(f"⚠️ Falha ao gravar trace do ciclo {trace.cycle_id}: {e}")
+
+    def _append_slow(self, trace: Trace):
+        os.makedirs(self.trace_dir, exist_ok=True)
+        with open(self.slow_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'agent': self.name, **trace.to_dict()}, default=str) + '\n')
+        log.warning(f"🐢 Ciclo {trace.cycle_id} lento: {trace.duration_ms:.0f} ms (trace em {self.slow_path})")
+
+    def _write_json(self, path: str, data: Any):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(data, f, default=str)
+        os.replace(path + '.tmp', path)
+
+    def chrome_events(self) -> List[Dict[str, Any]]:
+        """Eventos 'X' (completos) do formato Chrome trace-event, em microssegundos"""
+        with self._lock:
+            traces = list(self._chrome or [])
+        pid, events = os.getpid(), []
+        for trace in traces:
+            base_us = trace.started_at * 1e6
+            events.append({'name': f"ciclo {trace.cycle_id}", 'cat': self.name, 'ph': 'X', 'pid': pid, 'tid': 0,
+                           'ts': base_us, 'dur': trace.duration_ms * 1000,
+                           'args': {'error': trace.error} if trace.error else {}})
+            for span in trace.spans:
+                events.append({'name': span['name'], 'cat': self.name, 'ph': 'X', 'pid': pid, 'tid': 0,
+                               'ts': base_us + span['start_ms'] * 1000, 'dur': span['duration_ms'] * 1000,
+                               'args': {**span.get('attrs', {}), **({'error': span['error']} if 'error' in span else {})}})
+        return events
+
+    def export_chrome(self, path: Optional[str] = None) -> str:
+        path = path or self.chrome_path
+        self._write_json(path, {'traceEvents': self.chrome_events(), 'displayTimeUnit': 'ms'})
+        return path
+
+    # ------------------------------------------------------------ resumo
+
+    def breakdown(self) -> str:
+        """Uma linha com o tempo das etapas de topo do último ciclo (para o log)"""
+        trace = self.last
+        if trace is None:
+            return "Tracing desligado" if not self.enabled else "Nenhum ciclo medido"
+        stages: Dict[str, float] = {}
+        for span in trace.spans:
+            if span['depth'] == 0:
+                stages[span['name']] = stages.get(span['name'], 0.0) + span['duration_ms']
+        parts = ' | '.join(f"{name} {ms:.0f} ms" for name, ms in stages.items())
+        return f"Ciclo {trace.cycle_id}: {trace.duration_ms:.0f} ms" + (f" | {parts}" if parts else '')
+
+    def summary(self) -> Dict[str, Any]:
+        """Percentis por etapa na janela (ms) e participação das etapas de topo no tempo do ciclo"""
+        with self._lock:
+            totals = sorted(self._totals)
+            stages = {name: sorted(values) for name, values in self._stages.items()}
+            depths = dict(self._depths)
+            last = self.last
+        total_sum = sum(totals) or 1.0
+        stage_summary = {}
+        for name, values in stages.items():
+            stage_summary[name] = {
+                'depth': depths.get(name, 0),
+                'count': len(values),
+                'p50_ms': round(_percentile(values, 0.50), 3),
+                'p95_ms': round(_percentile(values, 0.95), 3),
+                'p99_ms': round(_percentile(values, 0.99), 3),
+                'max_ms': round(values[-1], 3),
+                'share_pct': round(sum(values) / total_sum * 100, 1) if depths.get(name, 0) == 0 else None,
+            }
+        return {
+            'agent': self.name,
+            'enabled': self.enabled,
+            'cycles': self.cycles,
+            'window': len(totals),
+            'slow_cycles': self.slow_cycles,
+            'slow_ms': self.slow_ms,
+            'cycle_ms': {
+                'p50': round(_percentile(totals, 0.50), 3),
+                'p95': round(_percentile(totals, 0.95), 3),
+                'p99': round(_percentile(totals, 0.99), 3),
+                'max': round(totals[-1], 3),
+            } if totals else None,
+            'stages': stage_summary,
+            'last_cycle': last.to_dict() if last else None,
+            'updated_at': datetime.now().isoformat(),
+        }
+
+
+def load_summaries(trace_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Resumos gravados pelos agentes (runtime/trace_<agente>.json), por agente"""
+    trace_dir = trace_dir or TRACE_DIR
+    summaries = {}
+    try:
+        names = sorted(os.listdir(trace_dir))
+    except OSError:
+        return summaries
+    for filename in names:
+        if not (filename.startswith('trace_') and filename.endswith('.json')) or filename.endswith('.chrome.json'):
+            continue
+        try:
+            with open(os.path.join(trace_dir, filename), encoding='utf-8') as f:
+                data = json.load(f)
+            summaries[data.get('agent', filename[6:-5])] = data
+        except (OSError, ValueError) as e:
+            log.warning(f"⚠️ Resumo de trace ilegível ({filename}): {e}")
+    return summaries
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Exchange Config - Endereço da exchange usado pelos clientes ccxt
+MOCOVE_EXCHANGE_URL troca o host de todos os endpoints de um cliente ccxt
+(usado pelo backend, pelos agentes e pelo job de preços). O replay de mercado
+(market_replay.py) aponta a variável para a sua exchange falsa.
+"""
+
+import os
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+EXCHANGE_URL_ENV = 'MOCOVE_EXCHANGE_URL'
+
+
+def apply_exchange_url(exchange, url: Optional[str] = None):
+    """Aponta um cliente ccxt para MOCOVE_EXCHANGE_URL (sem efeito se não definida).
+
+    Mantém o caminho de cada endpoint (/api/v3, /sapi/v1, /fapi/v1...) e troca
+    só esquema e host, de modo que o mesmo cliente funcione contra a exchange
+    falsa do replay.
+    """
+    url = url or os.getenv(EXCHANGE_URL_ENV)
+    if not url or exchange is None:
+        return exchange
+    target = urlsplit(url)
+    api = exchange.urls.get('api')
+    if isinstance(api, dict):
+        for key, value in api.items():
+            if isinstance(value, str):
+                parts = urlsplit(value)
+                api[key] = urlunsplit((target.scheme, target.netloc, parts.path, parts.query, parts.fragment))
+    return exchange
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+History Pages - Paginação por cursor (keyset) do histórico de trades e preços
+Em vez de OFFSET, cada página continua da última linha da anterior: o cursor
+guarda (tempo, id) dessa linha e a consulta seguinte busca direto no índice
+(`(date, id) < (:t, :id) ORDER BY date DESC, id DESC`). O custo por página é o
+mesmo na primeira ou na milésima página.
+
+- fields=: projeção (só as colunas pedidas saem no JSON)
+- start/end: intervalo de tempo (ISO-8601 sem fuso, mesma convenção do banco)
+- tempo gravado sempre como 'YYYY-MM-DD HH:MM:SS[.ffffff]' (separador espaço):
+  comparação de texto e ordem (tempo, id) só valem com um formato único;
+  normalize_stored_times() converte as linhas antigas gravadas com 'T'
+- filtros de igualdade por fonte (ex. symbol, type)
+- NDJSON: iter_ndjson() transmite o histórico inteiro página a página
+
+Os trades têm um índice de cobertura (init_history_indexes): as colunas padrão
+saem do índice, sem ler a tabela. Nos preços o índice (symbol, timestamp)
+cobre id/symbol/timestamp; price/volume custam uma leitura por linha devolvida.
+Só a camada SQLite é paginada; ticks já arquivados em Parquet (tick_archive)
+saem por /api/prices/export.
+
+Uso:
+    query = parse_page_query(TRADES, {'limit': '100', 'fields': 'id,date,price'})
+    rows, next_cursor = fetch_page(conn, TRADES, query)
+    # próxima página: parse_page_query(TRADES, {..., 'cursor': next_cursor})
+"""
+
+import json
+import base64
+import sqlite3
+from datetime import datetime
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+import pandas as pd
+
+from position_store import init_migrations_table, migration_applied, record_migration
+
+# Linhas por consulta ao transmitir o histórico completo
+PAGE_ROWS = 1000
+
+# Marcador (portfolio_migrations) da troca única de 'T' por espaço nas datas antigas
+TIME_FORMAT_MIGRATION = 'history_time_format'
+
+
+@dataclass(frozen=True)
+class HistorySource:
+    """Tabela paginável: coluna de tempo, campos projetáveis e filtros de igualdade"""
+    table: str
+    time_column: str
+    fields: Tuple[str, ...]
+    default_fields: Tuple[str, ...]
+    filters: Tuple[str, ...] = ()
+
+
+TRADES = HistorySource(
+    'trades', 'date',
+    fields=('id', 'date', 'type', 'symbol', 'amount', 'price', 'total', 'status', 'created_at'),
+    default_fields=('id', 'date', 'type', 'symbol', 'amount', 'price', 'total', 'status'),
+    filters=('symbol', 'type', 'status'),
+)
+
+PRICES = HistorySource(
+    'prices', 'timestamp',
+    fields=('id', 'symbol', 'timestamp', 'price', 'volume'),
+    default_fields=('id', 'symbol', 'timestamp', 'price', 'volume'),
+    filters=('symbol',),
+)
+
+# (tabela, índice). id logo após o tempo: ORDER BY tempo, id sai do índice sem ordenar
+HISTORY_INDEXES = (
+    # Cobre as colunas padrão de TRADES: páginas sem leitura da tabela
+    ('trades', 'CREATE INDEX IF NOT EXISTS idx_trades_date_cover '
+               'ON trades(date, id, symbol, type, amount, price, total, status)'),
+    ('trades', 'CREATE INDEX IF NOT EXISTS idx_trades_symbol_date ON trades(symbol, date)'),
+    ('prices', 'CREATE INDEX IF NOT EXISTS idx_prices_symbol_timestamp ON prices(symbol, timestamp)'),
+    ('prices', 'CREATE INDEX IF NOT EXISTS idx_prices_timestamp ON prices(timestamp)'),
+)
+
+
+@dataclass
+class PageQuery:
+    """Parâmetros de uma página (ou de uma exportação completa, com limit=None)"""
+    fields: Tuple[str, ...]
+    limit: Optional[int] = 50
+    order: str = 'desc'
+    cursor: Optional[Tuple[Any, int]] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+    filters: Dict[str, str] = field(default_factory=dict)
+
+
+def init_history_indexes(conn: sqlite3.Connection):
+    """Cria os índices usados pela paginação (idempotente; ignora tabelas ausentes)"""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table, statement in HISTORY_INDEXES:
+        if table in tables:
+            conn.execute(statement)
+
+
+def format_timestamp(value: Any) -> str:
+    """Tempo no formato gravado no banco (o mesmo de datetime/sqlite3): separador espaço, não 'T'"""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return str(value).replace('T', ' ', 1)
+
+
+def normalize_stored_times(conn: sqlite3.Connection) -> int:
+    """Migração única: troca o 'T' do isoformat() por espaço nas linhas antigas de trades e prices.
+
+    Registrada em portfolio_migrations na mesma transação (o chamador faz o commit); as
+    gravações novas já usam format_timestamp. Retorna as linhas alteradas (0 se já aplicada).
+    """
+    init_migrations_table(conn)
+    if migration_applied(conn, TIME_FORMAT_MIGRATION):
+        return 0
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    changed = 0
+    for source in (TRADES, PRICES):
+        if source.table in tables:
+            column = source.time_column
+            changed += conn.execute(f"UPDATE {source.table} SET {column} = replace({column}, 'T', ' ') "
+                                    f"WHERE {column} LIKE '____-__-__T%'").rowcount
+    record_migration(conn, TIME_FORMAT_MIGRATION)
+    return changed
+
+
+def encode_cursor(time_value: Any, row_id: int) -> str:
+    """Cursor opaco (base64url) com o tempo como está gravado e o id da linha"""
+    raw = json.dumps([time_value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> Tuple[Any, int]:
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        time_value, row_id = json.loads(raw)
+        if not isinstance(row_id, int) or isinstance(time_value, (list, dict)):
+            raise ValueError
+    except ValueError:
+        raise ValueError(f"Cursor inválido: {token}") from None
+    return time_value, row_id
+
+
+def _parse_time(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        ts = pd.Timestamp(value)
+    except ValueError:
+        ts = None
+    if ts is None or ts is pd.NaT or ts.tzinfo is not None:
+        raise ValueError(f"Data inválida: {value} (ISO-8601 sem fuso)")
+    return ts.isoformat(sep=' ')
+
+
+def parse_page_query(source: HistorySource, args: Mapping[str, str], default_limit: Optional[int] = 50,
+                     max_limit: Optional[int] = 500) -> PageQuery:
+    """Lê limit/cursor/fields/order/start/end e os filtros da query string.
+
+    limit fora de 1..max_limit volta para default_limit (comportamento antigo
+    de /api/trades). Sem default_limit e sem limit: todas as linhas.
+    Parâmetros inválidos levantam ValueError (mensagem pronta para HTTP 400).
+    """
+    try:
+        limit = int(args['limit']) if args.get('limit') else None
+    except ValueError:
+        limit = None
+    if limit is None or limit < 1 or (max_limit is not None and limit > max_limit):
+        limit = default_limit
+
+    fields = source.default_fields
+    if args.get('fields'):
+        fields = tuple(dict.fromkeys(f.strip() for f in args['fields'].split(',') if f.strip()))
+        unknown = [f for f in fields if f not in source.fields]
+        if unknown or not fields:
+            raise ValueError(f"Campo inválido: {', '.join(unknown)} (use {', '.join(source.fields)})")
+
+    order = args.get('order', 'desc').lower()
+    if order not in ('asc', 'desc'):
+        raise ValueError(f"Ordem inválida: {order} (use asc ou desc)")
+
+    cursor = decode_cursor(args['cursor']) if args.get('cursor') else None
+    filters = {name: args[name] for name in source.filters if args.get(name)}
+    return PageQuery(fields=fields, limit=limit, order=order, cursor=cursor,
+                     start=_parse_time(args.get('start')), end=_parse_time(args.get('end')), filters=filters)
+
+
+def _select(source: HistorySource, query: PageQuery, limit: Optional[int]) -> Tuple[str, Dict[str, Any], List[str]]:
+    columns = list(dict.fromkeys(('id', source.time_column) + query.fields))
+    time_column = source.time_column
+    where, params = [], {}
+    for name, value in query.filters.items():
+        where.append(f'{name} = :{name}')
+        params[name] = value
+    if query.start is not None:
+        where.append(f'{time_column} >= :start')
+        params['start'] = query.start
+    if query.end is not None:
+        where.append(f'{time_column} <= :end')
+        params['end'] = query.end
+    if query.cursor is not None:
+        where.append(f"({time_column}, id) {'<' if query.order == 'desc' else '>'} (:cursor_time, :cursor_id)")
+        params['cursor_time'], params['cursor_id'] = query.cursor
+
+    direction = query.order.upper()
+    sql = f"SELECT {', '.join(columns)} FROM {source.table}"
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += f' ORDER BY {time_column} {direction}, id {direction}'
+    if limit is not None:
+        sql += ' LIMIT :limit'
+        params['limit'] = limit
+    return sql, params, columns
+
+
+def fetch_page(conn: sqlite3.Connection, source: HistorySource,
+               query: PageQuery) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Uma página (só os campos pedidos) e o cursor da próxima (None na última)"""
+    sql, params, columns = _select(source, query, None if query.limit is None else query.limit + 1)
+    rows = conn.execute(sql, params).fetchall()
+    next_cursor = None
+    if query.limit is not None and len(rows) > query.limit:
+        rows = rows[:query.limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[1], last[0])
+    positions = [columns.index(name) for name in query.fields]
+    return [{name: row[i] for name, i in zip(query.fields, positions)} for row in rows], next_cursor
+
+
+def iter_rows(conn: sqlite3.Connection, source: HistorySource, query: PageQuery,
+              page_rows: int = PAGE_ROWS) -> Iterator[Dict[str, Any]]:
+    """Todas as linhas da consulta (até query.limit), uma página keyset por vez"""
+    remaining = query.limit
+    page = replace(query, limit=page_rows if remaining is None else min(page_rows, remaining))
+    while True:
+        rows, next_cursor = fetch_page(conn, source, page)
+        yield from rows
+        if remaining is not None:
+            remaining -= len(rows)
+            if remaining <= 0:
+                return
+        if next_cursor is None:
+            return
+        page = replace(page, cursor=decode_cursor(next_cursor),
+                       limit=page_rows if remaining is None else min(page_rows, remaining))
+
+
+def iter_ndjson(db_path: str, source: HistorySource, query: PageQuery,
+                page_rows: int = PAGE_ROWS) -> Iterator[bytes]:
+    """Gerador NDJSON para respostas HTTP (abre a própria conexão, um bloco por página)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        chunk = []
+        for row in iter_rows(conn, source, query, page_rows):
+            chunk.append(json.dumps(row, separators=(',', ':')))
+            if len(chunk) >= page_rows:
+                yield ('\n'.join(chunk) + '\n').encode()
+                chunk = []
+        if chunk:
+            yield ('\n'.join(chunk) + '\n').encode()
+    finally:
+        conn.close()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+HTTP Cache - ETag, GET condicional e compressão para os endpoints do dashboard
+O dashboard consulta os mesmos endpoints a cada poucos segundos. Cada rota
+declara de que dados depende (versões baratas: último id de trades/preços,
+mtime de um arquivo); o ETag sai dessas versões e dos parâmetros da URL.
+
+- If-None-Match igual ao ETag atual: 304 sem chamar a view (sem consulta às tabelas)
+- ETag já renderizado por outro cliente: corpo servido do LRU em memória
+- Corpos grandes: gzip (ou brotli, se instalado), comprimidos uma vez por ETag
+
+As versões de tabela só são recalculadas quando outra conexão gravou no banco
+(PRAGMA data_version numa conexão persistente), como em shared_state.
+
+Uso:
+    versions = DataVersions(DB_PATH, {'trades': 'SELECT MAX(id) FROM trades'})
+    cache = ResponseCache()
+    cache.init_app(app)                                   # compressão das demais respostas grandes
+
+    @app.route('/api/trades')
+    @cache.conditional(lambda: versions.get('trades'))
+    def get_trades(): ...
+"""
+
+import os
+import gzip
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import Response, make_response, request
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    brotli = None
+    HAS_BROTLI = False
+
+log = logging.getLogger("HttpCache")
+
+COMPRESSIBLE = ('application/json', 'text/', 'application/javascript', 'image/svg+xml')
+
+
+def file_version(path: str) -> Optional[Tuple[int, int]]:
+    """Versão de um arquivo (mtime em ns, tamanho); None se não existe"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def time_bucket(seconds: float) -> int:
+    """Versão que muda a cada `seconds` (para respostas sem fonte de dados versionável)"""
+    return int(time.time() // seconds)
+
+
+class DataVersions:
+    """Versões por tabela recalculadas só quando o banco mudou (PRAGMA data_version)"""
+
+    def __init__(self, db_path: str, sources: Dict[str, str]):
+        self.db_path = db_path
+        self.sources = dict(sources)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._data_version: Optional[int] = None
+        self._values: Dict[str, Any] = {}
+        self.hits = 0  # versões servidas sem consultar tabela
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            self._pid, self._data_version, self._values = os.getpid(), None, {}
+        return self._conn
+
+    def _query(self, conn: sqlite3.Connection, name: str) -> Any:
+        try:
+            row = conn.execute(self.sources[name]).fetchone()
+        except sqlite3.Error as e:
+            log.debug(f"Versão de {name} indisponível: {e}")
+            return None
+        return tuple(row) if row is not None else None
+
+    def get(self, *names: str) -> Tuple:
+        """Versões das fontes pedidas (tupla estável enquanto nada mudar no banco)"""
+        with self._lock:
+            conn = self._connection()
+            data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+            if data_version != self._data_version:
+                self._values.clear()
+                self._data_version = data_version
+            values = []
+            for name in names:
+                if name in self._values:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                    self._values[name] = self._query(conn, name)
+                values.append(self._values[name])
+            return tuple(values)
+
+    def invalidate(self):
+        """Força recálculo (gravações desta mesma conexão não mudam data_version)"""
+        with self._lock:
+            self._data_version = None
+            self._values.clear()
+
+
+class CachedResponse:
+    """Corpo renderizado de um ETag, cabeçalhos da view e variantes comprimidas (sob demanda)"""
+
+    __slots__ = ('body', 'mimetype', 'headers', 'variants')
+
+    def __init__(self, body: bytes, mimetype: str, headers: Tuple[Tuple[str, str], ...] = ()):
+        self.body = body
+        self.mimetype = mimetype
+        self.headers = headers  # ex. X-Next-Cursor/Link da paginação
+        self.variants: Dict[str, bytes] = {}
+
+
+def _compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=min(level, 11))
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class ResponseCache:
+    """ETag/304 por versão dos dados, LRU de respostas prontas e compressão"""
+
+    def __init__(self, max_entries: int = 256, min_compress_bytes: int = 1024, compress_level: int = 6,
+                 enabled: bool = True):
+        self.max_entries = max_entries
+        self.min_compress_bytes = min_compress_bytes
+        self.compress_level = compress_level
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, CachedResponse]' = OrderedDict()
+        self.hits = 0  # respostas servidas do LRU
+        self.misses = 0  # view executada
+        self.not_modified = 0  # 304
+
+    def _choose_encoding(self, size: int, mimetype: str) -> Optional[str]:
+        if size < self.min_compress_bytes or not mimetype.startswith(COMPRESSIBLE):
+            return None
+        accepted = request.accept_encodings
+        if HAS_BROTLI and accepted['br']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
+
+    def _etag(self, key: Any) -> str:
+        args = sorted(request.args.items(multi=True))
+        return hashlib.sha1(repr((request.path, args, key)).encode()).hexdigest()[:24]
+
+    def _lookup(self, etag: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is not None:
+                self._entries.move_to_end(etag)
+            return entry
+
+    def _store(self, etag: str, entry: CachedResponse):
+        with self._lock:
+            self._entries[etag] = entry
+            self._entries.move_to_end(etag)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _respond(self, etag: str, entry: CachedResponse) -> Response:
+        encoding = self._choose_encoding(len(entry.body), entry.mimetype)
+        body = entry.body
+        if encoding:
+            body = entry.variants.get(encoding)
+            if body is None:
+                body = entry.variants[encoding] = _compress(entry.body, encoding, self.compress_level)
+        response = Response(body, mimetype=entry.mimetype)
+        response.headers.extend(entry.headers)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'  # sempre revalidar (barato: 304)
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def conditional(self, key_fn: Callable[[], Any]):
+        """Decorador de view GET: key_fn devolve as versões dos dados de que a resposta depende"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method not in ('GET', 'HEAD'):
+                    return view(*args, **kwargs)
+                try:
+                    etag = self._etag(key_fn())
+                except Exception as e:
+                    log.warning(f"⚠️ Versão indisponível para {request.path}: {e}")
+                    return view(*args, **kwargs)
+
+                if request.if_none_match.contains_weak(etag):
+                    self.not_modified += 1
+                    response = Response(status=304)
+                    response.set_etag(etag, weak=True)
+                    response.headers['Cache-Control'] = 'no-cache'
+                    response.vary.add('Accept-Encoding')
+                    return response
+
+                entry = self._lookup(etag)
+                if entry is None:
+                    self.misses += 1
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed or response.direct_passthrough:
+                        return response  # erros e streams não entram no cache
+                    headers = tuple((k, v) for k, v in response.headers.items()
+                                    if k.lower() not in ('content-type', 'content-length'))
+                    entry = CachedResponse(response.get_data(), response.mimetype, headers)
+                    self._store(etag, entry)
+                else:
+                    self.hits += 1
+                return self._respond(etag, entry)
+            return wrapper
+        return decorator
+
+    def compress_response(self, response: Response) -> Response:
+        """after_request: comprime respostas grandes que não passaram por conditional()"""
+        if (not self.enabled or response.status_code != 200 or response.direct_passthrough
+                or response.is_streamed or 'Content-Encoding' in response.headers):
+            return response
+        body = response.get_data()
+        encoding = self._choose_encoding(len(body), response.mimetype or '')
+        if encoding:
+            response.set_data(_compress(body, encoding, self.compress_level))
+            response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+        return response
+
+    def init_app(self, app):
+        app.after_request(self.compress_response)
+        return app
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,642 @@
+#!/usr/bin/env python3
+"""
+Ingest Daemon - Ingestão contínua de dados de mercado com fontes plugáveis
+Fontes (TickSource) produzem eventos que são normalizados num único formato
+(Tick) e distribuídos para os consumidores (TickSink), cada um com sua fila
+limitada e sua thread:
+
+    fontes                        consumidores
+    BinanceStreamSource (ws)  \\   PriceCache   últimos preços em memória
+    RestPollingSource         --> LiveCandles  candle corrente por resolução
+    ReplaySource (arquivo)    /   DbWriter     prices em lote + update_candles
+
+Política de fila cheia por consumidor: 'block' (contrapressão na fonte, usado
+pelo DbWriter para não perder ticks) ou 'drop_oldest' (cache e candles ao
+vivo, que só precisam do mais recente).
+
+Métricas (IngestDaemon.metrics()): eventos por fonte, vazão, profundidade das
+filas, descartes e atraso (p50/p99/máx) entre a chegada do tick e o
+processamento em cada consumidor, além do atraso desde o horário do evento.
+
+Uso:
+    python ingest_daemon.py --source ws --symbols DOGEUSDT,PEPEUSDT
+    python ingest_daemon.py --source replay --replay-file ticks.jsonl
+
+Variáveis de ambiente:
+    MOCOVE_INGEST_WS_URL        padrão wss://stream.binance.com:9443
+    MOCOVE_INGEST_REST_URL      padrão https://api.binance.com
+    MOCOVE_INGEST_STATUS        arquivo JSON com as métricas (padrão runtime/ingest_status.json)
+"""
+
+import os
+import json
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Sequence
+
+from candles import RESOLUTIONS, price_columns, update_candles
+
+log = logging.getLogger("IngestDaemon")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB_PATH = os.getenv('DB_PATH', os.path.join(ROOT, 'memecoin.db'))
+WS_URL = os.getenv('MOCOVE_INGEST_WS_URL', 'wss://stream.binance.com:9443')
+REST_URL = os.getenv('MOCOVE_INGEST_REST_URL', 'https://api.binance.com')
+STATUS_FILE = os.getenv('MOCOVE_INGEST_STATUS', os.path.join(ROOT, 'runtime', 'ingest_status.json'))
+
+
+@dataclass
+class Tick:
+    """Formato único de tick (ts em epoch, segundos)"""
+    symbol: str
+    ts: float
+    price: float
+    volume: float = 0.0
+    high: Optional[float] = None
+    low: Optional[float] = None
+    source: str = ''
+    received_at: float = 0.0  # time.monotonic() na chegada ao daemon
+
+    @property
+    def timestamp(self) -> str:
+        """Timestamp no formato do banco (hora local sem fuso, como datetime.now() nos demais escritores)"""
+        return datetime.fromtimestamp(self.ts).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+Emit = Callable[[Tick], None]
+
+
+# ===== Fontes =====
+
+class TickSource:
+    """Fonte de ticks: run() emite até stop ser sinalizado (ou a fonte acabar)"""
+    name = 'source'
+
+    def run(self, emit: Emit, stop: threading.Event):
+        raise NotImplementedError
+
+
+class BinanceStreamSource(TickSource):
+    """Stream combinado da Binance (@ticker ou @kline_<intervalo>) via websocket-client"""
+    name = 'ws'
+
+    def __init__(self, symbols: Sequence[str], stream: str = 'ticker', url: str = WS_URL,
+                 recv_timeout: float = 5.0):
+        self.symbols = [s.upper() for s in symbols]
+        self.stream = stream
+        self.url = url.rstrip('/')
+        self.recv_timeout = recv_timeout
+
+    @property
+    def stream_url(self) -> str:
+        streams = '/'.join(f"{s.lower()}@{self.stream}" for s in self.symbols)
+        return f"{self.url}/stream?streams={streams}"
+
+    @staticmethod
+    def parse_message(message: Dict) -> Optional[Tick]:
+        """Converte um evento 24hrTicker ou kline em Tick (None para outros eventos)"""
+        data = message.get('data', message)
+        event = data.get('e')
+        if event == '24hrTicker':
+            return Tick(symbol=data['s'], ts=data['E'] / 1000, price=float(data['c']),
+                        volume=float(data.get('v', 0)), high=float(data['h']), low=float(data['l']),
+                        source='ws')
+        if event == 'kline':
+            k = data['k']
+            return Tick(symbol=data['s'], ts=data['E'] / 1000, price=float(k['c']),
+                        volume=float(k.get('v', 0)), high=float(k['h']), low=float(k['l']),
+                        source='ws')
+        return None
+
+    def run(self, emit: Emit, stop: threading.Event):
+        import websocket  # websocket-client
+
+        ws = websocket.create_connection(self.stream_url, timeout=self.recv_timeout)
+        log.info(f"🔌 Stream conectado: {len(self.symbols)} símbolos ({self.stream})")
+        try:
+            while not stop.is_set():
+                try:
+                    raw = ws.recv()
+                except websocket.WebSocketTimeoutException:
+                    continue
+                if not raw:
+                    raise ConnectionError("Stream fechado pelo servidor")
+                tick = self.parse_message(json.loads(raw))
+                if tick is not None:
+                    emit(tick)
+        finally:
+            ws.close()
+
+
+class RestPollingSource(TickSource):
+    """Consulta /api/v3/ticker/24hr de todos os símbolos numa única requisição por ciclo"""
+    name = 'rest'
+
+    def __init__(self, symbols: Sequence[str], interval_s: float = 10.0, base_url: str = REST_URL,
+                 session=None, timeout: float = 10.0):
+        self.symbols = [s.upper() for s in symbols]
+        self.interval_s = interval_s
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        if session is None:
+            from watchlist_scanner import build_session
+            session = build_session(2)
+        self.session = session
+
+    @staticmethod
+    def parse_ticker(data: Dict) -> Tick:
+        return Tick(symbol=data['symbol'], ts=data['closeTime'] / 1000, price=float(data['lastPrice']),
+                    volume=float(data.get('volume', 0)), high=float(data['highPrice']),
+                    low=float(data['lowPrice']), source='rest')
+
+    def run(self, emit: Emit, stop: threading.Event):
+        while not stop.is_set():
+            began = time.monotonic()
+            response = self.session.get(f"{self.base_url}/api/v3/ticker/24hr",
+                                        params={'symbols': json.dumps(self.symbols, separators=(',', ':'))},
+                                        timeout=self.timeout)
+            response.raise_for_status()
+            for data in response.json():
+                emit(self.parse_ticker(data))
+            stop.wait(max(0.0, self.interval_s - (time.monotonic() - began)))
+
+
+class ReplaySource(TickSource):
+    """Reproduz ticks de um JSONL (ou de dicts/Ticks em memória) para testes offline.
+
+    speed=None reproduz o mais rápido possível; speed=1.0 respeita o intervalo
+    original entre ticks, 10.0 acelera 10x.
+    """
+    name = 'replay'
+
+    def __init__(self, path: Optional[str] = None, records: Optional[Iterable] = None,
+                 speed: Optional[float] = None):
+        if (path is None) == (records is None):
+            raise ValueError("Informe path ou records")
+        self.path = path
+        self.records = records
+        self.speed = speed
+
+    @staticmethod
+    def to_tick(record) -> Tick:
+        if isinstance(record, Tick):
+            return Tick(**{**asdict(record), 'source': record.source or 'replay'})
+        ts = record.get('ts')
+        if ts is None:
+            dt = datetime.fromisoformat(str(record['timestamp']).replace('Z', '+00:00'))
+            ts = dt.timestamp()  # sem fuso = hora local (convenção do banco)
+        return Tick(symbol=record['symbol'], ts=float(ts), price=float(record['price']),
+                    volume=float(record.get('volume') or 0), high=record.get('high'), low=record.get('low'),
+                    source='replay')
+
+    def _iter_records(self):
+        if self.records is not None:
+            yield from self.records
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def run(self, emit: Emit, stop: threading.Event):
+        first_ts = started = None
+        for record in self._iter_records():
+            if stop.is_set():
+                return
+            tick = self.to_tick(record)
+            if self.speed:
+                if first_ts is None:
+                    first_ts, started = tick.ts, time.monotonic()
+                delay = (tick.ts - first_ts) / self.speed - (time.monotonic() - started)
+                if delay > 0 and stop.wait(delay):
+                    return
+            emit(tick)
+
+
+# ===== Consumidores =====
+
+class TickSink:
+    """Consumidor de ticks: handle() recebe lotes na thread do próprio consumidor"""
+    name = 'sink'
+    overflow = 'block'
+
+    def handle(self, ticks: List[Tick]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PriceCache(TickSink):
+    """Último tick por símbolo (thread-safe)"""
+    name = 'price_cache'
+    overflow = 'drop_oldest'
+
+    def __init__(self):
+        self._latest: Dict[str, Tick] = {}
+        self._lock = threading.Lock()
+
+    def handle(self, ticks: List[Tick]):
+        with self._lock:
+            for tick in ticks:
+                current = self._latest.get(tick.symbol)
+                if current is None or tick.ts >= current.ts:
+                    self._latest[tick.symbol] = tick
+
+    def get(self, symbol: str) -> Optional[Tick]:
+        with self._lock:
+            return self._latest.get(symbol)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {symbol: tick.price for symbol, tick in self._latest.items()}
+
+
+class LiveCandles(TickSink):
+    """Candles ao vivo por símbolo/resolução (o corrente + os últimos fechados).
+
+    Só em memória: o histórico persistido vem de price_candles, alimentado pelo
+    DbWriter via update_candles.
+    """
+    name = 'live_candles'
+    overflow = 'drop_oldest'
+
+    def __init__(self, resolutions: Sequence[str] = tuple(RESOLUTIONS), keep: int = 120):
+        self.resolutions = {r: RESOLUTIONS[r] for r in resolutions}
+        self.keep = keep
+        self._current: Dict[tuple, List] = {}
+        self._closed: Dict[tuple, Deque[List]] = {}
+        self._lock = threading.Lock()
+
+    def handle(self, ticks: List[Tick]):
+        with self._lock:
+            for tick in ticks:
+                for resolution, seconds in self.resolutions.items():
+                    key = (tick.symbol, resolution)
+                    bucket = int(tick.ts // seconds) * seconds
+                    bar = self._current.get(key)
+                    if bar is not None and bucket < bar[0]:
+                        continue  # tick atrasado de um candle já fechado
+                    if bar is None or bucket > bar[0]:
+                        if bar is not None:
+                            self._closed.setdefault(key, deque(maxlen=self.keep)).append(bar)
+                        bar = self._current[key] = [bucket, tick.price, tick.price, tick.price, tick.price, 0.0, 0]
+                    bar[2] = max(bar[2], tick.high or tick.price, tick.price)
+                    bar[3] = min(bar[3], tick.low or tick.price, tick.price)
+                    bar[4] = tick.price
+                    bar[5] = tick.volume
+                    bar[6] += 1
+
+    def get(self, symbol: str, resolution: str = '1m', limit: int = 60) -> List[Dict]:
+        """Últimos candles em ordem cronológica (o último ainda está aberto)"""
+        with self._lock:
+            key = (symbol, resolution)
+            bars = list(self._closed.get(key, ()))[-(limit - 1):] if limit > 1 else []
+            if key in self._current:
+                bars.append(self._current[key])
+            return [dict(zip(('bucket', 'open', 'high', 'low', 'close', 'volume', 'ticks'), bar)) for bar in bars]
+
+
+class DbWriter(TickSink):
+    """Grava os ticks em prices em lotes e atualiza os candles persistidos"""
+    name = 'db_writer'
+    overflow = 'block'
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, max_attempts: int = 3):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._conn: Optional[sqlite3.Connection] = None
+        self._insert_sql: Optional[str] = None
+        self._with_high_low = False
+        self.written = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Criada na thread do consumidor (sqlite3 não compartilha conexões entre threads)
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30)
+            # high/low só existem no schema antigo; o do backend (init_database) não tem
+            self._with_high_low = {'high', 'low'} <= price_columns(self._conn)
+            columns = ['symbol', 'timestamp', 'price', 'volume'] + (['high', 'low'] if self._with_high_low else [])
+            self._insert_sql = (f"INSERT INTO prices ({', '.join(columns)}) "
+                                f"VALUES ({', '.join('?' * len(columns))})")
+        return self._conn
+
+    def handle(self, ticks: List[Tick]):
+        # Só a transação do INSERT é repetida: depois do commit, repetir duplicaria os ticks
+        for attempt in range(self.max_attempts):
+            try:
+                conn = self._connection()
+                if self._with_high_low:
+                    rows = [(t.symbol, t.timestamp, t.price, t.volume, t.high or 0, t.low or 0) for t in ticks]
+                else:
+                    rows = [(t.symbol, t.timestamp, t.price, t.volume) for t in ticks]
+                with conn:
+                    conn.executemany(self._insert_sql, rows)
+                break
+            except sqlite3.OperationalError as e:
+                if attempt == self.max_attempts - 1:
+                    raise
+                log.warning(f"⚠️ Banco ocupado ao gravar ticks ({e}); tentando de novo")
+                time.sleep(0.2 * (attempt + 1))
+        self.written += len(rows)
+        try:
+            update_candles(conn)
+        except sqlite3.OperationalError as e:
+            # A marca d'água não avançou: o próximo lote agrega estes ticks
+            log.warning(f"⚠️ Candles não atualizados ({e}); ficam para o próximo lote")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# ===== Daemon =====
+
+class _LagWindow:
+    """Últimos N atrasos (s) para p50/p99/máx"""
+
+    def __init__(self, size: int = 2048):
+        self.values: Deque[float] = deque(maxlen=size)
+
+    def add(self, value: float):
+        self.values.append(value)
+
+    def summary(self) -> Dict[str, float]:
+        if not self.values:
+            return {'p50_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+        ordered = sorted(self.values)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+        return {'p50_ms': round(pick(0.5), 3), 'p99_ms': round(pick(0.99), 3), 'max_ms': round(ordered[-1] * 1000, 3)}
+
+
+class _SinkWorker:
+    """Fila limitada + thread de um consumidor"""
+
+    def __init__(self, sink: TickSink, maxsize: int, max_batch: int, max_wait_s: float):
+        self.sink = sink
+        self.queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_s
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.lag = _LagWindow()
+        self.event_lag = _LagWindow()
+        self._closing = False
+        self.thread = threading.Thread(target=self._run, name=f"ingest-{sink.name}", daemon=True)
+
+    def put(self, tick: Tick, stop: threading.Event):
+        if self.sink.overflow == 'drop_oldest':
+            while True:
+                try:
+                    self.queue.put_nowait(tick)
+                    break
+                except queue.Full:
+                    try:
+                        self.queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+        else:
+            # Contrapressão: a fonte espera enquanto o consumidor estiver atrasado
+            while True:
+                try:
+                    self.queue.put(tick, timeout=0.5)
+                    break
+                except queue.Full:
+                    if stop.is_set():
+                        self.dropped += 1
+                        return
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def _run(self):
+        try:
+            self._consume()
+        finally:
+            # close() na mesma thread do handle() (conexões sqlite3 são por thread)
+            try:
+                self.sink.close()
+            except Exception as e:
+                log.error(f"❌ Erro ao fechar {self.sink.name}: {e}")
+
+    def _consume(self):
+        while True:
+            try:
+                first = self.queue.get(timeout=self.max_wait_s)
+            except queue.Empty:
+                if self._closing:
+                    return
+                continue
+            batch = [first]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.sink.handle(batch)
+            except Exception as e:
+                self.errors += 1
+                self.failed += len(batch)
+                log.error(f"❌ Consumidor {self.sink.name} falhou com {len(batch)} ticks: {e}")
+                continue
+            now_mono, now = time.monotonic(), time.time()
+            for tick in batch[-64:]:  # amostra do lote para as janelas de atraso
+                self.lag.add(now_mono - tick.received_at)
+                self.event_lag.add(now - tick.ts)
+            self.processed += len(batch)
+
+    def close(self, timeout: float):
+        self._closing = True
+        self.thread.join(timeout)
+
+
+class IngestDaemon:
+    """Liga fontes a consumidores por filas limitadas e acompanha as métricas"""
+
+    def __init__(self, sources: Sequence[TickSource], sinks: Sequence[TickSink],
+                 queue_size: int = 10000, max_batch: int = 500, max_wait_s: float = 0.25,
+                 restart_delay_s: float = 2.0, status_file: Optional[str] = None,
+                 metrics_interval_s: float = 30.0):
+        self.sources = list(sources)
+        self.workers = [_SinkWorker(s, queue_size, max_batch, max_wait_s) for s in sinks]
+        self.restart_delay_s = restart_delay_s
+        self.status_file = status_file
+        self.metrics_interval_s = metrics_interval_s
+        self.stop_event = threading.Event()
+        self._source_threads: List[threading.Thread] = []
+        self._source_stats = {s.name: {'events': 0, 'rejected': 0, 'errors': 0, 'restarts': 0} for s in self.sources}
+        self._started_at = None
+        self._last_rate = (0.0, 0)
+        self._stats_lock = threading.Lock()
+
+    # ===== Ciclo de vida =====
+
+    def start(self):
+        self._started_at = time.monotonic()
+        self._last_rate = (self._started_at, 0)
+        for worker in self.workers:
+            worker.thread.start()
+        for source in self.sources:
+            t = threading.Thread(target=self._run_source, args=(source,), name=f"ingest-src-{source.name}", daemon=True)
+            t.start()
+            self._source_threads.append(t)
+        log.info(f"🚀 Ingestão iniciada: fontes={[s.name for s in self.sources]} "
+                 f"consumidores={[w.sink.name for w in self.workers]}")
+
+    def stop(self, timeout: float = 10.0):
+        """Para as fontes e drena as filas dos consumidores"""
+        self.stop_event.set()
+        for t in self._source_threads:
+            t.join(timeout)
+        for worker in self.workers:
+            worker.close(timeout)
+        self._write_status()
+        log.info("🛑 Ingestão parada")
+
+    def wait_sources(self, timeout: Optional[float] = None) -> bool:
+        """Espera as fontes finitas (replay) terminarem"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for t in self._source_threads:
+            t.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return not any(t.is_alive() for t in self._source_threads)
+
+    def drain(self, timeout: float = 30.0) -> bool:
+        """Espera as filas esvaziarem"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            accepted = self._accepted()
+            if all(w.processed + w.dropped + w.failed >= accepted for w in self.workers):
+                return True
+            time.sleep(0.01)
+        return False
+
+    def run_forever(self):
+        """Roda até Ctrl+C, registrando as métricas periodicamente"""
+        self.start()
+        try:
+            while not self.stop_event.wait(self.metrics_interval_s):
+                m = self.metrics()
+                log.info(f"📊 Ingestão: {m['throughput_tps']:.1f} ticks/s | "
+                         + ' | '.join(f"{name}: fila {s['queue_depth']} atraso p99 {s['lag']['p99_ms']:.0f} ms"
+                                      for name, s in m['sinks'].items()))
+                self._write_status(m)
+        except KeyboardInterrupt:
+            log.info("Interrupção manual detectada")
+        finally:
+            self.stop()
+
+    # ===== Fontes =====
+
+    def _run_source(self, source: TickSource):
+        stats = self._source_stats[source.name]
+
+        def emit(tick: Tick):
+            if not tick.symbol or not tick.price or tick.price <= 0 or not tick.ts:
+                stats['rejected'] += 1
+                return
+            tick.symbol = tick.symbol.upper()
+            tick.received_at = time.monotonic()
+            with self._stats_lock:
+                stats['events'] += 1
+            for worker in self.workers:
+                worker.put(tick, self.stop_event)
+
+        while not self.stop_event.is_set():
+            try:
+                source.run(emit, self.stop_event)
+                if isinstance(source, ReplaySource):
+                    return  # fonte finita
+            except Exception as e:
+                stats['errors'] += 1
+                log.error(f"❌ Fonte {source.name} caiu: {e}; reiniciando em {self.restart_delay_s}s")
+            stats['restarts'] += 1
+            self.stop_event.wait(self.restart_delay_s)
+
+    def _accepted(self) -> int:
+        with self._stats_lock:
+            return sum(s['events'] for s in self._source_stats.values())
+
+    # ===== Métricas =====
+
+    def metrics(self) -> Dict:
+        now = time.monotonic()
+        accepted = self._accepted()
+        last_at, last_count = self._last_rate
+        throughput = (accepted - last_count) / (now - last_at) if now > last_at else 0.0
+        self._last_rate = (now, accepted)
+        return {
+            'uptime_s': round(now - self._started_at, 3) if self._started_at else 0.0,
+            'ticks_total': accepted,
+            'throughput_tps': round(throughput, 1),
+            'sources': {name: dict(s) for name, s in self._source_stats.items()},
+            'sinks': {
+                w.sink.name: {
+                    'processed': w.processed, 'dropped': w.dropped, 'errors': w.errors, 'failed': w.failed,
+                    'queue_depth': w.queue.qsize(), 'max_queue_depth': w.max_depth,
+                    'lag': w.lag.summary(), 'event_lag': w.event_lag.summary(),
+                } for w in self.workers
+            },
+        }
+
+    def _write_status(self, metrics: Optional[Dict] = None):
+        if not self.status_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.status_file) or '.', exist_ok=True)
+            with open(self.status_file + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump({**(metrics or self.metrics()), 'updated_at': datetime.now().isoformat()}, f, indent=2)
+            os.replace(self.status_file + '.tmp', self.status_file)
+        except OSError as e:
+            log.error(f"❌ Erro ao gravar status da ingestão: {e}")
+
+
+def main():
+    """Daemon de ingestão pela linha de comando"""
+    import argparse
+    from logging_setup import setup_logging
+
+    parser = argparse.ArgumentParser(description="Ingestão contínua de dados de mercado")
+    parser.add_argument('--source', choices=('ws', 'rest', 'replay'), default='ws')
+    parser.add_argument('--symbols', default='DOGEUSDT,SHIBUSDT,PEPEUSDT,FLOKIUSDT,BONKUSDT')
+    parser.add_argument('--stream', default='ticker', help='ticker ou kline_1m (fonte ws)')
+    parser.add_argument('--poll-interval', type=float, default=10.0, help='Segundos entre consultas (fonte rest)')
+    parser.add_argument('--replay-file', help='JSONL de ticks (fonte replay)')
+    parser.add_argument('--replay-speed', type=float, default=None)
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='Caminho do banco SQLite')
+    parser.add_argument('--log-file', default=os.path.join(ROOT, 'ingest_daemon.log'))
+    args = parser.parse_args()
+
+    setup_logging(log_file=args.log_file)
+    symbols = [s.strip() for s in args.symbols.split(',') if s.strip()]
+    if args.source == 'ws':
+        source = BinanceStreamSource(symbols, args.stream)
+    elif args.source == 'rest':
+        source = RestPollingSource(symbols, args.poll_interval)
+    else:
+        if not args.replay_file:
+            parser.error('--replay-file é obrigatório com --source replay')
+        source = ReplaySource(args.replay_file, speed=args.replay_speed)
+
+    daemon = IngestDaemon([source], [PriceCache(), LiveCandles(), DbWriter(args.db)], status_file=STATUS_FILE)
+    if args.source == 'replay':
+        daemon.start()
+        daemon.wait_sources()
+        daemon.drain()
+        daemon.stop()
+        print(json.dumps(daemon.metrics(), indent=2))
+    else:
+        daemon.run_forever()
+
+
+if __name__ == "__main__":
+    main()
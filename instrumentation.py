@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+"""
+Instrumentation - Métricas do backend em formato Prometheus (texto)
+Histogramas de latência por rota, tempo de consulta no SQLite (pela conexão),
+chamadas à exchange (contagem, erros e latência), taxa de acerto de caches e
+amostras do sistema coletadas em segundo plano (psutil, ou /proc e
+os.getloadavg se psutil não estiver instalado).
+
+Cada processo tem o próprio registro. Com vários workers (serve_backend.py,
+MOCOVE_METRICS_DIR definido) cada worker grava um snapshot do registro no
+diretório a cada amostragem, e /metrics agrega os snapshots: contadores e
+histogramas somados (inclusive de workers já encerrados, para continuarem
+monotônicos), gauges só dos workers vivos, com o rótulo worker.
+
+Uso:
+    registry = MetricsRegistry()
+    instrument_app(app, registry)                        # latência por rota
+    conn = connect(DB_PATH, registry)                    # sqlite3 com tempo por consulta
+    exchange = InstrumentedExchange(ccxt.binance(), registry)
+    registry.track_cache('shared_state', shared_state)   # objeto com .hits/.misses
+    SystemSampler(registry).ensure_started()
+    registry.render()                                    # texto para /metrics
+    render_workers(metrics_dir)                          # /metrics agregado entre workers
+"""
+
+import os
+import json
+import time
+import bisect
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    psutil = None
+    HAS_PSUTIL = False
+
+from logging_setup import WORKER_ID_ENV
+
+log = logging.getLogger("Instrumentation")
+
+METRICS_DIR_ENV = 'MOCOVE_METRICS_DIR'
+
+# Segundos: de 1 ms (consulta SQLite) a 10 s (chamada lenta à exchange)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _key(pairs) -> Labels:
+    """Rótulos lidos de um snapshot (listas JSON) de volta para a chave interna"""
+    return tuple(sorted((str(k), str(v)) for k, v in pairs))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format(name: str, labels: Labels, value: float, extra: Labels = ()) -> str:
+    pairs = labels + extra
+    label_text = '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}' if pairs else ''
+    return f"{name}{label_text} {value:.10g}"
+
+
+class Histogram:
+    """Contagem por faixa (não acumulada), soma e total de observações"""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # última posição = acima da maior faixa
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimativa pelo limite superior da faixa que contém o quantil"""
+        if not self.count:
+            return None
+        target, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float('inf')
+
+
+class CacheTotals:
+    """Hits/misses somados de um cache entre workers"""
+
+    def __init__(self):
+        self.hits, self.misses = 0, 0
+
+
+class MetricsRegistry:
+    """Contadores, gauges e histogramas com rótulos; thread-safe"""
+
+    def __init__(self, prefix: str = 'mocove', buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._caches: Dict[str, Any] = {}
+
+    def _name(self, name: str, help_text: Optional[str]) -> str:
+        full = f"{self.prefix}_{name}"
+        if help_text and full not in self._help:
+            self._help[full] = help_text
+        return full
+
+    def inc(self, name: str, value: float = 1.0, help: Optional[str] = None, **labels):
+        with self._lock:
+            series = self._counters.setdefault(self._name(name, help), {})
+            key = _labels(labels)
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, help: Optional[str] = None, **labels):
+        with self._lock:
+            self._gauges.setdefault(self._name(name, help), {})[_labels(labels)] = float(value)
+
+    def observe(self, name: str, value: float, help: Optional[str] = None, **labels):
+        with self._lock:
+            series = self._histograms.setdefault(self._name(name, help), {})
+            key = _labels(labels)
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def track_cache(self, name: str, cache: Any):
+        """Expõe hits/misses (e a taxa de acerto) de um objeto com atributos .hits e .misses"""
+        with self._lock:
+            self._caches[name] = cache
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        with self._lock:
+            return self._histograms.get(f"{self.prefix}_{name}", {}).get(_labels(labels))
+
+    def series(self, name: str) -> Dict[Labels, Histogram]:
+        with self._lock:
+            return dict(self._histograms.get(f"{self.prefix}_{name}", {}))
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            caches = dict(self._caches)
+        stats = {}
+        for name, cache in caches.items():
+            hits, misses = getattr(cache, 'hits', 0), getattr(cache, 'misses', 0)
+            stats[name] = {'hits': hits, 'misses': misses,
+                           'hit_ratio': hits / (hits + misses) if hits + misses else 0.0}
+        return stats
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado do registro em JSON, para agregar entre workers (render_workers)"""
+        cache_stats = self.cache_stats()
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'worker': os.getenv(WORKER_ID_ENV) or str(os.getpid()),
+                'help': dict(self._help),
+                'counters': {n: [[k, v] for k, v in series.items()] for n, series in self._counters.items()},
+                'gauges': {n: [[k, v] for k, v in series.items()] for n, series in self._gauges.items()},
+                'histograms': {n: [[k, h.buckets, h.counts, h.sum, h.count] for k, h in series.items()]
+                               for n, series in self._histograms.items()},
+                'caches': {name: [stats['hits'], stats['misses']] for name, stats in cache_stats.items()},
+            }
+
+    def merge(self, snapshot: Dict[str, Any], gauges: bool = True):
+        """Soma contadores, histogramas e caches de um snapshot; gauges entram com o rótulo worker"""
+        worker = str(snapshot.get('worker') or snapshot.get('pid'))
+        with self._lock:
+            for name, text in snapshot.get('help', {}).items():
+                self._help.setdefault(name, text)
+            for name, rows in snapshot.get('counters', {}).items():
+                series = self._counters.setdefault(name, {})
+                for labels, value in rows:
+                    key = _key(labels)
+                    series[key] = series.get(key, 0.0) + value
+            if gauges:
+                for name, rows in snapshot.get('gauges', {}).items():
+                    series = self._gauges.setdefault(name, {})
+                    for labels, value in rows:
+                        series[_key(list(labels) + [['worker', worker]])] = value
+            for name, rows in snapshot.get('histograms', {}).items():
+                series = self._histograms.setdefault(name, {})
+                for labels, buckets, counts, total, count in rows:
+                    key = _key(labels)
+                    histogram = series.get(key)
+                    if histogram is None:
+                        histogram = series[key] = Histogram(buckets)
+                    if list(histogram.buckets) != sorted(buckets):
+                        continue  # faixas diferentes (versões distintas do app): não dá para somar
+                    histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                    histogram.sum += total
+                    histogram.count += count
+            for name, (hits, misses) in snapshot.get('caches', {}).items():
+                totals = self._caches.setdefault(name, CacheTotals())
+                totals.hits += hits
+                totals.misses += misses
+
+    def render(self, processes: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Formato de exposição de texto do Prometheus (0.0.4); processes = rótulos de mocove_process_info"""
+        cache_stats = self.cache_stats()
+        lines: List[str] = []
+        with self._lock:
+            def header(name, kind):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+            for name, series in sorted(self._counters.items()):
+                header(name, 'counter')
+                lines.extend(_format(name, k, v) for k, v in sorted(series.items()))
+            for name, series in sorted(self._gauges.items()):
+                header(name, 'gauge')
+                lines.extend(_format(name, k, v) for k, v in sorted(series.items()))
+            for name, series in sorted(self._histograms.items()):
+                header(name, 'histogram')
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, n in zip(histogram.buckets, histogram.counts):
+                        cumulative += n
+                        lines.append(_format(f"{name}_bucket", key, cumulative, (('le', f"{bound:g}"),)))
+                    lines.append(_format(f"{name}_bucket", key, histogram.count, (('le', '+Inf'),)))
+                    lines.append(_format(f"{name}_sum", key, histogram.sum))
+                    lines.append(_format(f"{name}_count", key, histogram.count))
+
+        prefix = self.prefix
+        lines.append(f"# TYPE {prefix}_process_info gauge")
+        for labels in processes if processes is not None else [{'pid': os.getpid()}]:
+            lines.append(_format(f"{prefix}_process_info", _labels(labels), 1))
+        if cache_stats:
+            for metric, field, kind in (('cache_hits_total', 'hits', 'counter'),
+                                        ('cache_misses_total', 'misses', 'counter'),
+                                        ('cache_hit_ratio', 'hit_ratio', 'gauge')):
+                lines.append(f"# TYPE {prefix}_{metric} {kind}")
+                lines.extend(_format(f"{prefix}_{metric}", (('cache', name),), stats[field])
+                             for name, stats in sorted(cache_stats.items()))
+        return '\n'.join(lines) + '\n'
+
+
+def snapshot_path(directory: str, pid: Optional[int] = None) -> str:
+    return os.path.join(directory, f"metrics.{pid or os.getpid()}.json")
+
+
+def write_snapshot(registry: MetricsRegistry, directory: str):
+    """Grava o snapshot deste processo (troca atômica: quem agrega nunca lê um arquivo pela metade)"""
+    path = snapshot_path(directory)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(registry.snapshot(), f)
+    os.replace(tmp, path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def render_workers(directory: str, prefix: str = 'mocove') -> str:
+    """/metrics de todos os workers a partir dos snapshots gravados em directory"""
+    merged, processes = MetricsRegistry(prefix), []
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith('metrics.') and name.endswith('.json')):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning(f"⚠️ Snapshot de métricas ilegível {name}: {e}")
+            continue
+        alive = _pid_alive(snapshot['pid'])
+        merged.merge(snapshot, gauges=alive)
+        if alive:
+            processes.append({'pid': snapshot['pid'], 'worker': snapshot.get('worker') or snapshot['pid']})
+    return merged.render(processes)
+
+
+def clear_snapshots(directory: str):
+    """Cria o diretório de snapshots e remove os de uma execução anterior (chamado pelo launcher)"""
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.startswith('metrics.'):
+            os.remove(os.path.join(directory, name))
+
+
+# ---------------------------------------------------------------- SQLite
+
+def _statement_kind(sql: str) -> str:
+    words = sql.lstrip().split(None, 1)
+    return words[0].lower() if words else 'empty'
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor que mede execute/executemany (o primeiro passo da consulta)"""
+
+    def _timed(self, method, sql, *args):
+        start = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            self.connection.registry.observe(
+                'db_query_duration_seconds', time.perf_counter() - start,
+                help='Tempo de execute no SQLite por tipo de comando', op=_statement_kind(sql))
+
+    def execute(self, sql, *args):
+        return self._timed(super().execute, sql, *args)
+
+    def executemany(self, sql, *args):
+        return self._timed(super().executemany, sql, *args)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Conexão cujos cursores (inclusive os de conn.execute e pandas.read_sql) são medidos"""
+
+    registry: MetricsRegistry
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # Connection.execute do C não passa por cursor(); refeitos aqui para serem medidos
+    def execute(self, sql, *args):
+        return self.cursor().execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        return self.cursor().executemany(sql, *args)
+
+
+def connect(db_path: str, registry: MetricsRegistry, **kwargs) -> sqlite3.Connection:
+    """sqlite3.connect com tempo de consulta registrado em db_query_duration_seconds"""
+    conn = sqlite3.connect(db_path, factory=TimedConnection, **kwargs)
+    conn.registry = registry
+    return conn
+
+
+# -------------------------------------------------------------- Exchange
+
+class InstrumentedExchange:
+    """Proxy de um cliente de exchange: mede cada método chamado (fetch_*, create_order...)"""
+
+    def __init__(self, exchange, registry: MetricsRegistry, name: Optional[str] = None):
+        object.__setattr__(self, '_exchange', exchange)
+        object.__setattr__(self, '_registry', registry)
+        object.__setattr__(self, '_name', name or getattr(exchange, 'id', None) or type(exchange).__name__)
+
+    @property
+    def wrapped(self):
+        return self._exchange
+
+    def __getattr__(self, attr):
+        value = getattr(self._exchange, attr)
+        if attr.startswith('_') or not callable(value):
+            return value
+        registry, name = self._registry, self._name
+
+        def timed(*args, **kwargs):
+            start, outcome = time.perf_counter(), 'ok'
+            try:
+                return value(*args, **kwargs)
+            except Exception as e:
+                outcome = type(e).__name__
+                raise
+            finally:
+                registry.observe('exchange_call_duration_seconds', time.perf_counter() - start,
+                                 help='Latência das chamadas à exchange', exchange=name, method=attr)
+                registry.inc('exchange_calls_total', help='Chamadas à exchange por resultado',
+                             exchange=name, method=attr, outcome=outcome)
+
+        return timed
+
+    def __setattr__(self, attr, value):
+        setattr(self._exchange, attr, value)
+
+    def __delattr__(self, attr):
+        delattr(self._exchange, attr)
+
+    def __repr__(self):
+        return f"InstrumentedExchange({self._exchange!r})"
+
+
+# ----------------------------------------------------------------- Flask
+
+def instrument_app(app, registry: MetricsRegistry, clock: Callable[[], float] = time.perf_counter):
+    """Middleware: latência por rota (regra da URL, não o caminho, para não explodir rótulos)"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = clock()
+
+    @app.after_request
+    def _record_latency(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            rule = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+            registry.observe('http_request_duration_seconds', clock() - start,
+                             help='Latência das requisições HTTP por rota',
+                             route=rule, method=request.method, status=response.status_code)
+        return response
+
+    return app
+
+
+def slowest_routes(registry: MetricsRegistry, limit: int = 5) -> List[Dict[str, Any]]:
+    """Rotas ordenadas pelo p95 estimado (limite superior da faixa do histograma)"""
+    routes: Dict[Tuple[str, str], Histogram] = {}
+    for key, histogram in registry.series('http_request_duration_seconds').items():
+        labels = dict(key)
+        merged = routes.setdefault((labels['method'], labels['route']), Histogram(histogram.buckets))
+        merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+        merged.sum += histogram.sum
+        merged.count += histogram.count
+    ranked = sorted(routes.items(), key=lambda item: (item[1].quantile(0.95), item[1].sum), reverse=True)
+    return [{'method': method, 'route': route, 'count': h.count,
+             'avg_ms': round(h.sum / h.count * 1000, 2), 'p95_ms_upper': h.quantile(0.95) * 1000}
+            for (method, route), h in ranked[:limit]]
+
+
+# --------------------------------------------------------------- Sistema
+
+def _read_proc_rss() -> Optional[int]:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _read_proc_memory_percent() -> Optional[float]:
+    try:
+        info = {}
+        with open('/proc/meminfo') as f:
+            for line in f:
+                key, value = line.split(':', 1)
+                info[key] = int(value.split()[0])
+        return 100.0 * (1 - info['MemAvailable'] / info['MemTotal'])
+    except (OSError, ValueError, KeyError, ZeroDivisionError):
+        return None
+
+
+def sample_system() -> Dict[str, Optional[float]]:
+    """Uma amostra de CPU, memória e carga (psutil; sem ele, /proc e os.getloadavg)"""
+    load1 = os.getloadavg()[0] if hasattr(os, 'getloadavg') else None
+    if HAS_PSUTIL:
+        memory = psutil.virtual_memory()
+        return {
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'memory_percent': memory.percent,
+            'process_rss_bytes': psutil.Process().memory_info().rss,
+            'load1': load1,
+            'source': 'psutil',
+        }
+    cpus = os.cpu_count() or 1
+    return {
+        'cpu_percent': min(100.0, load1 / cpus * 100) if load1 is not None else None,
+        'memory_percent': _read_proc_memory_percent(),
+        'process_rss_bytes': _read_proc_rss(),
+        'load1': load1,
+        'source': 'proc',
+    }
+
+
+class SystemSampler:
+    """Amostra o sistema em segundo plano; a thread é recriada após fork (um por worker).
+
+    Com snapshot_dir, cada amostragem também grava o snapshot do registro (render_workers).
+    """
+
+    def __init__(self, registry: MetricsRegistry, interval_s: float = 5.0,
+                 sampler: Callable[[], Dict[str, Any]] = sample_system, snapshot_dir: Optional[str] = None):
+        self.registry = registry
+        self.interval_s = interval_s
+        self.sampler = sampler
+        self.snapshot_dir = snapshot_dir
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._stop = threading.Event()
+        self.last: Optional[Dict[str, Any]] = None
+
+    def sample(self) -> Dict[str, Any]:
+        values = dict(self.sampler(), sampled_at=time.time())
+        for key in ('cpu_percent', 'memory_percent', 'process_rss_bytes', 'load1'):
+            if values.get(key) is not None:
+                self.registry.set(f"system_{key}", values[key], help=f"Amostra do sistema ({values['source']})")
+        self.last = values
+        return values
+
+    def ensure_started(self):
+        """Inicia a thread de amostragem neste processo (barato se já estiver rodando)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            threading.Thread(target=self._run, args=(self._stop,), name='system-sampler', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self._pid = None
+
+    def _run(self, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                log.warning(f"⚠️ Falha ao amostrar o sistema: {e}")
+            if self.snapshot_dir:
+                try:
+                    write_snapshot(self.registry, self.snapshot_dir)
+                except OSError as e:
+                    log.warning(f"⚠️ Falha ao gravar snapshot de métricas: {e}")
+            stop.wait(self.interval_s)
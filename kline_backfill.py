@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Kline Backfill - Carga histórica de klines retomável e concorrente
+Divide (símbolo, intervalo, período) em blocos de até 1000 klines (o máximo
+por requisição da Binance), baixa os blocos num pool de threads dentro de um
+orçamento de peso por minuto e grava cada bloco com upsert em
+klines(symbol, interval, open_time) junto com o checkpoint em backfill_chunks.
+
+Os blocos seguem uma grade fixa (múltiplos de 1000 x intervalo desde o epoch),
+então execuções com períodos diferentes reaproveitam os mesmos checkpoints.
+Um bloco só fica 'done' quando todas as suas klines já fecharam; o bloco
+corrente é baixado de novo na próxima execução.
+
+Uso:
+    python kline_backfill.py --symbols DOGEUSDT,PEPEUSDT --intervals 1m,5m --days 30
+
+Variáveis de ambiente:
+    MOCOVE_BACKFILL_BASE_URL         API REST (padrão https://api.binance.com)
+    MOCOVE_BACKFILL_WORKERS          requisições simultâneas (padrão 4)
+    MOCOVE_BACKFILL_WEIGHT_PER_MIN   orçamento de peso por minuto (padrão 600,
+                                     metade do limite de 1200 da Binance)
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import requests
+
+log = logging.getLogger("KlineBackfill")
+
+DEFAULT_DB_PATH = os.getenv(
+    'DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'memecoin.db')
+)
+BASE_URL = os.getenv('MOCOVE_BACKFILL_BASE_URL', 'https://api.binance.com')
+WORKERS = int(os.getenv('MOCOVE_BACKFILL_WORKERS', 4))
+WEIGHT_PER_MIN = int(os.getenv('MOCOVE_BACKFILL_WEIGHT_PER_MIN', 600))
+
+# Klines por requisição (máximo da API) e peso de cada requisição
+CHUNK_KLINES = 1000
+KLINE_WEIGHT = 2
+
+INTERVAL_MS = {
+    '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '2h': 7_200_000, '4h': 14_400_000, '6h': 21_600_000,
+    '8h': 28_800_000, '12h': 43_200_000, '1d': 86_400_000,
+}
+
+_UPSERT_SQL = '''
+    INSERT INTO klines
+        (symbol, interval, open_time, open, high, low, close, volume, close_time, quote_volume, trades)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(symbol, interval, open_time) DO UPDATE SET
+        open = excluded.open, high = excluded.high, low = excluded.low, close = excluded.close,
+        volume = excluded.volume, close_time = excluded.close_time,
+        quote_volume = excluded.quote_volume, trades = excluded.trades
+'''
+
+
+def init_backfill_tables(conn: sqlite3.Connection):
+    """Cria as tabelas de klines e de checkpoints se não existirem"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS klines (
+            symbol TEXT NOT NULL,
+            interval TEXT NOT NULL,
+            open_time INTEGER NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            volume REAL DEFAULT 0,
+            close_time INTEGER,
+            quote_volume REAL DEFAULT 0,
+            trades INTEGER DEFAULT 0,
+            PRIMARY KEY (symbol, interval, open_time)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS backfill_chunks (
+            symbol TEXT NOT NULL,
+            interval TEXT NOT NULL,
+            start_ms INTEGER NOT NULL,
+            end_ms INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            rows INTEGER DEFAULT 0,
+            attempts INTEGER DEFAULT 0,
+            last_error TEXT,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (symbol, interval, start_ms)
+        )
+    ''')
+
+
+def to_ms(value) -> int:
+    """datetime/ISO-8601/epoch em ms; sem fuso = UTC"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    dt = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """Bloco de klines [start_ms, end_ms) de um símbolo/intervalo"""
+    symbol: str
+    interval: str
+    start_ms: int
+    end_ms: int
+
+
+@dataclass
+class BackfillReport:
+    """Resumo de uma execução"""
+    planned: int = 0
+    skipped: int = 0
+    completed: int = 0
+    rows: int = 0
+    requests: int = 0
+    failed: Dict[Chunk, str] = field(default_factory=dict)
+    elapsed_s: float = 0.0
+
+
+class RateLimiter:
+    """Token bucket thread-safe por peso (orçamento por minuto)"""
+
+    def __init__(self, weight_per_minute: float, burst: Optional[float] = None):
+        self.rate = weight_per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1.0, weight_per_minute / 10.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, weight: float = 1.0):
+        """Bloqueia até haver orçamento para `weight`"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= weight:
+                    self._tokens -= weight
+                    return
+                wait = (weight - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Zera o orçamento por `seconds` (resposta 429/418 da API)"""
+        with self._lock:
+            self._tokens = -seconds * self.rate
+            self._updated = time.monotonic()
+
+
+class KlineBackfill:
+    """Motor de backfill: planeja blocos, baixa concorrentemente e grava com checkpoint"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, base_url: str = BASE_URL,
+                 max_workers: int = WORKERS, weight_per_minute: float = WEIGHT_PER_MIN,
+                 max_attempts: int = 5, chunk_klines: int = CHUNK_KLINES,
+                 session: Optional[requests.Session] = None, timeout: float = 15.0):
+        self.db_path = db_path
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max(1, int(max_workers))
+        self.limiter = RateLimiter(weight_per_minute)
+        self.max_attempts = max(1, int(max_attempts))
+        self.chunk_klines = chunk_klines
+        self.timeout = timeout
+        if session is None:
+            from watchlist_scanner import build_session
+            session = build_session(self.max_workers)
+        self.session = session
+        self._requests = 0
+        self._requests_lock = threading.Lock()
+
+    # ===== Planejamento =====
+
+    def plan(self, symbols: Sequence[str], intervals: Sequence[str], start, end=None) -> List[Chunk]:
+        """Blocos da grade fixa que cobrem [start, end) para cada símbolo/intervalo"""
+        start_ms = to_ms(start)
+        end_ms = to_ms(end) if end is not None else int(time.time() * 1000)
+        chunks = []
+        for interval in intervals:
+            if interval not in INTERVAL_MS:
+                raise ValueError(f"Intervalo inválido: {interval} (use {', '.join(INTERVAL_MS)})")
+            step = INTERVAL_MS[interval]
+            span = step * self.chunk_klines
+            first = start_ms // step * step // span * span
+            for symbol in symbols:
+                for chunk_start in range(first, end_ms, span):
+                    chunks.append(Chunk(symbol, interval, chunk_start, chunk_start + span))
+        return chunks
+
+    # ===== Execução =====
+
+    def run(self, symbols: Sequence[str], intervals: Sequence[str], start, end=None) -> BackfillReport:
+        """Baixa os blocos pendentes e retorna o resumo. Pode ser interrompido e reexecutado"""
+        began = time.perf_counter()
+        report = BackfillReport()
+        self._requests = 0
+        chunks = self.plan(symbols, intervals, start, end)
+        report.planned = len(chunks)
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            init_backfill_tables(conn)
+            with conn:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO backfill_chunks (symbol, interval, start_ms, end_ms) VALUES (?, ?, ?, ?)',
+                    [(c.symbol, c.interval, c.start_ms, c.end_ms) for c in chunks]
+                )
+            done = {(s, i, st) for s, i, st in conn.execute(
+                "SELECT symbol, interval, start_ms FROM backfill_chunks WHERE status = 'done'")}
+            pending = [c for c in chunks if (c.symbol, c.interval, c.start_ms) not in done]
+            report.skipped = len(chunks) - len(pending)
+
+            # Download nas threads; gravação só nesta thread (uma conexão SQLite)
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="backfill") as executor:
+                futures = {executor.submit(self._fetch_chunk, c): c for c in pending}
+                for future in as_completed(futures):
+                    chunk = futures[future]
+                    try:
+                        rows, fetched_at = future.result()
+                    except Exception as e:
+                        report.failed[chunk] = str(e)
+                        self._record_failure(conn, chunk, str(e))
+                        log.warning(f"⚠️ Bloco {chunk.symbol} {chunk.interval} {chunk.start_ms} falhou: {e}")
+                        continue
+                    self._store(conn, chunk, rows, fetched_at)
+                    report.completed += 1
+                    report.rows += len(rows)
+        finally:
+            conn.close()
+
+        report.requests = self._requests
+        report.elapsed_s = time.perf_counter() - began
+        log.info(f"📥 Backfill: {report.completed}/{len(pending)} blocos, {report.rows} klines, "
+                 f"{report.skipped} já concluídos, {len(report.failed)} falhas em {report.elapsed_s:.1f}s")
+        return report
+
+    def _fetch_chunk(self, chunk: Chunk) -> Tuple[List[Tuple], int]:
+        last_error = None
+        for attempt in range(self.max_attempts):
+            self.limiter.acquire(KLINE_WEIGHT)
+            fetched_at = int(time.time() * 1000)
+            try:
+                with self._requests_lock:
+                    self._requests += 1
+                response = self.session.get(f"{self.base_url}/api/v3/klines", params={
+                    'symbol': chunk.symbol, 'interval': chunk.interval,
+                    'startTime': chunk.start_ms, 'endTime': chunk.end_ms - 1, 'limit': self.chunk_klines,
+                }, timeout=self.timeout)
+                if response.status_code in (418, 429):
+                    retry_after = float(response.headers.get('Retry-After', 1 + attempt))
+                    self.limiter.pause(retry_after)
+                    last_error = f"HTTP {response.status_code} (Retry-After {retry_after}s)"
+                    continue
+                response.raise_for_status()
+                return [self._row(chunk, k) for k in response.json()], fetched_at
+            except (requests.RequestException, ValueError) as e:
+                last_error = str(e)
+                time.sleep(min(8.0, 0.25 * 2 ** attempt))
+        raise RuntimeError(f"{self.max_attempts} tentativas: {last_error}")
+
+    @staticmethod
+    def _row(chunk: Chunk, k: Sequence) -> Tuple:
+        # [open_time, open, high, low, close, volume, close_time, quote_volume, trades, ...]
+        return (chunk.symbol, chunk.interval, int(k[0]), float(k[1]), float(k[2]), float(k[3]),
+                float(k[4]), float(k[5]), int(k[6]), float(k[7]), int(k[8]))
+
+    def _store(self, conn: sqlite3.Connection, chunk: Chunk, rows: List[Tuple], fetched_at: int):
+        # Bloco com klines ainda abertas continua pendente
+        status = 'done' if chunk.end_ms <= fetched_at else 'pending'
+        with conn:
+            conn.executemany(_UPSERT_SQL, rows)
+            conn.execute('''
+                UPDATE backfill_chunks
+                SET status = ?, rows = ?, attempts = attempts + 1, last_error = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE symbol = ? AND interval = ? AND start_ms = ?
+            ''', (status, len(rows), chunk.symbol, chunk.interval, chunk.start_ms))
+
+    @staticmethod
+    def _record_failure(conn: sqlite3.Connection, chunk: Chunk, error: str):
+        with conn:
+            conn.execute('''
+                UPDATE backfill_chunks
+                SET attempts = attempts + 1, last_error = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE symbol = ? AND interval = ? AND start_ms = ?
+            ''', (error[:500], chunk.symbol, chunk.interval, chunk.start_ms))
+
+
+def load_klines(conn: sqlite3.Connection, symbol: str, interval: str, start=None, end=None):
+    """Klines gravadas como DataFrame (open_time em datetime UTC sem fuso)"""
+    import pandas as pd
+
+    query = '''
+        SELECT symbol, interval, open_time, open, high, low, close, volume FROM klines
+        WHERE symbol = ? AND interval = ?
+    '''
+    params: list = [symbol, interval]
+    if start is not None:
+        query += ' AND open_time >= ?'
+        params.append(to_ms(start))
+    if end is not None:
+        query += ' AND open_time < ?'
+        params.append(to_ms(end))
+    df = pd.read_sql_query(query + ' ORDER BY open_time', conn, params=params)
+    df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
+    return df
+
+
+def main():
+    """Backfill de klines pela linha de comando"""
+    import argparse
+    from datetime import timedelta
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Backfill retomável de klines")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='Caminho do banco SQLite')
+    parser.add_argument('--symbols', required=True, help='Lista separada por vírgula')
+    parser.add_argument('--intervals', default='1m', help='Lista separada por vírgula')
+    parser.add_argument('--days', type=float, default=30, help='Dias de histórico')
+    parser.add_argument('--base-url', default=BASE_URL)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--weight-per-min', type=int, default=WEIGHT_PER_MIN)
+    args = parser.parse_args()
+
+    backfill = KlineBackfill(args.db, args.base_url, args.workers, args.weight_per_min)
+    start = datetime.now(timezone.utc) - timedelta(days=args.days)
+    report = backfill.run(args.symbols.split(','), args.intervals.split(','), start)
+    print(f"📥 {report.completed} blocos, {report.rows} klines, {report.skipped} já concluídos, "
+          f"{len(report.failed)} falhas, {report.requests} requisições em {report.elapsed_s:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
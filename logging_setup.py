@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Logging Setup - Configuração de logging compartilhada e não bloqueante
+Os pontos de entrada (backend, agentes, jobs) chamam setup_logging(): os
+registros vão para uma fila (QueueHandler) e são gravados por uma thread de
+fundo (QueueListener) no console e num arquivo rotativo em JSON Lines.
+Processos que servem o mesmo app (workers do backend) gravam cada um no seu
+arquivo (worker_log_file): RotatingFileHandler não é seguro entre processos.
+
+Variáveis de ambiente:
+    MOCOVE_LOG_LEVEL     nível mínimo (padrão INFO)
+    MOCOVE_LOG_FORMAT    formato do arquivo: json | text (padrão json)
+    MOCOVE_LOG_MAX_MB    tamanho máximo do arquivo antes de girar (padrão 20)
+    MOCOVE_LOG_BACKUPS   arquivos antigos mantidos (padrão 5)
+    MOCOVE_LOG_SAMPLE    amostragem por nível, ex. "DEBUG:10,INFO:2"
+                         (mantém 1 de cada N registros de cada linha de código;
+                         WARNING e acima nunca são amostrados)
+    MOCOVE_WORKER_ID     número do worker (definido pelo launcher do backend)
+"""
+
+import os
+import json
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from datetime import datetime
+from typing import Dict, Optional
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+WORKER_ID_ENV = 'MOCOVE_WORKER_ID'
+
+# Atributos padrão do LogRecord (o resto vem de extra= e vai para o JSON)
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Formata cada registro como uma linha JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Mantém 1 de cada N registros por linha de código, conforme o nível.
+
+    Usado para mensagens de alta frequência (ex. uma linha por símbolo a cada
+    ciclo). WARNING e acima sempre passam.
+    """
+
+    def __init__(self, rates: Dict[int, int]):
+        super().__init__()
+        self.rates = {level: n for level, n in rates.items() if n > 1 and level < logging.WARNING}
+        self._counters: Dict[tuple, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        n = self.rates.get(record.levelno)
+        if not n:
+            return True
+        key = (record.pathname, record.lineno)
+        count = self._counters.get(key, 0)
+        self._counters[key] = count + 1
+        return count % n == 0
+
+
+def parse_sample_rates(spec: str) -> Dict[int, int]:
+    """Converte "DEBUG:10,INFO:2" em {logging.DEBUG: 10, logging.INFO: 2}"""
+    rates = {}
+    for item in (spec or '').split(','):
+        if ':' not in item:
+            continue
+        name, _, n = item.partition(':')
+        level = logging.getLevelName(name.strip().upper())
+        if isinstance(level, int):
+            rates[level] = max(1, int(n))
+    return rates
+
+
+def render_log_line(line: str) -> str:
+    """Converte uma linha JSON do arquivo de log no formato texto tradicional"""
+    try:
+        data = json.loads(line)
+    except (json.JSONDecodeError, TypeError):
+        return line
+    if not isinstance(data, dict) or 'msg' not in data:
+        return line
+    ts = data.get('ts', '').replace('T', ' ').replace('.', ',')
+    text = f"{ts} - {data.get('level', '')} - {data['msg']}"
+    if data.get('exc'):
+        text += '\n' + data['exc']
+    return text
+
+
+def next_worker_id(used) -> int:
+    """Menor número de worker livre: quem substitui um worker encerrado herda o arquivo dele"""
+    used = set(used)
+    return next(n for n in range(len(used) + 1) if n not in used)
+
+
+def worker_log_file(log_file: Optional[str], worker_id=None) -> Optional[str]:
+    """Arquivo de log do worker: backend.log -> backend.w0.log (MOCOVE_WORKER_ID, ou o pid)"""
+    if not log_file:
+        return None
+    if worker_id is None:
+        worker_id = os.getenv(WORKER_ID_ENV) or os.getpid()
+    root, ext = os.path.splitext(log_file)
+    return f"{root}.w{worker_id}{ext}"
+
+
+def setup_logging(log_file: Optional[str] = None, level: Optional[str] = None,
+                  console: bool = True, file_format: Optional[str] = None,
+                  sample: Optional[str] = None) -> logging.handlers.QueueListener:
+    """Configura o logger raiz com QueueHandler + QueueListener.
+
+    Pode ser chamada mais de uma vez: a configuração anterior é substituída.
+    """
+    global _listener, _queue_handler
+
+    level = (level or os.getenv('MOCOVE_LOG_LEVEL', 'INFO')).upper()
+    file_format = (file_format or os.getenv('MOCOVE_LOG_FORMAT', 'json')).lower()
+    sample = sample if sample is not None else os.getenv('MOCOVE_LOG_SAMPLE', '')
+
+    handlers = []
+    if console:
+        stream = logging.StreamHandler()
+        stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(stream)
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, encoding='utf-8',
+            maxBytes=int(float(os.getenv('MOCOVE_LOG_MAX_MB', 20)) * 1024 * 1024),
+            backupCount=int(os.getenv('MOCOVE_LOG_BACKUPS', 5)),
+        )
+        file_handler.setFormatter(JsonFormatter() if file_format == 'json' else logging.Formatter(TEXT_FORMAT))
+        handlers.append(file_handler)
+
+    with _lock:
+        shutdown_logging()
+
+        log_queue = queue.SimpleQueue()
+        _queue_handler = logging.handlers.QueueHandler(log_queue)
+        rates = parse_sample_rates(sample)
+        if rates:
+            _queue_handler.addFilter(SamplingFilter(rates))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+        root.addHandler(_queue_handler)
+        root.setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Grava os registros pendentes e encerra a thread de logging"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,763 @@
+#!/usr/bin/env python3
+"""
+Market Replay - Reprodução acelerada do mercado para testes de carga e regressão
+Pega ticks gravados (prices + arquivo Parquet via tick_archive.read_ticks) e os
+reproduz N vezes mais rápido que o tempo real contra uma exchange falsa local,
+com o backend e os agentes rodando sem modificação em processos próprios:
+
+    ticks gravados -> IngestDaemon(ReplaySource) -> DbWriter (banco do replay)
+                                                 -> FakeExchange (HTTP estilo Binance)
+    backend/app.py e agentes -> ccxt -> FakeExchange (MOCOVE_EXCHANGE_URL)
+
+Os processos rodam sob o probe (python market_replay.py probe ...), que conta
+comandos SQLite e chamadas HTTP e registra o instante dos sinais dos agentes.
+O relatório traz a latência tick -> sinal -> ordem, as chamadas por endpoint e
+pode ser comparado com um relatório de referência (suíte de regressão).
+
+Uso:
+    python market_replay.py run --symbols DOGEUSDT,PEPEUSDT --minutes 30 --speed 60 \\
+        --report runtime/replay_report.json --baseline runtime/replay_baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import shutil
+import sqlite3
+import logging
+import tempfile
+import threading
+import subprocess
+from bisect import bisect_right
+from collections import defaultdict, deque
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import urlsplit, parse_qs
+
+from dateutil.tz import tzlocal
+
+from exchange_config import EXCHANGE_URL_ENV
+from ingest_daemon import IngestDaemon, ReplaySource, DbWriter, TickSink, Tick
+
+log = logging.getLogger("MarketReplay")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PROBE_OUT_ENV = 'MOCOVE_PROBE_OUT'
+PROBE_SIGNALS_ENV = 'MOCOVE_PROBE_SIGNALS'
+PROBE_DUMP_S = 0.5
+
+# Alvo do probe -> funções cuja chamada é o "sinal" do agente
+AGENT_SIGNALS = {
+    'ai_trading_agent_robust:main': ['ai_trading_agent_robust:SimpleAgent.execute_trade'],
+}
+
+QUOTE_ASSET = 'USDT'
+PRICE_DECIMALS = 8
+
+
+def load_recorded_ticks(db_path: str, symbols: Sequence[str], start=None, end=None) -> List[Tick]:
+    """Ticks gravados (banco + arquivo Parquet) em ordem cronológica"""
+    from tick_archive import read_ticks
+
+    ticks = []
+    with sqlite3.connect(db_path) as conn:
+        for symbol in symbols:
+            df = read_ticks(conn, symbol, start=start, end=end)
+            if df.empty:
+                continue
+            # Timestamps do banco são hora local sem fuso (mesma convenção de Tick.timestamp)
+            local = df['timestamp'].dt.tz_localize(tzlocal(), ambiguous='NaT', nonexistent='shift_forward')
+            df = df[local.notna()]  # hora repetida na volta do horário de verão
+            utc = local.dropna().dt.tz_convert('UTC').dt.tz_localize(None)
+            epochs = utc.astype('datetime64[us]').astype('int64') / 1e6
+            for ts, row in zip(epochs, df.itertuples(index=False)):
+                high, low = getattr(row, 'high', None), getattr(row, 'low', None)
+                ticks.append(Tick(symbol=symbol, ts=float(ts), price=float(row.price),
+                                  volume=float(row.volume or 0),
+                                  high=float(high) if high and high == high else None,
+                                  low=float(low) if low and low == low else None,
+                                  source='replay'))
+    ticks.sort(key=lambda t: t.ts)
+    return ticks
+
+
+# ===== Exchange falsa =====
+
+class FakeExchange(TickSink):
+    """Subconjunto da API spot da Binance usado pelo ccxt, com preços do replay.
+
+    Ordens a mercado executam no último preço reproduzido; saldos começam com
+    starting_balance USDT. Cada requisição é contada por endpoint e cada tick
+    aplicado guarda o instante de publicação para medir latências.
+    """
+    name = 'fake_exchange'
+    overflow = 'block'
+
+    def __init__(self, symbols: Sequence[str], starting_balance: float = 10000.0,
+                 host: str = '127.0.0.1', port: int = 0):
+        self.symbols = [s.upper() for s in symbols]
+        self.balances: Dict[str, float] = defaultdict(float, {QUOTE_ASSET: float(starting_balance)})
+        self.orders: List[Dict] = []
+        self.calls: Dict[str, int] = defaultdict(int)
+        self._window: Dict[str, deque] = {s: deque() for s in self.symbols}
+        self._published: Dict[str, List] = {s: [] for s in self.symbols}  # (wall, price)
+        self._lock = threading.Lock()
+        self._next_order_id = 1
+        exchange = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self, method):
+                parts = urlsplit(self.path)
+                params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    params.update({k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()})
+                status, body = exchange.route(method, parts.path, params)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def do_DELETE(self):
+                self._dispatch('DELETE')
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-exchange', daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # ===== Ticks (TickSink) =====
+
+    def handle(self, ticks: List[Tick]):
+        now = time.time()
+        with self._lock:
+            for tick in ticks:
+                window = self._window.get(tick.symbol)
+                if window is None:
+                    continue
+                price = round(tick.price, PRICE_DECIMALS)  # grade de preço da exchange
+                window.append((tick.ts, price, tick.volume))
+                while window and window[0][0] < tick.ts - 86400:
+                    window.popleft()
+                self._published[tick.symbol].append((now, price))
+
+    def last_price(self, symbol: str) -> Optional[float]:
+        window = self._window.get(symbol)
+        return window[-1][1] if window else None
+
+    def tick_published_at(self, symbol: str, price: float, before: float) -> Optional[float]:
+        """Instante de publicação do último tick com esse preço antes de 'before'"""
+        with self._lock:
+            published = self._published.get(symbol, [])
+            i = bisect_right(published, (before, float('inf')))
+            price = round(price, PRICE_DECIMALS)
+            for wall, p in reversed(published[max(0, i - 5000):i]):
+                if p == price:
+                    return wall
+        return None
+
+    # ===== Rotas =====
+
+    def route(self, method: str, path: str, params: Dict):
+        key = f"{method} {path}"
+        with self._lock:
+            self.calls[key] += 1
+        handler = {
+            'GET /api/v3/ping': lambda p: {},
+            'GET /api/v3/time': lambda p: {'serverTime': int(time.time() * 1000)},
+            'GET /api/v3/exchangeInfo': self._exchange_info,
+            'GET /api/v3/ticker/24hr': self._ticker_24hr,
+            'GET /api/v3/ticker/price': self._ticker_price,
+            'GET /api/v3/account': self._account,
+            'POST /api/v3/order': self._create_order,
+            'GET /sapi/v1/system/status': lambda p: {'status': 0, 'msg': 'normal'},
+            'GET /fapi/v1/exchangeInfo': lambda p: {'symbols': []},
+            'GET /dapi/v1/exchangeInfo': lambda p: {'symbols': []},
+        }.get(key)
+        if handler is None and method == 'GET' and path.startswith('/sapi/'):
+            handler = lambda p: []  # listas de margem/carteira que o ccxt consulta ao carregar mercados
+        if handler is None:
+            return 404, {'code': -1, 'msg': f'Endpoint não suportado pelo replay: {key}'}
+        try:
+            return 200, handler(params)
+        except ValueError as e:
+            return 400, {'code': -2010, 'msg': str(e)}
+
+    def _market(self, symbol: str) -> Dict:
+        base = symbol[:-len(QUOTE_ASSET)]
+        return {
+            'symbol': symbol, 'status': 'TRADING', 'baseAsset': base, 'baseAssetPrecision': 8,
+            'quoteAsset': QUOTE_ASSET, 'quotePrecision': 8, 'quoteAssetPrecision': 8,
+            'orderTypes': ['LIMIT', 'MARKET'], 'icebergAllowed': True, 'ocoAllowed': True,
+            'isSpotTradingAllowed': True, 'isMarginTradingAllowed': False,
+            'permissions': ['SPOT'], 'permissionSets': [['SPOT']],
+            'filters': [
+                {'filterType': 'PRICE_FILTER', 'minPrice': '0.00000001', 'maxPrice': '1000000.00000000',
+                 'tickSize': '0.00000001'},
+                {'filterType': 'LOT_SIZE', 'minQty': '0.00000100', 'maxQty': '9000000000.00000000',
+                 'stepSize': '0.00000100'},
+                {'filterType': 'NOTIONAL', 'minNotional': '1.00000000', 'applyMinToMarket': True,
+                 'maxNotional': '9000000.00000000', 'applyMaxToMarket': False, 'avgPriceMins': 5},
+            ],
+        }
+
+    def _exchange_info(self, params):
+        return {'timezone': 'UTC', 'serverTime': int(time.time() * 1000), 'rateLimits': [],
+                'symbols': [self._market(s) for s in self.symbols]}
+
+    def _ticker(self, symbol: str) -> Dict:
+        with self._lock:
+            window = list(self._window.get(symbol) or ())
+        if not window:
+            raise ValueError(f'Sem preços reproduzidos para {symbol}')
+        first_ts, open_price, _ = window[0]
+        last_ts, last_price, volume = window[-1]
+        prices = [p for _, p, _ in window]
+        change = last_price - open_price
+        return {
+            'symbol': symbol, 'priceChange': f'{change:.8f}',
+            'priceChangePercent': f'{(change / open_price * 100) if open_price else 0:.3f}',
+            'weightedAvgPrice': f'{sum(prices) / len(prices):.8f}', 'prevClosePrice': f'{open_price:.8f}',
+            'lastPrice': f'{last_price:.8f}', 'lastQty': '0', 'bidPrice': f'{last_price:.8f}', 'bidQty': '0',
+            'askPrice': f'{last_price:.8f}', 'askQty': '0', 'openPrice': f'{open_price:.8f}',
+            'highPrice': f'{max(prices):.8f}', 'lowPrice': f'{min(prices):.8f}',
+            'volume': f'{volume:.8f}', 'quoteVolume': f'{volume * last_price:.8f}',
+            'openTime': int(first_ts * 1000), 'closeTime': int(last_ts * 1000),
+            'firstId': 0, 'lastId': len(window) - 1, 'count': len(window),
+        }
+
+    def _requested_symbols(self, params) -> List[str]:
+        if 'symbol' in params:
+            return [params['symbol']]
+        if 'symbols' in params:
+            return json.loads(params['symbols'])
+        return [s for s in self.symbols if self._window[s]]
+
+    def _ticker_24hr(self, params):
+        tickers = [self._ticker(s) for s in self._requested_symbols(params)]
+        return tickers[0] if 'symbol' in params else tickers
+
+    def _ticker_price(self, params):
+        prices = [{'symbol': s, 'price': f'{self.last_price(s) or 0:.8f}'} for s in self._requested_symbols(params)]
+        return prices[0] if 'symbol' in params else prices
+
+    def _account(self, params):
+        with self._lock:
+            balances = [{'asset': a, 'free': f'{v:.8f}', 'locked': '0.00000000'} for a, v in self.balances.items()]
+        return {'makerCommission': 0, 'takerCommission': 0, 'canTrade': True, 'canWithdraw': False,
+                'canDeposit': False, 'accountType': 'SPOT', 'balances': balances, 'permissions': ['SPOT'],
+                'updateTime': int(time.time() * 1000)}
+
+    def _create_order(self, params):
+        received = time.time()
+        symbol, side = params['symbol'], params['side'].upper()
+        if params.get('type', 'MARKET').upper() != 'MARKET':
+            raise ValueError('Replay só executa ordens a mercado')
+        base = symbol[:-len(QUOTE_ASSET)]
+        with self._lock:
+            price = self.last_price(symbol)
+            if price is None:
+                raise ValueError(f'Sem preço para {symbol}')
+            if 'quoteOrderQty' in params:
+                qty = float(params['quoteOrderQty']) / price
+            else:
+                qty = float(params['quantity'])
+            cost = qty * price
+            if side == 'BUY' and self.balances[QUOTE_ASSET] < cost:
+                raise ValueError('Account has insufficient balance for requested action.')
+            if side == 'SELL' and self.balances[base] < qty - 1e-12:
+                raise ValueError('Account has insufficient balance for requested action.')
+            sign = 1 if side == 'BUY' else -1
+            self.balances[base] += sign * qty
+            self.balances[QUOTE_ASSET] -= sign * cost
+            order_id = self._next_order_id
+            self._next_order_id += 1
+            self.orders.append({'id': order_id, 'symbol': symbol, 'side': side.lower(), 'price': price,
+                                'amount': qty, 'cost': cost, 'received_at': received})
+        return {
+            'symbol': symbol, 'orderId': order_id, 'orderListId': -1,
+            'clientOrderId': params.get('newClientOrderId', f'replay-{order_id}'),
+            'transactTime': int(received * 1000), 'price': '0.00000000', 'origQty': f'{qty:.8f}',
+            'executedQty': f'{qty:.8f}', 'cummulativeQuoteQty': f'{cost:.8f}', 'status': 'FILLED',
+            'timeInForce': 'GTC', 'type': 'MARKET', 'side': side,
+            'fills': [{'price': f'{price:.8f}', 'qty': f'{qty:.8f}', 'commission': '0', 'commissionAsset': base}],
+        }
+
+
+# ===== Probe (roda dentro dos processos do backend e dos agentes) =====
+
+class _Probe:
+    """Conta comandos SQLite, chamadas HTTP de saída e sinais do processo atual"""
+
+    def __init__(self, out_path: str):
+        self.out_path = out_path
+        self.lock = threading.Lock()
+        self.sqlite_connections = 0
+        self.sqlite_statements: Dict[str, int] = defaultdict(int)
+        self.http: Dict[str, int] = defaultdict(int)
+        self.signals: List[Dict] = []
+        # Portas mudam a cada replay: chamadas são agrupadas pelo papel do host
+        self.host_labels = {urlsplit(os.getenv(env, '')).netloc: label
+                            for env, label in (('MOCOVE_API_BASE', 'backend'), (EXCHANGE_URL_ENV, 'exchange'))
+                            if os.getenv(env)}
+
+    def install(self):
+        import requests
+
+        probe = self
+        original_connect = sqlite3.connect
+        original_request = requests.Session.request
+
+        def connect(*args, **kwargs):
+            conn = original_connect(*args, **kwargs)
+            with probe.lock:
+                probe.sqlite_connections += 1
+            conn.set_trace_callback(probe._on_statement)
+            return conn
+
+        def request(session, method, url, *args, **kwargs):
+            parts = urlsplit(url)
+            key = f"{method.upper()} {probe.host_labels.get(parts.netloc, parts.netloc)}{parts.path}"
+            with probe.lock:
+                probe.http[key] += 1
+            return original_request(session, method, url, *args, **kwargs)
+
+        sqlite3.connect = connect
+        requests.Session.request = request
+
+    def _on_statement(self, sql: str):
+        verb = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else '?'
+        with self.lock:
+            self.sqlite_statements[verb] += 1
+
+    def hook_signal(self, spec: str):
+        """Registra cada chamada de 'modulo:Classe.metodo' como um sinal"""
+        import functools
+        import importlib
+
+        module_name, qualname = spec.split(':')
+        owner = importlib.import_module(module_name)
+        *path, attr = qualname.split('.')
+        for name in path:
+            owner = getattr(owner, name)
+        fn = getattr(owner, attr)
+        probe = self
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            detail = next((a for a in list(args) + list(kwargs.values()) if isinstance(a, dict)), {})
+            with probe.lock:
+                probe.signals.append({'t': time.time(), 'fn': qualname, 'symbol': detail.get('symbol'),
+                                      'action': detail.get('action'), 'price': detail.get('price')})
+            return fn(*args, **kwargs)
+
+        setattr(owner, attr, wrapper)
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return {'sqlite_connections': self.sqlite_connections,
+                    'sqlite_statements': dict(self.sqlite_statements),
+                    'http': dict(self.http), 'signals': list(self.signals)}
+
+    def dump(self):
+        tmp = self.out_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, self.out_path)
+
+    def _dump_periodically(self, interval_s: float = PROBE_DUMP_S):
+        while True:
+            time.sleep(interval_s)
+            try:
+                self.dump()
+            except OSError:
+                pass
+
+
+def run_probed(target: str, argv: Sequence[str] = ()):
+    """Executa 'script.py' ou 'modulo:funcao' com o probe instalado"""
+    import atexit
+    import runpy
+    import importlib
+
+    probe = _Probe(os.environ[PROBE_OUT_ENV])
+    probe.install()
+    atexit.register(probe.dump)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    threading.Thread(target=probe._dump_periodically, name='replay-probe', daemon=True).start()
+
+    if ':' in target and not target.endswith('.py'):
+        for spec in filter(None, os.getenv(PROBE_SIGNALS_ENV, '').split(',')):
+            probe.hook_signal(spec)
+        module_name, func = target.split(':')
+        sys.argv = [module_name] + list(argv)
+        getattr(importlib.import_module(module_name), func)()
+    else:
+        sys.argv = [target] + list(argv)
+        sys.path.insert(0, os.path.dirname(os.path.abspath(target)))
+        runpy.run_path(target, run_name='__main__')
+
+
+# ===== Harness =====
+
+def _summary_ms(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {'count': 0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+    ordered = sorted(v * 1000 for v in values)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+    return {'count': len(ordered), 'p50': pick(0.5), 'p95': pick(0.95), 'max': round(ordered[-1], 3)}
+
+
+@dataclass
+class ReplayReport:
+    """Resultado de um replay (serializável para comparação entre versões)"""
+    speed: float
+    ticks: int
+    replay_span_s: float
+    wall_s: float
+    signals: int = 0
+    orders: int = 0
+    latency_ms: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    exchange_calls: Dict[str, int] = field(default_factory=dict)
+    processes: Dict[str, Dict] = field(default_factory=dict)
+    ingest: Dict = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def _process_rates(report: Dict) -> Dict[str, float]:
+    """Chamadas por segundo de relógio (HTTP e SQLite por processo, HTTP na exchange)"""
+    wall = max(report.get('wall_s') or 0, 1e-9)
+    rates = {'exchange.http': sum(report.get('exchange_calls', {}).values()) / wall}
+    for name, counters in report.get('processes', {}).items():
+        rates[f'{name}.http'] = sum(counters.get('http', {}).values()) / wall
+        rates[f'{name}.sqlite'] = sum(counters.get('sqlite_statements', {}).values()) / wall
+    return rates
+
+
+def compare_reports(baseline: Dict, current: Dict, tolerance: float = 0.25, min_latency_ms: float = 5.0) -> List[str]:
+    """Regressões do relatório atual contra a referência (lista vazia = ok)"""
+    regressions = []
+    for metric, base in baseline.get('latency_ms', {}).items():
+        cur = current.get('latency_ms', {}).get(metric)
+        if not cur or not base.get('count') or not cur.get('count'):
+            continue
+        if cur['p95'] > base['p95'] * (1 + tolerance) and cur['p95'] - base['p95'] > min_latency_ms:
+            regressions.append(f"latência {metric} p95 {base['p95']:.1f} -> {cur['p95']:.1f} ms")
+    base_rates, cur_rates = _process_rates(baseline), _process_rates(current)
+    for key, base in base_rates.items():
+        cur = cur_rates.get(key)
+        if cur is not None and base > 0 and cur > base * (1 + tolerance):
+            regressions.append(f"chamadas {key} {base:.2f} -> {cur:.2f}/s")
+    return regressions
+
+
+def _prepare_database(db_path: str):
+    """Banco do replay com o esquema completo de prices (o backend cria o resto)"""
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS prices (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                symbol TEXT,
+                coin_id TEXT,
+                timestamp DATETIME NOT NULL,
+                price REAL NOT NULL,
+                volume REAL DEFAULT 0,
+                high REAL DEFAULT 0,
+                low REAL DEFAULT 0,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class ReplayHarness:
+    """Roda backend e agentes sem modificação contra o mercado reproduzido"""
+
+    def __init__(self, ticks: Sequence[Tick], speed: float = 60.0,
+                 agents: Sequence[str] = ('ai_trading_agent_robust:main',),
+                 backend: Optional[str] = os.path.join(ROOT, 'backend', 'app.py'),
+                 warmup_s: float = 3600.0, starting_balance: float = 10000.0, trade_amount: float = 10.0,
+                 workdir: Optional[str] = None, startup_timeout_s: float = 60.0, extra_env: Optional[Dict] = None,
+                 signals: Optional[Dict[str, List[str]]] = None, settle_timeout_s: float = 10.0):
+        if not ticks:
+            raise ValueError("Nenhum tick para reproduzir")
+        self.ticks = sorted(ticks, key=lambda t: t.ts)
+        self.speed = speed
+        self.agents = list(agents)
+        self.backend = backend
+        self.warmup_s = warmup_s
+        self.starting_balance = starting_balance
+        self.trade_amount = trade_amount
+        self.workdir = workdir
+        self.startup_timeout_s = startup_timeout_s
+        self.settle_timeout_s = settle_timeout_s
+        self.extra_env = extra_env or {}
+        self.signals = AGENT_SIGNALS if signals is None else signals
+        self.symbols = sorted({t.symbol for t in self.ticks})
+
+    def _write_watchlist(self, workdir: str):
+        coins = [{'symbol': s, 'name': s[:-len(QUOTE_ASSET)], 'trading_enabled': True} for s in self.symbols]
+        with open(os.path.join(workdir, 'coin_watchlist_expanded.json'), 'w', encoding='utf-8') as f:
+            json.dump({'memecoins': {'tier1': coins}}, f)
+
+    def _spawn(self, name: str, target: str, env: Dict, workdir: str) -> subprocess.Popen:
+        out = open(os.path.join(workdir, f'{name}.out'), 'w', encoding='utf-8')
+        proc_env = {**env, PROBE_OUT_ENV: os.path.join(workdir, f'{name}.probe.json'),
+                    PROBE_SIGNALS_ENV: ','.join(self.signals.get(target, []))}
+        return subprocess.Popen([sys.executable, os.path.join(ROOT, 'market_replay.py'), 'probe', target],
+                                cwd=workdir, env=proc_env, stdout=out, stderr=subprocess.STDOUT)
+
+    def _wait_backend(self, url: str, proc: subprocess.Popen):
+        import requests
+
+        deadline = time.monotonic() + self.startup_timeout_s
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"Backend encerrou durante a inicialização (código {proc.returncode})")
+            try:
+                if requests.get(f"{url}/api/status", timeout=2).status_code == 200:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        raise TimeoutError("Backend não respondeu a tempo")
+
+    @staticmethod
+    def _dumped_signals(workdir: str, names: Sequence[str]) -> int:
+        total = 0
+        for name in names:
+            try:
+                with open(os.path.join(workdir, f'{name}.probe.json'), encoding='utf-8') as f:
+                    total += len(json.load(f).get('signals', []))
+            except (OSError, ValueError):
+                pass
+        return total
+
+    def _settle(self, workdir: str, agents: Sequence[str], exchange: FakeExchange):
+        """Espera as ordens em voo: parar os agentes logo após o drain corta sinais a caminho da exchange"""
+        deadline = time.monotonic() + self.settle_timeout_s
+        matched_since = None
+        while time.monotonic() < deadline:
+            if len(exchange.orders) >= self._dumped_signals(workdir, agents):
+                matched_since = matched_since or time.monotonic()
+                # O probe grava a cada PROBE_DUMP_S: o empate precisa sobreviver a uma gravação nova
+                if time.monotonic() - matched_since > 2 * PROBE_DUMP_S:
+                    return
+            else:
+                matched_since = None
+            time.sleep(0.1)
+        log.warning(f"⚠️ Sinais sem ordem após {self.settle_timeout_s:g}s; parando os agentes assim mesmo")
+
+    @staticmethod
+    def _stop(procs: Dict[str, subprocess.Popen]):
+        for proc in procs.values():
+            if proc.poll() is None:
+                proc.terminate()
+        for proc in procs.values():
+            try:
+                proc.wait(15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+    def run(self) -> ReplayReport:
+        workdir = self.workdir or tempfile.mkdtemp(prefix='mocove-replay-')
+        os.makedirs(workdir, exist_ok=True)
+        db_path = os.path.join(workdir, 'replay.db')
+        _prepare_database(db_path)
+        self._write_watchlist(workdir)
+
+        cutoff = self.ticks[0].ts + self.warmup_s
+        warmup = [t for t in self.ticks if t.ts < cutoff]
+        live = [t for t in self.ticks if t.ts >= cutoff]
+
+        exchange = FakeExchange(self.symbols, self.starting_balance).start()
+        exchange.handle(warmup)
+        if warmup:
+            writer = DbWriter(db_path)
+            writer.handle(warmup)
+            writer.close()
+
+        port = _free_port()
+        api_base = f"http://127.0.0.1:{port}"
+        env = {**os.environ, **self.extra_env,
+               'PYTHONPATH': os.pathsep.join(filter(None, [ROOT, self.extra_env.get('PYTHONPATH', os.getenv('PYTHONPATH'))])),
+               'DB_PATH': db_path, 'PORT': str(port), 'DEBUG': 'false', 'MOCOVE_API_BASE': api_base,
+               EXCHANGE_URL_ENV: exchange.url, 'BINANCE_API_KEY': 'replay', 'BINANCE_API_SECRET': 'replay',
+               'USE_TESTNET': 'false', 'ENABLE_REAL_TRADING': 'true', 'DEFAULT_AMOUNT': str(self.trade_amount),
+               'SCAN_UNIVERSE': 'watchlist'}
+
+        procs: Dict[str, subprocess.Popen] = {}
+        daemon = None
+        try:
+            if self.backend:
+                procs['backend'] = self._spawn('backend', self.backend, env, workdir)
+                self._wait_backend(api_base, procs['backend'])
+            for target in self.agents:
+                procs[target.split(':')[0]] = self._spawn(target.split(':')[0], target, env, workdir)
+
+            log.info(f"▶️ Replay de {len(live)} ticks ({len(self.symbols)} símbolos) a {self.speed:g}x")
+            daemon = IngestDaemon([ReplaySource(records=live, speed=self.speed)], [DbWriter(db_path), exchange])
+            started = time.monotonic()
+            daemon.start()
+            daemon.wait_sources()
+            daemon.drain()
+            wall_s = time.monotonic() - started
+            self._settle(workdir, [name for name in procs if name != 'backend'], exchange)
+        finally:
+            self._stop(procs)
+            if daemon is not None:
+                daemon.stop()
+            exchange.stop()
+
+        processes = {}
+        for name in procs:
+            try:
+                with open(os.path.join(workdir, f'{name}.probe.json'), encoding='utf-8') as f:
+                    processes[name] = json.load(f)
+            except (OSError, ValueError):
+                processes[name] = {}
+        report = self._build_report(live, wall_s, exchange, processes, daemon.metrics())
+        if not self.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+        return report
+
+    def _build_report(self, live: List[Tick], wall_s: float, exchange: FakeExchange,
+                      processes: Dict[str, Dict], ingest: Dict) -> ReplayReport:
+        signals = sorted((s for p in processes.values() for s in p.get('signals', [])), key=lambda s: s['t'])
+        tick_to_signal, tick_to_order, signal_to_order = [], [], []
+        origin = {}
+        for s in signals:
+            if s.get('symbol') and s.get('price') is not None:
+                wall = exchange.tick_published_at(s['symbol'], float(s['price']), s['t'])
+                if wall is not None:
+                    tick_to_signal.append(s['t'] - wall)
+                    origin[id(s)] = wall
+        pending = list(signals)
+        for order in exchange.orders:
+            match = next((s for s in pending if s['symbol'] == order['symbol'] and s['action'] == order['side']
+                          and s['t'] <= order['received_at']), None)
+            if match is None:
+                continue
+            pending.remove(match)
+            signal_to_order.append(order['received_at'] - match['t'])
+            if id(match) in origin:
+                tick_to_order.append(order['received_at'] - origin[id(match)])
+
+        for counters in processes.values():
+            counters.pop('signals', None)
+        return ReplayReport(
+            speed=self.speed, ticks=len(live),
+            replay_span_s=round(live[-1].ts - live[0].ts, 3) if live else 0.0,
+            wall_s=round(wall_s, 3), signals=len(signals), orders=len(exchange.orders),
+            latency_ms={'tick_to_signal': _summary_ms(tick_to_signal), 'tick_to_order': _summary_ms(tick_to_order),
+                        'signal_to_order': _summary_ms(signal_to_order)},
+            exchange_calls=dict(exchange.calls), processes=processes,
+            ingest={k: ingest[k] for k in ('ticks_total', 'sinks')},
+        )
+
+
+def main():
+    """Replay pela linha de comando (run) e execução sob o probe (probe)"""
+    import argparse
+    from logging_setup import setup_logging
+
+    parser = argparse.ArgumentParser(description="Replay acelerado do mercado para testes de carga e regressão")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help='Reproduz ticks gravados contra backend e agentes')
+    run.add_argument('--source-db', default=os.getenv('DB_PATH', os.path.join(ROOT, 'memecoin.db')))
+    run.add_argument('--symbols', required=True, help='Lista separada por vírgula (ex: DOGEUSDT,PEPEUSDT)')
+    run.add_argument('--start', help='Início (ISO); padrão: --minutes antes do fim')
+    run.add_argument('--end', help='Fim (ISO); padrão: último tick gravado')
+    run.add_argument('--minutes', type=float, default=60.0)
+    run.add_argument('--speed', type=float, default=60.0)
+    run.add_argument('--warmup-minutes', type=float, default=60.0, help='Histórico carregado antes de iniciar')
+    run.add_argument('--agents', default='ai_trading_agent_robust:main', help="Alvos 'modulo:funcao' (vazio = só backend)")
+    run.add_argument('--report', default=os.path.join(ROOT, 'runtime', 'replay_report.json'))
+    run.add_argument('--baseline', help='Relatório de referência para detectar regressões')
+    run.add_argument('--tolerance', type=float, default=0.25)
+    run.add_argument('--workdir', help='Mantém banco, logs e contadores do replay neste diretório')
+
+    probe = sub.add_parser('probe', help='Executa um alvo com contadores (uso interno do harness)')
+    probe.add_argument('target', help="'script.py' ou 'modulo:funcao'")
+    probe.add_argument('args', nargs=argparse.REMAINDER)
+
+    args = parser.parse_args()
+    if args.command == 'probe':
+        run_probed(args.target, args.args)
+        return
+
+    setup_logging()
+    symbols = [s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+    end = args.end
+    if end is None:
+        with sqlite3.connect(args.source_db) as conn:
+            marks = ','.join('?' * len(symbols))
+            end = conn.execute(f'SELECT MAX(timestamp) FROM prices WHERE symbol IN ({marks})', symbols).fetchone()[0]
+        if end is None:
+            parser.error('Nenhum tick gravado para esses símbolos')
+    end_dt = datetime.fromisoformat(str(end))
+    start = args.start or (end_dt - timedelta(minutes=args.minutes + args.warmup_minutes)).isoformat(sep=' ')
+
+    ticks = load_recorded_ticks(args.source_db, symbols, start=start, end=end)
+    harness = ReplayHarness(ticks, speed=args.speed, agents=[a for a in args.agents.split(',') if a],
+                            warmup_s=args.warmup_minutes * 60, workdir=args.workdir)
+    report = harness.run()
+    report.save(args.report)
+    print(json.dumps({k: v for k, v in report.to_dict().items() if k not in ('processes', 'ingest')}, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare_reports(json.load(f), report.to_dict(), args.tolerance)
+        for line in regressions:
+            print(f"❌ Regressão: {line}")
+        if regressions:
+            sys.exit(1)
+        print("✅ Sem regressões em relação à referência")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Opportunity Scoring - Pontuação cross-sectional de oportunidades
+Monta uma matriz (símbolos × indicadores) a partir dos dados de mercado e
+calcula scores, ranking e z-scores relativos ao universo numa única passada NumPy.
+Funções de pontuação são plugáveis via register_scorer().
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+log = logging.getLogger("OpportunityScoring")
+
+# Colunas da matriz de features
+FEATURE_COLUMNS = ['price', 'change_24h', 'volume', 'trend_3', 'has_history']
+COL = {name: i for i, name in enumerate(FEATURE_COLUMNS)}
+
+# Códigos de ação (mesma convenção dos rótulos do modelo: 1=BUY, -1=SELL, 0=HOLD)
+BUY, HOLD, SELL = 1, 0, -1
+ACTION_NAMES = {BUY: 'buy', HOLD: 'hold', SELL: 'sell'}
+
+
+@dataclass
+class FeatureMatrix:
+    """Matriz de features do universo de símbolos"""
+    symbols: List[str]
+    values: np.ndarray  # shape (n_symbols, len(FEATURE_COLUMNS))
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, COL[name]]
+
+    def zscores(self) -> np.ndarray:
+        """Z-score de cada indicador em relação ao universo (NaN-safe)"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.nanmean(self.values, axis=0) if len(self.symbols) else np.zeros(len(FEATURE_COLUMNS))
+            std = np.nanstd(self.values, axis=0) if len(self.symbols) else np.zeros(len(FEATURE_COLUMNS))
+            z = (self.values - mean) / np.where(std > 0, std, 1.0)
+        return np.nan_to_num(z, nan=0.0)
+
+
+@dataclass
+class ScoreTable:
+    """Resultado da pontuação cross-sectional"""
+    features: FeatureMatrix
+    actions: np.ndarray
+    confidence: np.ndarray
+    zscores: np.ndarray
+    rank: np.ndarray  # 0 = melhor oportunidade
+    scorer: str
+
+    def order(self) -> np.ndarray:
+        """Índices dos símbolos ordenados por confiança (estável em empates)"""
+        return np.argsort(-self.confidence, kind='stable')
+
+    def action(self, i: int) -> str:
+        return ACTION_NAMES[int(self.actions[i])]
+
+    def reason(self, i: int) -> str:
+        describe = _DESCRIBERS.get(self.scorer, _describe_generic)
+        return describe(self, i)
+
+    def to_records(self) -> List[Dict]:
+        records = []
+        for i in self.order():
+            records.append({
+                'symbol': self.features.symbols[i],
+                'action': self.action(i),
+                'confidence': float(self.confidence[i]),
+                'price': float(self.features.values[i, COL['price']]),
+                'change_24h': float(self.features.values[i, COL['change_24h']]),
+                'rank': int(self.rank[i]),
+                'zscores': {c: float(self.zscores[i, j]) for j, c in enumerate(FEATURE_COLUMNS)},
+                'reason': self.reason(i),
+            })
+        return records
+
+
+# ==========================
+# Construção da matriz
+# ==========================
+
+def _numeric_prices(prices: Optional[Sequence]) -> List[float]:
+    numeric = []
+    for p in prices or []:
+        value = p.get('price', p.get('close', p.get('value', 0))) if isinstance(p, dict) else p
+        try:
+            numeric.append(float(value))
+        except (ValueError, TypeError):
+            pass
+    return numeric
+
+
+def feature_row(market_data: Optional[Dict], prices: Optional[Sequence]) -> np.ndarray:
+    """Converte market_data + histórico de preços numa linha da matriz"""
+    row = np.full(len(FEATURE_COLUMNS), np.nan)
+    if not market_data:
+        row[COL['has_history']] = 0.0
+        return row
+    row[COL['price']] = float(market_data.get('price') or 0)
+    row[COL['change_24h']] = float(market_data.get('change_24h') or 0)
+    row[COL['volume']] = float(market_data.get('volume') or 0)
+    row[COL['has_history']] = 1.0 if prices else 0.0
+
+    numeric = _numeric_prices(prices[-3:] if prices else [])
+    if len(numeric) >= 3 and numeric[-3] != 0:
+        row[COL['trend_3']] = (numeric[-1] - numeric[-3]) / numeric[-3] * 100
+    return row
+
+
+def build_feature_matrix(snapshots: Dict[str, Tuple[Optional[Dict], Optional[Sequence]]]) -> FeatureMatrix:
+    """Monta a matriz a partir de {symbol: (market_data, prices)}"""
+    symbols = list(snapshots.keys())
+    if not symbols:
+        return FeatureMatrix(symbols=[], values=np.empty((0, len(FEATURE_COLUMNS))))
+    values = np.vstack([feature_row(*snapshots[s]) for s in symbols])
+    return FeatureMatrix(symbols=symbols, values=values)
+
+
+def matrix_from_tickers(tickers: Dict[str, Dict], quote: str = 'USDT',
+                        min_quote_volume: float = 0.0) -> FeatureMatrix:
+    """Monta a matriz para todos os pares de uma cotação a partir de um único fetch_tickers().
+
+    O snapshot de tickers não traz histórico, então trend_3 fica ausente e o
+    fator de tendência não contribui para o score.
+    """
+    symbols, rows = [], []
+    for market, t in tickers.items():
+        base, _, q = market.partition('/')
+        # 'DOGE/USDT:USDT' é contrato perpétuo, não o par à vista DOGEUSDT
+        if q != quote or not t.get('last'):
+            continue
+        if (t.get('quoteVolume') or 0) < min_quote_volume:
+            continue
+        symbols.append(f"{base}{quote}")
+        rows.append([
+            float(t['last']),
+            float(t.get('percentage') or 0),
+            float(t.get('baseVolume') or 0),
+            np.nan,
+            1.0,
+        ])
+    values = np.array(rows, dtype=float) if rows else np.empty((0, len(FEATURE_COLUMNS)))
+    return FeatureMatrix(symbols=symbols, values=values)
+
+
+# ==========================
+# Funções de pontuação
+# ==========================
+
+ScorerFn = Callable[[FeatureMatrix, np.ndarray], Tuple[np.ndarray, np.ndarray]]
+_SCORERS: Dict[str, ScorerFn] = {}
+_DESCRIBERS: Dict[str, Callable[[ScoreTable, int], str]] = {}
+
+
+def register_scorer(name: str, fn: ScorerFn, describe: Optional[Callable[[ScoreTable, int], str]] = None):
+    """Registra uma função de pontuação: fn(features, zscores) -> (actions, confidence)"""
+    _SCORERS[name] = fn
+    if describe is not None:
+        _DESCRIBERS[name] = describe
+
+
+def available_scorers() -> List[str]:
+    return sorted(_SCORERS)
+
+
+def rules_scorer(fm: FeatureMatrix, z: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Versão vetorizada das regras de SimpleAgent.analyze_market"""
+    change = np.nan_to_num(fm.column('change_24h'))
+    volume = np.nan_to_num(fm.column('volume'))
+    trend = fm.column('trend_3')
+    abs_change = np.abs(change)
+
+    conf = np.where(abs_change > 5, 0.4, np.where(abs_change > 2, 0.2, 0.0))
+    conf = conf + np.where(volume > 1000000, 0.2, 0.0)
+    with np.errstate(invalid='ignore'):
+        conf = conf + np.where(np.abs(trend) > 1, 0.2, 0.0)
+
+    conditions = [
+        change >= 8, change >= 5, change >= 3,
+        change <= -2, change <= -1, change <= -0.5,
+        abs_change > 1,
+    ]
+    actions = np.select(conditions, [BUY, BUY, BUY, SELL, SELL, SELL, HOLD], default=HOLD)
+    confidence = np.select(conditions, [
+        np.minimum(conf + 0.3, 0.9),
+        np.minimum(conf + 0.2, 0.8),
+        conf,
+        np.minimum(conf + 0.4, 0.9),
+        np.minimum(conf + 0.3, 0.8),
+        np.minimum(conf + 0.2, 0.7),
+        conf * 0.3,
+    ], default=0.1)
+
+    # Sem dados de mercado ou histórico: "Dados insuficientes"
+    insufficient = fm.column('has_history') <= 0
+    actions = np.where(insufficient, HOLD, actions)
+    confidence = np.where(insufficient, 0.0, confidence)
+    return actions.astype(int), confidence.astype(float)
+
+
+def _describe_rules(table: ScoreTable, i: int) -> str:
+    if table.features.values[i, COL['has_history']] <= 0:
+        return "Dados insuficientes"
+    change_24h = float(table.features.values[i, COL['change_24h']])
+    if change_24h >= 8:
+        return f"🚀 ALTA FORTE: {change_24h:.2f}% - Oportunidade detectada!"
+    elif change_24h >= 5:
+        return f"📈 Alta significativa: {change_24h:.2f}%"
+    elif change_24h >= 3:
+        return f"📊 Alta moderada: {change_24h:.2f}%"
+    elif change_24h <= -2:
+        return f"� PROTEÇÃO: {change_24h:.2f}% - Venda preventiva!"
+    elif change_24h <= -1:
+        return f"⚠️ ALERTA: {change_24h:.2f}% - Minimizar perdas!"
+    elif change_24h <= -0.5:
+        return f"📉 Declínio: {change_24h:.2f}% - Monitorar de perto"
+    elif abs(change_24h) > 1:
+        return f"📍 Movimento lateral: {change_24h:.2f}%"
+    return f"😴 Mercado estável: {change_24h:.2f}%"
+
+
+def momentum_zscore_scorer(fm: FeatureMatrix, z: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Score relativo ao universo: momentum 24h + tendência curta, ponderado por volume"""
+    raw = 0.6 * z[:, COL['change_24h']] + 0.3 * z[:, COL['trend_3']] + 0.1 * z[:, COL['volume']]
+    actions = np.where(raw > 1.0, BUY, np.where(raw < -1.0, SELL, HOLD))
+    # Mapeia |score| para (0, 1) com uma logística
+    confidence = 1.0 / (1.0 + np.exp(-(np.abs(raw) - 1.0) * 2.0))
+    confidence = np.where(fm.column('has_history') <= 0, 0.0, confidence)
+    return actions.astype(int), confidence.astype(float)
+
+
+def _describe_generic(table: ScoreTable, i: int) -> str:
+    z = table.zscores[i]
+    return (f"{table.scorer}: z(change_24h)={z[COL['change_24h']]:+.2f} "
+            f"z(trend_3)={z[COL['trend_3']]:+.2f} z(volume)={z[COL['volume']]:+.2f}")
+
+
+register_scorer('rules', rules_scorer, _describe_rules)
+register_scorer('momentum_zscore', momentum_zscore_scorer)
+
+
+# ==========================
+# Motor de pontuação
+# ==========================
+
+class CrossSectionalScorer:
+    """Pontua todo o universo de símbolos numa única passada"""
+
+    def __init__(self, scorer: str = 'rules'):
+        if scorer not in _SCORERS:
+            raise ValueError(f"Scorer desconhecido: {scorer} (disponíveis: {', '.join(available_scorers())})")
+        self.scorer = scorer
+
+    def score(self, fm: FeatureMatrix) -> ScoreTable:
+        z = fm.zscores()
+        actions, confidence = _SCORERS[self.scorer](fm, z)
+        rank = np.empty(len(fm.symbols), dtype=int)
+        rank[np.argsort(-confidence, kind='stable')] = np.arange(len(fm.symbols))
+        return ScoreTable(features=fm, actions=actions, confidence=confidence,
+                          zscores=z, rank=rank, scorer=self.scorer)
+
+    def score_snapshots(self, snapshots: Dict[str, Tuple[Optional[Dict], Optional[Sequence]]]) -> ScoreTable:
+        return self.score(build_feature_matrix(snapshots))
@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+Order Manager - Execução de ordens com máquina de estados
+Toda ordem (API, SimpleAgent, TradingAgent) passa por aqui:
+
+    new -> submitted -> partially_filled -> filled
+                    \\-> cancelled / rejected
+
+submit() não bloqueia: registra a ordem, devolve o objeto Order e o envio à
+exchange acontece num pool de threads. A chave de idempotência devolve a
+mesma ordem em reenvios (retry de rede, clique duplo). Ordens que voltam
+abertas são conciliadas por fetch_order em segundo plano. Execuções são
+gravadas na tabela trades em lote (uma transação por lote), uma linha por
+ordem terminada com quantidade executada.
+
+O número de ordens em voo é limitado (max_in_flight): acima disso a ordem é
+rejeitada na hora, sem tocar a exchange. stats() traz latência e vazão.
+
+Com state_store (OrderStateStore), cada transição também é gravada na tabela
+order_states pela chave de idempotência: outros processos (workers do backend)
+consultam a ordem sem depender do processo que a recebeu.
+
+Uso:
+    manager = OrderManager(exchange, db_path='memecoin.db')
+    order = manager.submit('DOGE/USDT', 'buy', quote_amount=10, idempotency_key='sinal-123')
+    order.wait(10)                     # opcional: bloqueia até o estado terminal
+    manager.stats()
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from pnl_ledger import ensure_fee_column
+
+log = logging.getLogger("OrderManager")
+
+NEW = 'new'
+SUBMITTED = 'submitted'
+PARTIALLY_FILLED = 'partially_filled'
+FILLED = 'filled'
+CANCELLED = 'cancelled'
+REJECTED = 'rejected'
+
+TERMINAL = (FILLED, CANCELLED, REJECTED)
+
+TRANSITIONS = {
+    NEW: (SUBMITTED, CANCELLED, REJECTED),
+    SUBMITTED: (PARTIALLY_FILLED, FILLED, CANCELLED, REJECTED),
+    PARTIALLY_FILLED: (PARTIALLY_FILLED, FILLED, CANCELLED),
+}
+
+# Status ccxt -> estado (aberta vira submitted/partially_filled conforme o executado)
+CCXT_STATUS = {'closed': FILLED, 'canceled': CANCELLED, 'cancelled': CANCELLED, 'expired': CANCELLED,
+               'rejected': REJECTED}
+
+
+class InvalidTransition(Exception):
+    """Transição fora da máquina de estados"""
+
+
+@dataclass
+class Order:
+    """Ordem a mercado: pedido (amount em base ou quote_amount) e execução acumulada"""
+    key: str
+    client_order_id: str
+    symbol: str
+    side: str
+    amount: Optional[float] = None
+    quote_amount: Optional[float] = None
+    source: str = 'api'
+    state: str = NEW
+    exchange_order_id: Optional[str] = None
+    filled: float = 0.0
+    average: Optional[float] = None
+    cost: float = 0.0
+    fee: float = 0.0
+    error: Optional[str] = None
+    persisted: bool = False
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    history: List[tuple] = field(default_factory=list)
+    response: Optional[Dict] = field(default=None, repr=False)
+    _done: threading.Event = field(default_factory=threading.Event, repr=False)
+    _slot: bool = field(default=False, repr=False)  # ocupa uma vaga de max_in_flight
+
+    @property
+    def done(self) -> bool:
+        return self.state in TERMINAL
+
+    @property
+    def latency_ms(self) -> Optional[float]:
+        """Do submit ao estado terminal"""
+        return (self.finished_at - self.created_at) * 1000 if self.finished_at else None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Bloqueia até o estado terminal; False se o prazo acabou antes"""
+        return self._done.wait(timeout)
+
+    def to_dict(self) -> Dict:
+        return {
+            'key': self.key, 'client_order_id': self.client_order_id, 'exchange_order_id': self.exchange_order_id,
+            'symbol': self.symbol, 'side': self.side, 'amount': self.amount, 'quote_amount': self.quote_amount,
+            'source': self.source, 'state': self.state, 'filled': self.filled, 'average': self.average,
+            'cost': self.cost, 'fee': self.fee, 'error': self.error, 'persisted': self.persisted,
+            'created_at': datetime.fromtimestamp(self.created_at).isoformat(),
+            'latency_ms': round(self.latency_ms, 3) if self.latency_ms is not None else None,
+            'history': [{'state': s, 'at': datetime.fromtimestamp(t).isoformat()} for s, t in self.history],
+        }
+
+
+class SimulatedFillExchange:
+    """Executa ordens a mercado na hora pelo último preço da exchange real (testnet sem paper trading)"""
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+    def create_order(self, symbol: str, type: str, side: str, amount: Optional[float],
+                     price: Optional[float] = None, params: Optional[Dict] = None) -> Dict:
+        params = params or {}
+        price = self.exchange.fetch_ticker(symbol.replace('/', ''))['last']
+        if not price:
+            raise ValueError('Não foi possível obter o preço atual')
+        if params.get('cost') is not None:
+            amount = float(params['cost']) / price
+        return {'id': f"test_{datetime.now().timestamp()}", 'clientOrderId': params.get('clientOrderId'),
+                'symbol': symbol, 'type': 'market', 'side': side, 'amount': amount, 'price': price,
+                'average': price, 'status': 'closed', 'filled': amount, 'cost': amount * price}
+
+    def create_market_buy_order_with_cost(self, symbol: str, cost: float, params: Optional[Dict] = None) -> Dict:
+        return self.create_order(symbol, 'market', 'buy', None, None, {**(params or {}), 'cost': cost})
+
+    def fetch_ticker(self, symbol: str) -> Dict:
+        return self.exchange.fetch_ticker(symbol.replace('/', ''))
+
+
+def quote_fee(order: Order) -> float:
+    """Taxa da ordem na moeda de cotação (taxa cobrada no ativo base vira base * preço médio)"""
+    currency = ((order.response or {}).get('fee') or {}).get('currency')
+    base = order.symbol.split('/')[0] if '/' in order.symbol else None
+    if base and currency == base:
+        return order.fee * (order.average or 0.0)
+    return order.fee
+
+
+class OrderStateStore:
+    """Último estado de cada ordem (Order.to_dict) numa tabela SQLite, visível a todos os processos"""
+
+    def __init__(self, db_path: str, ttl_s: float = 86400):
+        self.db_path = db_path
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._purged_at = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão do processo (reaberta após fork), usada pelas threads do gerenciador sob o lock"""
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA busy_timeout=10000')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS order_states (
+                    key TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    done INTEGER NOT NULL,
+                    pid INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def save(self, orders: List['Order']):
+        """Grava o estado atual; um estado terminal nunca é sobrescrito por um anterior"""
+        now = time.time()
+        rows = [(o.key, o.state, int(o.done), os.getpid(), json.dumps(o.to_dict(), default=str), now) for o in orders]
+        with self._lock:
+            conn = self._connection()
+            conn.executemany('''
+                INSERT INTO order_states (key, state, done, pid, data, updated_at) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET state = excluded.state, done = excluded.done, pid = excluded.pid,
+                    data = excluded.data, updated_at = excluded.updated_at
+                WHERE order_states.done = 0 OR excluded.done = 1
+            ''', rows)
+            if now - self._purged_at > 3600:
+                conn.execute('DELETE FROM order_states WHERE updated_at < ?', (now - self.ttl_s,))
+                self._purged_at = now
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._connection().execute('SELECT data FROM order_states WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def stats(self) -> Dict:
+        """Contagem por estado e processos com ordens abertas, somando todos os processos"""
+        with self._lock:
+            conn = self._connection()
+            states = dict(conn.execute('SELECT state, COUNT(*) FROM order_states GROUP BY state').fetchall())
+            open_by = conn.execute('SELECT COUNT(*), COUNT(DISTINCT pid) FROM order_states WHERE done = 0').fetchone()
+        return {'states': states, 'open': open_by[0], 'processes_with_open': open_by[1]}
+
+
+class OrderManager:
+    """Envia ordens em segundo plano, concilia execuções e grava trades em lote"""
+
+    def __init__(self, exchange=None, db_path: Optional[str] = None, max_workers: int = 4,
+                 max_in_flight: int = 32, batch_size: int = 50, flush_interval_s: float = 0.5,
+                 reconcile_interval_s: float = 2.0, on_done: Optional[Callable[[Order], None]] = None,
+                 on_persist: Optional[Callable[[int], None]] = None, history: int = 10000,
+                 exchange_factory: Optional[Callable[[], object]] = None,
+                 state_store: Optional[OrderStateStore] = None):
+        self._exchange = exchange
+        self.state_store = state_store
+        self.exchange_factory = exchange_factory
+        self.db_path = db_path
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval_s = flush_interval_s
+        self.reconcile_interval_s = reconcile_interval_s
+        self.on_done = on_done
+        self.on_persist = on_persist
+        self.history = history
+        self.executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="order")
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._orders: 'OrderedDict[str, Order]' = OrderedDict()
+        self._open: Dict[str, Order] = {}
+        self._pending_rows: List[tuple] = []
+        self._fee_column = False  # trades.fee garantida (bancos antigos não têm a coluna)
+        self._in_flight = 0
+        self._latencies = deque(maxlen=1000)
+        self._counters = {'submitted': 0, 'duplicates': 0, 'backpressure': 0, 'persisted': 0, 'flushes': 0}
+        self._started = time.time()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    @property
+    def exchange(self):
+        """Exchange fixa ou a devolvida por exchange_factory() a cada uso (troca de modo em execução)"""
+        return self._exchange if self._exchange is not None else self.exchange_factory()
+
+    # ===== Submissão =====
+
+    def submit(self, symbol: str, side: str, amount: Optional[float] = None, quote_amount: Optional[float] = None,
+               idempotency_key: Optional[str] = None, source: str = 'api') -> Order:
+        """Registra a ordem e agenda o envio; não espera a exchange"""
+        side = (side or '').lower()
+        if side not in ('buy', 'sell'):
+            raise ValueError(f"Lado inválido: {side}")
+        if not (amount and amount > 0) and not (quote_amount and quote_amount > 0):
+            raise ValueError("Informe amount (base) ou quote_amount (quote) positivo")
+
+        with self._lock:
+            if idempotency_key and idempotency_key in self._orders:
+                self._counters['duplicates'] += 1
+                return self._orders[idempotency_key]
+            client_order_id = f"mcv{uuid.uuid4().hex[:24]}"
+            order = Order(key=idempotency_key or client_order_id, client_order_id=client_order_id, symbol=symbol,
+                          side=side, amount=amount, quote_amount=quote_amount, source=source)
+            order.history.append((NEW, order.created_at))
+            self._orders[order.key] = order
+            self._trim_history()
+            self._counters['submitted'] += 1
+            if self._in_flight >= self.max_in_flight:
+                self._counters['backpressure'] += 1
+                self._finish(order, REJECTED, f"Limite de {self.max_in_flight} ordens em voo atingido")
+            else:
+                self._in_flight += 1
+                order._slot = True
+
+        if order.done:
+            self._after_done(order)
+            return order
+        self._publish(order)
+        self._ensure_worker()
+        self.executor.submit(self._send, order)
+        return order
+
+    def get(self, key: str) -> Optional[Order]:
+        with self._lock:
+            return self._orders.get(key)
+
+    def cancel(self, key: str) -> Optional[Order]:
+        """Cancela uma ordem ainda não enviada ou aberta na exchange"""
+        with self._lock:
+            order = self._orders.get(key)
+            if order is None or order.done:
+                return order
+            cancel_local = order.state == NEW
+            if cancel_local:
+                self._finish(order, CANCELLED)
+        if cancel_local:
+            self._after_done(order)
+            return order
+        try:
+            self.apply_update(order, self.exchange.cancel_order(order.exchange_order_id, order.symbol))
+        except Exception as e:
+            log.warning(f"⚠️ Cancelamento de {order.key} falhou: {e}")
+        return order
+
+    def _send(self, order: Order):
+        with self._lock:
+            if order.state != NEW:  # cancelada antes do envio
+                return
+            self._transition(order, SUBMITTED)
+        self._publish(order)
+        params = {'clientOrderId': order.client_order_id}
+        try:
+            if order.amount:
+                response = self.exchange.create_order(order.symbol, 'market', order.side, order.amount, None, params)
+            elif order.side == 'buy':
+                response = self.exchange.create_market_buy_order_with_cost(order.symbol, order.quote_amount, params)
+            else:
+                price = self.exchange.fetch_ticker(order.symbol)['last']
+                response = self.exchange.create_order(order.symbol, 'market', 'sell', order.quote_amount / price,
+                                                      None, params)
+        except Exception as e:
+            log.warning(f"⚠️ Ordem {order.side.upper()} {order.symbol} rejeitada: {e}")
+            with self._lock:
+                self._finish(order, REJECTED, str(e))
+            self._after_done(order)
+            return
+        self.apply_update(order, response)
+
+    # ===== Conciliação =====
+
+    def apply_update(self, order: Order, response: Dict):
+        """Aplica uma resposta ccxt (create/fetch/cancel) à ordem"""
+        finished = False
+        with self._lock:
+            if order.done or not response:
+                return
+            filled = float(response.get('filled') or 0.0)
+            cost = float(response.get('cost') or 0.0)
+            order.response = response
+            order.exchange_order_id = str(response.get('id') or order.exchange_order_id)
+            order.filled, order.cost = max(order.filled, filled), max(order.cost, cost)
+            order.average = response.get('average') or (order.cost / order.filled if order.filled else None)
+            order.fee = float((response.get('fee') or {}).get('cost') or 0.0)
+            state = CCXT_STATUS.get(response.get('status'))
+            if state is None:
+                state = PARTIALLY_FILLED if order.filled > 0 else SUBMITTED
+            if state == REJECTED and order.filled > 0:
+                state = CANCELLED
+            if state in TERMINAL:
+                self._finish(order, state, (response.get('info') or {}).get('msg') if state == REJECTED else None)
+                finished = True
+            else:
+                changed = state != order.state
+                if changed:
+                    self._transition(order, state)
+                self._open[order.key] = order
+        if finished:
+            self._after_done(order)
+        elif changed:
+            self._publish(order)
+
+    def reconcile(self) -> int:
+        """Consulta as ordens abertas na exchange; retorna quantas terminaram"""
+        with self._lock:
+            open_orders = list(self._open.values())
+        finished = 0
+        for order in open_orders:
+            try:
+                self.apply_update(order, self.exchange.fetch_order(order.exchange_order_id, order.symbol))
+            except Exception as e:
+                log.warning(f"⚠️ Conciliação de {order.key} falhou: {e}")
+            finished += order.done
+        return finished
+
+    # ===== Estados =====
+
+    def _transition(self, order: Order, state: str):
+        if state not in TRANSITIONS.get(order.state, ()):
+            raise InvalidTransition(f"{order.key}: {order.state} -> {state}")
+        if state != order.state:
+            order.state = state
+            order.history.append((state, time.time()))
+
+    def _finish(self, order: Order, state: str, error: Optional[str] = None):
+        """Estado terminal (chamado com o lock): libera a vaga e enfileira a gravação"""
+        self._transition(order, state)
+        order.error = error or order.error
+        order.finished_at = order.history[-1][1]
+        self._open.pop(order.key, None)
+        if order._slot:
+            order._slot = False
+            self._in_flight -= 1
+        self._latencies.append(order.latency_ms)
+        if order.filled > 0 and self.db_path:
+            self._pending_rows.append((order, (datetime.now(), order.side, order.symbol, order.filled,
+                                               order.average or 0.0, order.cost or order.filled * (order.average or 0.0),
+                                               'completed', quote_fee(order))))
+
+    def _publish(self, order: Order):
+        """Grava o estado da ordem no state_store (fora do lock); falha só gera aviso"""
+        if self.state_store is None:
+            return
+        try:
+            self.state_store.save([order])
+        except Exception as e:
+            log.warning(f"⚠️ Estado da ordem {order.key} não gravado: {e}")
+
+    def _after_done(self, order: Order):
+        """Fora do lock: estado compartilhado, callback do chamador, lote cheio e liberação de quem espera"""
+        self._publish(order)
+        if len(self._pending_rows) >= self.batch_size:
+            self.flush()
+        if self.on_done:
+            try:
+                self.on_done(order)
+            except Exception as e:
+                log.error(f"❌ Callback da ordem {order.key} falhou: {e}")
+        order._done.set()
+
+    def _trim_history(self):
+        while len(self._orders) > self.history:
+            key, oldest = next(iter(self._orders.items()))
+            if not oldest.done:
+                break
+            del self._orders[key]
+
+    # ===== Persistência =====
+
+    def flush(self) -> int:
+        """Grava as execuções pendentes na tabela trades numa transação; retorna quantas"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending_rows = self._pending_rows, []
+            if not batch:
+                return 0
+            try:
+                conn = sqlite3.connect(self.db_path, timeout=10)
+                try:
+                    with conn:
+                        if not self._fee_column:
+                            self._fee_column = ensure_fee_column(conn)
+                        conn.executemany('''
+                            INSERT INTO trades (date, type, symbol, amount, price, total, status, fee)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        ''', [row for _, row in batch])
+                finally:
+                    conn.close()
+            except Exception as e:
+                log.error(f"❌ Falha ao gravar {len(batch)} trades (nova tentativa no próximo lote): {e}")
+                with self._lock:
+                    self._pending_rows[:0] = batch
+                return 0
+            for order, _ in batch:
+                order.persisted = True
+            if self.state_store is not None:
+                try:
+                    self.state_store.save([order for order, _ in batch])
+                except Exception as e:
+                    log.warning(f"⚠️ Estado de {len(batch)} ordens gravadas não atualizado: {e}")
+            with self._lock:
+                self._counters['persisted'] += len(batch)
+                self._counters['flushes'] += 1
+        if self.on_persist:
+            try:
+                self.on_persist(len(batch))
+            except Exception as e:
+                log.error(f"❌ Callback de persistência falhou: {e}")
+        return len(batch)
+
+    # ===== Segundo plano =====
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._stop.clear()
+                self._worker = threading.Thread(target=self._loop, name="order-manager", daemon=True)
+                self._worker.start()
+
+    def _loop(self):
+        next_reconcile = time.monotonic() + self.reconcile_interval_s
+        while not self._stop.wait(self.flush_interval_s):
+            try:
+                self.flush()
+                if time.monotonic() >= next_reconcile:
+                    self.reconcile()
+                    next_reconcile = time.monotonic() + self.reconcile_interval_s
+            except Exception as e:
+                log.error(f"❌ Erro no ciclo do gerenciador de ordens: {e}")
+
+    def close(self):
+        """Espera os envios em andamento e grava o que estiver pendente"""
+        self._stop.set()
+        self.executor.shutdown(wait=True)
+        if self._worker is not None:
+            self._worker.join(timeout=5)
+        self.flush()
+
+    # ===== Métricas =====
+
+    def stats(self) -> Dict:
+        """Contagem por estado, ordens em voo, latência (submit -> terminal) e vazão"""
+        with self._lock:
+            states: Dict[str, int] = {}
+            for order in self._orders.values():
+                states[order.state] = states.get(order.state, 0) + 1
+            latencies = sorted(self._latencies)
+            counters = dict(self._counters)
+            in_flight, pending = self._in_flight, len(self._pending_rows)
+
+        def pct(q):
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 3) if latencies else None
+
+        elapsed = max(time.time() - self._started, 1e-9)
+        return {**counters, 'states': states, 'in_flight': in_flight, 'max_in_flight': self.max_in_flight,
+                'open': len(self._open), 'pending_rows': pending,
+                'latency_ms': {'p50': pct(0.5), 'p95': pct(0.95), 'max': pct(1.0)},
+                'orders_per_s': round(counters['submitted'] / elapsed, 3)}
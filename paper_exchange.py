@@ -0,0 +1,612 @@
+#!/usr/bin/env python3
+"""
+Paper Exchange - Motor de casamento local para paper trading, testes e benchmarks
+Exchange simulada com a mesma interface (estilo ccxt) usada pelo backend:
+fetch_ticker, fetch_balance, create_order, create_market_buy_order, cancel_order...
+
+Modelo de execução:
+- Cada símbolo tem um livro sintético centrado no último preço (recebido por
+  update_price/handle, ou puxado de price_source): níveis a cada
+  level_step_bps a partir do spread, com depth_usd de liquidez por nível.
+- Ordens a mercado percorrem os níveis (slippage); liquidez insuficiente gera
+  execução parcial com status 'expired'. Liquidez consumida só volta na
+  próxima atualização de preço.
+- Ordens limit que cruzam executam como taker; o restante fica no livro e
+  executa ao preço limite (maker) quando o mercado chegar nele, limitado à
+  liquidez de cada atualização (execuções parciais).
+- stop_loss / stop_loss_limit disparam quando o preço atravessa stopPrice;
+  create_oco_order liga um limit e um stop (a execução de um cancela o outro).
+- Taxas maker/taker são cobradas na moeda de cotação.
+- Latência: realtime=True dorme latency_s antes de casar (uso ao vivo);
+  realtime=False agenda a chegada para o tempo do livro + latency_s e casa na
+  primeira atualização de preço que alcançar esse instante (replay/backtest).
+
+Uso no backend: MOCOVE_EXCHANGE=paper (preços lidos da tabela prices).
+Variáveis: MOCOVE_PAPER_BALANCE, MOCOVE_PAPER_FEE, MOCOVE_PAPER_LATENCY_MS,
+MOCOVE_PAPER_DEPTH_USD, MOCOVE_PAPER_SPREAD_BPS.
+"""
+
+import os
+import time
+import heapq
+import sqlite3
+import logging
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+try:
+    from ccxt.base.errors import ExchangeError, InsufficientFunds, InvalidOrder, OrderNotFound, BadSymbol
+except ImportError:  # mesmas classes de erro quando o ccxt não está instalado
+    class ExchangeError(Exception):
+        pass
+
+    class InsufficientFunds(ExchangeError):
+        pass
+
+    class InvalidOrder(ExchangeError):
+        pass
+
+    class OrderNotFound(ExchangeError):
+        pass
+
+    class BadSymbol(ExchangeError):
+        pass
+
+log = logging.getLogger("PaperExchange")
+
+QUOTE_ASSETS = ('USDT', 'BUSD', 'USDC', 'FDUSD', 'BTC', 'ETH', 'BNB')
+ORDER_TYPES = ('market', 'limit', 'stop_loss', 'stop_loss_limit')
+EPS = 1e-12
+
+
+@dataclass
+class BookConfig:
+    """Forma do livro sintético"""
+    spread_bps: float = 5.0
+    level_step_bps: float = 2.0
+    levels: int = 25
+    depth_usd: float = 5000.0
+
+
+@dataclass
+class _Reserve:
+    """Saldo bloqueado por uma ordem (ou pelas duas pernas de um OCO)"""
+    asset: str
+    qty: float
+    refs: int = 1
+
+
+@dataclass
+class _Order:
+    id: str
+    symbol: str
+    type: str
+    side: str
+    amount: float
+    price: Optional[float]
+    stop_price: Optional[float]
+    time_in_force: str
+    timestamp: float
+    client_order_id: Optional[str] = None
+    status: str = 'open'
+    filled: float = 0.0
+    cost: float = 0.0
+    fee: float = 0.0
+    trades: List[Dict] = field(default_factory=list)
+    reserve: Optional[_Reserve] = None
+    oco: Optional[List['_Order']] = None
+    max_cost: Optional[float] = None  # compra a mercado por valor (quoteOrderQty)
+    triggered: bool = False
+
+    @property
+    def remaining(self) -> float:
+        return max(0.0, self.amount - self.filled)
+
+
+class _Market:
+    """Estado de um símbolo: preço, janela 24h, livro consumido e ordens em espera"""
+
+    def __init__(self, market_id: str, base: str, quote: str):
+        self.id = market_id
+        self.symbol = f"{base}/{quote}"
+        self.base = base
+        self.quote = quote
+        self.last: Optional[float] = None
+        self.ts = 0.0
+        self.refreshed_at = 0.0
+        self.window: deque = deque()  # (ts, price, volume)
+        self.volume = 0.0
+        self.consumed = {'buy': defaultdict(float), 'sell': defaultdict(float)}  # lado do taker -> nível -> qty
+        self.bids: list = []        # limit buy: (-price, seq, order)
+        self.asks: list = []        # limit sell: (price, seq, order)
+        self.stops_sell: list = []  # dispara com preço <= stop: (-stop, seq, order)
+        self.stops_buy: list = []   # dispara com preço >= stop: (stop, seq, order)
+        self.pending: deque = deque()  # (arrive_at, order) em ordem de chegada
+
+
+class PaperExchange:
+    """Exchange simulada com interface estilo ccxt (síncrona, thread-safe)"""
+    id = 'paper'
+
+    def __init__(self, balances: Optional[Dict[str, float]] = None, maker_fee: float = 0.001,
+                 taker_fee: float = 0.001, latency_s: float = 0.0, realtime: bool = True,
+                 book: Optional[BookConfig] = None,
+                 price_source: Optional[Callable[[str], Optional[float]]] = None, refresh_s: float = 1.0):
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.latency_s = latency_s
+        self.realtime = realtime
+        self.book = book or BookConfig()
+        self.price_source = price_source
+        self.refresh_s = refresh_s
+        self._free: Dict[str, float] = defaultdict(float, balances if balances is not None else {'USDT': 10000.0})
+        self._used: Dict[str, float] = defaultdict(float)
+        self._markets: Dict[str, _Market] = {}
+        self._orders: Dict[str, _Order] = {}
+        self._trades: List[Dict] = []
+        self._seq = 0
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_env(cls, **kwargs) -> 'PaperExchange':
+        """Instância configurada pelas variáveis MOCOVE_PAPER_*"""
+        fee = float(os.getenv('MOCOVE_PAPER_FEE', 0.001))
+        defaults = dict(
+            balances={'USDT': float(os.getenv('MOCOVE_PAPER_BALANCE', 10000))},
+            maker_fee=fee, taker_fee=fee,
+            latency_s=float(os.getenv('MOCOVE_PAPER_LATENCY_MS', 0)) / 1000,
+            book=BookConfig(spread_bps=float(os.getenv('MOCOVE_PAPER_SPREAD_BPS', 5)),
+                            depth_usd=float(os.getenv('MOCOVE_PAPER_DEPTH_USD', 5000))),
+        )
+        return cls(**{**defaults, **kwargs})
+
+    # ===== Mercados e preços =====
+
+    @staticmethod
+    def _split(symbol: str):
+        if '/' in symbol:
+            base, quote = symbol.upper().split('/', 1)
+            return base + quote, base, quote
+        market_id = symbol.upper()
+        for quote in QUOTE_ASSETS:
+            if market_id.endswith(quote) and len(market_id) > len(quote):
+                return market_id, market_id[:-len(quote)], quote
+        raise BadSymbol(f"Símbolo não reconhecido: {symbol}")
+
+    def _market_for(self, symbol: str) -> _Market:
+        market_id, base, quote = self._split(symbol)
+        market = self._markets.get(market_id)
+        if self.price_source is not None and (market is None or time.time() - market.refreshed_at > self.refresh_s):
+            price = self.price_source(market_id)
+            if price:
+                market = market or self._markets.setdefault(market_id, _Market(market_id, base, quote))
+                self._apply_price(market, float(price), time.time(), market.volume)
+                market.refreshed_at = time.time()
+        if market is None or market.last is None:
+            raise BadSymbol(f"Sem preço para {symbol}")
+        return market
+
+    def market(self, symbol: str) -> Dict:
+        with self._lock:
+            m = self._market_for(symbol)
+            return {'id': m.id, 'symbol': m.symbol, 'base': m.base, 'quote': m.quote, 'spot': True}
+
+    def load_markets(self, reload: bool = False) -> Dict[str, Dict]:
+        with self._lock:
+            return {m.symbol: {'id': m.id, 'symbol': m.symbol, 'base': m.base, 'quote': m.quote, 'spot': True}
+                    for m in self._markets.values() if m.last is not None}
+
+    @property
+    def markets(self) -> Dict[str, Dict]:
+        return self.load_markets()
+
+    def update_price(self, symbol: str, price: float, ts: Optional[float] = None, volume: float = 0.0):
+        """Novo preço de referência: reconstrói o livro e casa stops, limits e chegadas"""
+        market_id, base, quote = self._split(symbol)
+        with self._lock:
+            market = self._markets.get(market_id) or self._markets.setdefault(market_id, _Market(market_id, base, quote))
+            self._apply_price(market, float(price), time.time() if ts is None else float(ts), volume)
+
+    def handle(self, ticks):
+        """Consumidor de ticks (ingest_daemon.TickSink): aplica cada preço em ordem"""
+        for tick in ticks:
+            self.update_price(tick.symbol, tick.price, tick.ts, tick.volume)
+
+    def _apply_price(self, market: _Market, price: float, ts: float, volume: float):
+        market.last, market.ts, market.volume = price, max(market.ts, ts), volume or market.volume
+        market.window.append((ts, price, volume))
+        while market.window and market.window[0][0] < ts - 86400:
+            market.window.popleft()
+        market.consumed['buy'].clear()
+        market.consumed['sell'].clear()
+        self._trigger_stops(market)
+        self._match_resting(market)
+        while market.pending and market.pending[0][0] <= market.ts:
+            _, order = market.pending.popleft()
+            if order.status == 'open':
+                self._arrive(market, order)
+
+    # ===== Livro sintético =====
+
+    def _level_price(self, market: _Market, taker_side: str, level: int) -> float:
+        offset = (self.book.spread_bps / 2 + level * self.book.level_step_bps) / 10000
+        return market.last * (1 + offset) if taker_side == 'buy' else market.last * (1 - offset)
+
+    def _take(self, market: _Market, order: _Order, limit: Optional[float], maker: bool) -> float:
+        """Consome níveis do lado oposto até limit (maker: executa ao preço da ordem)"""
+        side = order.side
+        consumed = market.consumed[side]
+        filled_now = 0.0
+        for level in range(self.book.levels):
+            if order.remaining <= EPS:
+                break
+            level_price = self._level_price(market, side, level)
+            if limit is not None and (level_price > limit + EPS if side == 'buy' else level_price < limit - EPS):
+                break
+            available = self.book.depth_usd / level_price - consumed[level]
+            if available <= EPS:
+                continue
+            price = order.price if maker else level_price
+            qty = min(order.remaining, available, self._affordable(market, order, price, maker))
+            if qty <= EPS:
+                break
+            consumed[level] += qty
+            self._fill(market, order, qty, price, maker)
+            filled_now += qty
+        return filled_now
+
+    def _affordable(self, market: _Market, order: _Order, price: float, maker: bool) -> float:
+        fee_rate = self.maker_fee if maker else self.taker_fee
+        if order.side == 'sell':
+            return order.reserve.qty if order.reserve else self._free[market.base]
+        budget = order.reserve.qty if order.reserve else self._free[market.quote]
+        if order.type in ('market', 'stop_loss') and order.max_cost is None:
+            budget += self._free[market.quote]  # como na exchange: a mercado usa o saldo livre além do bloqueio
+        if order.max_cost is not None:
+            budget = min(budget, (order.max_cost - order.cost) * (1 + fee_rate))
+        return budget / (price * (1 + fee_rate))
+
+    def _fill(self, market: _Market, order: _Order, qty: float, price: float, maker: bool):
+        cost = qty * price
+        fee = cost * (self.maker_fee if maker else self.taker_fee)
+        if order.side == 'buy':
+            self._debit(market.quote, cost + fee, order.reserve)
+            self._free[market.base] += qty
+        else:
+            self._debit(market.base, qty, order.reserve)
+            self._free[market.quote] += cost - fee
+        order.filled += qty
+        order.cost += cost
+        order.fee += fee
+        trade = {'id': str(len(self._trades) + 1), 'order': order.id, 'symbol': market.symbol, 'side': order.side,
+                 'price': price, 'amount': qty, 'cost': cost, 'takerOrMaker': 'maker' if maker else 'taker',
+                 'fee': {'cost': fee, 'currency': market.quote}, 'timestamp': int(market.ts * 1000)}
+        order.trades.append(trade)
+        self._trades.append(trade)
+        if order.oco:
+            for sibling in order.oco:
+                if sibling is not order and sibling.status == 'open':
+                    self._finish(sibling, 'canceled')
+        if order.remaining <= EPS:
+            self._finish(order, 'closed')
+
+    def _debit(self, asset: str, qty: float, reserve: Optional[_Reserve]):
+        if reserve is not None:
+            taken = min(qty, reserve.qty)
+            reserve.qty -= taken
+            self._used[asset] -= taken
+            qty -= taken
+        self._free[asset] -= qty
+
+    def _finish(self, order: _Order, status: str):
+        order.status = status
+        reserve = order.reserve
+        if reserve is not None:
+            reserve.refs -= 1
+            if reserve.refs <= 0 and reserve.qty > 0:
+                self._used[reserve.asset] -= reserve.qty
+                self._free[reserve.asset] += reserve.qty
+                reserve.qty = 0.0
+
+    # ===== Casamento =====
+
+    def _arrive(self, market: _Market, order: _Order):
+        """Ordem chega ao motor (após a latência)"""
+        if order.type in ('stop_loss', 'stop_loss_limit') and not order.triggered:
+            self._rest_stop(market, order)
+            return
+        limit = order.price if order.type in ('limit', 'stop_loss_limit') else None
+        if order.time_in_force == 'FOK' and self._available(market, order, limit) < order.remaining - EPS:
+            self._finish(order, 'expired')
+            return
+        self._take(market, order, limit, maker=False)
+        if order.max_cost is not None and order.max_cost - order.cost <= order.max_cost * 1e-9:
+            self._finish(order, 'closed')
+        if order.status != 'open':
+            return
+        if limit is None or order.time_in_force in ('IOC', 'FOK'):
+            self._finish(order, 'expired')  # parcial: liquidez do livro esgotada
+        else:
+            self._seq += 1
+            book = market.bids if order.side == 'buy' else market.asks
+            heapq.heappush(book, (-order.price if order.side == 'buy' else order.price, self._seq, order))
+
+    def _available(self, market: _Market, order: _Order, limit: Optional[float]) -> float:
+        total = 0.0
+        for level in range(self.book.levels):
+            price = self._level_price(market, order.side, level)
+            if limit is not None and (price > limit + EPS if order.side == 'buy' else price < limit - EPS):
+                break
+            total += max(0.0, self.book.depth_usd / price - market.consumed[order.side][level])
+        return total
+
+    def _rest_stop(self, market: _Market, order: _Order):
+        self._seq += 1
+        if order.side == 'sell':
+            heapq.heappush(market.stops_sell, (-order.stop_price, self._seq, order))
+        else:
+            heapq.heappush(market.stops_buy, (order.stop_price, self._seq, order))
+        self._trigger_stops(market)
+
+    def _trigger_stops(self, market: _Market):
+        price = market.last
+        while market.stops_sell and -market.stops_sell[0][0] >= price:
+            order = heapq.heappop(market.stops_sell)[2]
+            if order.status == 'open':
+                order.triggered = True
+                self._arrive(market, order)
+        while market.stops_buy and market.stops_buy[0][0] <= price:
+            order = heapq.heappop(market.stops_buy)[2]
+            if order.status == 'open':
+                order.triggered = True
+                self._arrive(market, order)
+
+    def _match_resting(self, market: _Market):
+        ask = self._level_price(market, 'buy', 0)
+        while market.bids and -market.bids[0][0] >= ask:
+            order = market.bids[0][2]
+            if order.status == 'open':
+                self._take(market, order, order.price, maker=True)
+                if order.status == 'open':
+                    break  # liquidez desta atualização esgotada
+            heapq.heappop(market.bids)
+        bid = self._level_price(market, 'sell', 0)
+        while market.asks and market.asks[0][0] <= bid:
+            order = market.asks[0][2]
+            if order.status == 'open':
+                self._take(market, order, order.price, maker=True)
+                if order.status == 'open':
+                    break
+            heapq.heappop(market.asks)
+
+    # ===== Ordens (interface ccxt) =====
+
+    def create_order(self, symbol: str, type: str, side: str, amount: Optional[float],
+                     price: Optional[float] = None, params: Optional[Dict] = None) -> Dict:
+        params = dict(params or {})
+        type, side = type.lower(), side.lower()
+        if type not in ORDER_TYPES:
+            raise InvalidOrder(f"Tipo de ordem não suportado: {type}")
+        if side not in ('buy', 'sell'):
+            raise InvalidOrder(f"Lado inválido: {side}")
+        stop_price = params.get('stopPrice', params.get('triggerPrice'))
+        if type in ('limit', 'stop_loss_limit') and not price:
+            raise InvalidOrder(f"Ordem {type} exige price")
+        if type.startswith('stop_loss') and not stop_price:
+            raise InvalidOrder(f"Ordem {type} exige params['stopPrice']")
+
+        with self._lock:
+            market = self._market_for(symbol)
+            max_cost = params.get('cost', params.get('quoteOrderQty'))
+            if max_cost is not None:
+                if type != 'market' or side != 'buy' or float(max_cost) <= 0:
+                    raise InvalidOrder("cost só vale para compra a mercado com valor positivo")
+                max_cost, amount = float(max_cost), float('inf')  # quantidade limitada pelo custo
+            elif not amount or amount <= 0:
+                raise InvalidOrder(f"Quantidade inválida: {amount}")
+            order = self._new_order(market, type, side, float(amount), price, stop_price, params, max_cost)
+            order.reserve = self._reserve_for(market, order)
+            self._orders[order.id] = order
+            self._submit(market, order)
+        if self.realtime and self.latency_s > 0:
+            time.sleep(self.latency_s)
+            with self._lock:
+                if order.status == 'open' and not order.triggered:
+                    self._arrive_if_pending(market, order)
+        with self._lock:
+            return self._to_ccxt(order)
+
+    def _new_order(self, market, type, side, amount, price, stop_price, params, max_cost=None) -> _Order:
+        self._seq += 1
+        return _Order(id=str(self._seq), symbol=market.symbol, type=type, side=side, amount=amount,
+                      price=float(price) if price else None,
+                      stop_price=float(stop_price) if stop_price else None,
+                      time_in_force=str(params.get('timeInForce', 'GTC')).upper(),
+                      timestamp=market.ts, client_order_id=params.get('clientOrderId'), max_cost=max_cost)
+
+    def _lock_funds(self, asset: str, qty: float, required: Optional[float] = None) -> _Reserve:
+        """Bloqueia qty de asset (required: mínimo exigido, se menor que qty)"""
+        required = qty if required is None else required
+        if self._free[asset] < required - EPS:
+            raise InsufficientFunds(f"Saldo {asset} insuficiente: {self._free[asset]:.8f} < {required:.8f}")
+        qty = min(qty, self._free[asset])
+        self._free[asset] -= qty
+        self._used[asset] += qty
+        return _Reserve(asset, qty)
+
+    def _reserve_for(self, market: _Market, order: _Order) -> _Reserve:
+        if order.side == 'sell':
+            return self._lock_funds(market.base, order.amount)
+        fee = 1 + max(self.maker_fee, self.taker_fee)
+        if order.max_cost is not None:
+            return self._lock_funds(market.quote, order.max_cost * (1 + self.taker_fee))
+        if order.type == 'market':
+            # Custo real depende do livro: bloqueia a estimativa com folga para slippage
+            estimate = order.amount * self._level_price(market, 'buy', 0) * fee
+            return self._lock_funds(market.quote, estimate * 1.05, required=estimate)
+        ref_price = order.price if order.type in ('limit', 'stop_loss_limit') else order.stop_price * 1.05
+        return self._lock_funds(market.quote, order.amount * ref_price * fee)
+
+    def _submit(self, market: _Market, order: _Order):
+        if self.latency_s > 0:
+            if self.realtime:
+                market.pending.append((float('inf'), order))  # casada após o sleep em create_order
+            else:
+                market.pending.append((market.ts + self.latency_s, order))
+            return
+        self._arrive(market, order)
+
+    def _arrive_if_pending(self, market: _Market, order: _Order):
+        for i, (_, pending) in enumerate(market.pending):
+            if pending is order:
+                del market.pending[i]
+                self._arrive(market, order)
+                return
+
+    def create_market_buy_order(self, symbol: str, amount: float, params: Optional[Dict] = None) -> Dict:
+        return self.create_order(symbol, 'market', 'buy', amount, None, params)
+
+    def create_market_sell_order(self, symbol: str, amount: float, params: Optional[Dict] = None) -> Dict:
+        return self.create_order(symbol, 'market', 'sell', amount, None, params)
+
+    def create_market_buy_order_with_cost(self, symbol: str, cost: float, params: Optional[Dict] = None) -> Dict:
+        return self.create_order(symbol, 'market', 'buy', None, None, {**(params or {}), 'cost': cost})
+
+    def create_limit_buy_order(self, symbol: str, amount: float, price: float, params: Optional[Dict] = None) -> Dict:
+        return self.create_order(symbol, 'limit', 'buy', amount, price, params)
+
+    def create_limit_sell_order(self, symbol: str, amount: float, price: float, params: Optional[Dict] = None) -> Dict:
+        return self.create_order(symbol, 'limit', 'sell', amount, price, params)
+
+    def create_oco_order(self, symbol: str, side: str, amount: float, price: float, stop_price: float,
+                         stop_limit_price: Optional[float] = None, params: Optional[Dict] = None) -> List[Dict]:
+        """Limit + stop ligados: a execução (mesmo parcial) de uma perna cancela a outra"""
+        side = side.lower()
+        if side == 'sell' and not stop_price < price or side == 'buy' and not stop_price > price:
+            raise InvalidOrder("OCO exige stop do lado oposto ao limit")
+        with self._lock:
+            market = self._market_for(symbol)
+            params = dict(params or {})
+            limit_leg = self._new_order(market, 'limit', side, float(amount), price, None, params)
+            stop_leg = self._new_order(market, 'stop_loss_limit' if stop_limit_price else 'stop_loss', side,
+                                       float(amount), stop_limit_price, stop_price, params)
+            # Um único bloqueio para as duas pernas (compra: pela perna mais cara)
+            reserve = self._reserve_for(market, limit_leg if side == 'sell' else stop_leg)
+            reserve.refs = 2
+            limit_leg.reserve = stop_leg.reserve = reserve
+            limit_leg.oco = stop_leg.oco = [limit_leg, stop_leg]
+            for leg in (limit_leg, stop_leg):
+                self._orders[leg.id] = leg
+                self._submit(market, leg)
+            return [self._to_ccxt(limit_leg), self._to_ccxt(stop_leg)]
+
+    def cancel_order(self, id: str, symbol: Optional[str] = None, params: Optional[Dict] = None) -> Dict:
+        with self._lock:
+            order = self._orders.get(str(id))
+            if order is None:
+                raise OrderNotFound(f"Ordem {id} não encontrada")
+            if order.status != 'open':
+                raise OrderNotFound(f"Ordem {id} já está {order.status}")
+            for leg in order.oco or [order]:  # cancelar uma perna cancela o OCO inteiro
+                if leg.status == 'open':
+                    self._finish(leg, 'canceled')
+            return self._to_ccxt(order)
+
+    def fetch_order(self, id: str, symbol: Optional[str] = None, params: Optional[Dict] = None) -> Dict:
+        with self._lock:
+            order = self._orders.get(str(id))
+            if order is None:
+                raise OrderNotFound(f"Ordem {id} não encontrada")
+            return self._to_ccxt(order)
+
+    def fetch_open_orders(self, symbol: Optional[str] = None, since=None, limit=None, params=None) -> List[Dict]:
+        with self._lock:
+            wanted = self._market_for(symbol).symbol if symbol else None
+            return [self._to_ccxt(o) for o in self._orders.values()
+                    if o.status == 'open' and (wanted is None or o.symbol == wanted)]
+
+    def fetch_my_trades(self, symbol: Optional[str] = None, since=None, limit=None, params=None) -> List[Dict]:
+        with self._lock:
+            wanted = self._market_for(symbol).symbol if symbol else None
+            trades = [dict(t) for t in self._trades if wanted is None or t['symbol'] == wanted]
+            return trades[-limit:] if limit else trades
+
+    # ===== Consultas (interface ccxt) =====
+
+    def fetch_ticker(self, symbol: str, params: Optional[Dict] = None) -> Dict:
+        with self._lock:
+            market = self._market_for(symbol)
+            prices = [p for _, p, _ in market.window]
+            open_price, last = prices[0], market.last
+            change = last - open_price
+            return {
+                'symbol': market.symbol, 'timestamp': int(market.ts * 1000), 'datetime': _iso(market.ts),
+                'high': max(prices), 'low': min(prices),
+                'bid': self._level_price(market, 'sell', 0), 'ask': self._level_price(market, 'buy', 0),
+                'open': open_price, 'close': last, 'last': last, 'previousClose': open_price,
+                'change': change, 'percentage': change / open_price * 100 if open_price else None,
+                'average': (open_price + last) / 2, 'baseVolume': market.volume,
+                'quoteVolume': market.volume * last, 'info': {'source': 'paper'},
+            }
+
+    def fetch_tickers(self, symbols: Optional[List[str]] = None, params: Optional[Dict] = None) -> Dict[str, Dict]:
+        with self._lock:
+            wanted = symbols or [m.symbol for m in self._markets.values() if m.last is not None]
+            tickers = [self.fetch_ticker(s) for s in wanted]
+            return {t['symbol']: t for t in tickers}
+
+    def fetch_balance(self, params: Optional[Dict] = None) -> Dict:
+        with self._lock:
+            assets = {a for a, v in self._free.items() if abs(v) > EPS} | {a for a, v in self._used.items() if abs(v) > EPS}
+            balance = {'free': {}, 'used': {}, 'total': {}, 'info': {'source': 'paper'}}
+            for asset in sorted(assets):
+                free, used = max(0.0, self._free[asset]), max(0.0, self._used[asset])
+                balance[asset] = {'free': free, 'used': used, 'total': free + used}
+                balance['free'][asset], balance['used'][asset], balance['total'][asset] = free, used, free + used
+            return balance
+
+    def fetch_status(self, params: Optional[Dict] = None) -> Dict:
+        return {'status': 'ok', 'updated': int(time.time() * 1000), 'eta': None, 'url': None, 'info': {}}
+
+    def _to_ccxt(self, order: _Order) -> Dict:
+        average = order.cost / order.filled if order.filled > EPS else None
+        return {
+            'id': order.id, 'clientOrderId': order.client_order_id, 'timestamp': int(order.timestamp * 1000),
+            'datetime': _iso(order.timestamp), 'symbol': order.symbol, 'type': order.type, 'side': order.side,
+            'timeInForce': order.time_in_force, 'price': order.price if order.price else average,
+            'stopPrice': order.stop_price, 'average': average,
+            'amount': order.filled if order.max_cost is not None else order.amount,
+            'filled': order.filled, 'remaining': None if order.max_cost is not None else order.remaining,
+            'cost': order.cost, 'status': order.status,
+            'fee': {'cost': order.fee, 'currency': self._markets[order.symbol.replace('/', '')].quote},
+            'trades': [dict(t) for t in order.trades], 'info': {'source': 'paper'},
+        }
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def db_price_source(db_path: str) -> Callable[[str], Optional[float]]:
+    """Último preço gravado em prices ('DOGEUSDT' ou 'DOGE/USDT')"""
+
+    def latest(market_id: str) -> Optional[float]:
+        _, base, quote = PaperExchange._split(market_id)
+        try:
+            conn = sqlite3.connect(db_path, timeout=5)
+            try:
+                row = conn.execute(
+                    'SELECT price FROM prices WHERE symbol IN (?, ?) ORDER BY id DESC LIMIT 1',
+                    (base + quote, f"{base}/{quote}")
+                ).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            log.warning(f"⚠️ Erro ao ler preço de {market_id}: {e}")
+            return None
+        return row[0] if row else None
+
+    return latest
@@ -0,0 +1,604 @@
+#!/usr/bin/env python3
+"""
+Param Sweep - Busca paralela de parâmetros da Strategy e do modelo
+Avalia candidatos de um espaço de busca num pool de processos e devolve um
+leaderboard ordenado e a configuração escolhida.
+
+Alvos:
+- strategy: campos de backtest.StrategyParams (os mesmos de
+  ai_trading_agent_II.Settings). Cada candidato roda o backtest vetorizado
+  em todos os símbolos e a nota é a média do objetivo (sharpe, pnl_usd,
+  return_pct...) entre eles. Candidatos com menos de min_trades trades ficam
+  sem nota (NaN, fim do leaderboard). Cada processo guarda as séries de
+  indicadores por símbolo, reaproveitadas entre candidatos.
+- model: hiperparâmetros do RandomForest e da rotulagem de ai/train_model
+  (n_estimators, max_depth, min_samples_*, future_window, buy_threshold...)
+  e os limiares buy_p/sell_p. Validação com TimeSeriesSplit(cv_splits,
+  gap) da Config; o gap cobre ao menos o horizonte do rótulo (future_window
+  ou tb_max_holding, vezes o número de moedas intercaladas), senão os
+  rótulos do treino enxergariam o teste. Objetivo 'ev': retorno líquido
+  médio por linha, mesma conta de optimize_thresholds (só com
+  label_method='threshold'); 'f1': F1 médio de BUY/SELL.
+
+Métodos: grid (produto das listas), random (amostras sem repetição) e bayes
+(processo gaussiano + expected improvement sobre as notas já obtidas,
+propondo lotes do tamanho do pool).
+
+Espaço de busca: {campo: [valores]} ou faixa {campo: (mín, máx)} /
+{campo: {"low": mín, "high": máx}}; faixa de inteiros se os dois limites
+forem int.
+
+Cache: features (calculate_features) e datasets rotulados ficam em disco
+(joblib), chaveados pelo conteúdo dos dados e pelos parâmetros de
+rotulagem; sweeps repetidos sobre os mesmos dados não recalculam nada.
+
+Uso:
+    python param_sweep.py strategy --symbols DOGEUSDT,PEPEUSDT --method bayes --trials 60
+    python param_sweep.py model --method random --trials 30 --space space.json --out runtime/sweep
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import warnings
+import itertools
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, fields, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtest import DEFAULT_DB_PATH, RESOLUTION_S, StrategyParams, load_candles, simulate, strategy_signals
+
+log = logging.getLogger("ParamSweep")
+
+CACHE_DIR = os.getenv('MOCOVE_SWEEP_CACHE', './runtime/sweep_cache')
+
+DEFAULT_STRATEGY_SPACE = {
+    'sma_fast': [3, 5, 8],
+    'sma_slow': [10, 15, 20],
+    'rsi_period': [7, 10, 14],
+    'sl_atr_mult': (1.0, 3.0),
+    'tp_rr': (1.0, 3.0),
+    'trail_atr_mult': (0.5, 2.0),
+    'min_confidence': (0.4, 0.7),
+}
+
+DEFAULT_MODEL_SPACE = {
+    'n_estimators': [100, 200, 300],
+    'max_depth': [6, 8, 12, None],
+    'min_samples_leaf': [1, 2, 5],
+    'future_window': [10, 15, 30],
+    'buy_threshold': (0.005, 0.03),
+    'buy_p': (0.4, 0.8),
+    'sell_p': (0.4, 0.8),
+}
+
+# Parâmetros que mudam o dataset (rótulos) e os que mudam só o modelo
+LABEL_FIELDS = ('label_method', 'future_window', 'buy_threshold', 'sell_threshold', 'tb_max_holding',
+                'tb_use_atr', 'tb_upper_mult_atr', 'tb_lower_mult_atr', 'tb_upper_pct', 'tb_lower_pct')
+MODEL_FIELDS = ('n_estimators', 'max_depth', 'min_samples_split', 'min_samples_leaf')
+THRESHOLD_FIELDS = ('buy_p', 'sell_p')
+
+
+@dataclass
+class SweepResult:
+    """Leaderboard ordenado (melhor primeiro) e a configuração completa escolhida"""
+    target: str
+    objective: str
+    method: str
+    leaderboard: pd.DataFrame
+    best: Dict[str, Any]
+    config: Dict[str, Any]
+    elapsed_s: float
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+    def save(self, out_dir: str):
+        """leaderboard.csv + best_config.json em out_dir"""
+        os.makedirs(out_dir, exist_ok=True)
+        self.leaderboard.to_csv(os.path.join(out_dir, 'leaderboard.csv'), index=False)
+        with open(os.path.join(out_dir, 'best_config.json'), 'w', encoding='utf-8') as f:
+            json.dump({'target': self.target, 'objective': self.objective, 'method': self.method,
+                       'best': self.best, 'config': self.config, 'elapsed_s': self.elapsed_s,
+                       'meta': self.meta}, f, indent=2, default=_json_default)
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+# ===== Espaço de busca e amostragem =====
+
+def normalize_space(space: Dict[str, Any]) -> Dict[str, Any]:
+    """Listas ficam como estão; faixas viram tuplas (mín, máx)"""
+    out = {}
+    for name, spec in space.items():
+        if isinstance(spec, dict):
+            spec = (spec['low'], spec['high'])
+        if isinstance(spec, tuple):
+            if len(spec) != 2 or not spec[0] < spec[1]:
+                raise ValueError(f"Faixa inválida para {name}: {spec}")
+        elif not isinstance(spec, list) or not spec:
+            raise ValueError(f"Espaço de {name} deve ser lista de valores ou faixa (mín, máx)")
+        out[name] = spec
+    return out
+
+
+def _grid(space: Dict[str, Any]) -> List[Dict[str, Any]]:
+    ranges = [name for name, spec in space.items() if isinstance(spec, tuple)]
+    if ranges:
+        raise ValueError(f"grid exige listas de valores; faixas em {', '.join(ranges)}")
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+
+def _sample(space: Dict[str, Any], rng: np.random.Generator) -> Dict[str, Any]:
+    params = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            params[name] = spec[int(rng.integers(len(spec)))]
+        elif isinstance(spec[0], int) and isinstance(spec[1], int):
+            params[name] = int(rng.integers(spec[0], spec[1] + 1))
+        else:
+            params[name] = float(rng.uniform(spec[0], spec[1]))
+    return params
+
+
+def _encode(space: Dict[str, Any], params: Dict[str, Any]) -> List[float]:
+    """Candidato -> vetor em [0, 1] (valores de lista pela posição)"""
+    vec = []
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            vec.append(spec.index(params[name]) / max(len(spec) - 1, 1))
+        else:
+            vec.append((params[name] - spec[0]) / (spec[1] - spec[0]))
+    return vec
+
+
+def _key(params: Dict[str, Any]) -> str:
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def _unique_samples(space: Dict[str, Any], rng: np.random.Generator, n: int, seen=()) -> List[Dict[str, Any]]:
+    out, keys = [], set(seen)
+    for _ in range(n * 20):
+        if len(out) == n:
+            break
+        cand = _sample(space, rng)
+        if _key(cand) not in keys:
+            keys.add(_key(cand))
+            out.append(cand)
+    return out
+
+
+def _propose(space: Dict[str, Any], history: List[Tuple[Dict, float]], k: int,
+             rng: np.random.Generator, n_candidates: int = 2000) -> List[Dict[str, Any]]:
+    """k candidatos inéditos de maior expected improvement segundo um GP ajustado ao histórico"""
+    from scipy.stats import norm
+    from sklearn.exceptions import ConvergenceWarning
+    from sklearn.gaussian_process import GaussianProcessRegressor
+    from sklearn.gaussian_process.kernels import Matern, WhiteKernel
+
+    seen = [_key(p) for p, _ in history]
+    scores = np.array([s for _, s in history], dtype=float)
+    finite = np.isfinite(scores)
+    if finite.sum() < 2:
+        return _unique_samples(space, rng, k, seen)
+    # Sem nota (poucos trades) conta como pior que o pior resultado visto
+    floor = scores[finite].min() - (scores[finite].std() or 1.0)
+    scores = np.where(finite, scores, floor)
+    X = np.array([_encode(space, p) for p, _ in history])
+    gp = GaussianProcessRegressor(kernel=Matern(nu=2.5) + WhiteKernel(1e-3), normalize_y=True,
+                                  random_state=int(rng.integers(2 ** 31)))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', ConvergenceWarning)  # poucos pontos: length scale no limite
+        gp.fit(X, scores)
+
+    pool = _unique_samples(space, rng, n_candidates, seen)
+    if not pool:
+        return []
+    mu, sigma = gp.predict(np.array([_encode(space, p) for p in pool]), return_std=True)
+    improve = mu - scores.max()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = improve / sigma
+        ei = np.where(sigma > 0, improve * norm.cdf(z) + sigma * norm.pdf(z), 0.0)
+    return [pool[i] for i in np.argsort(-ei, kind='stable')[:k]]
+
+
+def _search(space: Dict[str, Any], method: str, n_trials: int, seed: int, batch_size: int,
+            evaluate_batch: Callable[[List[Dict]], List[Dict]], maximize: bool) -> List[Tuple[Dict, Dict]]:
+    """Gera candidatos pelo método e avalia em lotes; devolve [(params, métricas)] na ordem de avaliação"""
+    rng = np.random.default_rng(seed)
+    if method == 'grid':
+        candidates = _grid(space)
+        return list(zip(candidates, evaluate_batch(candidates)))
+    if method == 'random':
+        candidates = _unique_samples(space, rng, n_trials)
+        return list(zip(candidates, evaluate_batch(candidates)))
+    if method != 'bayes':
+        raise ValueError(f"Método inválido: {method} (use grid, random ou bayes)")
+
+    sign = 1.0 if maximize else -1.0
+    evaluated: List[Tuple[Dict, Dict]] = []
+    batch = _unique_samples(space, rng, min(n_trials, max(batch_size, 5, n_trials // 4)))
+    while batch:
+        evaluated += list(zip(batch, evaluate_batch(batch)))
+        remaining = n_trials - len(evaluated)
+        if remaining <= 0:
+            break
+        history = [(p, sign * m['score']) for p, m in evaluated]
+        batch = _propose(space, history, min(batch_size, remaining), rng)
+    return evaluated
+
+
+def _rank(target: str, objective: str, method: str, evaluated: List[Tuple[Dict, Dict]], maximize: bool,
+          config_of: Callable[[Dict], Dict], elapsed_s: float, meta: Dict) -> SweepResult:
+    rows = [{**metrics, **{f"param_{k}": v for k, v in params.items()}} for params, metrics in evaluated]
+    board = pd.DataFrame(rows)
+    if not board.empty:
+        board = board.sort_values('score', ascending=not maximize, na_position='last', kind='stable')
+        board = board.reset_index(drop=True)
+    board.insert(0, 'rank', range(1, len(board) + 1))
+
+    scored = [(p, m) for p, m in evaluated if np.isfinite(m['score'])]
+    if scored:
+        pick = max if maximize else min
+        best = pick(scored, key=lambda pm: pm[1]['score'])[0]
+    else:
+        best = evaluated[0][0] if evaluated else {}
+        log.warning("⚠️ Nenhum candidato com nota válida; usando o primeiro avaliado")
+    return SweepResult(target=target, objective=objective, method=method, leaderboard=board,
+                       best=dict(best), config=config_of(best), elapsed_s=elapsed_s, meta=meta)
+
+
+def _sweep(space: Dict[str, Any], method: str, n_trials: int, seed: int, workers: int,
+           batch_size: Optional[int], maximize: bool, make_job: Callable[[Dict], Any], run_job: Callable,
+           initializer: Callable, initargs: Tuple):
+    """Busca com os lotes avaliados no pool (ou no próprio processo com workers=1).
+    batch_size: propostas por rodada do bayes (padrão: workers); fixo, o resultado não depende do pool"""
+    batch_size = max(1, batch_size or workers)
+    if workers <= 1:
+        initializer(*initargs)
+        return _search(space, method, n_trials, seed, batch_size,
+                       lambda batch: [run_job(make_job(p)) for p in batch], maximize)
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+        return _search(space, method, n_trials, seed, batch_size,
+                       lambda batch: list(pool.map(run_job, [make_job(p) for p in batch])), maximize)
+
+
+# ===== Strategy =====
+
+_WORKER_CANDLES: Dict[str, pd.DataFrame] = {}
+_WORKER_SERIES: Dict[str, Dict] = {}
+
+
+def _init_strategy_worker(candles_by_symbol: Dict[str, pd.DataFrame]):
+    global _WORKER_CANDLES, _WORKER_SERIES
+    _WORKER_CANDLES = candles_by_symbol
+    _WORKER_SERIES = {symbol: {} for symbol in candles_by_symbol}
+
+
+def _run_strategy_job(job: Tuple[StrategyParams, Dict]) -> Dict[str, Any]:
+    params, opts = job
+    objective = opts['objective']
+    per_symbol = []
+    for symbol, candles in _WORKER_CANDLES.items():
+        signals = strategy_signals(candles, params, cache=_WORKER_SERIES[symbol])
+        result = simulate(candles, signals, params, symbol=symbol, initial_equity=opts['initial_equity'],
+                          slippage_pct=opts['slippage_pct'])
+        per_symbol.append(result.metrics)
+    trades = sum(m['trades'] for m in per_symbol)
+    value = float(np.mean([m[objective] for m in per_symbol]))
+    return {
+        'score': value if trades >= opts['min_trades'] else float('nan'),
+        objective: value,
+        'trades': trades,
+        'pnl_usd': float(sum(m['pnl_usd'] for m in per_symbol)),
+        'win_rate': float(np.mean([m['win_rate'] for m in per_symbol])),
+        'max_drawdown_pct': float(max(m['max_drawdown_pct'] for m in per_symbol)),
+        'turnover_usd': float(sum(m['turnover_usd'] for m in per_symbol)),
+    }
+
+
+def sweep_strategy(candles_by_symbol: Dict[str, pd.DataFrame], space: Optional[Dict[str, Any]] = None,
+                   method: str = 'grid', n_trials: int = 50, objective: str = 'sharpe', maximize: bool = True,
+                   min_trades: int = 5, base: Optional[StrategyParams] = None, workers: Optional[int] = None,
+                   seed: int = 42, batch_size: Optional[int] = None, initial_equity: float = 1000.0,
+                   slippage_pct: float = 0.0) -> SweepResult:
+    """Busca de StrategyParams pelo backtest vetorizado em todos os símbolos"""
+    space = normalize_space(space or DEFAULT_STRATEGY_SPACE)
+    base = base or StrategyParams()
+    unknown = set(space) - {f.name for f in fields(StrategyParams)}
+    if unknown:
+        raise ValueError(f"Parâmetros desconhecidos da Strategy: {', '.join(sorted(unknown))}")
+    opts = dict(objective=objective, min_trades=min_trades, initial_equity=initial_equity,
+                slippage_pct=slippage_pct)
+    workers = max(1, workers or os.cpu_count() or 1)
+
+    start = time.perf_counter()
+    evaluated = _sweep(space, method, n_trials, seed, workers, batch_size, maximize,
+                       lambda p: (replace(base, **p), opts), _run_strategy_job,
+                       _init_strategy_worker, (candles_by_symbol,))
+    meta = {'symbols': list(candles_by_symbol), 'candles': {s: len(c) for s, c in candles_by_symbol.items()},
+            'min_trades': min_trades, 'workers': workers, 'trials': len(evaluated)}
+    result = _rank('strategy', objective, method, evaluated, maximize,
+                   lambda best: asdict(replace(base, **best)), time.perf_counter() - start, meta)
+    log.info(f"🏁 Sweep strategy ({method}): {len(evaluated)} candidatos em {result.elapsed_s:.1f}s")
+    return result
+
+
+# ===== Modelo =====
+
+class FeatureCache:
+    """Cache em disco (joblib) de features e datasets, chaveado pelo conteúdo dos dados + parâmetros"""
+
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def fingerprint(df: pd.DataFrame) -> str:
+        digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+        digest.update(','.join(map(str, df.columns)).encode())
+        return digest.hexdigest()
+
+    def path(self, kind: str, key: Dict) -> str:
+        name = hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()[:20]
+        return os.path.join(self.cache_dir, f"{kind}-{name}.joblib")
+
+    def get(self, kind: str, key: Dict, compute: Callable[[], Any]) -> str:
+        """Caminho do arquivo em cache, calculando (e gravando de forma atômica) se ausente"""
+        import joblib
+
+        path = self.path(kind, key)
+        if os.path.exists(path):
+            self.hits += 1
+            return path
+        self.misses += 1
+        tmp = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(compute(), tmp)
+        os.replace(tmp, path)
+        return path
+
+
+def _label_params(cfg, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Parâmetros de rotulagem efetivos (só os do método escolhido, para não dividir o cache)"""
+    label = {name: params.get(name, getattr(cfg, name)) for name in LABEL_FIELDS}
+    if 'buy_threshold' in params and 'sell_threshold' not in params:
+        label['sell_threshold'] = -params['buy_threshold']  # faixa simétrica
+    unused = LABEL_FIELDS[4:] if label['label_method'] == 'threshold' else LABEL_FIELDS[1:4]
+    for name in unused:
+        label.pop(name)
+    return label
+
+
+def build_dataset(feats: pd.DataFrame, label: Dict[str, Any]) -> Dict[str, Any]:
+    """X/y/retorno futuro em ordem temporal, com a limpeza de prepare_dataset.
+    Diferença: linhas sem preço futuro (fim de cada moeda) saem em vez de virar HOLD"""
+    from ai.train_model import FEATURES, label_threshold, label_triple_barrier
+
+    clean = feats.dropna(subset=['price'])
+    if label['label_method'] == 'triple_barrier':
+        y = label_triple_barrier(clean, max_holding=label['tb_max_holding'], use_atr=label['tb_use_atr'],
+                                 up_mult_atr=label['tb_upper_mult_atr'], lo_mult_atr=label['tb_lower_mult_atr'],
+                                 up_pct=label['tb_upper_pct'], lo_pct=label['tb_lower_pct'])
+        future_ret = pd.Series(np.nan, index=clean.index)
+        horizon = label['tb_max_holding']
+    else:
+        y, future_ret = label_threshold(clean, label['future_window'], label['buy_threshold'],
+                                        label['sell_threshold'])
+        y = y.where(future_ret.notna())
+        horizon = label['future_window']
+    clean = clean.assign(target=y, future_ret=future_ret)
+    for col in ('volume_z', 'var24', 'volatility', 'rsi', 'bb_pos'):
+        clean[col] = clean[col].fillna(0)
+    clean = clean.dropna(subset=FEATURES + ['target']).sort_values('timestamp', kind='stable')
+    return {
+        'X': clean[FEATURES].to_numpy(float),
+        'y': clean['target'].to_numpy(int),
+        'future_ret': clean['future_ret'].to_numpy(float),
+        'has_future_ret': label['label_method'] != 'triple_barrier',
+        'horizon_rows': int(horizon * max(clean['coin_id'].nunique(), 1)),
+    }
+
+
+_WORKER_DATASETS: Dict[str, Dict] = {}
+
+
+def _init_model_worker():
+    _WORKER_DATASETS.clear()
+
+
+def _signals(proba: np.ndarray, classes: List, buy_p: float, sell_p: float) -> np.ndarray:
+    """Mesma regra de evaluate: limiar por classe, conflito decidido pela maior probabilidade"""
+    n = proba.shape[0]
+    p_buy = proba[:, classes.index(1)] if 1 in classes else np.zeros(n)
+    p_sell = proba[:, classes.index(-1)] if -1 in classes else np.zeros(n)
+    is_buy, is_sell = p_buy >= buy_p, p_sell >= sell_p
+    return np.where(is_buy & is_sell, np.where(p_buy >= p_sell, 1, -1),
+                    np.where(is_buy, 1, np.where(is_sell, -1, 0)))
+
+
+def _run_model_job(job: Tuple[str, Dict, Dict]) -> Dict[str, Any]:
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import f1_score
+    from sklearn.model_selection import TimeSeriesSplit
+
+    dataset_path, params, opts = job
+    if dataset_path not in _WORKER_DATASETS:
+        import joblib
+        _WORKER_DATASETS[dataset_path] = joblib.load(dataset_path)
+    data = _WORKER_DATASETS[dataset_path]
+    X, y, future_ret = data['X'], data['y'], data['future_ret']
+    gap = max(opts['cv_gap'], data['horizon_rows'])
+    out = {'score': float('nan'), 'ev': float('nan'), 'f1': float('nan'), 'signals': 0,
+           'rows': int(len(y)), 'gap': gap, 'folds': 0}
+    try:
+        splits = list(TimeSeriesSplit(n_splits=opts['cv_splits'], gap=gap).split(X))
+    except ValueError as e:
+        out['error'] = str(e)
+        return out
+
+    round_trip_cost = 2 * opts['fee_pct'] + opts['slippage_pct']
+    evs, f1s, signals = [], [], 0
+    for train_idx, test_idx in splits:
+        if np.unique(y[train_idx]).size < 2:
+            continue
+        clf = RandomForestClassifier(class_weight='balanced', random_state=opts['random_state'], n_jobs=1,
+                                     **{k: params[k] for k in MODEL_FIELDS})
+        clf.fit(X[train_idx], y[train_idx])
+        preds = _signals(clf.predict_proba(X[test_idx]), list(clf.classes_), params['buy_p'], params['sell_p'])
+        signals += int((preds != 0).sum())
+        f1s.append(f1_score(y[test_idx], preds, labels=[1, -1], average='macro', zero_division=0))
+        if data['has_future_ret']:
+            fr = future_ret[test_idx]
+            pnl = np.where(preds == 1, fr, np.where(preds == -1, -fr, 0.0))
+            evs.append(float((pnl - (preds != 0) * round_trip_cost).mean()))
+    out.update(folds=len(f1s), signals=signals)
+    if f1s:
+        out['f1'] = float(np.mean(f1s))
+    if evs:
+        out['ev'] = float(np.mean(evs))
+    out['score'] = out[opts['objective']]
+    return out
+
+
+def sweep_model(raw: pd.DataFrame, space: Optional[Dict[str, Any]] = None, method: str = 'random',
+                n_trials: int = 30, objective: str = 'ev', maximize: bool = True,
+                cv_splits: Optional[int] = None, cv_gap: Optional[int] = None, workers: Optional[int] = None,
+                seed: int = 42, batch_size: Optional[int] = None, cache_dir: str = CACHE_DIR) -> SweepResult:
+    """Busca de hiperparâmetros do modelo/rotulagem com validação temporal (TimeSeriesSplit com gap).
+    raw: saída de extract_data_from_db (coin_id, timestamp, price, volume, high, low, close)"""
+    from ai.train_model import Config, calculate_features
+
+    if objective not in ('ev', 'f1'):
+        raise ValueError(f"Objetivo inválido: {objective} (use ev ou f1)")
+    space = normalize_space(space or DEFAULT_MODEL_SPACE)
+    unknown = set(space) - set(LABEL_FIELDS + MODEL_FIELDS + THRESHOLD_FIELDS)
+    if unknown:
+        raise ValueError(f"Parâmetros desconhecidos do modelo: {', '.join(sorted(unknown))}")
+    cfg = Config()
+    opts = dict(objective=objective, cv_splits=cv_splits or cfg.cv_splits,
+                cv_gap=cfg.cv_gap if cv_gap is None else cv_gap, fee_pct=cfg.fee_pct,
+                slippage_pct=cfg.slippage_pct, random_state=cfg.random_state)
+    workers = max(1, workers or os.cpu_count() or 1)
+    cache = FeatureCache(cache_dir)
+    fingerprint = FeatureCache.fingerprint(raw)
+
+    def make_job(params: Dict[str, Any]):
+        label = _label_params(cfg, params)
+        model = {name: params.get(name, getattr(cfg, name)) for name in MODEL_FIELDS}
+        model.update(buy_p=params.get('buy_p', 0.5), sell_p=params.get('sell_p', 0.5))
+        features_path = cache.get('features', {'data': fingerprint}, lambda: calculate_features(raw))
+
+        def dataset():
+            import joblib
+            return build_dataset(joblib.load(features_path), label)
+        return cache.get('dataset', {'data': fingerprint, **label}, dataset), model, opts
+
+    start = time.perf_counter()
+    evaluated = _sweep(space, method, n_trials, seed, workers, batch_size, maximize, make_job, _run_model_job,
+                       _init_model_worker, ())
+
+    def config_of(best: Dict[str, Any]) -> Dict[str, Any]:
+        config = {name: getattr(cfg, name) for name in MODEL_FIELDS}
+        config.update(_label_params(cfg, best))
+        config.update({k: v for k, v in best.items() if k in MODEL_FIELDS})
+        config['thresholds'] = {'buy_p': best.get('buy_p', 0.5), 'sell_p': best.get('sell_p', 0.5)}
+        return config
+
+    meta = {'rows': int(len(raw)), 'coins': int(raw['coin_id'].nunique()), 'cv_splits': opts['cv_splits'],
+            'cv_gap': opts['cv_gap'], 'workers': workers, 'trials': len(evaluated),
+            'cache_hits': cache.hits, 'cache_misses': cache.misses}
+    result = _rank('model', objective, method, evaluated, maximize, config_of, time.perf_counter() - start, meta)
+    log.info(f"🏁 Sweep model ({method}): {len(evaluated)} candidatos em {result.elapsed_s:.1f}s | "
+             f"cache {cache.hits} hits / {cache.misses} misses")
+    return result
+
+
+# ===== CLI =====
+
+def _load_space(value: Optional[str], default: Dict[str, Any]) -> Dict[str, Any]:
+    """Espaço em JSON inline ou caminho de arquivo (padrão do alvo se vazio)"""
+    if not value:
+        return default
+    if os.path.exists(value):
+        with open(value, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return json.loads(value)
+
+
+def main():
+    """Sweep pela linha de comando"""
+    import argparse
+    from candles import to_epoch
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Busca paralela de parâmetros da Strategy / do modelo")
+    sub = parser.add_subparsers(dest='target', required=True)
+    for target in ('strategy', 'model'):
+        p = sub.add_parser(target)
+        p.add_argument('--db', default=DEFAULT_DB_PATH, help='Caminho do banco SQLite')
+        p.add_argument('--space', default=None,
+                       help='Espaço de busca em JSON (inline ou arquivo); faixas como {"low": x, "high": y}')
+        p.add_argument('--method', default='random', choices=['grid', 'random', 'bayes'])
+        p.add_argument('--trials', type=int, default=50)
+        p.add_argument('--workers', type=int, default=None)
+        p.add_argument('--seed', type=int, default=42)
+        p.add_argument('--minimize', action='store_true', help='Menor objetivo é melhor')
+        p.add_argument('--top', type=int, default=10, help='Linhas do leaderboard exibidas')
+        p.add_argument('--out', default=None, help='Diretório para leaderboard.csv e best_config.json')
+    strategy = sub.choices['strategy']
+    strategy.add_argument('--symbols', required=True, help='Lista separada por vírgula')
+    strategy.add_argument('--resolution', default='1m', choices=sorted(RESOLUTION_S))
+    strategy.add_argument('--start', default=None, help='Início (ISO-8601)')
+    strategy.add_argument('--end', default=None, help='Fim (ISO-8601)')
+    strategy.add_argument('--objective', default='sharpe')
+    strategy.add_argument('--min-trades', type=int, default=5)
+    strategy.add_argument('--slippage', type=float, default=0.0, help='Slippage por lado (fração)')
+    model = sub.choices['model']
+    model.add_argument('--resolution', default=None, help='Resolução dos candles (padrão: CANDLE_RESOLUTION)')
+    model.add_argument('--objective', default='ev', choices=['ev', 'f1'])
+    model.add_argument('--cv-splits', type=int, default=None)
+    model.add_argument('--cv-gap', type=int, default=None)
+    model.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    if args.target == 'strategy':
+        conn = sqlite3.connect(args.db)
+        start = to_epoch(args.start) if args.start else None
+        end = to_epoch(args.end) if args.end else None
+        candles = {s: load_candles(conn, s, args.resolution, start, end) for s in args.symbols.split(',')}
+        conn.close()
+        candles = {s: df for s, df in candles.items() if len(df) > StrategyParams().min_price_history}
+        if not candles:
+            raise SystemExit("Sem candles suficientes para os símbolos pedidos")
+        result = sweep_strategy(candles, _load_space(args.space, DEFAULT_STRATEGY_SPACE), method=args.method,
+                                n_trials=args.trials, objective=args.objective, maximize=not args.minimize,
+                                min_trades=args.min_trades, workers=args.workers, seed=args.seed,
+                                slippage_pct=args.slippage)
+    else:
+        from ai.train_model import extract_data_from_db
+        raw = extract_data_from_db(args.db, args.resolution)
+        result = sweep_model(raw, _load_space(args.space, DEFAULT_MODEL_SPACE), method=args.method,
+                             n_trials=args.trials, objective=args.objective, maximize=not args.minimize,
+                             cv_splits=args.cv_splits, cv_gap=args.cv_gap, workers=args.workers,
+                             seed=args.seed, cache_dir=args.cache_dir)
+
+    print(result.leaderboard.head(args.top).to_string(index=False))
+    print(f"🏆 Melhor ({result.objective}): {json.dumps(result.best, default=_json_default)}")
+    if args.out:
+        result.save(args.out)
+        print(f"💾 {os.path.join(args.out, 'leaderboard.csv')} / best_config.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+PnL Ledger - Livro incremental de posição, custo médio e P&L realizado
+Cada trade gravado na tabela trades é aplicado uma única vez, em ordem de id:
+atualiza a posição e o custo médio do símbolo e soma o P&L realizado nos
+agregados por dia e por hora (pnl_buckets, uma linha por período/símbolo/lado,
+com contagem, volume, P&L realizado, ganhos/perdas e taxas). O cursor (último
+id aplicado) fica no banco junto com os agregados, na mesma transação; vários
+processos podem sincronizar o mesmo banco sem aplicar um trade duas vezes.
+
+Acumulados de todo o histórico (pnl_stats) avançam trade a trade na mesma
+transação: curva de P&L líquido (realizado - taxas) com pico e drawdown
+máximo, melhor e pior venda, sequência atual de ganhos/perdas. O P&L líquido
+por dia fica em memória com soma e soma dos quadrados: Sharpe em O(1).
+
+Consultas em O(1) na memória: P&L realizado do dia, exposição por símbolo e
+performance() (endpoints de performance). sync() só lê trades novos
+(id > cursor) e não abre transação de escrita se nada mudou.
+
+Uso:
+    ledger = PnLLedger('memecoin.db')
+    ledger.sync()                     # depois de inserir trades (qualquer processo)
+    ledger.daily_realized()           # P&L realizado de hoje (hora local)
+    ledger.exposure('DOGE/USDT')      # {'quantity', 'avg_cost', 'cost_basis'}
+    ledger.performance()              # totais, Sharpe, drawdown máximo, P&L por dia
+
+Reconstrução (após correção manual de trades antigos):
+    python pnl_ledger.py --rebuild
+"""
+
+import math
+import sqlite3
+import logging
+import threading
+from datetime import date as Date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from position_store import DEFAULT_DB_PATH
+
+log = logging.getLogger("PnLLedger")
+
+PERIODS = ('day', 'hour')
+
+# Posições com quantidade abaixo disso são consideradas zeradas (resíduo de float)
+EPS = 1e-12
+
+BUCKET_FIELDS = ['trades', 'amount', 'quote', 'price_sum', 'realized_pnl', 'wins', 'losses', 'fees']
+
+# Acumulados de todo o histórico (tabela pnl_stats); equity = P&L realizado - taxas
+STAT_FIELDS = ['trades', 'volume', 'realized_pnl', 'fees', 'wins', 'losses', 'best_trade', 'worst_trade',
+               'streak', 'equity', 'peak', 'max_drawdown']
+
+# Dias por ano no Sharpe anualizado (cripto negocia todos os dias)
+TRADING_DAYS = 365
+
+
+def ensure_fee_column(conn: sqlite3.Connection) -> bool:
+    """Adiciona trades.fee (taxa na moeda de cotação) em bancos antigos; False se não há tabela trades"""
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(trades)')]
+    if not columns:
+        return False
+    if 'fee' not in columns:
+        conn.execute('ALTER TABLE trades ADD COLUMN fee REAL DEFAULT 0')
+    return True
+
+
+def bucket_keys(date) -> Dict[str, str]:
+    """'2024-05-01 13:45:10' -> {'day': '2024-05-01', 'hour': '2024-05-01 13:00'} (hora local do registro)"""
+    text = str(date).replace('T', ' ')
+    return {'day': text[:10], 'hour': f"{text[:13]}:00"}
+
+
+class PnLLedger:
+    """Posições por custo médio e P&L realizado, atualizados a cada trade novo"""
+
+    def __init__(self, db_path: Optional[str] = None, clock=datetime.now):
+        self.db_path = db_path or DEFAULT_DB_PATH
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._cursor = 0
+        self._positions: Dict[str, Dict] = {}
+        self._daily: Dict[str, Dict[str, float]] = {}  # dia -> totais do dia (todos os símbolos)
+        self._stats: Dict[str, float] = {f: 0.0 for f in STAT_FIELDS}
+        self._day_net: Dict[str, float] = {}  # dia -> P&L líquido (todos os dias com trades)
+        self._first_day: Optional[str] = None
+        self._net_sum = self._net_sumsq = 0.0
+        self.init_database()
+        conn = self._connect()
+        try:
+            self._reload(conn)
+            migrate = self._cursor and not conn.execute('SELECT COUNT(*) FROM pnl_stats').fetchone()[0]
+        finally:
+            conn.close()
+        if migrate:
+            log.info("📒 Ledger anterior às estatísticas acumuladas: reconstruindo a partir dos trades")
+            self.rebuild()
+
+    # ===== Banco =====
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA busy_timeout=10000')
+        return conn
+
+    def init_database(self):
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pnl_positions (
+                    symbol TEXT PRIMARY KEY,
+                    quantity REAL NOT NULL,
+                    avg_cost REAL NOT NULL,
+                    realized_pnl REAL NOT NULL DEFAULT 0,
+                    last_trade_id INTEGER,
+                    updated_at TEXT
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pnl_buckets (
+                    period TEXT NOT NULL,
+                    bucket TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    side TEXT NOT NULL,
+                    trades INTEGER NOT NULL DEFAULT 0,
+                    amount REAL NOT NULL DEFAULT 0,
+                    quote REAL NOT NULL DEFAULT 0,
+                    price_sum REAL NOT NULL DEFAULT 0,
+                    realized_pnl REAL NOT NULL DEFAULT 0,
+                    wins INTEGER NOT NULL DEFAULT 0,
+                    losses INTEGER NOT NULL DEFAULT 0,
+                    first_trade TEXT,
+                    last_trade TEXT,
+                    PRIMARY KEY (period, bucket, symbol, side)
+                )
+            ''')
+            conn.execute('CREATE TABLE IF NOT EXISTS pnl_ledger_state (key TEXT PRIMARY KEY, value INTEGER)')
+            conn.execute('CREATE TABLE IF NOT EXISTS pnl_stats (key TEXT PRIMARY KEY, value REAL NOT NULL)')
+            # Bancos criados antes das taxas
+            if 'fees' not in [row[1] for row in conn.execute('PRAGMA table_info(pnl_buckets)')]:
+                conn.execute('ALTER TABLE pnl_buckets ADD COLUMN fees REAL NOT NULL DEFAULT 0')
+            ensure_fee_column(conn)
+        finally:
+            conn.close()
+
+    def _db_cursor(self, conn: sqlite3.Connection) -> int:
+        row = conn.execute("SELECT value FROM pnl_ledger_state WHERE key = 'last_trade_id'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _reload(self, conn: sqlite3.Connection):
+        """Estado em memória a partir do banco (início ou outro processo avançou o cursor)"""
+        positions = {}
+        for symbol, quantity, avg_cost, realized in conn.execute(
+                'SELECT symbol, quantity, avg_cost, realized_pnl FROM pnl_positions'):
+            positions[symbol] = {'quantity': quantity, 'avg_cost': avg_cost, 'realized_pnl': realized}
+        today = bucket_keys(self.clock())['day']
+        daily = {}
+        for day, *values in conn.execute(f'''
+                SELECT bucket, {', '.join(f'SUM({f})' for f in BUCKET_FIELDS)} FROM pnl_buckets
+                WHERE period = 'day' AND bucket >= ? GROUP BY bucket''', (today,)):
+            daily[day] = dict(zip(BUCKET_FIELDS, values))
+        stats = {f: 0.0 for f in STAT_FIELDS}
+        stats.update(conn.execute('SELECT key, value FROM pnl_stats').fetchall())
+        day_net = dict(conn.execute('''
+                SELECT bucket, SUM(realized_pnl) - SUM(fees) FROM pnl_buckets
+                WHERE period = 'day' GROUP BY bucket''').fetchall())
+        self._positions, self._daily, self._stats, self._day_net = positions, daily, stats, day_net
+        self._first_day = min(day_net) if day_net else None
+        self._net_sum = sum(day_net.values())
+        self._net_sumsq = sum(v * v for v in day_net.values())
+        self._cursor = self._db_cursor(conn)
+
+    # ===== Aplicação de trades =====
+
+    def sync(self) -> int:
+        """Aplica os trades novos (id > cursor); retorna quantos foram aplicados"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                try:
+                    last_id, db_cursor = conn.execute(
+                        "SELECT (SELECT MAX(id) FROM trades), "
+                        "(SELECT value FROM pnl_ledger_state WHERE key = 'last_trade_id')").fetchone()
+                except sqlite3.OperationalError as e:
+                    log.warning(f"⚠️ Ledger sem tabela trades: {e}")
+                    return 0
+                if (last_id or 0) <= self._cursor and (db_cursor or 0) == self._cursor:
+                    return 0
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    if self._db_cursor(conn) != self._cursor:
+                        self._reload(conn)
+                    applied = self._apply_new(conn)
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    self._reload(conn)
+                    raise
+                return applied
+            finally:
+                conn.close()
+
+    def _apply_new(self, conn: sqlite3.Connection) -> int:
+        fee_column = 'fee' if ensure_fee_column(conn) else '0'
+        rows = conn.execute(f'''
+            SELECT id, date, type, symbol, amount, price, total, status, {fee_column} FROM trades
+            WHERE id > ? ORDER BY id
+        ''', (self._cursor,)).fetchall()
+        if not rows:
+            return 0
+
+        now = self.clock().isoformat()
+        positions = {s: dict(p) for s, p in self._positions.items()}
+        buckets: Dict[tuple, Dict] = {}
+        stats = dict(self._stats)
+        day_net_delta: Dict[str, float] = {}
+        touched, cursor, applied = {}, self._cursor, 0
+        for trade_id, date, side, symbol, amount, price, total, status, fee in rows:
+            cursor = trade_id
+            date = str(date or now)
+            side = (side or '').lower()
+            if side not in ('buy', 'sell') or (status not in (None, 'completed')) or not amount or not price:
+                continue
+            amount, price = float(amount), float(price)
+            quote = float(total) if total else amount * price
+            fee = float(fee or 0)
+            realized = self._apply_fill(positions, symbol, side, amount, price)
+            touched[symbol] = trade_id
+            applied += 1
+            self._apply_stats(stats, side, quote, realized, fee)
+            keys = bucket_keys(date)
+            day_net_delta[keys['day']] = day_net_delta.get(keys['day'], 0.0) + realized - fee
+            for period, bucket in keys.items():
+                b = buckets.setdefault((period, bucket, symbol, side), {
+                    **{f: 0 for f in BUCKET_FIELDS}, 'first_trade': date, 'last_trade': date})
+                b['trades'] += 1
+                b['amount'] += amount
+                b['quote'] += quote
+                b['price_sum'] += price
+                b['realized_pnl'] += realized
+                b['wins'] += side == 'sell' and realized > 0
+                b['losses'] += side == 'sell' and realized < 0
+                b['fees'] += fee
+                b['first_trade'] = min(b['first_trade'], date)
+                b['last_trade'] = max(b['last_trade'], date)
+
+        conn.executemany('''
+            INSERT INTO pnl_positions (symbol, quantity, avg_cost, realized_pnl, last_trade_id, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(symbol) DO UPDATE SET quantity = excluded.quantity, avg_cost = excluded.avg_cost,
+                realized_pnl = excluded.realized_pnl, last_trade_id = excluded.last_trade_id,
+                updated_at = excluded.updated_at
+        ''', [(s, positions[s]['quantity'], positions[s]['avg_cost'], positions[s]['realized_pnl'], tid, now)
+              for s, tid in touched.items()])
+        conn.executemany(f'''
+            INSERT INTO pnl_buckets (period, bucket, symbol, side, {', '.join(BUCKET_FIELDS)}, first_trade, last_trade)
+            VALUES (?, ?, ?, ?, {', '.join('?' * len(BUCKET_FIELDS))}, ?, ?)
+            ON CONFLICT(period, bucket, symbol, side) DO UPDATE SET
+                {', '.join(f'{f} = {f} + excluded.{f}' for f in BUCKET_FIELDS)},
+                first_trade = MIN(first_trade, excluded.first_trade),
+                last_trade = MAX(last_trade, excluded.last_trade)
+        ''', [(*key, *(b[f] for f in BUCKET_FIELDS), b['first_trade'], b['last_trade'])
+              for key, b in buckets.items()])
+        conn.executemany('INSERT OR REPLACE INTO pnl_stats (key, value) VALUES (?, ?)', stats.items())
+        conn.execute("INSERT OR REPLACE INTO pnl_ledger_state (key, value) VALUES ('last_trade_id', ?)", (cursor,))
+
+        today = bucket_keys(self.clock())['day']
+        daily = {day: dict(totals) for day, totals in self._daily.items() if day >= today}
+        for (period, bucket, _, _), b in buckets.items():
+            if period == 'day' and bucket >= today:
+                totals = daily.setdefault(bucket, {f: 0 for f in BUCKET_FIELDS})
+                for f in BUCKET_FIELDS:
+                    totals[f] += b[f]
+        for day, delta in day_net_delta.items():
+            before = self._day_net.get(day, 0.0)
+            self._day_net[day] = before + delta
+            self._net_sum += delta
+            self._net_sumsq += (before + delta) ** 2 - before ** 2
+            self._first_day = min(self._first_day or day, day)
+        self._positions, self._daily, self._stats, self._cursor = positions, daily, stats, cursor
+        if applied:
+            log.info(f"📒 Ledger: {applied} trades aplicados (cursor {cursor})")
+        return applied
+
+    @staticmethod
+    def _apply_stats(stats: Dict[str, float], side: str, quote: float, realized: float, fee: float):
+        """Acumulados de um trade: totais, melhor/pior venda, sequência e drawdown da curva líquida"""
+        stats['trades'] += 1
+        stats['volume'] += quote
+        stats['realized_pnl'] += realized
+        stats['fees'] += fee
+        if side == 'sell' and realized != 0:
+            first_close = stats['wins'] + stats['losses'] == 0
+            stats['best_trade'] = realized if first_close else max(stats['best_trade'], realized)
+            stats['worst_trade'] = realized if first_close else min(stats['worst_trade'], realized)
+            if realized > 0:
+                stats['wins'] += 1
+                stats['streak'] = stats['streak'] + 1 if stats['streak'] > 0 else 1
+            else:
+                stats['losses'] += 1
+                stats['streak'] = stats['streak'] - 1 if stats['streak'] < 0 else -1
+        stats['equity'] += realized - fee
+        stats['peak'] = max(stats['peak'], stats['equity'])
+        stats['max_drawdown'] = max(stats['max_drawdown'], stats['peak'] - stats['equity'])
+
+    @staticmethod
+    def _apply_fill(positions: Dict[str, Dict], symbol: str, side: str, amount: float, price: float) -> float:
+        """Custo médio: compra ajusta o custo, venda realiza (só até a quantidade em carteira)"""
+        position = positions.setdefault(symbol, {'quantity': 0.0, 'avg_cost': 0.0, 'realized_pnl': 0.0})
+        if side == 'buy':
+            quantity = position['quantity'] + amount
+            position['avg_cost'] = (position['avg_cost'] * position['quantity'] + price * amount) / quantity
+            position['quantity'] = quantity
+            return 0.0
+        sold = min(amount, position['quantity'])
+        realized = sold * (price - position['avg_cost'])
+        position['quantity'] -= sold
+        position['realized_pnl'] += realized
+        if position['quantity'] <= EPS:
+            position['quantity'], position['avg_cost'] = 0.0, 0.0
+        return realized
+
+    # ===== Consultas (memória) =====
+
+    def day_totals(self, day: Optional[str] = None) -> Dict[str, float]:
+        """Totais do dia (hoje por padrão): trades, amount, quote, realized_pnl, wins, losses"""
+        day = day or bucket_keys(self.clock())['day']
+        with self._lock:
+            totals = self._daily.get(day)
+        return dict(totals) if totals else {f: 0 for f in BUCKET_FIELDS}
+
+    def daily_realized(self, day: Optional[str] = None) -> float:
+        """P&L realizado do dia (hoje por padrão)"""
+        return float(self.day_totals(day)['realized_pnl'])
+
+    def exposure(self, symbol: str) -> Dict[str, float]:
+        """Posição aberta do símbolo a custo médio"""
+        with self._lock:
+            p = self._positions.get(symbol)
+        if not p or p['quantity'] <= EPS:
+            return {'quantity': 0.0, 'avg_cost': 0.0, 'cost_basis': 0.0}
+        return {'quantity': p['quantity'], 'avg_cost': p['avg_cost'], 'cost_basis': p['quantity'] * p['avg_cost']}
+
+    def positions(self) -> Dict[str, Dict[str, float]]:
+        """Posições abertas: {symbol: {quantity, avg_cost, cost_basis, realized_pnl}}"""
+        with self._lock:
+            items = [(s, dict(p)) for s, p in self._positions.items() if p['quantity'] > EPS]
+        return {s: {**p, 'cost_basis': p['quantity'] * p['avg_cost']} for s, p in items}
+
+    # ===== Consultas (agregados persistidos) =====
+
+    def buckets(self, period: str = 'day', since: Optional[str] = None, side: Optional[str] = None) -> List[Dict]:
+        """Agregados por período desde `since` (bucket), somados entre símbolos: por (bucket, side)"""
+        if period not in PERIODS:
+            raise ValueError(f"Período inválido: {period} (use {', '.join(PERIODS)})")
+        sql = (f"SELECT bucket, side, {', '.join(f'SUM({f})' for f in BUCKET_FIELDS)}, MIN(first_trade), "
+               f"MAX(last_trade) FROM pnl_buckets WHERE period = ?")
+        params: list = [period]
+        if since:
+            sql += ' AND bucket >= ?'
+            params.append(since)
+        if side:
+            sql += ' AND side = ?'
+            params.append(side)
+        sql += ' GROUP BY bucket, side ORDER BY bucket, side'
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        return [{'bucket': r[0], 'side': r[1], **dict(zip(BUCKET_FIELDS, r[2:-2])),
+                 'first_trade': r[-2], 'last_trade': r[-1]} for r in rows]
+
+    def sharpe_ratio(self) -> Optional[float]:
+        """Sharpe anualizado do P&L líquido diário, do primeiro dia com trades até hoje (dias sem trade = 0).
+
+        Média/desvio não dependem da escala: sobre P&L em USD equivale ao Sharpe
+        dos retornos sobre um capital fixo. Sem taxa livre de risco.
+        """
+        with self._lock:
+            first_day, total, total_sq = self._first_day, self._net_sum, self._net_sumsq
+        if first_day is None:
+            return None
+        n = (self.clock().date() - Date.fromisoformat(first_day)).days + 1
+        if n < 2:
+            return None
+        mean = total / n
+        variance = (total_sq - n * mean * mean) / (n - 1)
+        if variance <= 1e-18:
+            return None
+        return mean / math.sqrt(variance) * math.sqrt(TRADING_DAYS)
+
+    def performance(self, days: int = 30) -> Dict:
+        """Métricas de todo o histórico e P&L líquido dos últimos `days` dias (custo fixo por consulta)"""
+        recent = [bucket_keys(self.clock() - timedelta(days=i))['day'] for i in range(days - 1, -1, -1)]
+        with self._lock:
+            stats = dict(self._stats)
+            daily_pnl = [{'date': day, 'pnl': self._day_net.get(day, 0.0)} for day in recent]
+        closed = int(stats['wins'] + stats['losses'])
+        return {
+            'total_trades': int(stats['trades']),
+            'closed_trades': closed,
+            'profitable_trades': int(stats['wins']),
+            'losing_trades': int(stats['losses']),
+            'win_rate': round(stats['wins'] / closed * 100, 2) if closed else 0.0,
+            'total_volume': stats['volume'],
+            'realized_pnl': stats['realized_pnl'],
+            'fees': stats['fees'],
+            'total_profit': stats['equity'],  # realizado - taxas
+            'best_trade': stats['best_trade'] if closed else None,
+            'worst_trade': stats['worst_trade'] if closed else None,
+            'current_streak': int(stats['streak']),  # >0 vendas com lucro seguidas, <0 com prejuízo
+            'max_drawdown': stats['max_drawdown'],  # USD, do pico ao vale da curva líquida
+            'sharpe_ratio': self.sharpe_ratio(),
+            'daily_pnl': daily_pnl,
+        }
+
+    def days_ago(self, days: int) -> str:
+        return bucket_keys(self.clock() - timedelta(days=days))['day']
+
+    def rebuild(self) -> int:
+        """Zera o livro e reaplica toda a tabela trades (após correção manual de trades antigos)"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    for table in ('pnl_positions', 'pnl_buckets', 'pnl_ledger_state', 'pnl_stats'):
+                        conn.execute(f'DELETE FROM {table}')
+                    self._positions, self._daily, self._cursor = {}, {}, 0
+                    self._stats, self._day_net, self._first_day = {f: 0.0 for f in STAT_FIELDS}, {}, None
+                    self._net_sum = self._net_sumsq = 0.0
+                    applied = self._apply_new(conn)
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    self._reload(conn)
+                    raise
+                return applied
+            finally:
+                conn.close()
+
+
+def main():
+    """Sincroniza ou reconstrói o livro de P&L do memecoin.db"""
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Livro de P&L e agregados diários/horários dos trades")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='Caminho do banco SQLite')
+    parser.add_argument('--rebuild', action='store_true', help='Recalcular a partir de toda a tabela trades')
+    args = parser.parse_args()
+
+    ledger = PnLLedger(args.db)
+    if args.rebuild:
+        print(f"📒 {ledger.rebuild()} trades reaplicados")
+    else:
+        print(f"📒 {ledger.sync()} trades novos aplicados")
+    summary = ledger.performance(days=1)
+    sharpe = summary['sharpe_ratio']
+    print(f"📒 {summary['total_trades']} trades | P&L líquido {summary['total_profit']:.2f} | "
+          f"drawdown máx. {summary['max_drawdown']:.2f} | Sharpe {'-' if sharpe is None else f'{sharpe:.2f}'}")
+
+
+if __name__ == "__main__":
+    main()
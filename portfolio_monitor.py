@@ -11,8 +11,9 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+from position_state import PositionState
+from logging_setup import setup_logging
+
 log = logging.getLogger("PortfolioMonitor")
 
 class PortfolioPosition:
@@ -31,8 +32,13 @@ class PortfolioPosition:
         self.peak_performance_pct = 0.0  # Performance máxima atingida
         self.trailing_stop_triggered = False
         
+        # Marca a posição como alterada desde a última gravação no banco
+        self.dirty = True
+        
     def update_current_price(self, current_price: float):
         """Atualiza o preço atual da posição e o trailing stop"""
+        if current_price != self.current_price:
+            self.dirty = True
         self.current_price = current_price
         self.last_update = datetime.now().isoformat()
         
@@ -107,14 +113,52 @@ class PortfolioPosition:
             return (datetime.now() - buy_datetime).days
         except:
             return 0
+    
+    def to_record(self) -> Dict:
+        """Estado persistido no PositionStore"""
+        return {
+            'symbol': self.symbol,
+            'buy_price': self.buy_price,
+            'quantity': self.quantity,
+            'buy_date': self.buy_date,
+            'trade_id': self.trade_id,
+            'current_price': self.current_price,
+            'last_update': self.last_update,
+            'peak_price': self.peak_price,
+            'peak_performance_pct': self.peak_performance_pct,
+            'trailing_stop_triggered': self.trailing_stop_triggered
+        }
+    
+    @classmethod
+    def from_record(cls, record: Dict) -> 'PortfolioPosition':
+        """Restaura posição (incluindo pico e trailing stop) a partir do banco"""
+        position = cls(
+            symbol=record['symbol'],
+            buy_price=record['buy_price'],
+            quantity=record['quantity'],
+            buy_date=record['buy_date'],
+            trade_id=record.get('trade_id')
+        )
+        position.current_price = record.get('current_price') or 0.0
+        position.last_update = record.get('last_update')
+        position.peak_price = record.get('peak_price') or position.buy_price
+        position.peak_performance_pct = record.get('peak_performance_pct') or 0.0
+        position.trailing_stop_triggered = bool(record.get('trailing_stop_triggered'))
+        position.dirty = False
+        return position
 
 class PortfolioMonitor:
     """Monitor de performance do portfólio"""
     
-    def __init__(self, api_base: str = "http://localhost:5000"):
+    def __init__(self, api_base: str = "http://localhost:5000", db_path: str = None,
+                 portfolio_file: str = "portfolio_positions.json", state: PositionState = None):
         self.api_base = api_base
         self.positions: Dict[str, PortfolioPosition] = {}
-        self.portfolio_file = "portfolio_positions.json"
+        # Arquivo JSON legado - usado apenas para importação única
+        self.portfolio_file = portfolio_file
+        # Estado compartilhado com o agente (fonte única das posições abertas)
+        self.state = state if state is not None else PositionState(db_path=db_path, legacy_json=portfolio_file)
+        self.store = self.state.store
         self.load_positions()
         
         # Configurações de alertas - STOP LOSS
@@ -127,82 +171,30 @@ class PortfolioMonitor:
         log.info(f"   🎯 Take Profit: {self.take_profit_threshold}%")
         
     def load_positions(self):
-        """Carrega posições do arquivo ou do histórico de trades"""
+        """Carrega posições do estado compartilhado (banco local, sem chamadas ao backend)"""
         try:
-            # Tentar carregar do arquivo primeiro
-            try:
-                with open(self.portfolio_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    for pos_data in data.get('positions', []):
-                        position = PortfolioPosition(
-                            symbol=pos_data['symbol'],
-                            buy_price=pos_data['buy_price'],
-                            quantity=pos_data['quantity'],
-                            buy_date=pos_data['buy_date'],
-                            trade_id=pos_data.get('trade_id')
-                        )
-                        self.positions[pos_data['symbol']] = position
-                log.info(f"📊 Carregadas {len(self.positions)} posições do arquivo")
-            except FileNotFoundError:
-                log.info("📊 Arquivo de posições não encontrado, carregando do histórico de trades")
-                self._load_from_trades_history()
+            self.positions = {
+                record['symbol']: PortfolioPosition.from_record(record)
+                for record in self.state.records()
+            }
+            if self.positions:
+                log.info(f"📊 Carregadas {len(self.positions)} posições do banco")
+            else:
+                log.info("📊 Nenhuma posição aberta")
                 
         except Exception as e:
             log.error(f"❌ Erro ao carregar posições: {e}")
     
-    def _load_from_trades_history(self):
-        """Carrega posições do histórico de trades via API"""
-        try:
-            response = requests.get(f"{self.api_base}/api/trades", timeout=10)
-            if response.status_code == 200:
-                trades = response.json()
-                
-                # Processar apenas trades de compra que ainda não foram vendidos
-                buy_trades = [t for t in trades if t.get('type') == 'buy']
-                sell_trades = [t for t in trades if t.get('type') == 'sell']
-                
-                # Criar conjunto de moedas já vendidas
-                sold_symbols = {t.get('symbol') for t in sell_trades}
-                
-                for trade in buy_trades:
-                    symbol = trade.get('symbol')
-                    if symbol and symbol not in sold_symbols:
-                        position = PortfolioPosition(
-                            symbol=symbol,
-                            buy_price=float(trade.get('price', 0)),
-                            quantity=float(trade.get('amount', 0)),
-                            buy_date=trade.get('date'),
-                            trade_id=str(trade.get('id'))
-                        )
-                        self.positions[symbol] = position
-                
-                log.info(f"📊 Carregadas {len(self.positions)} posições ativas do histórico")
-                self.save_positions()
-                
-        except Exception as e:
-            log.error(f"❌ Erro ao carregar do histórico: {e}")
-    
     def save_positions(self):
-        """Salva posições no arquivo"""
+        """Grava no banco apenas as posições alteradas desde a última gravação"""
         try:
-            data = {
-                'last_update': datetime.now().isoformat(),
-                'positions': []
-            }
-            
-            for position in self.positions.values():
-                data['positions'].append({
-                    'symbol': position.symbol,
-                    'buy_price': position.buy_price,
-                    'quantity': position.quantity,
-                    'buy_date': position.buy_date,
-                    'trade_id': position.trade_id,
-                    'current_price': position.current_price,
-                    'last_update': position.last_update
-                })
+            dirty = [p for p in self.positions.values() if p.dirty]
+            if not dirty:
+                return
             
-            with open(self.portfolio_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            self.state.update([p.to_record() for p in dirty])
+            for position in dirty:
+                position.dirty = False
                 
         except Exception as e:
             log.error(f"❌ Erro ao salvar posições: {e}")
@@ -212,16 +204,28 @@ class PortfolioMonitor:
         if buy_date is None:
             buy_date = datetime.now().isoformat()
             
-        position = PortfolioPosition(symbol, buy_price, quantity, buy_date, trade_id)
-        self.positions[symbol] = position
-        self.save_positions()
+        record = self.state.on_fill(symbol, 'buy', buy_price, quantity, trade_id=trade_id, date=buy_date)
+        self.positions[symbol] = PortfolioPosition.from_record(record)
         log.info(f"📊 Nova posição adicionada: {symbol} @ ${buy_price}")
     
+    def reduce_position(self, symbol: str, quantity: float, price: float):
+        """Aplica uma venda executada (parcial ou total) à posição"""
+        record = self.state.on_fill(symbol, 'sell', price, quantity)
+        if record is None:
+            self.positions.pop(symbol, None)
+            log.info(f"📊 Posição removida: {symbol}")
+        elif symbol in self.positions:
+            self.positions[symbol].quantity = record['quantity']
+            log.info(f"📊 Venda parcial de {symbol}: restam {record['quantity']}")
+
     def remove_position(self, symbol: str):
         """Remove uma posição do portfólio (quando vendida)"""
         if symbol in self.positions:
-            del self.positions[symbol]
-            self.save_positions()
+            position = self.positions.pop(symbol)
+            try:
+                self.state.close(symbol, current_price=position.current_price or None)
+            except Exception as e:
+                log.error(f"❌ Erro ao remover posição do banco: {e}")
             log.info(f"📊 Posição removida: {symbol}")
     
     def update_prices(self):
@@ -310,15 +314,17 @@ class PortfolioMonitor:
                     'type': 'trailing_stop',
                     'symbol': position.symbol,
                     'current_price': position.current_price,
-                    'purchase_price': position.purchase_price,
+                    'purchase_price': position.buy_price,
                     'performance_pct': perf['performance_pct'],
                     'threshold': -self.trailing_stop_percentage,
-                    'message': f"🛑 STOP LOSS: {position.symbol} caiu {abs(perf['performance_pct']):.2f}% do preço de compra (${position.purchase_price:.6f})",
+                    'message': f"🛑 STOP LOSS: {position.symbol} caiu {abs(perf['performance_pct']):.2f}% do preço de compra (${position.buy_price:.6f})",
                     'recommendation': 'VENDER TOTAL - Proteção contra perdas'
                 })
                 
                 # Marcar trailing stop como acionado
-                position.trailing_stop_triggered = True
+                if not position.trailing_stop_triggered:
+                    position.trailing_stop_triggered = True
+                    position.dirty = True
             
             # 🎯 TAKE PROFIT: Manter como estava
             elif perf['performance_pct'] >= self.take_profit_threshold:
@@ -331,6 +337,9 @@ class PortfolioMonitor:
                     'recommendation': 'CONSIDERAR VENDA'
                 })
         
+        # Persistir estado de trailing stop acionado
+        self.save_positions()
+        
         return alerts
     
     def monitor_loop(self, interval_seconds: int = 60):
@@ -364,6 +373,7 @@ class PortfolioMonitor:
 
 def main():
     """Função principal para testar o monitor"""
+    setup_logging()
     monitor = PortfolioMonitor()
     
     # Mostrar performance atual
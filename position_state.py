@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Position State - Estado único das posições abertas
+Carregado uma vez do memecoin.db, atualizado a cada execução (fill) e
+consultado em O(1) para a proteção contra compras duplicadas. Substitui o
+set purchased_coins do agente e a releitura de /api/trades via HTTP.
+"""
+
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from position_store import PositionStore
+
+log = logging.getLogger("PositionState")
+
+# Resíduo (fração da posição) que ainda conta como venda total: arredondamento da quantidade
+CLOSE_TOLERANCE = 1e-6
+
+# Marcador da carga inicial (JSON legado ou reconstrução pela tabela trades)
+BOOTSTRAP_MIGRATION = 'positions_bootstrap'
+
+
+class PositionState:
+    """Índice em memória das posições abertas, persistido no PositionStore"""
+
+    def __init__(self, store: Optional[PositionStore] = None, db_path: Optional[str] = None,
+                 legacy_json: Optional[str] = None):
+        self.store = store or PositionStore(db_path)
+        self.legacy_json = legacy_json
+        self._open: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    # ===== Carga =====
+
+    def load(self):
+        """Carrega as posições do banco.
+
+        Na primeira carga de um banco sem posições, migra o JSON legado ou
+        reconstrói pela tabela trades. Depois disso um banco vazio significa
+        que tudo foi vendido: nada é reimportado num reinício.
+        """
+        if not self.store.is_migrated(BOOTSTRAP_MIGRATION):
+            if self.store.count() == 0:
+                if self.legacy_json and self.store.import_json(self.legacy_json):
+                    log.info(f"📊 Posições migradas de {self.legacy_json} para o banco")
+                else:
+                    self.bootstrap_from_trades()
+            self.store.mark_migrated(BOOTSTRAP_MIGRATION)
+
+        with self._lock:
+            self._open = {record['symbol']: record for record in self.store.load_all()}
+        log.info(f"🛡️ Estado de posições: {len(self._open)} abertas")
+
+    def bootstrap_from_trades(self) -> int:
+        """Reconstrói as posições abertas a partir da tabela trades local (execução única)"""
+        try:
+            conn = sqlite3.connect(self.store.db_path, timeout=10)
+            try:
+                rows = conn.execute('''
+                    SELECT id, date, type, symbol, amount, price FROM trades
+                    WHERE status IS NULL OR status = 'completed'
+                    ORDER BY date, id
+                ''').fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            log.warning(f"🛡️ Tabela trades indisponível para reconstruir posições: {e}")
+            return 0
+
+        positions: Dict[str, Dict] = {}
+        for trade_id, date, side, symbol, amount, price in rows:
+            self._apply_fill(positions, symbol, side, float(price), float(amount), str(trade_id), date)
+
+        if positions:
+            self.store.upsert(positions.values(), event='import')
+            log.info(f"🛡️ {len(positions)} posições abertas reconstruídas do histórico de trades")
+        return len(positions)
+
+    # ===== Consulta =====
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._open
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    def holds(self, symbol: str) -> bool:
+        return symbol in self._open
+
+    def get(self, symbol: str) -> Optional[Dict]:
+        record = self._open.get(symbol)
+        return dict(record) if record else None
+
+    def symbols(self) -> List[str]:
+        return sorted(self._open)
+
+    def records(self) -> List[Dict]:
+        with self._lock:
+            return [dict(r) for r in self._open.values()]
+
+    # ===== Atualização =====
+
+    def on_fill(self, symbol: str, side: str, price: float, quantity: float,
+                trade_id: Optional[str] = None, date: Optional[str] = None) -> Optional[Dict]:
+        """Aplica uma execução: compra abre/aumenta a posição, venda reduz a
+        quantidade executada (parcial inclusive) e fecha quando zera.
+
+        Retorna a posição resultante (None se a posição foi fechada).
+        """
+        with self._lock:
+            position = self._apply_fill(self._open, symbol, side, float(price), float(quantity),
+                                        trade_id, date or datetime.now().isoformat())
+            if position is not None:
+                self.store.upsert([position])
+                return dict(position)
+            self.store.delete(symbol, current_price=float(price) or None)
+        return None
+
+    def update(self, records: Iterable[Dict]) -> int:
+        """Grava alterações de posições já abertas (preço atual, pico, trailing stop).
+
+        Filtro, gravação e cópia em memória sob o mesmo lock: uma posição fechada
+        no meio (venda do agente) não volta para a tabela nem para _open.
+        """
+        with self._lock:
+            records = [r for r in records if r['symbol'] in self._open]
+            if not records:
+                return 0
+            changed = self.store.upsert(records)
+            for record in records:
+                self._open[record['symbol']] = PositionStore._normalize(record)
+        return changed
+
+    def close(self, symbol: str, current_price: Optional[float] = None) -> bool:
+        """Fecha a posição (venda ou remoção manual), liberando nova compra"""
+        with self._lock:
+            if self._open.pop(symbol, None) is None:
+                return False
+            return self.store.delete(symbol, current_price=current_price)
+
+    @staticmethod
+    def _apply_fill(positions: Dict[str, Dict], symbol: str, side: str, price: float,
+                    quantity: float, trade_id: Optional[str], date: Optional[str]) -> Optional[Dict]:
+        current = positions.get(symbol)
+        if side == 'sell':
+            if current is None:
+                return None
+            remaining = current['quantity'] - quantity
+            if remaining <= current['quantity'] * CLOSE_TOLERANCE:
+                positions.pop(symbol)
+                return None
+            current['quantity'] = remaining
+            return current
+
+        if current is None:
+            current = PositionStore._normalize({
+                'symbol': symbol,
+                'buy_price': price,
+                'quantity': quantity,
+                'buy_date': date,
+                'trade_id': trade_id,
+            })
+        else:
+            # Compra adicional: preço médio ponderado
+            total_qty = current['quantity'] + quantity
+            if total_qty > 0:
+                current['buy_price'] = (current['buy_price'] * current['quantity'] + price * quantity) / total_qty
+            current['quantity'] = total_qty
+            current['peak_price'] = max(current['peak_price'], current['buy_price'])
+        positions[symbol] = current
+        return current
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Position Store - Persistência transacional das posições do portfólio
+Guarda posições, picos e estado de trailing stop no memecoin.db (SQLite),
+com upsert apenas das linhas alteradas e histórico append-only para auditoria.
+"""
+
+import os
+import json
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+log = logging.getLogger("PositionStore")
+
+DEFAULT_DB_PATH = os.getenv(
+    'DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'memecoin.db')
+)
+
+# Colunas persistidas de cada posição (ordem usada nos INSERTs)
+POSITION_FIELDS = [
+    'symbol', 'buy_price', 'quantity', 'buy_date', 'trade_id',
+    'current_price', 'last_update', 'peak_price', 'peak_performance_pct',
+    'trailing_stop_triggered',
+]
+
+# Marcador da importação única do portfolio_positions.json
+LEGACY_JSON_MIGRATION = 'legacy_json'
+
+
+def init_migrations_table(conn: sqlite3.Connection):
+    """Tabela das migrações de execução única do banco (importação do JSON legado, formato de datas...)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS portfolio_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at DATETIME NOT NULL
+        )
+    ''')
+
+
+def migration_applied(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute('SELECT 1 FROM portfolio_migrations WHERE name = ?', (name,)).fetchone() is not None
+
+
+def record_migration(conn: sqlite3.Connection, name: str):
+    conn.execute('INSERT OR IGNORE INTO portfolio_migrations (name, applied_at) VALUES (?, ?)',
+                 (name, datetime.now().isoformat(sep=' ')))
+
+# Campos cuja mudança gera um evento no histórico (além de open/close)
+AUDITED_FIELDS = ['buy_price', 'quantity', 'peak_price', 'trailing_stop_triggered']
+
+
+class PositionStore:
+    """Armazena posições abertas na tabela portfolio_positions"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or DEFAULT_DB_PATH
+        self.init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Abre conexão com WAL e busy_timeout para tolerar vários escritores"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def init_database(self):
+        """Cria tabelas de posições e histórico se não existirem"""
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS portfolio_positions (
+                    symbol TEXT PRIMARY KEY,
+                    buy_price REAL NOT NULL,
+                    quantity REAL NOT NULL,
+                    buy_date TEXT,
+                    trade_id TEXT,
+                    current_price REAL DEFAULT 0,
+                    last_update TEXT,
+                    peak_price REAL DEFAULT 0,
+                    peak_performance_pct REAL DEFAULT 0,
+                    trailing_stop_triggered INTEGER DEFAULT 0,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS portfolio_position_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    symbol TEXT NOT NULL,
+                    event TEXT NOT NULL,
+                    buy_price REAL,
+                    quantity REAL,
+                    current_price REAL,
+                    peak_price REAL,
+                    trailing_stop_triggered INTEGER,
+                    trade_id TEXT,
+                    timestamp DATETIME NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_position_history_symbol
+                ON portfolio_position_history(symbol, timestamp)
+            ''')
+            init_migrations_table(conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ===== Leitura =====
+
+    def load_all(self) -> List[Dict]:
+        """Retorna todas as posições abertas"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT {', '.join(POSITION_FIELDS)} FROM portfolio_positions ORDER BY symbol"
+            ).fetchall()
+            return [self._row_to_dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def get(self, symbol: str) -> Optional[Dict]:
+        """Retorna uma posição pelo símbolo"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                f"SELECT {', '.join(POSITION_FIELDS)} FROM portfolio_positions WHERE symbol = ?",
+                (symbol,)
+            ).fetchone()
+            return self._row_to_dict(row) if row else None
+        finally:
+            conn.close()
+
+    def is_migrated(self, name: str) -> bool:
+        """True se a migração de execução única `name` já foi aplicada neste banco"""
+        conn = self._connect()
+        try:
+            return migration_applied(conn, name)
+        finally:
+            conn.close()
+
+    def mark_migrated(self, name: str):
+        """Registra a migração `name` (idempotente)"""
+        conn = self._connect()
+        try:
+            with conn:
+                record_migration(conn, name)
+        finally:
+            conn.close()
+
+    def count(self) -> int:
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT COUNT(*) FROM portfolio_positions').fetchone()[0]
+        finally:
+            conn.close()
+
+    def history(self, symbol: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """Retorna eventos do histórico (mais recentes primeiro)"""
+        conn = self._connect()
+        try:
+            if symbol:
+                rows = conn.execute('''
+                    SELECT * FROM portfolio_position_history
+                    WHERE symbol = ? ORDER BY id DESC LIMIT ?
+                ''', (symbol, limit)).fetchall()
+            else:
+                rows = conn.execute('''
+                    SELECT * FROM portfolio_position_history
+                    ORDER BY id DESC LIMIT ?
+                ''', (limit,)).fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    # ===== Escrita =====
+
+    def upsert(self, positions: Iterable[Dict], event: str = 'update') -> int:
+        """Insere/atualiza posições numa única transação.
+
+        Linhas idênticas ao que já está no banco não são reescritas. Retorna o
+        número de linhas efetivamente alteradas.
+        """
+        positions = [self._normalize(p) for p in positions]
+        if not positions:
+            return 0
+
+        conn = self._connect()
+        try:
+            with conn:
+                symbols = [p['symbol'] for p in positions]
+                previous = self._fetch_many(conn, symbols)
+
+                changed = []
+                history = []
+                now = datetime.now().isoformat()
+                for pos in positions:
+                    old = previous.get(pos['symbol'])
+                    if old is None:
+                        changed.append(pos)
+                        history.append(self._history_row(pos, 'open' if event == 'update' else event, now))
+                        continue
+                    if any(old[f] != pos[f] for f in POSITION_FIELDS):
+                        changed.append(pos)
+                        if event != 'update' or any(old[f] != pos[f] for f in AUDITED_FIELDS):
+                            history.append(self._history_row(pos, self._classify(old, pos, event), now))
+
+                if changed:
+                    conn.executemany(f'''
+                        INSERT INTO portfolio_positions ({', '.join(POSITION_FIELDS)}, updated_at)
+                        VALUES ({', '.join('?' for _ in POSITION_FIELDS)}, CURRENT_TIMESTAMP)
+                        ON CONFLICT(symbol) DO UPDATE SET
+                            {', '.join(f'{f} = excluded.{f}' for f in POSITION_FIELDS[1:])},
+                            updated_at = CURRENT_TIMESTAMP
+                    ''', [tuple(p[f] for f in POSITION_FIELDS) for p in changed])
+                if history:
+                    self._append_history(conn, history)
+                return len(changed)
+        finally:
+            conn.close()
+
+    def delete(self, symbol: str, current_price: Optional[float] = None) -> bool:
+        """Remove uma posição (venda) registrando o evento 'close'"""
+        conn = self._connect()
+        try:
+            with conn:
+                old = self._fetch_many(conn, [symbol]).get(symbol)
+                if old is None:
+                    return False
+                conn.execute('DELETE FROM portfolio_positions WHERE symbol = ?', (symbol,))
+                if current_price is not None:
+                    old['current_price'] = current_price
+                self._append_history(conn, [self._history_row(old, 'close', datetime.now().isoformat())])
+                return True
+        finally:
+            conn.close()
+
+    def import_json(self, path: str, overwrite: bool = False) -> int:
+        """Importa uma única vez o antigo portfolio_positions.json.
+
+        Só importa se a importação nunca rodou neste banco e a tabela estiver
+        vazia, a não ser que overwrite=True. Posições fechadas depois da
+        importação não voltam do JSON num reinício.
+        """
+        if not os.path.exists(path):
+            return 0
+        if not overwrite and self.is_migrated(LEGACY_JSON_MIGRATION):
+            return 0
+        if not overwrite and self.count() > 0:
+            log.info(f"📊 Importação ignorada: já existem posições no banco ({self.db_path})")
+            self.mark_migrated(LEGACY_JSON_MIGRATION)
+            return 0
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        positions = []
+        for pos_data in data.get('positions', []):
+            buy_price = float(pos_data['buy_price'])
+            positions.append({
+                'symbol': pos_data['symbol'],
+                'buy_price': buy_price,
+                'quantity': float(pos_data['quantity']),
+                'buy_date': pos_data.get('buy_date'),
+                'trade_id': pos_data.get('trade_id'),
+                'current_price': float(pos_data.get('current_price') or 0.0),
+                'last_update': pos_data.get('last_update'),
+                'peak_price': float(pos_data.get('peak_price') or buy_price),
+                'peak_performance_pct': float(pos_data.get('peak_performance_pct') or 0.0),
+                'trailing_stop_triggered': bool(pos_data.get('trailing_stop_triggered', False)),
+            })
+
+        self.upsert(positions, event='import')
+        self.mark_migrated(LEGACY_JSON_MIGRATION)
+        log.info(f"📊 Importadas {len(positions)} posições de {path}")
+        return len(positions)
+
+    # ===== Auxiliares =====
+
+    def _fetch_many(self, conn: sqlite3.Connection, symbols: List[str]) -> Dict[str, Dict]:
+        result = {}
+        # SQLite limita o número de parâmetros por query
+        for i in range(0, len(symbols), 500):
+            chunk = symbols[i:i + 500]
+            rows = conn.execute(
+                f"SELECT {', '.join(POSITION_FIELDS)} FROM portfolio_positions "
+                f"WHERE symbol IN ({', '.join('?' for _ in chunk)})",
+                chunk
+            ).fetchall()
+            for row in rows:
+                result[row['symbol']] = self._row_to_dict(row)
+        return result
+
+    def _append_history(self, conn: sqlite3.Connection, rows: List[tuple]):
+        conn.executemany('''
+            INSERT INTO portfolio_position_history
+            (symbol, event, buy_price, quantity, current_price, peak_price,
+             trailing_stop_triggered, trade_id, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+
+    @staticmethod
+    def _classify(old: Dict, new: Dict, event: str) -> str:
+        if event != 'update':
+            return event
+        if new['trailing_stop_triggered'] and not old['trailing_stop_triggered']:
+            return 'trailing_stop'
+        if new['peak_price'] > old['peak_price']:
+            return 'new_peak'
+        return 'update'
+
+    @staticmethod
+    def _history_row(pos: Dict, event: str, timestamp: str) -> tuple:
+        return (
+            pos['symbol'], event, pos['buy_price'], pos['quantity'],
+            pos['current_price'], pos['peak_price'],
+            int(bool(pos['trailing_stop_triggered'])), pos['trade_id'], timestamp,
+        )
+
+    @staticmethod
+    def _normalize(pos: Dict) -> Dict:
+        buy_price = float(pos['buy_price'])
+        trade_id = pos.get('trade_id')
+        return {
+            'symbol': pos['symbol'],
+            'buy_price': buy_price,
+            'quantity': float(pos['quantity']),
+            'buy_date': pos.get('buy_date'),
+            'trade_id': str(trade_id) if trade_id is not None else None,
+            'current_price': float(pos.get('current_price') or 0.0),
+            'last_update': pos.get('last_update'),
+            'peak_price': float(pos.get('peak_price') or buy_price),
+            'peak_performance_pct': float(pos.get('peak_performance_pct') or 0.0),
+            'trailing_stop_triggered': int(bool(pos.get('trailing_stop_triggered', False))),
+        }
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict:
+        data = {f: row[f] for f in POSITION_FIELDS}
+        data['trailing_stop_triggered'] = int(bool(data['trailing_stop_triggered']))
+        return data
+
+
+def main():
+    """Importa portfolio_positions.json para o banco (execução única)"""
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Importa posições do JSON para o memecoin.db")
+    parser.add_argument('--json', default='portfolio_positions.json', help='Arquivo JSON de origem')
+    parser.add_argument('--db', default=None, help='Caminho do banco SQLite')
+    parser.add_argument('--overwrite', action='store_true', help='Importar mesmo se já houver posições')
+    args = parser.parse_args()
+
+    store = PositionStore(args.db)
+    imported = store.import_json(args.json, overwrite=args.overwrite)
+    print(f"📊 {imported} posições importadas para {store.db_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Price Export - Exportação colunar em lote do histórico de preços
+Transmite uma consulta (símbolos, intervalo, resolução) como Arrow IPC ou
+Parquet em lotes de colunas, sem montar o resultado inteiro em memória:
+ticks brutos vêm das duas camadas (partições Parquet arquivadas + SQLite) e
+candles vêm de price_candles.
+
+No cliente, o stream Arrow vira pandas/NumPy sem cópia por linha:
+    table = fetch_prices('http://localhost:5000', ['DOGEUSDT'], start='2025-08-01')
+    df = table.to_pandas()
+
+Esquemas:
+    raw:     id, symbol, timestamp, price, volume, high, low
+    candles: symbol, timestamp, open, high, low, close, volume, ticks
+Ticks sem timestamp legível ficam de fora.
+
+Requer pyarrow.
+"""
+
+import io
+import sqlite3
+from typing import Dict, Iterator, List, Optional, Sequence, Set
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+from candles import RESOLUTIONS, to_epoch
+from tick_archive import (ARCHIVE_DIR, archived_symbols, parse_timestamps, partition_files,
+                          table_symbol_sql)
+
+FORMATS = {
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# Linhas por lote (limita a memória da exportação)
+BATCH_ROWS = 65536
+
+RAW_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('symbol', pa.string()),
+    ('timestamp', pa.timestamp('us')),
+    ('price', pa.float64()),
+    ('volume', pa.float64()),
+    ('high', pa.float64()),
+    ('low', pa.float64()),
+])
+
+CANDLE_SCHEMA = pa.schema([
+    ('symbol', pa.string()),
+    ('timestamp', pa.timestamp('us')),
+    ('open', pa.float64()),
+    ('high', pa.float64()),
+    ('low', pa.float64()),
+    ('close', pa.float64()),
+    ('volume', pa.float64()),
+    ('ticks', pa.int64()),
+])
+
+
+def export_schema(resolution: str = 'raw') -> pa.Schema:
+    return RAW_SCHEMA if resolution == 'raw' else CANDLE_SCHEMA
+
+
+def _validate(resolution: str, fmt: Optional[str] = None):
+    if resolution != 'raw' and resolution not in RESOLUTIONS:
+        raise ValueError(f"Resolução inválida: {resolution} (use raw, {', '.join(RESOLUTIONS)})")
+    if fmt is not None and fmt not in FORMATS:
+        raise ValueError(f"Formato inválido: {fmt} (use {', '.join(FORMATS)})")
+
+
+def _column(table: pa.Table, name: str, type_: pa.DataType, n: int) -> pa.Array:
+    if name not in table.column_names:
+        return pa.nulls(n, type_)
+    column = table.column(name).combine_chunks()
+    if name in ('high', 'low'):
+        # high/low = 0 significa ausente nos ticks
+        column = pc.if_else(pc.equal(column, 0), pa.scalar(None, column.type), column)
+    return column.cast(type_)
+
+
+def _conform(table: pa.Table, schema: pa.Schema) -> pa.RecordBatch:
+    """Ajusta um lote ao esquema de exportação (colunas ausentes viram nulos)"""
+    n = table.num_rows
+    return pa.RecordBatch.from_arrays([_column(table, f.name, f.type, n) for f in schema], schema=schema)
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> Set[str]:
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+
+def _raw_symbols(conn: sqlite3.Connection, archive_dir: str) -> List[str]:
+    expr, _ = table_symbol_sql(conn, 'prices')
+    rows = conn.execute(f'SELECT DISTINCT {expr} FROM prices WHERE {expr} IS NOT NULL').fetchall()
+    return sorted({r[0] for r in rows} | set(archived_symbols(archive_dir, 'prices')))
+
+
+def _iter_archived(symbol: str, start: Optional[pd.Timestamp], end: Optional[pd.Timestamp],
+                   archive_dir: str, batch_rows: int) -> Iterator[pa.RecordBatch]:
+    for path in partition_files(archive_dir, 'prices', symbol, start, end):
+        parquet = pq.ParquetFile(path)
+        columns = [f.name for f in RAW_SCHEMA if f.name in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=batch_rows, columns=columns):
+            table = pa.Table.from_batches([batch])
+            ts = table.column('timestamp').cast(pa.timestamp('us'))
+            mask = None
+            if start is not None:
+                mask = pc.greater_equal(ts, pa.scalar(start.to_pydatetime(), pa.timestamp('us')))
+            if end is not None:
+                upper = pc.less_equal(ts, pa.scalar(end.to_pydatetime(), pa.timestamp('us')))
+                mask = upper if mask is None else pc.and_(mask, upper)
+            if mask is not None:
+                table = table.filter(mask)
+            if table.num_rows:
+                yield _conform(table, RAW_SCHEMA)
+
+
+def _iter_recent(conn: sqlite3.Connection, symbol: str, start: Optional[pd.Timestamp],
+                 end: Optional[pd.Timestamp], archive_dir: str, batch_rows: int) -> Iterator[pa.RecordBatch]:
+    expr, filters = table_symbol_sql(conn, 'prices')
+    columns = _table_columns(conn, 'prices')
+    hl = ', '.join(col if col in columns else f'NULL AS {col}' for col in ('high', 'low'))
+    where, params = '', {'symbol': symbol}
+    if start is not None:
+        where += ' AND timestamp >= :start'
+        params['start'] = start.isoformat(sep=' ')
+    if end is not None:
+        where += ' AND timestamp <= :end'
+        params['end'] = end.isoformat(sep=' ')
+    query = ' UNION ALL '.join(
+        f'SELECT id, {expr} AS symbol, timestamp, price, volume, {hl} FROM prices WHERE {condition}{where}'
+        for condition in filters
+    ) + ' ORDER BY timestamp, id'
+
+    # Dias já arquivados: ids repetidos só existem se a compactação foi interrompida
+    archived_days = {path.split('date=')[1][:10] for path in partition_files(archive_dir, 'prices', symbol, start, end)}
+    archived_ids: Dict[str, Set[int]] = {}
+
+    cursor = conn.execute(query, params)
+    names = [d[0] for d in cursor.description]
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            break
+        df = pd.DataFrame.from_records(rows, columns=names)
+        df['timestamp'] = parse_timestamps(df['timestamp'])
+        df = df[df['timestamp'].notna()]
+        if archived_days and not df.empty:
+            days = df['timestamp'].dt.strftime('%Y-%m-%d')
+            overlap = days.isin(archived_days)
+            if overlap.any():
+                duplicate = pd.Series(False, index=df.index)
+                for day in days[overlap].unique():
+                    if day not in archived_ids:
+                        paths = partition_files(archive_dir, 'prices', symbol, pd.Timestamp(day), pd.Timestamp(day))
+                        archived_ids[day] = {i for path in paths
+                                             for i in pq.read_table(path, columns=['id']).column('id').to_pylist()}
+                    duplicate |= (days == day) & df['id'].isin(archived_ids[day])
+                df = df[~duplicate]
+        if not df.empty:
+            yield _conform(pa.Table.from_pandas(df, preserve_index=False), RAW_SCHEMA)
+
+
+def _iter_candles(conn: sqlite3.Connection, symbols: Optional[Sequence[str]], resolution: str,
+                  start, end, batch_rows: int) -> Iterator[pa.RecordBatch]:
+    query = '''
+        SELECT symbol, bucket, open, high, low, close, volume, ticks FROM price_candles
+        WHERE resolution = ?
+    '''
+    params: list = [resolution]
+    if symbols:
+        query += f" AND symbol IN ({', '.join('?' * len(symbols))})"
+        params.extend(symbols)
+    if start is not None:
+        query += ' AND bucket >= ?'
+        params.append(int(to_epoch(start)) // RESOLUTIONS[resolution] * RESOLUTIONS[resolution])
+    if end is not None:
+        query += ' AND bucket <= ?'
+        params.append(int(to_epoch(end)))
+    query += ' ORDER BY symbol, bucket'
+    try:
+        cursor = conn.execute(query, params)
+    except sqlite3.OperationalError:
+        # Tabela ainda não criada
+        return
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            break
+        symbol, bucket, o, h, l, c, v, n = zip(*rows)
+        yield pa.RecordBatch.from_arrays([
+            pa.array(symbol, pa.string()),
+            pa.array(bucket, pa.int64()).cast(pa.timestamp('s')).cast(pa.timestamp('us')),
+            pa.array(o, pa.float64()), pa.array(h, pa.float64()), pa.array(l, pa.float64()),
+            pa.array(c, pa.float64()), pa.array(v, pa.float64()), pa.array(n, pa.int64()),
+        ], schema=CANDLE_SCHEMA)
+
+
+def iter_price_batches(conn: sqlite3.Connection, symbols: Optional[Sequence[str]] = None,
+                       start=None, end=None, resolution: str = 'raw',
+                       batch_rows: int = BATCH_ROWS, archive_dir: str = ARCHIVE_DIR) -> Iterator[pa.RecordBatch]:
+    """Lotes Arrow do histórico, por símbolo e em ordem cronológica.
+
+    Sem symbols, exporta todos. start/end são ISO-8601 sem fuso (como no banco).
+    """
+    _validate(resolution)
+    if resolution != 'raw':
+        yield from _iter_candles(conn, symbols, resolution, start, end, batch_rows)
+        return
+
+    start_ts = pd.Timestamp(start) if start is not None else None
+    end_ts = pd.Timestamp(end) if end is not None else None
+    for symbol in (symbols or _raw_symbols(conn, archive_dir)):
+        yield from _iter_archived(symbol, start_ts, end_ts, archive_dir, batch_rows)
+        yield from _iter_recent(conn, symbol, start_ts, end_ts, archive_dir, batch_rows)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Arquivo só de escrita que acumula os bytes até serem drenados"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+
+def iter_export_bytes(batches: Iterator[pa.RecordBatch], schema: pa.Schema, fmt: str = 'arrow') -> Iterator[bytes]:
+    """Serializa os lotes em Arrow IPC (stream) ou Parquet (um row group por lote)"""
+    _validate('raw', fmt)
+    sink = _ChunkSink()
+    if fmt == 'arrow':
+        writer = pa.ipc.new_stream(sink, schema)
+    else:
+        writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for batch in batches:
+            if fmt == 'arrow':
+                writer.write_batch(batch)
+            else:
+                writer.write_table(pa.Table.from_batches([batch], schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def stream_export(db_path: str, symbols: Optional[Sequence[str]] = None, start=None, end=None,
+                  resolution: str = 'raw', fmt: str = 'arrow', batch_rows: int = BATCH_ROWS,
+                  archive_dir: str = ARCHIVE_DIR) -> Iterator[bytes]:
+    """Gerador de bytes para respostas HTTP (abre a própria conexão)"""
+    _validate(resolution, fmt)
+    conn = sqlite3.connect(db_path)
+    try:
+        batches = iter_price_batches(conn, symbols, start, end, resolution, batch_rows, archive_dir)
+        yield from iter_export_bytes(batches, export_schema(resolution), fmt)
+    finally:
+        conn.close()
+
+
+def export_prices(conn: sqlite3.Connection, path: str, symbols: Optional[Sequence[str]] = None,
+                  start=None, end=None, resolution: str = 'raw', fmt: str = 'parquet',
+                  archive_dir: str = ARCHIVE_DIR) -> int:
+    """Grava a exportação num arquivo. Retorna o número de linhas"""
+    _validate(resolution, fmt)
+    rows = 0
+
+    def counted():
+        nonlocal rows
+        for batch in iter_price_batches(conn, symbols, start, end, resolution, archive_dir=archive_dir):
+            rows += batch.num_rows
+            yield batch
+
+    with open(path, 'wb') as f:
+        for data in iter_export_bytes(counted(), export_schema(resolution), fmt):
+            f.write(data)
+    return rows
+
+
+def read_export(source, fmt: str = 'arrow') -> pa.Table:
+    """Lê uma exportação (bytes, caminho ou arquivo) como tabela Arrow"""
+    _validate('raw', fmt)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = pa.BufferReader(source)
+    if fmt == 'parquet':
+        return pq.read_table(source)
+    return pa.ipc.open_stream(source).read_all()
+
+
+def fetch_prices(api_base: str, symbols: Optional[Sequence[str]] = None, start=None, end=None,
+                 resolution: str = 'raw', timeout: float = 300) -> pa.Table:
+    """Cliente de /api/prices/export (Arrow IPC). Use .to_pandas() no resultado"""
+    import requests
+
+    params = {'resolution': resolution, 'format': 'arrow'}
+    if symbols:
+        params['symbols'] = ','.join(symbols)
+    if start is not None:
+        params['start'] = str(start)
+    if end is not None:
+        params['end'] = str(end)
+    with requests.get(f"{api_base.rstrip('/')}/api/prices/export", params=params,
+                      stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        return pa.ipc.open_stream(response.raw).read_all()
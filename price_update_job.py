@@ -17,6 +17,8 @@ from dotenv import load_dotenv
 # Adicionar o diretório raiz ao path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from watchlist_manager import WatchlistManager
+from logging_setup import setup_logging
+from exchange_config import apply_exchange_url
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -46,7 +48,7 @@ class PriceUpdateJob:
                 self.logger.warning("Chaves da API Binance não configuradas")
                 return False
             
-            self.exchange = ccxt.binance({
+            self.exchange = apply_exchange_url(ccxt.binance({
                 'apiKey': api_key,
                 'secret': api_secret,
                 'sandbox': use_testnet,
@@ -54,7 +56,7 @@ class PriceUpdateJob:
                 'options': {
                     'defaultType': 'spot'
                 }
-            })
+            }))
             
             # Testar conexão
             balance = self.exchange.fetch_balance()
@@ -284,10 +286,7 @@ class PriceUpdateScheduler:
 
 async def main():
     """Função principal"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+    setup_logging(log_file='price_update_job.log')
     
     logger = logging.getLogger(__name__)
     
@@ -0,0 +1,96 @@
+"""
+Benchmark: avaliação do saldo com 40 ativos "poeira"
+Legado (SystemController antigo): cliente ccxt novo a cada chamada, um
+fetch_ticker por ativo e um INSERT por linha. Novo: cliente reaproveitado,
+um fetch_tickers e um executemany. A exchange é simulada com latência fixa
+por requisição REST (BENCH_LATENCY_MS); a criação do cliente ccxt é real.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+
+import ccxt
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from account_valuation import AccountValuator
+
+N_ASSETS = int(os.getenv('BENCH_ASSETS', 40))
+LATENCY_S = float(os.getenv('BENCH_LATENCY_MS', 30)) / 1000
+ROUNDS = int(os.getenv('BENCH_ROUNDS', 5))
+ASSETS = [f"D{i:02d}" for i in range(N_ASSETS)]
+
+
+class SimulatedExchange:
+    def __init__(self):
+        self.requests = 0
+
+    def _request(self):
+        self.requests += 1
+        time.sleep(LATENCY_S)
+
+    def fetch_balance(self):
+        self._request()
+        totals = {**{a: 100.0 for a in ASSETS}, 'USDT': 50.0}
+        return {'free': totals, 'used': {a: 0.0 for a in totals}, 'total': totals}
+
+    def fetch_ticker(self, symbol):
+        self._request()
+        return {'symbol': symbol, 'last': 0.01}
+
+    def fetch_tickers(self, symbols=None):
+        self._request()
+        return {s: {'symbol': s, 'last': 0.01} for s in symbols}
+
+
+def legacy_update(exchange, db_path):
+    ccxt.binance({'apiKey': 'x', 'secret': 'y', 'enableRateLimit': True})  # cliente novo a cada chamada
+    balance = exchange.fetch_balance()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM account_balance WHERE timestamp < datetime('now', '-24 hours')")
+    total_usd = 0
+    for asset, amounts in balance['total'].items():
+        if amounts > 0:
+            usd_value = amounts if asset == 'USDT' else amounts * exchange.fetch_ticker(f"{asset}/USDT")['last']
+            cursor.execute('INSERT OR REPLACE INTO account_balance (asset, free, locked, total, usd_value) '
+                           'VALUES (?, ?, ?, ?, ?)', (asset, balance['free'][asset], 0.0, amounts, usd_value))
+            total_usd += usd_value
+    conn.commit()
+    conn.close()
+    return total_usd
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE account_balance (id INTEGER PRIMARY KEY AUTOINCREMENT, exchange TEXT DEFAULT "
+                     "'binance', asset TEXT NOT NULL, free REAL, locked REAL, total REAL, usd_value REAL, "
+                     "timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        conn.close()
+
+        ex = SimulatedExchange()
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            legacy_total = legacy_update(ex, db_path)
+        legacy_s = (time.perf_counter() - start) / ROUNDS
+        legacy_requests = ex.requests / ROUNDS
+
+        ex = SimulatedExchange()
+        valuator = AccountValuator(ex, db_path=db_path)
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            total = valuator.refresh().total_usd
+        new_s = (time.perf_counter() - start) / ROUNDS
+        assert abs(total - legacy_total) < 1e-9
+
+    print(f"{N_ASSETS} ativos + USDT, latência {LATENCY_S * 1000:.0f} ms/requisição, média de {ROUNDS} rodadas")
+    print(f"Legado: {legacy_requests:.0f} requisições, {legacy_s * 1000:.0f} ms")
+    print(f"Lote:   {ex.requests / ROUNDS:.0f} requisições, {new_s * 1000:.0f} ms ({legacy_s / new_s:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: persistência de sinais por abertura/append a cada ciclo vs AuditSink
+Mede o custo no caminho do ciclo do agente e a leitura de um intervalo de tempo
+(varredura completa do JSONL vs leitura indexada).
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from audit_sink import AuditSink, AuditReader
+
+N_CYCLES = int(os.getenv('BENCH_CYCLES', 20000))
+SIGNALS_PER_CYCLE = int(os.getenv('BENCH_SIGNALS', 2))
+
+
+def make_signal(ts):
+    return {
+        'action': 'buy', 'symbol': 'DOGEUSDT', 'confidence': 0.72,
+        'reason': 'Tendência de alta com RSI < 65', 'price': 0.2241, 'amount_usd': 12.5,
+        'timestamp': ts.isoformat(),
+        'indicators': {'rsi': 48.2, 'sma_fast': 0.2239, 'sma_slow': 0.2231, 'atr': 0.0012, 'bb_pos': 0.41},
+    }
+
+
+def cycle_signals(start):
+    for c in range(N_CYCLES):
+        ts = start + timedelta(seconds=20 * c)
+        yield [make_signal(ts + timedelta(milliseconds=i)) for i in range(SIGNALS_PER_CYCLE)]
+
+
+def bench_append(path, start):
+    begin = time.perf_counter()
+    for batch in cycle_signals(start):
+        with open(path, 'a', encoding='utf-8') as f:
+            for s in batch:
+                f.write(json.dumps(s) + '\n')
+    return time.perf_counter() - begin
+
+
+def bench_sink(base, start):
+    sink = AuditSink(base, 'signals', max_segment_bytes=4 * 1024 * 1024)
+    begin = time.perf_counter()
+    for batch in cycle_signals(start):
+        for s in batch:
+            sink.write(s)
+    hot_path = time.perf_counter() - begin
+    sink.close()
+    return hot_path, time.perf_counter() - begin
+
+
+def scan_range(path, lo, hi):
+    out = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            r = json.loads(line)
+            if lo <= r['timestamp'] <= hi:
+                out.append(r)
+    return out
+
+
+def main():
+    start = datetime(2025, 8, 1)
+    total = N_CYCLES * SIGNALS_PER_CYCLE
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl = os.path.join(tmp, 'signals.jsonl')
+        t_append = bench_append(jsonl, start)
+        t_hot, t_total = bench_sink(tmp, start)
+
+        # Janela de 1 hora no meio do histórico
+        lo = (start + timedelta(seconds=20 * N_CYCLES // 2)).isoformat()
+        hi = (start + timedelta(seconds=20 * N_CYCLES // 2 + 3600)).isoformat()
+        begin = time.perf_counter()
+        full = scan_range(jsonl, lo, hi)
+        t_scan = time.perf_counter() - begin
+        begin = time.perf_counter()
+        indexed = list(AuditReader(tmp, 'signals').read(start=lo, end=hi))
+        t_indexed = time.perf_counter() - begin
+        assert len(full) == len(indexed)
+
+        raw_size = os.path.getsize(jsonl)
+        sink_dir = os.path.join(tmp, 'signals')
+        sink_size = sum(os.path.getsize(os.path.join(sink_dir, f)) for f in os.listdir(sink_dir))
+
+    print(f"Ciclos: {N_CYCLES} | Sinais: {total}")
+    print(f"open+append por ciclo:   {t_append / N_CYCLES * 1e6:8.1f} µs/ciclo")
+    print(f"AuditSink (no ciclo):    {t_hot / N_CYCLES * 1e6:8.1f} µs/ciclo | total c/ gzip: {t_total:.2f}s")
+    print(f"Disco: JSONL {raw_size / 1e6:.1f} MB | segmentos gzip+índice {sink_size / 1e6:.1f} MB")
+    print(f"Janela de 1h ({len(full)} sinais): varredura {t_scan * 1000:.1f} ms | indexada {t_indexed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
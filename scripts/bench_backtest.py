@@ -0,0 +1,98 @@
+"""
+Benchmark: backtest vetorizado vs replay candle a candle com a Strategy do agente
+O replay monta o MarketState com a janela de 120 candles e chama analyze /
+check_exit_signal a cada candle, como o agente ao vivo; o backtest calcula
+os indicadores como séries e só a máquina de estados roda por candle.
+"""
+
+import os
+import sys
+import time
+import threading
+from dataclasses import fields
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from backtest import StrategyParams, backtest, change_24h_series, run_many, volatility_series
+
+with patch.object(threading.Thread, 'start'):  # o módulo inicia o auto-treino na importação
+    import ai_trading_agent_II as agent
+
+N_CANDLES = int(os.getenv('BENCH_CANDLES', 43200))  # 30 dias de 1m
+N_SYMBOLS = int(os.getenv('BENCH_SYMBOLS', 4))
+N_PARAMS = int(os.getenv('BENCH_PARAMS', 6))
+
+
+def synthetic_candles(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 0.2 * np.exp(np.cumsum(rng.normal(0, 0.004, n) + 0.002 * np.sin(np.arange(n) / 150)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    return pd.DataFrame({'ts': 1_700_000_000 + 60.0 * np.arange(n), 'open': open_,
+                         'high': np.maximum(open_, close) * 1.001, 'low': np.minimum(open_, close) * 0.999,
+                         'close': close, 'volume': 1.0})
+
+
+def replay_per_candle(candles, params):
+    settings = agent.Settings()
+    for f in fields(params):
+        setattr(settings, f.name, getattr(params, f.name))
+    strategy = agent.Strategy(settings)
+    ts, close = candles['ts'].to_numpy(), candles['close'].to_numpy()
+    high, low = candles['high'].to_numpy(), candles['low'].to_numpy()
+    chg, vol = change_24h_series(ts, close), volatility_series(close)
+    trades = 0
+    for i in range(params.min_price_history - 1, len(candles)):
+        now = datetime.fromtimestamp(ts[i], tz=timezone.utc)
+        with patch.object(agent, 'utcnow', return_value=now):
+            w = slice(max(0, i - 119), i + 1)
+            ms = agent.MarketState('X', close[i], list(close[w]), 0.0, chg[i], vol[i], now, list(high[w]), list(low[w]))
+            if strategy.current_position == 'long' and strategy.check_exit_signal(
+                    close[i], agent.TA.atr(*ms.hlc(), settings.atr_period)):
+                strategy.register_execution('sell', close[i], 0.0)
+                trades += 1
+            sig = strategy.analyze(ms)
+            if sig.action == 'buy' and strategy.should_execute(sig) and strategy.current_position != 'long':
+                strategy.set_oco_levels(sig.price, sig.indicators['atr'])
+                strategy.position_usd = sig.amount_usd
+                strategy.register_execution('buy', sig.price, 0.0)
+            elif sig.action == 'sell' and strategy.current_position == 'long':
+                strategy.register_execution('sell', close[i], 0.0)
+                trades += 1
+    return trades
+
+
+def main():
+    import logging
+    logging.disable(logging.WARNING)
+    candles = synthetic_candles(N_CANDLES, 1)
+    params = StrategyParams()
+
+    sample = candles.iloc[:5000]
+    start = time.perf_counter()
+    replay_per_candle(sample, params)
+    replay_rate = len(sample) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    result = backtest(candles, params)
+    vector_s = time.perf_counter() - start
+    print(f"{N_CANDLES:,} candles 1m: replay candle a candle {replay_rate:,.0f} candles/s "
+          f"(~{N_CANDLES / replay_rate:.1f}s) | vetorizado {N_CANDLES / vector_s:,.0f} candles/s "
+          f"({vector_s * 1000:.0f} ms, {result.metrics['trades']} trades)")
+
+    by_symbol = {f"S{k}USDT": synthetic_candles(N_CANDLES, k) for k in range(N_SYMBOLS)}
+    param_sets = [StrategyParams(sl_atr_mult=1.0 + 0.5 * k, tp_rr=1.2 + 0.2 * k) for k in range(N_PARAMS)]
+    jobs = N_SYMBOLS * N_PARAMS
+    for workers in sorted({1, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        run_many(by_symbol, param_sets, workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"run_many {N_SYMBOLS} símbolos x {N_PARAMS} parâmetros, workers={workers}: "
+              f"{jobs} backtests em {elapsed:.2f}s ({jobs * N_CANDLES / elapsed:,.0f} candles/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark: leitura de histórico longo a partir dos ticks brutos vs candles
+Simula ticks a cada 20s (como o coletor) e compara linhas lidas e tempo de
+consulta para uma janela de 30 dias, além do custo do update incremental.
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from candles import update_candles, get_candles
+
+DAYS = int(os.getenv('BENCH_DAYS', 30))
+SYMBOLS = ['DOGEUSDT', 'SHIBUSDT', 'PEPEUSDT', 'FLOKIUSDT']
+TICK_S = 20
+
+
+def populate(conn):
+    conn.execute('''
+        CREATE TABLE prices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, symbol TEXT, coin_id TEXT,
+            timestamp DATETIME NOT NULL, price REAL NOT NULL, volume REAL DEFAULT 0,
+            high REAL DEFAULT 0, low REAL DEFAULT 0
+        )
+    ''')
+    conn.execute('CREATE INDEX idx_prices_symbol_timestamp ON prices(symbol, timestamp)')
+    start = datetime(2025, 7, 1)
+    rows = []
+    for symbol in SYMBOLS:
+        price = 1.0
+        for i in range(DAYS * 86400 // TICK_S):
+            price *= 1 + random.gauss(0, 0.001)
+            ts = (start + timedelta(seconds=i * TICK_S)).strftime('%Y-%m-%d %H:%M:%S')
+            rows.append((symbol, ts, price, 1e6 + i))
+    conn.executemany('INSERT INTO prices (symbol, timestamp, price, volume) VALUES (?, ?, ?, ?)', rows)
+    conn.commit()
+    return start, len(rows)
+
+
+def main():
+    random.seed(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'bench.db'))
+        start, n_ticks = populate(conn)
+
+        begin = time.perf_counter()
+        update_candles(conn)
+        t_catchup = time.perf_counter() - begin
+
+        # Update incremental de um ciclo do coletor (1 tick por símbolo)
+        last = (start + timedelta(days=DAYS)).strftime('%Y-%m-%d %H:%M:%S')
+        conn.executemany('INSERT INTO prices (symbol, timestamp, price, volume) VALUES (?, ?, ?, ?)',
+                         [(s, last, 1.0, 1e6) for s in SYMBOLS])
+        conn.commit()
+        begin = time.perf_counter()
+        update_candles(conn)
+        t_incremental = time.perf_counter() - begin
+
+        lo, hi = start.strftime('%Y-%m-%d %H:%M:%S'), last
+        print(f"Ticks: {n_ticks:,} ({len(SYMBOLS)} símbolos, {DAYS} dias)")
+        print(f"Catch-up completo: {t_catchup:.2f}s | update de um ciclo: {t_incremental * 1000:.2f} ms")
+
+        begin = time.perf_counter()
+        raw = conn.execute('SELECT timestamp, price, volume FROM prices WHERE symbol = ? AND timestamp BETWEEN ? AND ? '
+                           'ORDER BY timestamp', ('DOGEUSDT', lo, hi)).fetchall()
+        t_raw = time.perf_counter() - begin
+        print(f"Janela de {DAYS} dias, ticks brutos: {len(raw):7,} linhas | {t_raw * 1000:7.1f} ms")
+        for resolution in ('1m', '5m', '15m', '1h'):
+            begin = time.perf_counter()
+            candles = get_candles(conn, 'DOGEUSDT', resolution, limit=10 ** 7, start=lo, end=hi)
+            t = time.perf_counter() - begin
+            print(f"Janela de {DAYS} dias, candles {resolution:>3}: {len(candles):7,} linhas | {t * 1000:7.1f} ms "
+                  f"({len(raw) / len(candles):.0f}x menos linhas)")
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
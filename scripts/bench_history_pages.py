@@ -0,0 +1,80 @@
+"""
+Benchmark: paginação OFFSET x cursor (keyset) no histórico de trades
+Tabela com N trades (vários por segundo) e os índices de init_history_indexes.
+Mede o tempo de uma página de 500 linhas em profundidades crescentes com
+LIMIT/OFFSET e com cursor, e a vazão da exportação NDJSON completa.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from history_pages import TRADES, encode_cursor, fetch_page, init_history_indexes, iter_ndjson, parse_page_query
+
+N_TRADES = int(os.getenv('BENCH_TRADES', 300000))
+PAGE = 500
+REPEAT = 20
+
+
+def build(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, date DATETIME NOT NULL, type TEXT NOT NULL,
+            symbol TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL, total REAL NOT NULL,
+            status TEXT DEFAULT 'completed', created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.executemany(
+        'INSERT INTO trades (date, type, symbol, amount, price, total) VALUES (?, ?, ?, 10, ?, ?)',
+        ((f'2025-{1 + i // 100000:02d}-{1 + (i // 4000) % 25:02d} {(i // 360) % 10 + 10}:{(i // 6) % 60:02d}:00',
+          'buy' if i % 2 else 'sell', 'DOGEUSDT', 0.1, 1.0) for i in range(N_TRADES)))
+    init_history_indexes(conn)
+    conn.commit()
+    return conn
+
+
+def timed_ms(fn):
+    fn()
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        conn = build(db_path)
+        columns = ', '.join(TRADES.default_fields)
+
+        print(f"{N_TRADES} trades, página de {PAGE} linhas (ms por página)")
+        print(f"  {'profundidade':>12} {'OFFSET':>9} {'cursor':>9}")
+        for depth in (0, N_TRADES // 10, N_TRADES // 2, N_TRADES - PAGE):
+            offset_ms = timed_ms(lambda: conn.execute(
+                f'SELECT {columns} FROM trades ORDER BY date DESC, id DESC LIMIT ? OFFSET ?', (PAGE, depth)).fetchall())
+            # Cursor da linha imediatamente anterior à página
+            if depth:
+                time_value, row_id = conn.execute('SELECT date, id FROM trades ORDER BY date DESC, id DESC '
+                                                  'LIMIT 1 OFFSET ?', (depth - 1,)).fetchone()
+                args = {'limit': str(PAGE), 'cursor': encode_cursor(time_value, row_id)}
+            else:
+                args = {'limit': str(PAGE)}
+            query = parse_page_query(TRADES, args, max_limit=None)
+            keyset_ms = timed_ms(lambda: fetch_page(conn, TRADES, query))
+            print(f"  {depth:>12} {offset_ms:>9.2f} {keyset_ms:>9.2f}")
+        conn.close()
+
+        query = parse_page_query(TRADES, {}, default_limit=None)
+        start = time.perf_counter()
+        size = sum(len(chunk) for chunk in iter_ndjson(db_path, TRADES, query))
+        elapsed = time.perf_counter() - start
+        print(f"NDJSON completo: {N_TRADES} linhas, {size / 1e6:.1f} MB em {elapsed:.2f} s "
+              f"({N_TRADES / elapsed / 1000:.0f} mil linhas/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: polling do dashboard com e sem ETag/compressão
+Cópia temporária do memecoin.db; a cada rodada o "navegador" consulta os cinco
+endpoints do dashboard. Sem cache: corpo JSON completo a cada consulta. Com
+cache: If-None-Match + Accept-Encoding: gzip, como faz o fetch do navegador.
+A cada WRITE_EVERY rodadas entra um trade e um tick novos (invalidam as versões).
+Mede bytes de corpo e tempo de CPU do processo por rodada.
+"""
+
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import logging
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+
+N_ROUNDS = int(os.getenv('BENCH_ROUNDS', 200))
+WRITE_EVERY = int(os.getenv('BENCH_WRITE_EVERY', 10))
+N_TRADES = 500
+PATHS = ('/api/trades?limit=200', '/api/prices?symbol=DOGE/BUSD&limit=200', '/api/watchlist/summary',
+         '/api/model/info', '/api/portfolio/performance')
+
+
+def seed(db_path):
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("INSERT INTO trades (date, type, symbol, amount, price, total) VALUES "
+                         "(datetime('now'), 'buy', 'DOGEUSDT', ?, 0.08, ?)",
+                         [(100 + i, 8 + i * 0.08) for i in range(N_TRADES)])
+
+
+def write_tick(db_path, i):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO trades (date, type, symbol, amount, price, total) VALUES "
+                     "(datetime('now'), 'sell', 'DOGEUSDT', ?, 0.09, ?)", (i, i * 0.09))
+        conn.execute("INSERT INTO prices (symbol, timestamp, price, volume) VALUES "
+                     "('DOGE/BUSD', datetime('now'), 0.09, ?)", (i,))
+
+
+def run(client, db_path, browser):
+    etags = {}
+    body_bytes = 0
+    statuses = {}
+    start = time.process_time()
+    for i in range(N_ROUNDS):
+        if i and i % WRITE_EVERY == 0:
+            write_tick(db_path, i)
+        for path in PATHS:
+            headers = {}
+            if browser:
+                headers['Accept-Encoding'] = 'gzip, deflate, br'
+                if path in etags:
+                    headers['If-None-Match'] = etags[path]
+            response = client.get(path, headers=headers)
+            if 'ETag' in response.headers:
+                etags[path] = response.headers['ETag']
+            body_bytes += len(response.data)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    cpu_ms = (time.process_time() - start) * 1000
+    return body_bytes / N_ROUNDS, cpu_ms / N_ROUNDS, statuses
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'memecoin.db')
+        shutil.copy(os.path.join(ROOT, 'memecoin.db'), db_path)
+        os.environ['DB_PATH'] = db_path
+        from app import app, response_cache, init_database
+        logging.disable(logging.CRITICAL)
+        init_database()
+        seed(db_path)
+        client = app.test_client()
+
+        response_cache.enabled = False
+        plain = run(client, db_path, browser=False)
+        response_cache.enabled = True
+        cached = run(client, db_path, browser=True)
+
+    print(f"{N_ROUNDS} rodadas x {len(PATHS)} endpoints, escrita a cada {WRITE_EVERY} rodadas")
+    for name, (kb, cpu, statuses) in (('sem cache', plain), ('ETag + gzip', cached)):
+        print(f"  {name:<12} {kb / 1024:>8.1f} KB/rodada  {cpu:>7.2f} ms CPU/rodada  status {statuses}")
+    print(f"  redução: {100 * (1 - cached[0] / plain[0]):.0f}% bytes, "
+          f"{100 * (1 - cached[1] / plain[1]):.0f}% CPU")
+
+
+if __name__ == '__main__':
+    main()
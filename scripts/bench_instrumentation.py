@@ -0,0 +1,77 @@
+"""
+Benchmark: custo da instrumentação (métricas) no caminho quente
+Compara, sem e com instrumentação: uma requisição Flask (test_client), uma
+consulta SQLite indexada e uma chamada a um cliente de exchange em memória.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from instrumentation import MetricsRegistry, InstrumentedExchange, connect, instrument_app
+
+N = int(os.getenv('BENCH_N', 5000))
+
+
+class MemoryExchange:
+    id = 'memory'
+
+    def fetch_ticker(self, symbol):
+        return {'symbol': symbol, 'last': 0.1}
+
+
+def per_call_us(fn, n=N):
+    fn()
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def make_app(registry=None):
+    app = Flask(__name__)
+    if registry is not None:
+        instrument_app(app, registry)
+
+    @app.route('/api/coins/<symbol>')
+    def coin(symbol):
+        return jsonify({'symbol': symbol})
+
+    return app.test_client()
+
+
+def main():
+    rows = []
+    plain_client, timed_client = make_app(), make_app(MetricsRegistry())
+    rows.append(('requisição Flask', per_call_us(lambda: plain_client.get('/api/coins/DOGE'), N // 5),
+                 per_call_us(lambda: timed_client.get('/api/coins/DOGE'), N // 5)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        conn = sqlite3.connect(path)
+        conn.execute('CREATE TABLE trades (id INTEGER PRIMARY KEY, symbol TEXT, total REAL)')
+        conn.executemany('INSERT INTO trades (symbol, total) VALUES (?, ?)', [('DOGE/USDT', i) for i in range(10000)])
+        conn.commit()
+        timed = connect(path, MetricsRegistry())
+        query = 'SELECT * FROM trades WHERE id = ?'
+        rows.append(('consulta SQLite (por id)', per_call_us(lambda: conn.execute(query, (500,)).fetchall()),
+                     per_call_us(lambda: timed.execute(query, (500,)).fetchall())))
+        conn.close()
+        timed.close()
+
+    raw, proxy = MemoryExchange(), InstrumentedExchange(MemoryExchange(), MetricsRegistry())
+    rows.append(('chamada à exchange', per_call_us(lambda: raw.fetch_ticker('DOGE/USDT')),
+                 per_call_us(lambda: proxy.fetch_ticker('DOGE/USDT'))))
+
+    print(f"{'operação':<26} {'sem (µs)':>10} {'com (µs)':>10} {'custo (µs)':>11}")
+    for name, plain, instrumented in rows:
+        print(f"{name:<26} {plain:>10.1f} {instrumented:>10.1f} {instrumented - plain:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: backfill de klines serial vs concorrente, e retomada após falha
+Usa um servidor local que imita /api/v3/klines com latência fixa por
+requisição (BENCH_LATENCY_MS), como a API real vista de fora.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import sqlite3
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from kline_backfill import KlineBackfill, INTERVAL_MS
+
+LATENCY_S = float(os.getenv('BENCH_LATENCY_MS', 80)) / 1000
+SYMBOLS = ['DOGEUSDT', 'PEPEUSDT', 'SHIBUSDT', 'FLOKIUSDT', 'BONKUSDT']
+INTERVALS = ['1m', '5m', '15m']
+DAYS = int(os.getenv('BENCH_DAYS', 30))
+START_MS = 1_750_000_000_000 // 86_400_000 * 86_400_000
+FAIL_AFTER = {'n': None, 'count': 0}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(LATENCY_S)
+        FAIL_AFTER['count'] += 1
+        if FAIL_AFTER['n'] is not None and FAIL_AFTER['count'] > FAIL_AFTER['n']:
+            self.send_response(503)
+            self.end_headers()
+            return
+        q = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        step = INTERVAL_MS[q['interval']]
+        start, end = int(q['startTime']), int(q['endTime'])
+        klines = [[t, "1.0", "1.1", "0.9", "1.0", "10", t + step - 1, "10", 3, "0", "0", "0"]
+                  for t in range(-(-start // step) * step, end + 1, step)][:int(q['limit'])]
+        body = json.dumps(klines).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def run(url, db_path, workers):
+    backfill = KlineBackfill(db_path, url, max_workers=workers, weight_per_minute=10 ** 6, max_attempts=1)
+    return backfill.run(SYMBOLS, INTERVALS, START_MS, START_MS + DAYS * 86_400_000)
+
+
+def main():
+    logging.disable(logging.WARNING)
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{httpd.server_address[1]}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{len(SYMBOLS)} símbolos x {INTERVALS} x {DAYS} dias | latência {LATENCY_S * 1000:.0f} ms/req")
+        for workers in (1, 4, 8):
+            report = run(url, os.path.join(tmp, f'w{workers}.db'), workers)
+            print(f"workers={workers}: {report.completed} blocos, {report.rows:,} klines em {report.elapsed_s:.2f}s")
+
+        # Execução interrompida na metade e retomada
+        db_path = os.path.join(tmp, 'resume.db')
+        FAIL_AFTER.update(n=60, count=0)
+        first = run(url, db_path, 8)
+        FAIL_AFTER.update(n=None)
+        second = run(url, db_path, 8)
+        conn = sqlite3.connect(db_path)
+        rows, distinct = conn.execute(
+            'SELECT COUNT(*), COUNT(DISTINCT symbol || interval || open_time) FROM klines').fetchone()
+        conn.close()
+        print(f"Retomada: 1ª execução {first.completed} blocos ok / {len(first.failed)} falhas; "
+              f"2ª execução {second.requests} requisições ({second.skipped} blocos pulados) | "
+              f"{rows:,} klines, {distinct:,} distintas")
+    httpd.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: custo de logging no ciclo do agente (modo verboso)
+Antigo: FileHandler + StreamHandler síncronos com flush a cada registro.
+Novo:   logging_setup (QueueHandler -> QueueListener em thread de fundo).
+Console redirecionado para /dev/null nos dois casos.
+"""
+
+import os
+import sys
+import time
+import logging
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import logging_setup
+
+N_CYCLES = int(os.getenv('BENCH_CYCLES', 200))
+N_SYMBOLS = int(os.getenv('BENCH_SYMBOLS', 50))
+
+
+def run_cycles(log):
+    """Simula o log de um ciclo do agente robusto: banner + uma linha por símbolo + resumo"""
+    start = time.perf_counter()
+    for cycle in range(N_CYCLES):
+        log.info(f"=== CICLO {cycle} - Analisando {N_SYMBOLS} moedas ===")
+        for i in range(N_SYMBOLS):
+            log.info(f"COIN{i}USDT: $0.00012345 | +1.23% | HOLD (0.10) - 😴 Mercado estável: +1.23%")
+        log.info(f"=== ENCONTRADAS 3 OPORTUNIDADES ===")
+        for i in range(3):
+            log.info(f"{i}. COIN{i}USDT: BUY | Confiança: 0.80 | Mudança 24h: +8.10% | Razão: 🚀 ALTA FORTE")
+        log.info("Aguardando 20 segundos...")
+    return (time.perf_counter() - start) / N_CYCLES
+
+
+def bench_sync(path, devnull):
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    file_handler = logging.FileHandler(path, encoding='utf-8')
+    stream = logging.StreamHandler(devnull)
+    for h in (file_handler, stream):
+        h.setFormatter(logging.Formatter(logging_setup.TEXT_FORMAT))
+        root.addHandler(h)
+    original_emit = file_handler.emit
+
+    def flush_emit(record):
+        original_emit(record)
+        file_handler.flush()
+    file_handler.emit = flush_emit
+    root.setLevel(logging.INFO)
+
+    per_cycle = run_cycles(logging.getLogger('AITradingAgent'))
+    for h in (file_handler, stream):
+        root.removeHandler(h)
+        h.close()
+    return per_cycle
+
+
+def bench_queue(path, devnull, sample=''):
+    stderr = sys.stderr
+    sys.stderr = devnull  # StreamHandler do listener usa sys.stderr
+    try:
+        logging_setup.setup_logging(log_file=path, sample=sample)
+        per_cycle = run_cycles(logging.getLogger('AITradingAgent'))
+        start = time.perf_counter()
+        logging_setup.shutdown_logging()
+        drain = time.perf_counter() - start
+    finally:
+        sys.stderr = stderr
+    return per_cycle, drain
+
+
+def main():
+    records = N_SYMBOLS + 6
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as devnull:
+        sync = bench_sync(os.path.join(tmp, 'sync.log'), devnull)
+        queued, drain = bench_queue(os.path.join(tmp, 'queue.log'), devnull)
+        sampled, _ = bench_queue(os.path.join(tmp, 'sampled.log'), devnull, sample='INFO:10')
+
+    print(f"Ciclos: {N_CYCLES} | Registros/ciclo: {records}")
+    print(f"Síncrono + flush por registro: {sync * 1000:7.3f} ms/ciclo")
+    print(f"QueueHandler (JSON rotativo):  {queued * 1000:7.3f} ms/ciclo | economia {(sync - queued) * 1000:.3f} ms/ciclo "
+          f"(dreno final da fila: {drain * 1000:.1f} ms)")
+    print(f"QueueHandler + INFO:10:        {sampled * 1000:7.3f} ms/ciclo | economia {(sync - sampled) * 1000:.3f} ms/ciclo")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark: replay acelerado com backend e agente robusto sem modificação.
+Grava ticks sintéticos (DOGE em alta forte, PEPE em queda, SHIB lateral),
+reproduz BENCH_HOURS horas a BENCH_SPEED x e mostra latência tick -> sinal ->
+ordem e as chamadas HTTP/SQLite por processo.
+"""
+
+import os
+import sys
+import json
+import math
+import random
+import sqlite3
+import logging
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from market_replay import ReplayHarness, load_recorded_ticks
+
+HOURS = float(os.getenv('BENCH_HOURS', 4))
+SPEED = float(os.getenv('BENCH_SPEED', 240))
+STEP_S = 5
+START = datetime(2025, 8, 1)
+DRIFT = {'DOGEUSDT': 0.15, 'PEPEUSDT': -0.06, 'SHIBUSDT': 0.0}  # variação total no período
+
+
+def record(db_path):
+    random.seed(7)
+    rows = []
+    n = int((HOURS + 1) * 3600 / STEP_S)
+    for symbol, drift in DRIFT.items():
+        price = 0.2 if symbol == 'DOGEUSDT' else 0.00001
+        for i in range(n):
+            ts = START + timedelta(seconds=i * STEP_S)
+            p = price * math.exp(drift * i / n + random.gauss(0, 0.0005))
+            rows.append((symbol, ts.isoformat(sep=' '), p, 5e6))
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('''CREATE TABLE prices (id INTEGER PRIMARY KEY AUTOINCREMENT, symbol TEXT, coin_id TEXT,
+                        timestamp DATETIME NOT NULL, price REAL NOT NULL, volume REAL DEFAULT 0,
+                        high REAL DEFAULT 0, low REAL DEFAULT 0)''')
+        conn.executemany('INSERT INTO prices (symbol, timestamp, price, volume) VALUES (?, ?, ?, ?)', rows)
+
+
+def main():
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'recorded.db')
+        record(source)
+        ticks = load_recorded_ticks(source, list(DRIFT))
+        report = ReplayHarness(ticks, speed=SPEED, warmup_s=3600, workdir=os.path.join(tmp, 'run')).run()
+
+    r = report.to_dict()
+    print(f"{r['ticks']} ticks ({r['replay_span_s'] / 3600:.1f} h) em {r['wall_s']:.1f}s a {SPEED:g}x | "
+          f"sinais={r['signals']} ordens={r['orders']}")
+    for metric, s in r['latency_ms'].items():
+        print(f"  {metric:16s} n={s['count']:3d} p50={s['p50']:8.1f} ms p95={s['p95']:8.1f} ms máx={s['max']:8.1f} ms")
+    for name, c in r['processes'].items():
+        print(f"  {name:24s} HTTP={sum(c.get('http', {}).values()):5d} "
+              f"SQLite={sum(c.get('sqlite_statements', {}).values()):6d} conexões={c.get('sqlite_connections', 0)}")
+    print(f"  exchange falsa: {sum(r['exchange_calls'].values())} requisições")
+    print(json.dumps(r['exchange_calls'], indent=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark: pontuação moeda-a-moeda vs cross-sectional vetorizada
+"""
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from opportunity_scoring import CrossSectionalScorer, build_feature_matrix
+
+SIZES = [int(x) for x in os.getenv('BENCH_SIZES', '50,500,2000').split(',')]
+REPEAT = int(os.getenv('BENCH_REPEAT', 20))
+
+
+def make_snapshots(n):
+    return {
+        f"COIN{i}USDT": (
+            {'price': 1.0, 'change_24h': random.uniform(-10, 10), 'volume': random.uniform(0, 5e6)},
+            [{'price': 1.0 + random.uniform(-0.05, 0.05)} for _ in range(60)],
+        )
+        for i in range(n)
+    }
+
+
+def main():
+    random.seed(42)
+    scorer = CrossSectionalScorer('rules')
+    print(f"{'símbolos':>8} | {'1 por vez (ms)':>14} | {'matriz (ms)':>11} | {'só scoring (ms)':>15}")
+    for n in SIZES:
+        snapshots = make_snapshots(n)
+
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            for symbol, snap in snapshots.items():
+                scorer.score_snapshots({symbol: snap})
+        per_coin = (time.perf_counter() - start) / REPEAT * 1000
+
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            fm = build_feature_matrix(snapshots)
+            table = scorer.score(fm)
+            table.order()
+        batch = (time.perf_counter() - start) / REPEAT * 1000
+
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            scorer.score(fm).order()
+        scoring_only = (time.perf_counter() - start) / REPEAT * 1000
+
+        print(f"{n:>8} | {per_coin:>14.2f} | {batch:>11.2f} | {scoring_only:>15.3f}")
+
+
+if __name__ == '__main__':
+    main()
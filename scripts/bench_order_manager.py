@@ -0,0 +1,104 @@
+"""
+Benchmark: vazão e latência de ordens
+Legado: create_order síncrono e um INSERT + commit por ordem, em sequência
+(como /api/execute_trade e o SimpleAgent faziam). Gerenciador: submit() não
+bloqueante, envio em pool e gravação em lote. A exchange é simulada com
+latência fixa por ordem (BENCH_LATENCY_MS); o banco é SQLite real.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import statistics
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from order_manager import OrderManager
+
+LATENCY_S = float(os.getenv('BENCH_LATENCY_MS', 50)) / 1000
+N_ORDERS = int(os.getenv('BENCH_ORDERS', 200))
+WORKERS = [int(w) for w in os.getenv('BENCH_WORKERS', '4,8').split(',')]
+
+
+class SimulatedExchange:
+    def __init__(self):
+        self.seq = 0
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        time.sleep(LATENCY_S)
+        self.seq += 1
+        return {'id': str(self.seq), 'status': 'closed', 'filled': amount, 'cost': amount * 0.1, 'average': 0.1}
+
+
+def make_db(tmp, name):
+    path = os.path.join(tmp, name)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE trades (id INTEGER PRIMARY KEY AUTOINCREMENT, date DATETIME NOT NULL, "
+                 "type TEXT NOT NULL, symbol TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL, "
+                 "total REAL NOT NULL, status TEXT DEFAULT 'completed')")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM trades').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def legacy(db_path):
+    exchange = SimulatedExchange()
+    latencies = []
+    start = time.perf_counter()
+    for i in range(N_ORDERS):
+        t0 = time.perf_counter()
+        order = exchange.create_order('DOGE/USDT', 'market', 'buy', 100)
+        conn = sqlite3.connect(db_path)
+        conn.execute('INSERT INTO trades (date, type, symbol, amount, price, total) VALUES (?, ?, ?, ?, ?, ?)',
+                     (datetime.now(), 'buy', 'DOGE/USDT', order['filled'], order['average'], order['cost']))
+        conn.commit()
+        conn.close()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - start
+    return elapsed, statistics.median(latencies), statistics.median(latencies), N_ORDERS  # um commit por ordem
+
+
+def managed(db_path, workers):
+    manager = OrderManager(SimulatedExchange(), db_path=db_path, max_workers=workers, max_in_flight=N_ORDERS,
+                           batch_size=100, flush_interval_s=0.5)
+    submit_ms = []
+    start = time.perf_counter()
+    orders = []
+    for i in range(N_ORDERS):
+        t0 = time.perf_counter()
+        orders.append(manager.submit('DOGE/USDT', 'buy', amount=100, idempotency_key=f"o{i}"))
+        submit_ms.append((time.perf_counter() - t0) * 1000)
+    for order in orders:
+        order.wait(60)
+    manager.close()
+    elapsed = time.perf_counter() - start
+    stats = manager.stats()
+    return elapsed, statistics.median(submit_ms), stats['latency_ms']['p50'], stats['flushes']
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = [('Legado (síncrono)', *legacy(make_db(tmp, 'legacy.db')))]
+        for workers in WORKERS:
+            path = make_db(tmp, f'managed{workers}.db')
+            rows.append((f'OrderManager, {workers} workers', *managed(path, workers)))
+            assert count(path) == N_ORDERS
+
+    print(f"{N_ORDERS} ordens, latência da exchange {LATENCY_S * 1000:.0f} ms/ordem")
+    print(f"{'':<28} {'total s':>8} {'ordens/s':>9} {'submit p50 ms':>14} {'até terminal p50 ms':>20} {'commits':>8}")
+    for name, elapsed, submit_ms, done_ms, flushes in rows:
+        print(f"{name:<28} {elapsed:>8.2f} {N_ORDERS / elapsed:>9.1f} {submit_ms:>14.3f} {done_ms:>20.1f} {flushes:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark: vazão do motor de paper trading
+Mede ordens/s a mercado (percorrendo o livro), limits em repouso casadas por
+atualizações de preço e o custo por atualização com o livro cheio.
+"""
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from paper_exchange import PaperExchange
+
+N_ORDERS = int(os.getenv('BENCH_ORDERS', 50000))
+SYMBOLS = ['DOGEUSDT', 'PEPEUSDT', 'SHIBUSDT', 'FLOKIUSDT', 'BONKUSDT']
+
+
+def new_exchange():
+    ex = PaperExchange(balances={'USDT': 1e12, **{s[:-4]: 1e15 for s in SYMBOLS}})
+    for s in SYMBOLS:
+        ex.update_price(s, 0.2, ts=0)
+    return ex
+
+
+def bench_market(rng):
+    ex = new_exchange()
+    start = time.perf_counter()
+    for i in range(N_ORDERS):
+        symbol = SYMBOLS[i % len(SYMBOLS)]
+        if i % 2:
+            ex.create_market_buy_order(symbol, rng.uniform(10, 50000))
+        else:
+            ex.create_market_sell_order(symbol, rng.uniform(10, 50000))
+        if i % 100 == 0:
+            ex.update_price(symbol, 0.2 * rng.uniform(0.99, 1.01), ts=i)
+    return N_ORDERS / (time.perf_counter() - start)
+
+
+def bench_resting(rng):
+    ex = new_exchange()
+    start = time.perf_counter()
+    for i in range(N_ORDERS):
+        symbol = SYMBOLS[i % len(SYMBOLS)]
+        side = 'buy' if i % 2 else 'sell'
+        price = 0.2 * (1 - rng.uniform(0, 0.02)) if side == 'buy' else 0.2 * (1 + rng.uniform(0, 0.02))
+        ex.create_order(symbol, 'limit', side, rng.uniform(10, 5000), price)
+    placed = time.perf_counter() - start
+
+    open_before = len(ex.fetch_open_orders())
+    start = time.perf_counter()
+    updates = 2000
+    for t in range(updates):
+        ex.update_price(SYMBOLS[t % len(SYMBOLS)], 0.2 * rng.uniform(0.975, 1.025), ts=t + 1)
+    matched = time.perf_counter() - start
+    return N_ORDERS / placed, updates / matched, open_before, len(ex.fetch_open_orders())
+
+
+def main():
+    rng = random.Random(7)
+    print(f"{N_ORDERS:,} ordens em {len(SYMBOLS)} símbolos")
+    print(f"A mercado: {bench_market(rng):,.0f} ordens/s")
+    placed, updates, before, after = bench_resting(rng)
+    print(f"Limit em repouso: {placed:,.0f} ordens/s | {updates:,.0f} atualizações/s casando o livro "
+          f"({before:,} abertas -> {after:,})")
+
+
+if __name__ == '__main__':
+    main()
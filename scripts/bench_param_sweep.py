@@ -0,0 +1,79 @@
+"""
+Benchmark: sweep de parâmetros com e sem reaproveitamento de intermediários
+Strategy: mesmo grid avaliado com o cache de séries de indicadores por
+processo e recalculando tudo a cada candidato. Modelo: o mesmo sweep rodado
+duas vezes sobre o mesmo cache em disco (features e rótulos reaproveitados).
+"""
+
+import os
+import sys
+import time
+import logging
+import tempfile
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import param_sweep
+from param_sweep import sweep_model, sweep_strategy
+
+N_CANDLES = int(os.getenv('BENCH_CANDLES', 43200))  # 30 dias de 1m
+N_SYMBOLS = int(os.getenv('BENCH_SYMBOLS', 2))
+N_ROWS = int(os.getenv('BENCH_ROWS', 3000))  # linhas por moeda no sweep do modelo
+
+
+def synthetic_candles(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 0.2 * np.exp(np.cumsum(rng.normal(0, 0.004, n) + 0.002 * np.sin(np.arange(n) / 150)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    return pd.DataFrame({'ts': 1_700_000_000 + 60.0 * np.arange(n), 'open': open_,
+                         'high': np.maximum(open_, close) * 1.001, 'low': np.minimum(open_, close) * 0.999,
+                         'close': close, 'volume': 1.0})
+
+
+def synthetic_raw(n, coins=('DOGEUSDT', 'PEPEUSDT')):
+    frames = []
+    for k, coin in enumerate(coins):
+        c = synthetic_candles(n, 10 + k)
+        frames.append(pd.DataFrame({'coin_id': coin, 'timestamp': pd.to_datetime(c['ts'], unit='s', utc=True),
+                                    'price': c['close'], 'volume': c['volume'], 'high': c['high'],
+                                    'low': c['low'], 'close': c['close']}))
+    return pd.concat(frames).reset_index(drop=True)
+
+
+def main():
+    logging.disable(logging.WARNING)
+    candles = {f"S{k}USDT": synthetic_candles(N_CANDLES, k) for k in range(N_SYMBOLS)}
+    space = {'sma_fast': [3, 5], 'sl_atr_mult': [1.0, 1.5, 2.0, 2.5], 'tp_rr': [1.2, 1.6, 2.0]}
+    n = 2 * 4 * 3
+
+    start = time.perf_counter()
+    sweep_strategy(candles, space, method='grid', workers=1)
+    cached = time.perf_counter() - start
+
+    uncached_signals = param_sweep.strategy_signals
+    with patch.object(param_sweep, 'strategy_signals', lambda c, p, cache=None: uncached_signals(c, p)):
+        start = time.perf_counter()
+        sweep_strategy(candles, space, method='grid', workers=1)
+        fresh = time.perf_counter() - start
+    print(f"Strategy: {n} candidatos x {N_SYMBOLS} símbolos x {N_CANDLES:,} candles | "
+          f"sem cache {fresh:.2f}s ({n / fresh:.1f}/s) | com cache de séries {cached:.2f}s ({n / cached:.1f}/s)")
+
+    raw = synthetic_raw(N_ROWS)
+    model_space = {'n_estimators': [50], 'max_depth': [6, 10], 'future_window': [10, 15], 'buy_p': [0.4, 0.6]}
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = []
+        for _ in range(2):
+            start = time.perf_counter()
+            result = sweep_model(raw, model_space, method='grid', cv_splits=3, workers=1, cache_dir=tmp)
+            runs.append((time.perf_counter() - start, result.meta))
+    (cold, m1), (warm, m2) = runs
+    print(f"Modelo: 8 candidatos, {2 * N_ROWS:,} linhas, CV 3 folds | 1ª rodada {cold:.2f}s "
+          f"({m1['cache_misses']} misses) | 2ª rodada {warm:.2f}s ({m2['cache_misses']} misses, "
+          f"{m2['cache_hits']} hits)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: métricas de performance do livro de P&L x agregação sobre trades
+Compara performance() (acumulados materializados, custo fixo) com a consulta
+equivalente recalculada a cada pedido: SUM/COUNT sobre a tabela trades e o
+P&L diário agrupado por dia, para históricos de tamanhos crescentes.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from pnl_ledger import PnLLedger
+
+SIZES = [int(n) for n in os.getenv('BENCH_TRADES', '10000,100000,300000').split(',')]
+REPEAT = 20
+NOW = datetime(2025, 12, 31, 23, 0)
+
+
+def build(db_path, n):
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, date DATETIME NOT NULL, type TEXT NOT NULL,
+            symbol TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL, total REAL NOT NULL,
+            status TEXT DEFAULT 'completed', created_at DATETIME DEFAULT CURRENT_TIMESTAMP, fee REAL DEFAULT 0
+        )
+    ''')
+    conn.executemany(
+        'INSERT INTO trades (date, type, symbol, amount, price, total, fee) VALUES (?, ?, ?, 10, ?, ?, ?)',
+        ((f'2025-{1 + (i * 12) // n:02d}-{1 + (i // 97) % 28:02d} {10 + i % 12}:00:00',
+          'buy' if i % 2 == 0 else 'sell', 'DOGE/USDT', 0.1 + (i % 7) / 100, 1 + (i % 7) / 10, 0.001)
+         for i in range(n)))
+    conn.commit()
+    return conn
+
+
+def timed_ms(fn):
+    fn()
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main():
+    print(f"{'trades':>8} {'sync inicial s':>14} {'performance() ms':>17} {'SQL em trades ms':>17}")
+    for n in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'bench.db')
+            conn = build(db_path, n)
+            ledger = PnLLedger(db_path, clock=lambda: NOW)
+            start = time.perf_counter()
+            ledger.sync()
+            rebuild_s = time.perf_counter() - start
+
+            ledger_ms = timed_ms(lambda: ledger.performance(30))
+
+            def raw():
+                conn.execute("SELECT COUNT(*), SUM(total), SUM(fee) FROM trades WHERE status = 'completed'").fetchone()
+                conn.execute("SELECT substr(date, 1, 10) AS day, SUM(CASE WHEN type = 'sell' THEN total ELSE -total END) "
+                             "- SUM(fee) FROM trades WHERE status = 'completed' GROUP BY day").fetchall()
+            raw_ms = timed_ms(raw)
+            print(f"{n:>8} {rebuild_s:>14.2f} {ledger_ms:>17.3f} {raw_ms:>17.2f}")
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: P&L realizado do dia por verificação de risco
+Replay: a cada verificação lê todos os trades e recalcula o custo médio do
+zero (único jeito correto de ter P&L realizado com posições de dias
+anteriores). Ledger: sync() incremental (nada novo = uma consulta de MAX(id))
+e leitura em memória. Mede também o custo de um sync() após 1 trade novo.
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from pnl_ledger import PnLLedger, bucket_keys
+
+SIZES = [int(n) for n in os.getenv('BENCH_TRADES', '1000,10000,100000').split(',')]
+CHECKS = int(os.getenv('BENCH_CHECKS', 20))
+SYMBOLS = [f"C{i:02d}/USDT" for i in range(20)]
+
+
+def fill(db_path, n):
+    rng = random.Random(n)
+    start = datetime.now() - timedelta(days=60)
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE trades (id INTEGER PRIMARY KEY AUTOINCREMENT, date DATETIME NOT NULL, type TEXT NOT "
+                 "NULL, symbol TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL, total REAL NOT NULL, "
+                 "status TEXT DEFAULT 'completed', created_at DATETIME DEFAULT CURRENT_TIMESTAMP)")
+    rows = []
+    for i in range(n):
+        date = start + timedelta(days=60) * i / n
+        amount, price = rng.uniform(1, 100), rng.uniform(0.5, 1.5)
+        rows.append((date, 'buy' if rng.random() < 0.55 else 'sell', rng.choice(SYMBOLS), amount, price,
+                     amount * price))
+    conn.executemany('INSERT INTO trades (date, type, symbol, amount, price, total) VALUES (?, ?, ?, ?, ?, ?)', rows)
+    conn.commit()
+    return conn
+
+
+def replay_daily_pnl(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT date, type, symbol, amount, price FROM trades "
+                        "WHERE status = 'completed' ORDER BY id").fetchall()
+    conn.close()
+    today = bucket_keys(datetime.now())['day']
+    positions, realized = {}, 0.0
+    for date, side, symbol, amount, price in rows:
+        pnl = PnLLedger._apply_fill(positions, symbol, side, amount, price)
+        if str(date)[:10] == today:
+            realized += pnl
+    return realized
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    print(f"Média de {CHECKS} verificações por tamanho")
+    print(f"{'trades':>8} {'replay ms':>10} {'ledger ms':>10} {'+1 trade ms':>12} {'rebuild ms':>11}")
+    for n in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'bench.db')
+            conn = fill(db_path, n)
+            replay_ms, expected = timed(lambda: replay_daily_pnl(db_path), CHECKS)
+
+            ledger = PnLLedger(db_path)
+            rebuild_ms, _ = timed(ledger.sync, 1)
+
+            def check():
+                ledger.sync()
+                return ledger.daily_realized()
+
+            ledger_ms, got = timed(check, CHECKS)
+            assert abs(got - expected) < 1e-6 * max(1.0, abs(expected)), (got, expected)
+
+            def one_more():
+                conn.execute("INSERT INTO trades (date, type, symbol, amount, price, total) "
+                             "VALUES (?, 'buy', ?, 1, 1, 1)", (datetime.now(), SYMBOLS[0]))
+                conn.commit()
+                return check()
+
+            append_ms, _ = timed(one_more, CHECKS)
+            conn.close()
+        print(f"{n:>8} {replay_ms:>10.2f} {ledger_ms:>10.3f} {append_ms:>12.2f} {rebuild_ms:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: gravação de posições no JSON (reescrita total) vs PositionStore (SQLite)
+Simula ciclos de update_prices com 1k posições onde apenas parte dos preços muda.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from position_store import PositionStore
+
+N_POSITIONS = int(os.getenv('BENCH_POSITIONS', 1000))
+N_CYCLES = int(os.getenv('BENCH_CYCLES', 50))
+CHANGED_FRACTION = float(os.getenv('BENCH_CHANGED', 0.2))
+
+
+def make_positions(n):
+    now = datetime.now().isoformat()
+    return [{
+        'symbol': f'COIN{i}USDT',
+        'buy_price': 1.0 + i * 0.001,
+        'quantity': 10.0,
+        'buy_date': now,
+        'trade_id': str(i),
+        'current_price': 1.0 + i * 0.001,
+        'last_update': now,
+        'peak_price': 1.0 + i * 0.001,
+        'peak_performance_pct': 0.0,
+        'trailing_stop_triggered': False,
+    } for i in range(n)]
+
+
+def mutate(positions, fraction):
+    changed = random.sample(positions, int(len(positions) * fraction))
+    now = datetime.now().isoformat()
+    for p in changed:
+        p['current_price'] *= 1 + random.uniform(-0.01, 0.01)
+        p['last_update'] = now
+    return changed
+
+
+def bench_json(path, positions):
+    start = time.perf_counter()
+    for _ in range(N_CYCLES):
+        mutate(positions, CHANGED_FRACTION)
+        data = {'last_update': datetime.now().isoformat(), 'positions': positions}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+    return time.perf_counter() - start
+
+
+def bench_store(store, positions):
+    store.upsert(positions)
+    start = time.perf_counter()
+    for _ in range(N_CYCLES):
+        changed = mutate(positions, CHANGED_FRACTION)
+        store.upsert(changed)
+    return time.perf_counter() - start
+
+
+def main():
+    random.seed(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_time = bench_json(os.path.join(tmp, 'portfolio_positions.json'), make_positions(N_POSITIONS))
+        store_time = bench_store(PositionStore(os.path.join(tmp, 'bench.db')), make_positions(N_POSITIONS))
+
+    print(f"Posições: {N_POSITIONS} | Ciclos: {N_CYCLES} | Alteradas/ciclo: {CHANGED_FRACTION:.0%}")
+    print(f"JSON (reescrita total): {json_time / N_CYCLES * 1000:8.2f} ms/ciclo | {N_CYCLES / json_time:8.1f} ciclos/s")
+    print(f"PositionStore (upsert): {store_time / N_CYCLES * 1000:8.2f} ms/ciclo | {N_CYCLES / store_time:8.1f} ciclos/s")
+    print(f"Linhas atualizadas/s (store): {N_CYCLES * int(N_POSITIONS * CHANGED_FRACTION) / store_time:,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark: histórico grande via JSON por linha vs exportação Arrow IPC
+Compara tempo de servidor, bytes transferidos, carga no cliente (pandas) e
+pico de memória Python do servidor (passada separada, com tracemalloc).
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from price_export import iter_price_batches, iter_export_bytes, read_export, RAW_SCHEMA
+from tick_archive import read_ticks
+
+N_SYMBOLS = int(os.getenv('BENCH_SYMBOLS', 10))
+TICKS_PER_SYMBOL = int(os.getenv('BENCH_TICKS', 100000))
+
+
+def populate(conn):
+    conn.execute('''
+        CREATE TABLE prices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, coin_id TEXT, timestamp DATETIME, price REAL,
+            symbol TEXT, volume REAL DEFAULT 0, high REAL DEFAULT 0, low REAL DEFAULT 0
+        )
+    ''')
+    conn.execute('CREATE INDEX idx_prices_symbol_timestamp ON prices(symbol, timestamp)')
+    start = np.datetime64(datetime(2025, 1, 1), 's')
+    stamps = np.char.replace(np.datetime_as_string(start + np.arange(TICKS_PER_SYMBOL) * 20), 'T', ' ').tolist()
+    rng = np.random.default_rng(1)
+    for i in range(N_SYMBOLS):
+        prices = np.cumprod(1 + rng.normal(0, 0.001, TICKS_PER_SYMBOL)).tolist()
+        conn.executemany('INSERT INTO prices (symbol, timestamp, price, volume) VALUES (?, ?, ?, ?)',
+                         zip([f"COIN{i:02d}USDT"] * TICKS_PER_SYMBOL, stamps, prices, [1e6] * TICKS_PER_SYMBOL))
+    conn.commit()
+
+
+def json_export(conn, archive_dir):
+    # Como /api/prices: DataFrame inteiro -> lista de dicts -> JSON
+    out = []
+    for i in range(N_SYMBOLS):
+        ticks = read_ticks(conn, f"COIN{i:02d}USDT", archive_dir=archive_dir)
+        out.extend({'id': int(t), 'symbol': s, 'timestamp': ts.isoformat(sep=' '), 'price': p, 'volume': v}
+                   for t, s, ts, p, v in zip(ticks['id'], ticks['symbol'], ticks['timestamp'],
+                                             ticks['price'], ticks['volume']))
+    return json.dumps(out).encode()
+
+
+def arrow_export(conn, archive_dir, keep=True):
+    # keep=False só conta os bytes (como um socket): mostra a memória limitada do servidor
+    chunks, size = [], 0
+    for data in iter_export_bytes(iter_price_batches(conn, archive_dir=archive_dir), RAW_SCHEMA, 'arrow'):
+        size += len(data)
+        if keep:
+            chunks.append(data)
+    return b''.join(chunks) if keep else size
+
+
+def timed(fn):
+    begin = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - begin
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'bench.db'))
+        populate(conn)
+        archive_dir = os.path.join(tmp, 'archive')
+        n = N_SYMBOLS * TICKS_PER_SYMBOL
+
+        payload_json, t_json = timed(lambda: json_export(conn, archive_dir))
+        payload_arrow, t_arrow = timed(lambda: arrow_export(conn, archive_dir))
+        peak_json = peak_memory(lambda: json_export(conn, archive_dir))
+        peak_arrow = peak_memory(lambda: arrow_export(conn, archive_dir, keep=False))
+
+        begin = time.perf_counter()
+        df_json = pd.DataFrame(json.loads(payload_json))
+        t_load_json = time.perf_counter() - begin
+        begin = time.perf_counter()
+        df_arrow = read_export(payload_arrow).to_pandas()
+        t_load_arrow = time.perf_counter() - begin
+        assert len(df_json) == len(df_arrow) == n
+        conn.close()
+
+    print(f"Ticks: {n:,} ({N_SYMBOLS} símbolos)")
+    print(f"JSON por linha: servidor {t_json:6.2f}s | {len(payload_json) / 1e6:6.1f} MB | "
+          f"cliente {t_load_json:5.2f}s | pico de memória {peak_json / 1e6:6.1f} MB")
+    print(f"Arrow IPC:      servidor {t_arrow:6.2f}s | {len(payload_arrow) / 1e6:6.1f} MB | "
+          f"cliente {t_load_arrow:5.2f}s | pico de memória {peak_arrow / 1e6:6.1f} MB")
+
+if __name__ == '__main__':
+    main()
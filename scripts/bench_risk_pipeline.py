@@ -0,0 +1,84 @@
+"""
+Benchmark: latência da verificação de risco pré-trade
+Sequencial sem cache (comportamento anterior) contra o pipeline: saldo e
+ticker em paralelo às checagens locais, com cache curto. A exchange é
+simulada com latência fixa por requisição REST (BENCH_LATENCY_MS); o P&L
+diário vem do ledger sobre BENCH_TRADES trades reais em SQLite.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import statistics
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from security import TradingSecurityManager
+
+LATENCY_S = float(os.getenv('BENCH_LATENCY_MS', 120)) / 1000
+N_TRADES = int(os.getenv('BENCH_TRADES', 5000))
+ROUNDS = int(os.getenv('BENCH_ROUNDS', 20))
+TRADE = {'symbol': 'DOGE/USDT', 'amount': 20, 'action': 'BUY'}
+
+
+class SimulatedExchange:
+    def __init__(self):
+        self.requests = 0
+
+    def fetch_balance(self):
+        self.requests += 1
+        time.sleep(LATENCY_S)
+        return {'USDT': {'free': 500.0}, 'BUSD': {'free': 0.0}}
+
+    def fetch_ticker(self, symbol):
+        self.requests += 1
+        time.sleep(LATENCY_S)
+        return {'last': 0.1, 'percentage': 2.0, 'baseVolume': 5e6}
+
+
+def run(manager, invalidate_every=None):
+    exchange = SimulatedExchange()
+    latencies = []
+    for i in range(ROUNDS):
+        if invalidate_every and i % invalidate_every == 0:
+            manager.invalidate_caches()
+        checks = manager.comprehensive_risk_check(TRADE, exchange)
+        assert checks['overall_status'] == 'APPROVED', checks['errors']
+        latencies.append(checks['latency_ms'])
+    return statistics.median(latencies), exchange.requests / ROUNDS
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE trades (id INTEGER PRIMARY KEY AUTOINCREMENT, date DATETIME NOT NULL, "
+                     "type TEXT NOT NULL, symbol TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL, "
+                     "total REAL NOT NULL, status TEXT DEFAULT 'completed')")
+        conn.executemany("INSERT INTO trades (date, type, symbol, amount, price, total) VALUES (?, ?, ?, 1, 1, 1)",
+                         [(datetime.now(), 'buy' if i % 2 == 0 else 'sell', f"C{i % 20}/USDT")
+                          for i in range(N_TRADES)])
+        conn.commit()
+        conn.close()
+
+        legacy = TradingSecurityManager(db_path)
+        legacy.parallel_checks = False
+        legacy.balance_cache.ttl_s = legacy.ticker_cache.ttl_s = 0
+        legacy.calculate_daily_pnl()  # ledger construído fora da medição
+
+        pipeline = TradingSecurityManager(db_path)
+        pipeline.calculate_daily_pnl()
+
+        rows = [('Sequencial, sem cache', *run(legacy)),
+                ('Paralelo, cache frio', *run(pipeline, invalidate_every=1)),
+                ('Paralelo, cache quente', *run(pipeline))]
+
+    print(f"Latência {LATENCY_S * 1000:.0f} ms/requisição, {N_TRADES} trades no banco, mediana de {ROUNDS} checagens")
+    for name, median_ms, requests in rows:
+        print(f"{name:<24} {median_ms:>8.2f} ms  {requests:.2f} requisições/checagem")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: vazão do backend por modo de serviço
+Legado: `python backend/app.py` (servidor de desenvolvimento do Flask, um
+processo). Produção: serve_backend.py (gunicorn) com 1..N workers; o pre-fork
+sobre wsgiref entra como referência. Clientes em
+threads fazem GETs em endpoints de leitura por BENCH_SECONDS; o banco é um
+SQLite temporário com BENCH_TRADES trades.
+"""
+
+import os
+import sys
+import time
+import socket
+import sqlite3
+import tempfile
+import threading
+import subprocess
+import statistics
+import urllib.request
+from datetime import datetime, timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SECONDS = float(os.getenv('BENCH_SECONDS', 5))
+CLIENTS = int(os.getenv('BENCH_CLIENTS', 16))
+N_TRADES = int(os.getenv('BENCH_TRADES', 2000))
+WORKERS = [int(w) for w in os.getenv('BENCH_WORKERS', '1,2,4').split(',')]
+PATHS = ['/api/trades?limit=50', '/api/trading/mode', '/api/trades/daily-performance', '/api/orders/stats']
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def seed(db_path):
+    """Cria as tabelas pelo próprio backend e insere trades sintéticos"""
+    env = dict(os.environ, DB_PATH=db_path)
+    subprocess.run([sys.executable, '-c', 'import sys; sys.path.insert(0, "backend"); '
+                    'from app import init_database; init_database()'], cwd=ROOT, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    conn = sqlite3.connect(db_path)
+    base = datetime.now() - timedelta(days=30)
+    conn.executemany('INSERT INTO trades (date, type, symbol, amount, price, total) VALUES (?, ?, ?, ?, ?, ?)', [
+        ((base + timedelta(minutes=20 * i)).isoformat(), 'buy' if i % 2 == 0 else 'sell', 'DOGE/USDT',
+         100.0, 0.1 + (i % 7) * 0.001, 10.0 + (i % 7) * 0.1) for i in range(N_TRADES)])
+    conn.commit()
+    conn.close()
+
+
+def wait_ready(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/trading/mode', timeout=2).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"servidor na porta {port} não respondeu")
+
+
+def load(port):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop = time.monotonic() + SECONDS
+
+    def client(n):
+        local, i = [], n
+        while time.monotonic() < stop:
+            t0 = time.perf_counter()
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}{PATHS[i % len(PATHS)]}', timeout=10).read()
+                local.append((time.perf_counter() - t0) * 1000)
+            except OSError:
+                with lock:
+                    errors[0] += 1
+            i += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(CLIENTS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return {
+        'rps': len(latencies) / SECONDS,
+        'p50': statistics.median(latencies) if latencies else None,
+        'p95': latencies[int(len(latencies) * 0.95)] if latencies else None,
+        'errors': errors[0],
+    }
+
+
+def run(label, cmd, env, port):
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        result = load(port)
+    finally:
+        proc.terminate()
+        proc.wait(60)
+    print(f"{label:<28} {result['rps']:>8.0f} req/s   p50 {result['p50']:>6.1f} ms   "
+          f"p95 {result['p95']:>6.1f} ms   erros {result['errors']}")
+    return result
+
+
+def main():
+    print(f"CPUs: {os.cpu_count()} | clientes: {CLIENTS} | {SECONDS:.0f}s por modo | {N_TRADES} trades")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        seed(db_path)
+        env = dict(os.environ, DB_PATH=db_path, BACKEND_LOG_FILE=os.path.join(tmp, 'backend.log'))
+
+        port = free_port()
+        run('dev server (app.py)', [sys.executable, 'backend/app.py'], dict(env, PORT=str(port)), port)
+        for server in ('gunicorn', 'prefork'):
+            for workers in WORKERS:
+                port = free_port()
+                run(f'{server} {workers} worker(s) x 4', [sys.executable, 'serve_backend.py', '--server', server,
+                    '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers), '--threads', '4'],
+                    env, port)
+
+
+if __name__ == '__main__':
+    main()
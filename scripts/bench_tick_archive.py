@@ -0,0 +1,129 @@
+"""
+Benchmark: ticks só no SQLite vs SQLite recente + Parquet arquivado
+Gera ~10M ticks (20 símbolos, 120 dias, um a cada 20s), mede tamanho em disco,
+custo de inserção e consultas históricas antes e depois de arquivar tudo que
+passa do horizonte de 7 dias.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from candles import update_candles
+from tick_archive import archive_old_ticks, archive_stats, read_ticks
+
+N_SYMBOLS = int(os.getenv('BENCH_SYMBOLS', 20))
+DAYS = int(os.getenv('BENCH_DAYS', 120))
+HORIZON_DAYS = 7
+TICK_S = 20
+
+
+def populate(conn, start):
+    conn.execute('''
+        CREATE TABLE prices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, coin_id TEXT, timestamp DATETIME, price REAL,
+            volume_change REAL, symbol TEXT, volume REAL DEFAULT 0, high REAL DEFAULT 0,
+            low REAL DEFAULT 0, close REAL DEFAULT 0
+        )
+    ''')
+    conn.execute('CREATE INDEX idx_prices_symbol ON prices(symbol)')
+    conn.execute('CREATE INDEX idx_prices_timestamp ON prices(timestamp)')
+    conn.execute('CREATE INDEX idx_prices_symbol_timestamp ON prices(symbol, timestamp)')
+    rng = np.random.default_rng(1)
+    symbols = [f"COIN{i:02d}USDT" for i in range(N_SYMBOLS)]
+    prices = np.ones(N_SYMBOLS)
+    per_day = 86400 // TICK_S
+    total = 0
+    for day in range(DAYS):
+        seconds = np.arange(per_day) * TICK_S
+        stamps = np.datetime64(start + timedelta(days=day), 's') + seconds.astype('timedelta64[s]')
+        stamps = np.char.replace(np.datetime_as_string(stamps), 'T', ' ')
+        rows = []
+        for i, symbol in enumerate(symbols):
+            path = prices[i] * np.cumprod(1 + rng.normal(0, 0.001, per_day))
+            prices[i] = path[-1]
+            rows.extend(zip([symbol] * per_day, stamps.tolist(), path.tolist(), [1e6] * per_day))
+        conn.executemany('INSERT INTO prices (symbol, timestamp, price, volume) VALUES (?, ?, ?, ?)', rows)
+        conn.commit()
+        total += len(rows)
+    return total
+
+
+def timed(fn, repeat=3):
+    best, result = None, None
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - begin
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def insert_cost(conn, n=20000):
+    now = datetime.now().isoformat(sep=' ')
+    begin = time.perf_counter()
+    for i in range(0, n, N_SYMBOLS):
+        conn.executemany('INSERT INTO prices (symbol, timestamp, price, volume) VALUES (?, ?, ?, ?)',
+                         [(f"COIN{j:02d}USDT", now, 1.0, 1e6) for j in range(N_SYMBOLS)])
+        conn.commit()
+    return (time.perf_counter() - begin) / (n // N_SYMBOLS)
+
+
+def queries(conn, archive_dir, start):
+    lo, hi = start + timedelta(days=30), start + timedelta(days=60)
+    t_window, window = timed(lambda: read_ticks(conn, 'COIN03USDT', lo, hi, archive_dir=archive_dir))
+    t_latest, latest = timed(lambda: read_ticks(conn, 'COIN03USDT', limit=50, archive_dir=archive_dir))
+    t_full, full = timed(lambda: read_ticks(conn, 'COIN03USDT', archive_dir=archive_dir), repeat=1)
+    return [
+        (f"janela de 30 dias ({len(window):,} ticks)", t_window),
+        ("últimos 50 ticks", t_latest),
+        (f"histórico completo de 1 símbolo ({len(full):,} ticks)", t_full),
+    ]
+
+
+def main():
+    start = (datetime.now() - timedelta(days=DAYS)).replace(hour=0, minute=0, second=0, microsecond=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        archive_dir = os.path.join(tmp, 'archive')
+        conn = sqlite3.connect(db_path)
+
+        begin = time.perf_counter()
+        n_ticks = populate(conn, start)
+        print(f"Ticks: {n_ticks:,} ({N_SYMBOLS} símbolos, {DAYS} dias) gerados em {time.perf_counter() - begin:.0f}s")
+        begin = time.perf_counter()
+        update_candles(conn)
+        print(f"Catch-up dos candles: {time.perf_counter() - begin:.0f}s")
+
+        size_before = os.path.getsize(db_path)
+        insert_before = insert_cost(conn)
+        q_before = queries(conn, archive_dir, start)
+
+        begin = time.perf_counter()
+        result = archive_old_ticks(conn, HORIZON_DAYS, archive_dir, tables=('prices',), vacuum=True)
+        t_archive = time.perf_counter() - begin
+
+        size_after = os.path.getsize(db_path)
+        parquet = archive_stats(archive_dir)['prices']
+        insert_after = insert_cost(conn)
+        q_after = queries(conn, archive_dir, start)
+        conn.close()
+
+    print(f"Arquivamento ({HORIZON_DAYS} dias no SQLite): {result['prices']['rows']:,} ticks "
+          f"em {t_archive:.0f}s (inclui VACUUM)")
+    print(f"Disco: SQLite {size_before / 1e6:.0f} MB -> {size_after / 1e6:.0f} MB "
+          f"+ Parquet {parquet['bytes'] / 1e6:.0f} MB em {parquet['files']} arquivos")
+    print(f"Inserção de um ciclo ({N_SYMBOLS} ticks + commit): "
+          f"{insert_before * 1000:.2f} ms -> {insert_after * 1000:.2f} ms")
+    for (label, before), (_, after) in zip(q_before, q_after):
+        print(f"{label}: só SQLite {before * 1000:.1f} ms | duas camadas {after * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
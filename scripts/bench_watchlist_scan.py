@@ -0,0 +1,96 @@
+"""
+Benchmark: latência do ciclo do SimpleAgent vs tamanho da watchlist
+Sobe um backend falso local (latência configurável por requisição) e compara a
+varredura serial (1 worker) com a concorrente (SCAN_WORKERS threads).
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+LATENCY_S = float(os.getenv('BENCH_LATENCY_MS', 40)) / 1000
+SLOW_SYMBOL_DELAY_S = float(os.getenv('BENCH_SLOW_MS', 3000)) / 1000
+SIZES = [int(x) for x in os.getenv('BENCH_SIZES', '10,25,50,100').split(',')]
+WORKERS = int(os.getenv('SCAN_WORKERS', 8))
+
+
+class FakeBackend(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _json(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        symbol = parse_qs(url.query).get('symbol', [''])[0]
+        time.sleep(SLOW_SYMBOL_DELAY_S if symbol == 'SLOWUSDT' else LATENCY_S)
+        if url.path == '/api/market_data':
+            self._json({'symbol': symbol, 'price': 1.0, 'volume': 2e6,
+                        'percentage': random.uniform(-10, 10)})
+        elif url.path == '/api/prices':
+            self._json([{'price': 1.0 + i * 0.01} for i in range(60)])
+        else:
+            self._json([] if url.path == '/api/trades' else {})
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeBackend)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['MOCOVE_API_BASE'] = f"http://127.0.0.1:{server.server_port}"
+    os.environ['DB_PATH'] = os.path.join(tmp, 'bench.db')
+    os.environ['ENABLE_REAL_TRADING'] = 'false'
+    os.environ['BINANCE_API_KEY'] = ''
+    os.chdir(tmp)  # log do agente vai para o diretório temporário
+
+    import logging
+    import ai_trading_agent_robust as robust
+    from watchlist_scanner import WatchlistScanner
+    logging.getLogger().setLevel(logging.WARNING)
+    robust.log.setLevel(logging.WARNING)
+
+    agent = robust.SimpleAgent()
+    agent.execute_trade = lambda opp: None
+
+    print(f"Latência por requisição: {LATENCY_S * 1000:.0f} ms | workers: {WORKERS}")
+    print(f"{'moedas':>7} | {'serial (s)':>10} | {'concorrente (s)':>15} | {'speedup':>7}")
+    for size in SIZES:
+        agent.active_coins = [f"COIN{i}USDT" for i in range(size)]
+        timings = []
+        for workers in (1, WORKERS):
+            agent.scanner = WatchlistScanner(agent.scan_symbol, workers, deadline_s=600)
+            start = time.perf_counter()
+            agent.run_cycle()
+            timings.append(time.perf_counter() - start)
+            agent.scanner.shutdown()
+        print(f"{size:>7} | {timings[0]:>10.2f} | {timings[1]:>15.2f} | {timings[0] / timings[1]:>6.1f}x")
+
+    # Um símbolo lento não deve atrasar o ciclo além do prazo
+    agent.active_coins = [f"COIN{i}USDT" for i in range(50)] + ['SLOWUSDT']
+    agent.scanner = WatchlistScanner(agent.scan_symbol, WORKERS, deadline_s=1.0)
+    scan = agent.scanner.scan(agent.active_coins)
+    print(f"Com 1 símbolo lento ({SLOW_SYMBOL_DELAY_S:.0f}s) e prazo de 1s: "
+          f"{scan.completed}/{len(agent.active_coins)} concluídos em {scan.elapsed_s:.2f}s, "
+          f"timeout: {scan.timed_out}")
+    agent.scanner.shutdown()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,10 @@ import logging
 import os
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from candles import update_candles
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -197,6 +201,7 @@ class DataCollector:
                     continue
             
             conn.commit()
+            update_candles(conn)
             conn.close()
             logger.info(f"Salvos {len(data_list)} registros no banco de dados")
             
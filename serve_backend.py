@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Serve Backend - Modo de produção multi-worker do backend Flask
+Substitui `python backend/app.py` (servidor de desenvolvimento, um processo):
+
+- gunicorn (padrão, fixado em requirements.txt): inicializa o banco uma vez num
+  processo filho e substitui o processo pelo gunicorn com
+  backend/gunicorn_conf.py (workers gthread, aquecimento e encerramento por worker).
+- Pre-fork (--server prefork, só biblioteca padrão): alternativa para máquinas
+  sem gunicorn; o mestre abre o socket e cria N workers com threads sobre o
+  wsgiref, todos aceitando no mesmo socket.
+
+/metrics soma as séries de todos os workers (snapshots em MOCOVE_METRICS_DIR,
+padrão runtime/metrics, limpo a cada partida).
+
+MOCOVE_EXCHANGE=paper roda com um worker só: o livro, o saldo e as ordens da
+PaperExchange ficam na memória do processo, e com vários workers
+GET /api/orders/<chave> só acharia a ordem no worker que a recebeu.
+
+Sinais (pre-fork):
+    SIGHUP          recarga graciosa: sobe workers novos (código relido do disco),
+                    espera ficarem prontos e só então encerra os antigos
+    SIGTERM/SIGINT  encerramento gracioso: workers terminam as requisições em
+                    andamento e gravam ordens pendentes
+
+Uso:
+    python serve_backend.py --workers 4 --threads 8 --port 5000
+    python serve_backend.py --server prefork --workers 4   # sem gunicorn
+"""
+
+import os
+import sys
+import time
+import select
+import signal
+import socket
+import logging
+import argparse
+import threading
+import socketserver
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(ROOT, 'backend')
+
+from instrumentation import METRICS_DIR_ENV, clear_snapshots
+from logging_setup import WORKER_ID_ENV, next_worker_id
+
+log = logging.getLogger("ServeBackend")
+
+
+class ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = False
+    block_on_close = True  # server_close() espera as requisições em andamento
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def run_in_child(fn) -> int:
+    """Executa fn num processo filho (não carrega o app no mestre) e devolve o código de saída"""
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            fn()
+        except BaseException as e:
+            print(f"❌ {e}", file=sys.stderr)
+            code = 1
+        finally:
+            os._exit(code)
+    return os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+
+
+def worker_count(requested: int) -> int:
+    """Número de workers efetivo: 1 com MOCOVE_EXCHANGE=paper (estado da exchange é por processo)"""
+    if os.getenv('MOCOVE_EXCHANGE', 'binance').lower() == 'paper' and requested > 1:
+        log.warning(f"⚠️ MOCOVE_EXCHANGE=paper: usando 1 worker em vez de {requested} "
+                    "(ordens e saldo da paper exchange ficam na memória do worker)")
+        return 1
+    return max(1, requested)
+
+
+def init_database():
+    from logging_setup import setup_logging
+    setup_logging()
+    sys.path.insert(0, BACKEND_DIR)
+    from app import init_database as init
+    init()
+
+
+def worker_main(sock: socket.socket, threads: int, ready_fd: int):
+    """Processo worker: importa o app, aquece, sinaliza pronto e atende até SIGTERM"""
+    # Sinais herdados do mestre: HUP/INT são do mestre; TERM mata direto até o worker estar pronto
+    for sig in (signal.SIGHUP, signal.SIGINT):
+        signal.signal(sig, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    sys.path.insert(0, BACKEND_DIR)
+    import wsgi
+
+    httpd = ThreadingWSGIServer(sock.getsockname()[:2], QuietHandler, bind_and_activate=False)
+    httpd.socket.close()
+    httpd.socket = sock
+    host, port = sock.getsockname()[:2]
+    httpd.server_name, httpd.server_port = socket.getfqdn(host), port
+    httpd.setup_environ()
+    httpd.set_app(wsgi.application)
+    # No máximo `threads` requisições simultâneas por worker; com todas ocupadas o worker
+    # para de aceitar e as conexões novas ficam para os outros workers
+    limit = threading.BoundedSemaphore(threads)
+    process_request, shutdown_request = httpd.process_request, httpd.shutdown_request
+
+    def bounded_process(request, client_address):
+        limit.acquire()
+        try:
+            process_request(request, client_address)
+        except Exception:
+            limit.release()
+            raise
+
+    def release_shutdown(request):
+        try:
+            shutdown_request(request)
+        finally:
+            limit.release()
+
+    httpd.process_request, httpd.shutdown_request = bounded_process, release_shutdown
+
+    def graceful_stop(*_):
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+
+    wsgi.warm_up()
+    signal.signal(signal.SIGTERM, graceful_stop)
+    os.write(ready_fd, b'1')
+    os.close(ready_fd)
+    httpd.serve_forever(poll_interval=0.2)
+    httpd.server_close()  # espera as threads em andamento
+    wsgi.shutdown()
+
+
+class PreforkServer:
+    """Mestre: socket compartilhado, workers com respawn, recarga e parada graciosas"""
+
+    def __init__(self, host: str, port: int, workers: int, threads: int, graceful_timeout: float = 30,
+                 ready_timeout: float = 60):
+        self.host, self.port = host, port
+        self.workers, self.threads = max(1, workers), max(1, threads)
+        self.graceful_timeout, self.ready_timeout = graceful_timeout, ready_timeout
+        self.children = {}  # pid -> geração
+        self.worker_ids = {}  # pid -> número do worker (sufixo do arquivo de log)
+        self.generation = 0
+        self.stopping = False
+        self.reload_requested = False
+        self.sock: socket.socket = None
+
+    def listen(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(1024)
+        self.port = self.sock.getsockname()[1]
+
+    def spawn(self) -> int:
+        """Cria um worker da geração atual e espera ele ficar pronto; retorna o pid"""
+        self.worker_ids = {pid: n for pid, n in self.worker_ids.items() if pid in self.children}
+        worker_id = next_worker_id(self.worker_ids.values())
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            os.environ[WORKER_ID_ENV] = str(worker_id)
+            code = 0
+            try:
+                worker_main(self.sock, self.threads, write_fd)
+            except BaseException as e:
+                print(f"❌ Worker {os.getpid()}: {e}", file=sys.stderr)
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(write_fd)
+        self.children[pid] = self.generation
+        self.worker_ids[pid] = worker_id
+        ready, _, _ = select.select([read_fd], [], [], self.ready_timeout)
+        if not ready or not os.read(read_fd, 1):
+            log.error(f"❌ Worker {pid} não ficou pronto em {self.ready_timeout:.0f}s")
+        os.close(read_fd)
+        return pid
+
+    def stop_children(self, pids, timeout: float):
+        for pid in pids:
+            self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + timeout
+        while any(pid in self.children for pid in pids) and time.monotonic() < deadline:
+            self.reap(block_s=0.1)
+        for pid in [p for p in pids if p in self.children]:
+            log.warning(f"⚠️ Worker {pid} excedeu {timeout:.0f}s; encerrando à força")
+            self._signal(pid, signal.SIGKILL)
+        while any(pid in self.children for pid in pids):
+            self.reap(block_s=0.1)
+
+    def _signal(self, pid: int, sig):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            self.children.pop(pid, None)
+
+    def reap(self, block_s: float = 0.0) -> list:
+        """Recolhe workers encerrados; retorna os que eram da geração atual"""
+        lost, deadline = [], time.monotonic() + block_s
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return lost
+            if pid == 0:
+                if time.monotonic() >= deadline:
+                    return lost
+                time.sleep(0.02)
+                continue
+            generation = self.children.pop(pid, None)
+            if generation == self.generation:
+                lost.append((pid, os.waitstatus_to_exitcode(status)))
+
+    def reload(self):
+        """Sobe a nova geração completa antes de parar a anterior (sem janela sem workers)"""
+        old = list(self.children)
+        self.generation += 1
+        for _ in range(self.workers):
+            self.spawn()
+        log.info(f"🔁 Recarga: {self.workers} workers novos prontos; encerrando {len(old)} antigos")
+        self.stop_children(old, self.graceful_timeout)
+
+    def run(self):
+        self.listen()
+        code = run_in_child(init_database)
+        if code != 0:
+            raise SystemExit(f"Falha ao inicializar o banco (código {code})")
+        signal.signal(signal.SIGHUP, lambda *_: setattr(self, 'reload_requested', True))
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, 'stopping', True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, 'stopping', True))
+        for _ in range(self.workers):
+            self.spawn()
+        log.info(f"🚀 Backend em http://{self.host}:{self.port} com {self.workers} workers x {self.threads} threads "
+                 f"(mestre {os.getpid()})")
+        while not self.stopping:
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+            for pid, code in self.reap(block_s=0.5):
+                if not self.stopping:
+                    log.warning(f"⚠️ Worker {pid} saiu (código {code}); criando outro")
+                    time.sleep(1)  # evita laço apertado se o worker cai na inicialização
+                    self.spawn()
+        log.info("🛑 Encerrando workers...")
+        self.stop_children(list(self.children), self.graceful_timeout)
+        self.sock.close()
+
+
+def run_gunicorn(args):
+    """Inicializa o banco uma vez e substitui o processo pelo gunicorn"""
+    code = run_in_child(init_database)
+    if code != 0:
+        raise SystemExit(f"Falha ao inicializar o banco (código {code})")
+    os.execvp(sys.executable, [
+        sys.executable, '-m', 'gunicorn', '-c', os.path.join(BACKEND_DIR, 'gunicorn_conf.py'),
+        '--chdir', BACKEND_DIR, '-w', str(args.workers), '--threads', str(args.threads),
+        '-b', f"{args.host}:{args.port}", '--graceful-timeout', str(int(args.graceful_timeout)), 'wsgi:application',
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend MoCoVe em modo de produção (multi-worker)")
+    parser.add_argument('--host', default=os.getenv('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1)))
+    parser.add_argument('--threads', type=int, default=int(os.getenv('WEB_THREADS', 4)))
+    parser.add_argument('--graceful-timeout', type=float, default=float(os.getenv('WEB_GRACEFUL_TIMEOUT', 30)))
+    parser.add_argument('--server', choices=['gunicorn', 'prefork'], default=os.getenv('WEB_SERVER', 'gunicorn'))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args.workers = worker_count(args.workers)
+    # Snapshots de métricas por worker, agregados em /metrics (herdado pelos workers e pelo gunicorn)
+    os.environ.setdefault(METRICS_DIR_ENV, os.path.join(ROOT, 'runtime', 'metrics'))
+    clear_snapshots(os.environ[METRICS_DIR_ENV])
+    if args.server == 'gunicorn':
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            raise SystemExit("gunicorn não instalado: pip install -r requirements.txt "
+                             "(ou use --server prefork)")
+        run_gunicorn(args)
+    else:
+        PreforkServer(args.host, args.port, args.workers, args.threads, args.graceful_timeout).run()
+
+
+if __name__ == '__main__':
+    main()
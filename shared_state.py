@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Shared State - Estado de execução compartilhado entre processos (workers do backend)
+Chave/valor em JSON numa tabela do memecoin.db. Cada processo mantém uma cópia
+em memória e só relê a tabela quando outra conexão gravou no banco
+(PRAGMA data_version), então get() no caminho quente não faz consulta.
+
+claim() registra uma chave uma única vez entre todos os processos (ex.:
+chave de idempotência de ordem recebida por dois workers).
+
+Uso:
+    state = SharedState('memecoin.db')
+    state.set('use_testnet', False)       # visível para os outros workers
+    state.get('use_testnet', True)
+    state.claim('order:abc', os.getpid())  # None = esta chamada ficou com a chave
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from position_store import DEFAULT_DB_PATH
+
+log = logging.getLogger("SharedState")
+
+
+class SharedState:
+    """Chave/valor entre processos com leitura em memória enquanto ninguém escreve"""
+
+    def __init__(self, db_path: Optional[str] = None, claim_ttl_s: float = 86400):
+        self.db_path = db_path or DEFAULT_DB_PATH
+        self.claim_ttl_s = claim_ttl_s
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._version: Optional[int] = None
+        self._values: Dict[str, Any] = {}
+        self.hits = 0  # leituras servidas da cópia em memória
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão do processo (reaberta após fork: conexões SQLite não atravessam fork)"""
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA busy_timeout=10000')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS runtime_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS runtime_claims (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            self._conn, self._pid, self._version = conn, os.getpid(), None
+        return self._conn
+
+    def _refresh(self, conn: sqlite3.Connection):
+        version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if version == self._version:
+            self.hits += 1
+            return
+        self.misses += 1
+        self._values = {k: json.loads(v) for k, v in conn.execute('SELECT key, value FROM runtime_state')}
+        self._version = version
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            self._refresh(self._connection())
+            return self._values.get(key, default)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh(self._connection())
+            return dict(self._values)
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            conn = self._connection()
+            conn.execute('INSERT OR REPLACE INTO runtime_state (key, value, updated_at) VALUES (?, ?, ?)',
+                         (key, json.dumps(value), time.time()))
+            self._refresh(conn)
+            self._values[key] = value  # gravação própria não muda data_version desta conexão
+
+    def claim(self, key: str, value: Any) -> Optional[Any]:
+        """Reserva a chave para value; None se reservou agora, senão o valor de quem reservou antes"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('DELETE FROM runtime_claims WHERE created_at < ?', (time.time() - self.claim_ttl_s,))
+                row = conn.execute('SELECT value FROM runtime_claims WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    conn.execute('INSERT INTO runtime_claims (key, value, created_at) VALUES (?, ?, ?)',
+                                 (key, json.dumps(value), time.time()))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            return None if row is None else json.loads(row[0])
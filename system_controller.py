@@ -18,6 +18,8 @@ import sqlite3
 import ccxt
 from dotenv import load_dotenv
 
+from account_valuation import AccountValuator
+
 # Carregar configurações
 load_dotenv()
 
@@ -47,6 +49,7 @@ class SystemController:
         self.binance_api_key = os.getenv('BINANCE_API_KEY', '')
         self.binance_api_secret = os.getenv('BINANCE_API_SECRET', '')
         self.use_testnet = os.getenv('USE_TESTNET', 'false').lower() == 'true'
+        self.valuator = AccountValuator(db_path=self.db_path, exchange_factory=self._create_exchange)
         
         # Inicializar componentes
         self.setup_logging()
@@ -258,15 +261,8 @@ class SystemController:
                     'permissions': []
                 }
             
-            exchange = ccxt.binance({
-                'apiKey': self.binance_api_key,
-                'secret': self.binance_api_secret,
-                'sandbox': self.use_testnet,
-                'enableRateLimit': True
-            })
-            
-            # Testar conexão
-            account_info = exchange.fetch_balance()
+            # Testar conexão (mesmo cliente da avaliação de saldo)
+            account_info = self.valuator.exchange.fetch_balance()
             
             result = {
                 'connected': True,
@@ -339,77 +335,31 @@ class SystemController:
             self.logger.error(f"Erro ao parar AI Agent: {e}")
             return False
     
+    def _create_exchange(self):
+        """Cliente Binance de longa duração (criado na primeira avaliação de saldo)"""
+        return ccxt.binance({
+            'apiKey': self.binance_api_key,
+            'secret': self.binance_api_secret,
+            'sandbox': self.use_testnet,
+            'enableRateLimit': True
+        })
+    
     def update_account_balance(self) -> Dict:
-        """Atualizar saldo da conta Binance"""
+        """Atualizar saldo da conta Binance (um fetch_balance + um fetch_tickers para todos os ativos)"""
         try:
             if not self.binance_api_key or not self.binance_api_secret:
                 return {'error': 'API keys não configuradas'}
             
-            exchange = ccxt.binance({
-                'apiKey': self.binance_api_key,
-                'secret': self.binance_api_secret,
-                'sandbox': self.use_testnet,
-                'enableRateLimit': True
-            })
-            
-            balance = exchange.fetch_balance()
-            
-            # Salvar no banco
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Limpar dados antigos (manter apenas últimas 24h)
-            cursor.execute('''
-                DELETE FROM account_balance 
-                WHERE timestamp < datetime('now', '-24 hours')
-            ''')
-            
-            total_usd = 0
-            balances_summary = {}
-            
-            for asset, amounts in balance['total'].items():
-                if amounts > 0:
-                    free = balance['free'].get(asset, 0)
-                    locked = balance['used'].get(asset, 0)
-                    
-                    # Tentar obter preço em USD (simplificado)
-                    usd_value = 0
-                    if asset == 'USDT' or asset == 'BUSD':
-                        usd_value = amounts
-                    else:
-                        try:
-                            ticker = exchange.fetch_ticker(f"{asset}/USDT")
-                            usd_value = amounts * ticker['last']
-                        except:
-                            pass
-                    
-                    # Salvar no banco
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO account_balance 
-                        (asset, free, locked, total, usd_value)
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', (asset, free, locked, amounts, usd_value))
-                    
-                    balances_summary[asset] = {
-                        'free': free,
-                        'locked': locked,
-                        'total': amounts,
-                        'usd_value': usd_value
-                    }
-                    
-                    total_usd += usd_value
-            
-            conn.commit()
-            conn.close()
-            
+            valuation = self.valuator.refresh()
             result = {
                 'success': True,
-                'total_usd': total_usd,
-                'balances': balances_summary,
-                'updated_at': datetime.now().isoformat()
+                'total_usd': valuation.total_usd,
+                'balances': valuation.balances,
+                'unpriced': valuation.unpriced,
+                'updated_at': valuation.updated_at
             }
             
-            self.update_system_status('balance', 'updated', f'Total: ${total_usd:.2f}')
+            self.update_system_status('balance', 'updated', f'Total: ${valuation.total_usd:.2f}')
             return result
             
         except Exception as e:
@@ -635,7 +585,13 @@ class SystemController:
             )
     
     def get_recent_balances(self) -> List[Dict]:
-        """Obter saldos recentes"""
+        """Obter saldos recentes (última avaliação em memória; sem ela, o último snapshot gravado)"""
+        last = self.valuator.last
+        if last is not None:
+            rows = [{'asset': asset, 'free': b['free'], 'locked': b['locked'], 'total': b['total'],
+                     'usd_value': b['usd_value'], 'timestamp': last.updated_at}
+                    for asset, b in last.balances.items()]
+            return sorted(rows, key=lambda r: r['usd_value'], reverse=True)
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
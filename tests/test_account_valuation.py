@@ -0,0 +1,190 @@
+"""
+Testes da avaliação do saldo em lote (account_valuation)
+"""
+
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from account_valuation import AccountValuator, db_latest_prices, held_assets
+
+try:
+    import psutil  # noqa: F401
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+DUST = [f"D{i:02d}" for i in range(40)]
+SHIPPED_DB = os.path.join(os.path.dirname(__file__), '..', 'memecoin.db')
+
+
+class FakeExchange:
+    """Conta chamadas; preço de cada ativo = 0,001 x (índice + 1)"""
+
+    def __init__(self, balance, markets=None, fail=False):
+        self.balance = balance
+        self.markets = markets
+        self.fail = fail
+        self.calls = []
+
+    def fetch_balance(self):
+        self.calls.append('fetch_balance')
+        return self.balance
+
+    def fetch_ticker(self, symbol):
+        self.calls.append('fetch_ticker')
+        raise AssertionError("fetch_ticker por ativo não deve ser usado")
+
+    def fetch_tickers(self, symbols=None):
+        self.calls.append('fetch_tickers')
+        if self.fail:
+            raise RuntimeError("rede indisponível")
+        return {s: {'symbol': s, 'last': 0.001 * (DUST.index(s.split('/')[0]) + 1)}
+                for s in symbols if s.split('/')[0] in DUST}
+
+
+def ccxt_balance(assets):
+    return {'info': {}, 'free': dict(assets), 'used': {a: 0.0 for a in assets}, 'total': dict(assets)}
+
+
+def make_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE prices (id INTEGER PRIMARY KEY AUTOINCREMENT, symbol TEXT, timestamp DATETIME, '
+                 'price REAL, volume REAL DEFAULT 0)')
+    conn.execute("CREATE TABLE account_balance (id INTEGER PRIMARY KEY AUTOINCREMENT, exchange TEXT DEFAULT "
+                 "'binance', asset TEXT NOT NULL, free REAL, locked REAL, total REAL, usd_value REAL, "
+                 "timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    conn.commit()
+    return conn
+
+
+class TestAccountValuator(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'val.db')
+        self.conn = make_db(self.db_path)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_forty_dust_assets_cost_one_pricing_call(self):
+        balance = ccxt_balance({**{a: 100.0 for a in DUST}, 'USDT': 50.0, 'ZERO': 0.0})
+        ex = FakeExchange(balance)
+        valuator = AccountValuator(ex, db_path=self.db_path)
+        valuation = valuator.refresh()
+
+        self.assertEqual(ex.calls, ['fetch_balance', 'fetch_tickers'])
+        self.assertEqual(valuation.pricing_calls, 1)
+        self.assertEqual(len(valuation.balances), 41)
+        self.assertNotIn('ZERO', valuation.balances)
+        expected = 50.0 + sum(100.0 * 0.001 * (i + 1) for i in range(40))
+        self.assertAlmostEqual(valuation.total_usd, expected)
+        self.assertEqual(valuation.balances['USDT']['source'], 'stable')
+        self.assertEqual(valuation.unpriced, [])
+        self.assertIs(valuator.last, valuation)
+
+        rows = self.conn.execute('SELECT asset, usd_value, timestamp FROM account_balance').fetchall()
+        self.assertEqual(len(rows), 41)
+        self.assertEqual(len({r[2] for r in rows}), 1)  # um snapshot, um timestamp
+
+    def test_missing_and_failed_tickers_fall_back_to_last_recorded_price(self):
+        self.conn.executemany('INSERT INTO prices (symbol, timestamp, price) VALUES (?, ?, ?)',
+                              [('FOOUSDT', '2024-01-01', 1.0), ('FOOUSDT', '2024-01-02', 2.0),
+                               ('D00USDT', '2024-01-02', 9.0)])
+        self.conn.commit()
+        balance = ccxt_balance({'D00': 10.0, 'FOO': 3.0, 'BAR': 1.0})
+
+        valuation = AccountValuator(FakeExchange(balance), db_path=self.db_path).value(balance)
+        self.assertEqual(valuation.balances['D00']['source'], 'exchange')
+        self.assertEqual(valuation.balances['FOO']['price'], 2.0)  # último gravado
+        self.assertEqual(valuation.balances['FOO']['source'], 'cache')
+        self.assertEqual(valuation.unpriced, ['BAR'])
+        self.assertAlmostEqual(valuation.total_usd, 10 * 0.001 + 3 * 2.0)
+
+        failing = AccountValuator(FakeExchange(balance, fail=True), db_path=self.db_path).value(balance)
+        self.assertEqual(failing.balances['D00']['price'], 9.0)
+        self.assertEqual(failing.pricing_calls, 1)
+
+    def test_known_markets_filter_symbols_before_the_call(self):
+        balance = ccxt_balance({'D01': 1.0, 'LDD01': 5.0})
+        ex = FakeExchange(balance, markets={'D01/USDT': {}})
+        with patch.object(ex, 'fetch_tickers', wraps=ex.fetch_tickers) as fetch:
+            AccountValuator(ex).value(balance)
+        fetch.assert_called_once_with(['D01/USDT'])
+
+    def test_exchange_factory_builds_client_once(self):
+        balance = ccxt_balance({'D00': 1.0})
+        created = []
+
+        def factory():
+            created.append(FakeExchange(balance))
+            return created[-1]
+
+        valuator = AccountValuator(exchange_factory=factory, db_path=self.db_path)
+        for _ in range(3):
+            valuator.refresh()
+        self.assertEqual(len(created), 1)
+
+    def test_held_assets_accepts_per_asset_format(self):
+        held = held_assets({'USDT': {'free': 1.0, 'used': 0.5, 'total': 1.5}, 'DOGE': {'total': 0}, 'info': {}})
+        self.assertEqual(held, {'USDT': {'free': 1.0, 'locked': 0.5, 'total': 1.5}})
+        self.assertEqual(db_latest_prices(self.db_path)([]), {})
+
+
+    def test_save_on_the_shipped_asset_keyed_table(self):
+        """memecoin.db: account_balance(asset PRIMARY KEY) sem exchange; snapshots seguidos substituem por ativo"""
+        db_path = os.path.join(self.tmp.name, 'shipped.db')
+        shutil.copy(SHIPPED_DB, db_path)
+        balance = ccxt_balance({'D00': 1000.0, 'USDT': 5.0})
+        valuator = AccountValuator(FakeExchange(balance), db_path=db_path, exchange_name='paper')
+        valuator.refresh()
+        balance['total']['USDT'] = balance['free']['USDT'] = 7.0
+        valuator.refresh()
+        with sqlite3.connect(db_path) as conn:
+            rows = conn.execute("SELECT asset, exchange, total FROM account_balance "
+                                "WHERE timestamp = (SELECT MAX(timestamp) FROM account_balance) "
+                                "ORDER BY asset").fetchall()
+        self.assertEqual(rows, [('D00', 'paper', 1000.0), ('USDT', 'paper', 7.0)])
+
+@unittest.skipUnless(HAS_PSUTIL, "psutil não instalado")
+class TestSystemControllerBalance(unittest.TestCase):
+    def test_update_account_balance_reuses_client(self):
+        from system_controller import SystemController
+
+        with tempfile.TemporaryDirectory() as tmp:
+            controller = SystemController(db_path=os.path.join(tmp, 'sc.db'))
+            controller.binance_api_key = controller.binance_api_secret = 'x'
+            ex = FakeExchange(ccxt_balance({'D00': 1000.0, 'USDT': 5.0}))
+            with patch.object(controller, '_create_exchange', return_value=ex) as create:
+                first = controller.update_account_balance()
+                controller.update_account_balance()
+            create.assert_called_once()
+            self.assertAlmostEqual(first['total_usd'], 6.0)
+            self.assertEqual(ex.calls.count('fetch_tickers'), 2)
+            self.assertEqual(controller.get_recent_balances()[0]['asset'], 'USDT')
+
+
+    def test_update_account_balance_on_the_shipped_db(self):
+        from system_controller import SystemController
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'shipped.db')
+            shutil.copy(SHIPPED_DB, db_path)
+            controller = SystemController(db_path=db_path)
+            controller.binance_api_key = controller.binance_api_secret = 'x'
+            ex = FakeExchange(ccxt_balance({'D00': 1000.0, 'USDT': 5.0}))
+            with patch.object(controller, '_create_exchange', return_value=ex):
+                for _ in range(2):
+                    result = controller.update_account_balance()
+                    self.assertNotIn('error', result)
+            self.assertEqual({b['asset'] for b in controller.get_recent_balances()}, {'D00', 'USDT'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Testes para o sink de auditoria (JSONL bufferizado, rotação, gzip e índice)
+"""
+
+import unittest
+import tempfile
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from audit_sink import AuditSink, AuditReader
+
+
+def record(i, symbol='DOGEUSDT'):
+    return {'timestamp': f'2025-08-18T10:{i // 60:02d}:{i % 60:02d}', 'symbol': symbol, 'action': 'buy', 'i': i}
+
+
+class TestAuditSink(unittest.TestCase):
+    """Testes do AuditSink e AuditReader"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.base = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_buffered_write_and_read(self):
+        """Registros bufferizados ficam legíveis após flush"""
+        sink = AuditSink(self.base, 'signals', flush_interval_s=60)
+        for i in range(10):
+            sink.write(record(i))
+        sink.flush()
+
+        records = list(AuditReader(self.base, 'signals').read())
+        self.assertEqual([r['i'] for r in records], list(range(10)))
+        sink.close()
+
+    def test_rotation_and_compression(self):
+        """Segmentos giram por tamanho e são comprimidos ao fechar"""
+        sink = AuditSink(self.base, 'signals', max_segment_bytes=500, flush_interval_s=60)
+        for i in range(200):
+            sink.write(record(i))
+            if i % 20 == 19:
+                sink.flush()
+        sink.close()
+
+        files = os.listdir(os.path.join(self.base, 'signals'))
+        segments = [f for f in files if f.endswith('.jsonl.gz')]
+        self.assertGreater(len(segments), 1)
+        self.assertFalse([f for f in files if f.endswith('.jsonl')])
+
+        records = list(AuditReader(self.base, 'signals').read())
+        self.assertEqual([r['i'] for r in records], list(range(200)))
+
+    def test_range_and_tail(self):
+        """Leitura por intervalo de tempo e últimos registros com filtro"""
+        sink = AuditSink(self.base, 'signals', max_segment_bytes=2000, flush_interval_s=60)
+        for i in range(300):
+            sink.write(record(i, 'PEPEUSDT' if i % 2 else 'DOGEUSDT'))
+            if i % 50 == 49:
+                sink.flush()
+        sink.close()
+
+        reader = AuditReader(self.base, 'signals')
+        window = list(reader.read(start='2025-08-18T10:02:00', end='2025-08-18T10:02:09'))
+        self.assertEqual([r['i'] for r in window], list(range(120, 130)))
+
+        last = reader.tail(3, where=lambda r: r['symbol'] == 'PEPEUSDT')
+        self.assertEqual([r['i'] for r in last], [299, 297, 295])
+
+    def test_leftover_segment_sealed_on_restart(self):
+        """Segmento ativo de uma execução interrompida é comprimido na próxima"""
+        sink = AuditSink(self.base, 'trades', flush_interval_s=60)
+        sink.write(record(1))
+        sink.flush()  # sem close(): simula queda do processo
+
+        restarted = AuditSink(self.base, 'trades', flush_interval_s=60)
+        files = os.listdir(os.path.join(self.base, 'trades'))
+        self.assertTrue(all(f.endswith('.gz') or f.endswith('.gz.idx') for f in files))
+        self.assertEqual(len(list(AuditReader(self.base, 'trades').read())), 1)
+        restarted.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -66,7 +66,20 @@ class TestMoCoVeBackend(unittest.TestCase):
         
         data = json.loads(response.data)
         self.assertIsInstance(data, list)
-    
+
+    def test_prices_export_endpoint(self):
+        """Testa a exportação colunar (Arrow IPC em streaming)"""
+        import pyarrow as pa
+
+        response = self.app.get('/api/prices/export?symbols=DOGE/BUSD&resolution=1h')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/vnd.apache.arrow.stream')
+        table = pa.ipc.open_stream(response.data).read_all()
+        self.assertIn('close', table.schema.names)
+
+        self.assertEqual(self.app.get('/api/prices/export?format=csv').status_code, 400)
+        self.assertEqual(self.app.get('/api/prices/export?resolution=2m').status_code, 400)
+
     def test_volatility_endpoint(self):
         """Testa endpoint de volatilidade"""
         response = self.app.get('/api/volatility?symbol=DOGE/BUSD')
@@ -123,6 +136,82 @@ class TestMoCoVeBackend(unittest.TestCase):
         self.assertIn('volume', data)
         self.assertEqual(data['symbol'], 'DOGE/BUSD')
 
+class TestFreshDatabase(unittest.TestCase):
+    """Banco criado do zero por init_database (prices sem coin_id, high e low)"""
+
+    def setUp(self):
+        import app as backend
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patches = [patch.object(backend, 'DB_PATH', os.path.join(self.tmp.name, 'fresh.db')),
+                        patch.object(backend.response_cache, 'enabled', False),
+                        patch.object(backend, '_pnl_ledger', None)]
+        for p in self.patches:
+            p.start()
+        init_database()
+        self.app = app.test_client()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmp.cleanup()
+
+    @patch('app.exchange.fetch_ticker')
+    def test_market_data_ticks_feed_candles(self, mock_fetch_ticker):
+        mock_fetch_ticker.return_value = {'last': 0.08, 'high': 0.085, 'low': 0.075, 'baseVolume': 1000,
+                                          'change': 0.005, 'percentage': 6.25}
+        for _ in range(2):
+            self.assertEqual(self.app.get('/api/market_data?symbol=DOGE/BUSD').status_code, 200)
+        init_database()  # catch-up dos candles na partida com ticks já gravados
+        candles = self.app.get('/api/prices?symbol=DOGE/BUSD&resolution=1m').get_json()
+        self.assertEqual(sum(c['ticks'] for c in candles), 2)
+
+    def test_raw_prices(self):
+        import app as backend
+        conn = backend.get_db_connection()
+        conn.execute("INSERT INTO prices (symbol, timestamp, price) VALUES ('DOGE/BUSD', '2025-08-18 10:00:00', 0.2)")
+        conn.commit()
+        conn.close()
+        response = self.app.get('/api/prices?symbol=DOGE/BUSD')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['price'] for p in response.get_json()], [0.2])
+
+    def test_execute_trade_without_fill_records_nothing(self):
+        import app as backend
+        from order_manager import OrderManager
+        exchange = MagicMock()
+        exchange.create_order.return_value = {'id': 'p1', 'status': 'expired', 'filled': 0.0, 'cost': 0.0}
+        manager = OrderManager(exchange, db_path=backend.DB_PATH, flush_interval_s=60)
+        try:
+            with patch.object(backend, 'order_manager', manager):
+                response = self.app.post('/api/execute_trade', json={'type': 'buy', 'symbol': 'DOGE/USDT',
+                                                                     'amount': 10})
+        finally:
+            manager.close()
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.get_json()['order_state']['filled'], 0.0)
+        self.assertEqual(self.app.get('/api/trades').get_json(), [])
+
+    def test_raw_prices_export(self):
+        import pyarrow as pa
+        import app as backend
+        conn = backend.get_db_connection()
+        conn.execute("INSERT INTO prices (symbol, timestamp, price) VALUES ('DOGE/BUSD', '2025-08-18 10:00:00', 0.2)")
+        conn.commit()
+        conn.close()
+        for query in ('', '?symbols=DOGE/BUSD'):
+            response = self.app.get('/api/prices/export' + query)
+            self.assertEqual(response.status_code, 200)
+            table = pa.ipc.open_stream(response.data).read_all()
+            self.assertEqual(table.column('price').to_pylist(), [0.2])
+            self.assertEqual(table.column('high').to_pylist(), [None])
+
+    def test_isoformat_trade_dates_fall_in_their_range(self):
+        trade = {'date': '2025-08-18T22:12:54.415204', 'type': 'buy', 'symbol': 'DOGEUSDT',
+                 'amount': 10, 'price': 0.2, 'total': 2.0}
+        self.assertEqual(self.app.post('/api/trades', json=trade).status_code, 201)
+        trades = self.app.get('/api/trades?start=2025-08-18&end=2025-08-18T23:59:59').get_json()
+        self.assertEqual([t['date'] for t in trades], ['2025-08-18 22:12:54.415204'])
+
 class TestDataValidation(unittest.TestCase):
     """Testes de validação de dados"""
     
@@ -0,0 +1,211 @@
+"""
+Testes do backtester vetorizado (backtest)
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import threading
+import unittest
+from dataclasses import fields
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backtest import (BUY, HOLD, SELL, StrategyParams, atr_series, backtest, bollinger_series,
+                      change_24h_series, ema_series, load_candles, ml_signals, rsi_series, run_many,
+                      simulate, sma_series, strategy_signals, volatility_series)
+
+# O módulo do agente inicia a thread de auto-treino ao ser importado
+with patch.object(threading.Thread, 'start'):
+    import ai_trading_agent_II as agent
+
+
+def synthetic_candles(n, seed=1, start=1_700_000_000):
+    rng = np.random.default_rng(seed)
+    ret = rng.normal(0, 0.004, n) + 0.002 * np.sin(np.arange(n) / 150)
+    close = 0.2 * np.exp(np.cumsum(ret))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.002, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.002, n)))
+    return pd.DataFrame({'ts': start + 60.0 * np.arange(n), 'open': open_, 'high': high, 'low': low,
+                         'close': close, 'volume': np.ones(n)})
+
+
+def manual_signals(n, buys=(), sells=(), amount=20.0, atr=0.0):
+    action = np.full(n, HOLD)
+    action[list(buys)] = BUY
+    action[list(sells)] = SELL
+    return {'action': action, 'confidence': np.ones(n), 'amount_usd': np.full(n, amount),
+            'entry_atr': np.full(n, atr), 'atr': np.full(n, atr), 'cooldown': np.zeros(n, dtype=bool)}
+
+
+def flat_candles(prices, start=1_700_000_000):
+    prices = np.asarray(prices, dtype=float)
+    return pd.DataFrame({'ts': start + 60.0 * np.arange(prices.size), 'open': prices, 'high': prices,
+                         'low': prices, 'close': prices, 'volume': 1.0})
+
+
+class TestIndicators(unittest.TestCase):
+    def test_series_match_agent_ta_with_live_window(self):
+        c = synthetic_candles(400, seed=3)
+        close, high, low = c['close'].to_numpy(), c['high'].to_numpy(), c['low'].to_numpy()
+        series = {
+            'sma': sma_series(close, 5), 'ema': ema_series(close, 12), 'rsi': rsi_series(close, 10),
+            'bb': bollinger_series(close, 15, 2.0)[0], 'atr': atr_series(high, low, close, 14),
+        }
+        for i in [0, 3, 9, 10, 13, 14, 15, 60, 119, 250, 399]:
+            window = slice(max(0, i - 119), i + 1)  # histórico de 120 candles do agente
+            arr, h, l = close[window], high[window], low[window]
+            self.assertAlmostEqual(series['sma'][i], agent.TA.sma(arr, 5), places=12)
+            self.assertAlmostEqual(series['ema'][i], agent.TA.ema(arr, 12), places=8)
+            self.assertAlmostEqual(series['rsi'][i], agent.TA.rsi(arr, 10), places=8)
+            self.assertAlmostEqual(series['bb'][i], agent.TA.bollinger(arr, 15, 2.0)[0], places=12)
+            self.assertAlmostEqual(series['atr'][i], agent.TA.atr(h, l, arr, 14), places=12)
+
+
+class TestBacktest(unittest.TestCase):
+    def test_matches_agent_strategy_cycle(self):
+        """Mesmos trades (hora, motivo, PnL) que a Strategy real rodando candle a candle"""
+        c = synthetic_candles(3000)
+        params = StrategyParams()
+        result = backtest(c, params)
+
+        settings = agent.Settings()
+        for f in fields(params):
+            setattr(settings, f.name, getattr(params, f.name))
+        strategy = agent.Strategy(settings)
+        ts, close = c['ts'].to_numpy(), c['close'].to_numpy()
+        high, low = c['high'].to_numpy(), c['low'].to_numpy()
+        chg, vol = change_24h_series(ts, close), volatility_series(close)
+        expected, entry_ts = [], None
+
+        def sell(i, reason):
+            qty = strategy.position_usd / strategy.entry_price
+            pnl = (close[i] - strategy.entry_price) * qty - strategy.position_usd * settings.maker_taker_fee_pct * 2
+            expected.append((entry_ts, ts[i], reason, round(pnl, 9)))
+            strategy.register_execution('sell', close[i], pnl)
+
+        for i in range(params.min_price_history - 1, len(c)):
+            now = datetime.fromtimestamp(ts[i], tz=timezone.utc)
+            with patch.object(agent, 'utcnow', return_value=now):
+                w = slice(max(0, i - 119), i + 1)
+                ms = agent.MarketState('DOGEUSDT', close[i], list(close[w]), 0.0, chg[i], vol[i], now,
+                                       list(high[w]), list(low[w]))
+                if strategy.current_position == 'long':
+                    reason = strategy.check_exit_signal(close[i], agent.TA.atr(*ms.hlc(), settings.atr_period))
+                    if reason:
+                        sell(i, reason)
+                sig = strategy.analyze(ms)
+                if strategy.daily_realized_pnl <= -abs(settings.daily_loss_limit_usd):
+                    continue
+                if (sig.action == 'buy' and strategy.should_execute(sig) and strategy.current_position != 'long'
+                        and sig.amount_usd > 0):
+                    strategy.set_oco_levels(sig.price, sig.indicators['atr'])
+                    strategy.position_usd = sig.amount_usd
+                    strategy.register_execution('buy', sig.price, 0.0)
+                    entry_ts = ts[i]
+                elif sig.action == 'sell' and strategy.current_position == 'long':
+                    sell(i, 'signal')
+
+        got = [(t['entry_ts'], t['exit_ts'], t['reason'], round(t['pnl'], 9)) for t in result.trades]
+        self.assertGreater(len(expected), 10)
+        self.assertEqual(got, expected)
+
+    def test_take_profit_fees_and_curves(self):
+        prices = [1.0] * 40 + [1.01, 1.02, 1.03, 1.05, 1.05]
+        c = flat_candles(prices)
+        params = StrategyParams(use_trailing_stop=False)
+        result = simulate(c, manual_signals(len(prices), buys=[35], amount=20.0), params, initial_equity=100)
+        self.assertEqual(len(result.trades), 1)
+        trade = result.trades[0]
+        # Sem ATR: stop 1,5% abaixo, take = 1,6 x risco acima
+        self.assertEqual(trade['reason'], 'take')
+        self.assertEqual(trade['exit_ts'], c['ts'].iat[42])  # take em 1,024
+        self.assertAlmostEqual(trade['pnl'], 20 * 0.03 - 20 * 0.001 * 2)
+        self.assertAlmostEqual(result.equity[-1], 100 + trade['pnl'])
+        self.assertAlmostEqual(result.equity[36], 100 - 20 * 0.001)  # posição aberta paga a taxa de entrada
+        self.assertAlmostEqual(result.metrics['turnover_usd'], 20 + 20 * 1.03)
+        self.assertLessEqual(result.drawdown.max(), 0)
+
+    def test_stop_loss_and_daily_loss_halt(self):
+        prices = [1.0] * 30 + [0.98] + [1.0] * 30
+        c = flat_candles(prices)
+        params = StrategyParams(use_trailing_stop=False, min_trade_interval_s=0)
+        buys = range(29, 61)
+        result = simulate(c, manual_signals(len(prices), buys=buys), params)
+        self.assertEqual(result.trades[0]['reason'], 'stop')
+        self.assertLess(result.trades[0]['pnl'], 0)
+        # Recompra no mesmo candle (intervalo mínimo 0) e a posição segue aberta
+        self.assertEqual(len(result.trades), 1)
+        self.assertTrue(result.metrics['open_position'])
+
+        halted = simulate(c, manual_signals(len(prices), buys=buys),
+                          StrategyParams(use_trailing_stop=False, min_trade_interval_s=0, daily_loss_limit_usd=0.1))
+        self.assertEqual(len(halted.trades), 1)
+        self.assertFalse(halted.metrics['open_position'])
+
+    def test_sell_signal_closes_position(self):
+        c = flat_candles([1.0] * 35 + [1.004] * 5)
+        result = simulate(c, manual_signals(40, buys=[30], sells=[37]), StrategyParams())
+        self.assertEqual([t['reason'] for t in result.trades], ['signal'])
+        self.assertAlmostEqual(result.metrics['exposure'], 7 / (40 - 29))
+
+    def test_strategy_signals_shape(self):
+        c = synthetic_candles(500)
+        signals = strategy_signals(c, StrategyParams())
+        self.assertEqual({len(v) for v in signals.values()}, {500})
+        self.assertTrue(set(np.unique(signals['action'])) <= {BUY, SELL, HOLD})
+        self.assertTrue((signals['amount_usd'] <= StrategyParams().max_position_usd + 1e-9).all())
+
+    def test_walk_forward_ml_signals_do_not_peek(self):
+        c = synthetic_candles(2600, seed=5)
+        signals, folds = ml_signals(c, StrategyParams(), train_bars=1000, test_bars=500, future_window=15,
+                                    buy_threshold=0.004, sell_threshold=-0.004)
+        self.assertEqual(len(folds), 4)
+        self.assertTrue((signals['action'][:1000] == HOLD).all())
+        self.assertGreater((signals['action'][1000:] == BUY).sum(), 0)
+        for fold in folds:
+            self.assertLessEqual(fold['train_rows'], 1000 - 15)
+            self.assertGreater(fold['test_start'], fold['train_start'])
+        result = backtest(c, StrategyParams(), mode='ml', train_bars=1000, test_bars=500,
+                          buy_threshold=0.004, sell_threshold=-0.004)
+        self.assertEqual(result.folds, folds)
+        self.assertGreater(result.metrics['trades'], 0)
+
+    def test_run_many_parallel_matches_serial(self):
+        candles = {'AAAUSDT': synthetic_candles(1500, seed=1), 'BBBUSDT': synthetic_candles(1500, seed=2)}
+        param_sets = [StrategyParams(), StrategyParams(sl_atr_mult=2.5, tp_rr=2.0)]
+        serial = run_many(candles, param_sets, workers=1)
+        parallel = run_many(candles, param_sets, workers=2)
+        self.assertEqual([(r.symbol, r.params) for r in serial], [(r.symbol, r.params) for r in parallel])
+        for a, b in zip(serial, parallel):
+            self.assertEqual(a.metrics, b.metrics)
+            np.testing.assert_array_equal(a.equity, b.equity)
+
+    def test_load_candles_prefers_price_candles_then_klines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = sqlite3.connect(os.path.join(tmp, 'bt.db'))
+            conn.execute('CREATE TABLE klines (symbol TEXT, interval TEXT, open_time INTEGER, open REAL, '
+                         'high REAL, low REAL, close REAL, volume REAL)')
+            conn.executemany('INSERT INTO klines VALUES (?, ?, ?, 1, 2, 0.5, 1.5, 10)',
+                             [('DOGEUSDT', '1m', t * 60_000) for t in range(5)])
+            df = load_candles(conn, 'DOGEUSDT', '1m', start=60)
+            self.assertEqual(df['ts'].tolist(), [60.0, 120.0, 180.0, 240.0])
+            self.assertEqual(df['close'].iat[0], 1.5)
+
+            conn.execute('CREATE TABLE price_candles (symbol TEXT, resolution TEXT, bucket INTEGER, open REAL, '
+                         'high REAL, low REAL, close REAL, volume REAL)')
+            conn.execute("INSERT INTO price_candles VALUES ('DOGEUSDT', '1m', 0, 1, 1, 1, 0.9, 1)")
+            self.assertEqual(load_candles(conn, 'DOGEUSDT', '1m')['close'].tolist(), [0.9])
+            self.assertTrue(load_candles(conn, 'PEPEUSDT', '1m').empty)
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
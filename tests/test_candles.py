@@ -0,0 +1,178 @@
+"""
+Testes para a agregação incremental de candles OHLCV
+"""
+
+import unittest
+import sqlite3
+import tempfile
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from candles import update_candles, rebuild_candles, get_candles, init_candle_tables
+
+
+def _candle_rows(conn):
+    return conn.execute(
+        'SELECT symbol, resolution, bucket, open, high, low, close, volume, ticks '
+        'FROM price_candles ORDER BY symbol, resolution, bucket'
+    ).fetchall()
+
+
+class TestCandles(unittest.TestCase):
+    """Testes do módulo candles"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(os.path.join(self.tmpdir.name, 'test.db'))
+        self.conn.execute('''
+            CREATE TABLE prices (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                symbol TEXT,
+                coin_id TEXT,
+                timestamp DATETIME NOT NULL,
+                price REAL NOT NULL,
+                volume REAL DEFAULT 0,
+                high REAL DEFAULT 0,
+                low REAL DEFAULT 0
+            )
+        ''')
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def _insert(self, rows):
+        self.conn.executemany('INSERT INTO prices (symbol, timestamp, price, volume) VALUES (?, ?, ?, ?)', rows)
+        self.conn.commit()
+
+    def test_incremental_update(self):
+        """Cada update agrega só os ticks novos"""
+        self._insert([
+            ('DOGEUSDT', '2025-08-18 10:00:05', 1.0, 100),
+            ('DOGEUSDT', '2025-08-18 10:00:30', 1.5, 110),
+        ])
+        self.assertEqual(update_candles(self.conn), 2)
+        self._insert([('DOGEUSDT', '2025-08-18 10:00:50', 0.8, 120)])
+        self.assertEqual(update_candles(self.conn), 1)
+        self.assertEqual(update_candles(self.conn), 0)
+
+        candles = get_candles(self.conn, 'DOGEUSDT', '1m')
+        self.assertEqual(len(candles), 1)
+        c = candles[0]
+        self.assertEqual(c['timestamp'], '2025-08-18 10:00:00')
+        self.assertEqual((c['open'], c['high'], c['low'], c['close']), (1.0, 1.5, 0.8, 0.8))
+        self.assertEqual(c['volume'], 120)
+        self.assertEqual(c['ticks'], 3)
+
+    def test_late_tick_merges_by_timestamp(self):
+        """Tick atrasado atualiza open sem sobrescrever close"""
+        self._insert([('DOGEUSDT', '2025-08-18 10:00:30', 1.0, 100)])
+        update_candles(self.conn)
+        self._insert([('DOGEUSDT', '2025-08-18 10:00:01', 2.0, 90)])
+        update_candles(self.conn)
+
+        c = get_candles(self.conn, 'DOGEUSDT', '1m')[0]
+        self.assertEqual(c['open'], 2.0)
+        self.assertEqual(c['close'], 1.0)
+        self.assertEqual(c['volume'], 100)
+
+    def test_rebuild_is_idempotent(self):
+        """rebuild sobre candles existentes reproduz o mesmo resultado"""
+        self._insert([
+            ('DOGEUSDT', '2025-08-18 10:00:05', 1.0, 100),
+            ('DOGEUSDT', '2025-08-18 10:07:00', 1.2, 100),
+            ('SHIBUSDT', '2025-08-18 11:30:00', 0.01, 5),
+        ])
+        update_candles(self.conn)
+        expected = _candle_rows(self.conn)
+
+        rebuild_candles(self.conn)
+        rebuild_candles(self.conn, symbol='DOGEUSDT', start='2025-08-18 10:00:00', end='2025-08-18 10:10:00')
+        self.assertEqual(_candle_rows(self.conn), expected)
+
+    def test_resolutions_and_range(self):
+        """Resoluções maiores agrupam os mesmos ticks; start/end filtram"""
+        self._insert([('DOGEUSDT', f'2025-08-18 10:{m:02d}:00', 1.0 + m, 100) for m in range(0, 30, 5)])
+        update_candles(self.conn)
+
+        self.assertEqual(len(get_candles(self.conn, 'DOGEUSDT', '1m')), 6)
+        self.assertEqual(len(get_candles(self.conn, 'DOGEUSDT', '15m')), 2)
+        hourly = get_candles(self.conn, 'DOGEUSDT', '1h')
+        self.assertEqual(len(hourly), 1)
+        self.assertEqual((hourly[0]['open'], hourly[0]['close']), (1.0, 26.0))
+
+        window = get_candles(self.conn, 'DOGEUSDT', '5m', start='2025-08-18 10:10:00', end='2025-08-18 10:20:00')
+        self.assertEqual([c['timestamp'][-8:] for c in window], ['10:10:00', '10:15:00', '10:20:00'])
+        with self.assertRaises(ValueError):
+            get_candles(self.conn, 'DOGEUSDT', '2m')
+
+    def test_missing_table_returns_empty(self):
+        """Sem price_candles a leitura devolve lista vazia"""
+        self.assertEqual(get_candles(self.conn, 'DOGEUSDT', '1m'), [])
+        init_candle_tables(self.conn)
+        self.assertEqual(get_candles(self.conn, 'DOGEUSDT', '1m'), [])
+
+    def test_concurrent_writers_merge_each_tick_once(self):
+        """Vários escritores chamando update_candles ao mesmo tempo não duplicam ticks nos candles"""
+        import threading
+
+        db_path = os.path.join(self.tmpdir.name, 'test.db')
+        self.conn.commit()
+        errors = []
+
+        def writer(offset):
+            conn = sqlite3.connect(db_path, timeout=30)
+            try:
+                for i in range(40):
+                    conn.executemany('INSERT INTO prices (symbol, timestamp, price, volume) VALUES (?, ?, ?, ?)',
+                                     [('DOGEUSDT', f'2025-08-18 10:{(offset + i) % 60:02d}:{j:02d}', 1.0 + j, 1)
+                                      for j in range(5)])
+                    conn.commit()
+                    update_candles(conn)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                conn.close()
+
+        threads = [threading.Thread(target=writer, args=(n * 7,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        update_candles(self.conn)
+        ticks = self.conn.execute("SELECT SUM(ticks) FROM price_candles WHERE resolution = '1m'").fetchone()[0]
+        self.assertEqual(ticks, 4 * 40 * 5)
+
+
+class TestCandlesBackendSchema(unittest.TestCase):
+    """prices como o backend cria (init_database): sem coin_id, high e low"""
+
+    def test_update_and_rebuild_without_legacy_columns(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = sqlite3.connect(os.path.join(tmp, 'fresh.db'))
+            conn.execute('''
+                CREATE TABLE prices (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    symbol TEXT NOT NULL,
+                    timestamp DATETIME NOT NULL,
+                    price REAL NOT NULL,
+                    volume REAL DEFAULT 0,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.executemany('INSERT INTO prices (symbol, timestamp, price, volume) VALUES (?, ?, ?, ?)',
+                             [('DOGEUSDT', '2025-08-18 10:00:05', 0.20, 10),
+                              ('DOGEUSDT', '2025-08-18 10:00:40', 0.25, 11)])
+            conn.commit()
+            self.assertEqual(update_candles(conn), 2)
+            candle = get_candles(conn, 'DOGEUSDT', '1m')[0]
+            self.assertEqual((candle['open'], candle['high'], candle['low'], candle['close']), (0.20, 0.25, 0.20, 0.25))
+            self.assertEqual(rebuild_candles(conn, 'DOGEUSDT'), 2)
+            self.assertEqual(get_candles(conn, 'DOGEUSDT', '1m')[0]['ticks'], 2)
+            conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
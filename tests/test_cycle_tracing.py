@@ -0,0 +1,150 @@
+"""
+Testes do tracing por ciclo dos agentes (cycle_tracing)
+"""
+
+import os
+import sys
+import json
+import asyncio
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cycle_tracing import CycleTracer, load_summaries
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, ms):
+        self.now += ms / 1000
+
+
+class TestCycleTracer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def tracer(self, **kwargs):
+        kwargs.setdefault('slow_ms', None)
+        return CycleTracer('teste', trace_dir=self.tmp.name, clock=self.clock, **kwargs)
+
+    def run_cycle(self, tracer, scan_ms, order_ms=0.0):
+        with tracer.cycle():
+            with tracer.span('scan'):
+                with tracer.span('http', symbol='DOGEUSDT'):
+                    self.clock.advance(scan_ms)
+            with tracer.span('execute'):
+                self.clock.advance(order_ms)
+
+    def test_spans_and_rolling_percentiles(self):
+        tracer = self.tracer(window=3)
+        for scan_ms in (10, 20, 30, 1000):
+            self.run_cycle(tracer, scan_ms, order_ms=5)
+
+        last = tracer.last.to_dict()
+        self.assertEqual(last['cycle'], 4)
+        self.assertEqual([(s['name'], s['depth']) for s in last['spans']],
+                         [('scan', 0), ('http', 1), ('execute', 0)])
+        self.assertEqual(last['spans'][1]['attrs'], {'symbol': 'DOGEUSDT'})
+        self.assertAlmostEqual(last['spans'][2]['start_ms'], 1000.0)
+
+        summary = tracer.summary()
+        self.assertEqual((summary['cycles'], summary['window']), (4, 3))
+        scan = summary['stages']['scan']
+        self.assertEqual(scan['count'], 3)  # janela de 3 ciclos: 20, 30, 1000
+        self.assertAlmostEqual(scan['p50_ms'], 30.0)
+        self.assertAlmostEqual(scan['max_ms'], 1000.0)
+        self.assertIsNone(summary['stages']['http']['share_pct'])  # só etapas de topo
+        self.assertAlmostEqual(summary['cycle_ms']['max'], 1005.0)
+        self.assertEqual(tracer.breakdown(), "Ciclo 4: 1005 ms | scan 1000 ms | execute 5 ms")
+
+        with open(tracer.status_path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['cycles'], 4)
+
+    def test_slow_cycles_are_written_and_errors_recorded(self):
+        tracer = self.tracer(slow_ms=100)
+        self.run_cycle(tracer, 10)
+        with self.assertRaises(RuntimeError):
+            with tracer.cycle():
+                with tracer.span('execute'):
+                    self.clock.advance(150)
+                    raise RuntimeError("timeout da exchange")
+
+        self.assertEqual(tracer.slow_cycles, 1)
+        with open(tracer.slow_path, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]['cycle'], 2)
+        self.assertEqual(lines[0]['error'], "RuntimeError: timeout da exchange")
+        self.assertEqual(lines[0]['spans'][0]['error'], "RuntimeError: timeout da exchange")
+
+    def test_chrome_trace_export(self):
+        tracer = self.tracer(chrome=True)
+        self.run_cycle(tracer, 40, order_ms=10)
+        with open(tracer.chrome_path, encoding='utf-8') as f:
+            events = json.load(f)['traceEvents']
+        self.assertEqual([e['name'] for e in events], ['ciclo 1', 'scan', 'http', 'execute'])
+        self.assertTrue(all(e['ph'] == 'X' for e in events))
+        self.assertAlmostEqual(events[0]['dur'], 50000.0)
+        self.assertAlmostEqual(events[3]['ts'] - events[0]['ts'], 40000.0, places=0)
+
+    def test_disabled_and_outside_cycle_record_nothing(self):
+        tracer = self.tracer(enabled=False)
+        self.assertIs(tracer.cycle(), tracer.span('scan'))
+        self.run_cycle(tracer, 10)
+        self.assertEqual(tracer.cycles, 0)
+        self.assertEqual(tracer.breakdown(), "Tracing desligado")
+        self.assertFalse(os.path.exists(tracer.status_path))
+
+        enabled = self.tracer()
+        with enabled.span('solto'):
+            pass
+        self.assertEqual(enabled.cycles, 0)
+
+    def test_nested_cycle_is_a_single_trace(self):
+        tracer = self.tracer()
+        with tracer.cycle():
+            self.run_cycle(tracer, 10)  # run_cycle chamado de dentro do loop já medido
+            with tracer.span('portfolio_alerts'):
+                self.clock.advance(5)
+        self.assertEqual(tracer.cycles, 1)
+        self.assertEqual([s['name'] for s in tracer.last.spans], ['scan', 'http', 'execute', 'portfolio_alerts'])
+
+    def test_async_spans_across_awaits(self):
+        tracer = self.tracer()
+
+        async def fetch():
+            with tracer.span('http_prices'):
+                await asyncio.sleep(0)
+                self.clock.advance(25)
+
+        async def run_once():
+            with tracer.cycle():
+                with tracer.span('market_state'):
+                    await fetch()
+
+        asyncio.run(run_once())
+        self.assertEqual([(s['name'], s['depth'], s['duration_ms']) for s in tracer.last.spans],
+                         [('market_state', 0, 25.0), ('http_prices', 1, 25.0)])
+
+    def test_load_summaries_reads_every_agent(self):
+        for name in ('agent_robust', 'agent_ii'):
+            tracer = CycleTracer(name, trace_dir=self.tmp.name, clock=self.clock, slow_ms=None, chrome=True)
+            self.run_cycle(tracer, 10)
+        summaries = load_summaries(self.tmp.name)
+        self.assertEqual(sorted(summaries), ['agent_ii', 'agent_robust'])
+        self.assertEqual(summaries['agent_ii']['stages']['scan']['count'], 1)
+        self.assertEqual(load_summaries(os.path.join(self.tmp.name, 'nada')), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
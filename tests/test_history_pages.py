@@ -0,0 +1,148 @@
+"""
+Testes da paginação por cursor do histórico (history_pages)
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from history_pages import (PRICES, TRADES, _select, decode_cursor, encode_cursor, fetch_page, format_timestamp,
+                           init_history_indexes, iter_ndjson, iter_rows, normalize_stored_times, parse_page_query)
+
+
+def create_trades(conn, n):
+    conn.execute('''
+        CREATE TABLE trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, date DATETIME NOT NULL, type TEXT NOT NULL,
+            symbol TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL, total REAL NOT NULL,
+            status TEXT DEFAULT 'completed', created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE TABLE prices (id INTEGER PRIMARY KEY AUTOINCREMENT, symbol TEXT NOT NULL, '
+                 'timestamp DATETIME NOT NULL, price REAL NOT NULL, volume REAL DEFAULT 0)')
+    # Três trades por segundo: empates de data resolvidos pelo id
+    conn.executemany(
+        'INSERT INTO trades (date, type, symbol, amount, price, total) VALUES (?, ?, ?, 1, ?, ?)',
+        [(f'2025-08-{1 + i // 300:02d} 12:{(i // 3) % 60:02d}:00', 'buy' if i % 2 else 'sell',
+          'DOGEUSDT' if i % 3 else 'PEPEUSDT', 0.1 + i, 0.1 + i) for i in range(n)])
+    init_history_indexes(conn)
+
+
+class TestHistoryPages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 't.db')
+        self.conn = sqlite3.connect(self.db_path)
+        create_trades(self.conn, 1000)
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def walk(self, args):
+        ids, cursor = [], None
+        while True:
+            page_args = dict(args, cursor=cursor) if cursor else args
+            rows, cursor = fetch_page(self.conn, TRADES, parse_page_query(TRADES, page_args))
+            ids.extend(row['id'] for row in rows)
+            if cursor is None:
+                return ids
+
+    def test_walk_visits_every_row_once_in_order(self):
+        expected = [row[0] for row in self.conn.execute('SELECT id FROM trades ORDER BY date DESC, id DESC')]
+        self.assertEqual(self.walk({'limit': '70'}), expected)
+        self.assertEqual(self.walk({'limit': '70', 'order': 'asc'}), expected[::-1])
+
+        pepe = self.walk({'limit': '33', 'symbol': 'PEPEUSDT', 'type': 'sell'})
+        self.assertEqual(len(pepe), len(set(pepe)))
+        self.assertEqual(len(pepe), self.conn.execute(
+            "SELECT COUNT(*) FROM trades WHERE symbol = 'PEPEUSDT' AND type = 'sell'").fetchone()[0])
+
+    def test_projection_time_range_and_limits(self):
+        query = parse_page_query(TRADES, {'fields': 'price,id', 'start': '2025-08-02', 'end': '2025-08-02T23:59:59',
+                                          'limit': '10'})
+        rows, cursor = fetch_page(self.conn, TRADES, query)
+        self.assertEqual(list(rows[0]), ['price', 'id'])
+        self.assertEqual(decode_cursor(cursor)[1], rows[-1]['id'])
+        self.assertEqual(len(list(iter_rows(self.conn, TRADES, parse_page_query(
+            TRADES, {'start': '2025-08-02', 'end': '2025-08-02 23:59:59'}, default_limit=None), page_rows=64))), 300)
+
+        self.assertEqual(parse_page_query(TRADES, {'limit': '9999'}).limit, 50)  # fora da faixa: padrão antigo
+        for args in ({'fields': 'id,senha'}, {'order': 'sideways'}, {'cursor': 'nada'}, {'start': 'ontem'},
+                     {'end': '2025-08-01T00:00:00+00:00'}):
+            with self.assertRaises(ValueError):
+                parse_page_query(TRADES, args)
+
+    def test_deep_pages_seek_the_covering_index(self):
+        query = parse_page_query(TRADES, {'cursor': fetch_page(self.conn, TRADES, parse_page_query(
+            TRADES, {'limit': '900'}))[1]})
+        sql, params, _ = _select(TRADES, query, query.limit + 1)
+        plan = ' '.join(row[3] for row in self.conn.execute('EXPLAIN QUERY PLAN ' + sql, params))
+        self.assertIn('COVERING INDEX idx_trades_date_cover', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+        prices_query = parse_page_query(PRICES, {'symbol': 'DOGEUSDT', 'cursor': encode_cursor('2025-08-01', 5)})
+        sql, params, _ = _select(PRICES, prices_query, 51)
+        plan = ' '.join(row[3] for row in self.conn.execute('EXPLAIN QUERY PLAN ' + sql, params))
+        self.assertIn('idx_prices_symbol_timestamp', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_ndjson_streams_whole_history(self):
+        query = parse_page_query(TRADES, {'fields': 'id,date'}, default_limit=None)
+        chunks = list(iter_ndjson(self.db_path, TRADES, query, page_rows=300))
+        self.assertEqual(len(chunks), 4)
+        lines = b''.join(chunks).decode().splitlines()
+        self.assertEqual(len(lines), 1000)
+        self.assertEqual(json.loads(lines[0]), {'id': 1000, 'date': '2025-08-04 12:33:00'})
+
+    def test_isoformat_dates_are_normalized(self):
+        """Linhas gravadas com 'T' (isoformat) entram no intervalo e na ordem (date, id) depois da normalização"""
+        self.conn.executemany('INSERT INTO trades (date, type, symbol, amount, price, total) VALUES (?, ?, ?, 1, 1, 1)',
+                              [('2025-08-18T22:12:54.415204', 'buy', 'DOGEUSDT'),
+                               ('2025-08-18 22:13:00', 'sell', 'DOGEUSDT'),
+                               ('2025-08-18T22:16:37.153368', 'sell', 'DOGEUSDT')])
+        query = parse_page_query(TRADES, {'start': '2025-08-18', 'end': '2025-08-18T23:59:59', 'fields': 'id'})
+        self.assertEqual(fetch_page(self.conn, TRADES, query)[0], [{'id': 1002}])
+
+        self.assertEqual(normalize_stored_times(self.conn), 2)
+        self.assertEqual(fetch_page(self.conn, TRADES, query)[0], [{'id': 1003}, {'id': 1002}, {'id': 1001}])
+        # Migração única: linhas gravadas depois (fora de format_timestamp) não são mais reescritas
+        self.conn.execute("UPDATE trades SET date = '2025-08-18T23:00:00' WHERE id = 1001")
+        self.assertEqual(normalize_stored_times(self.conn), 0)
+        self.assertEqual(self.conn.execute('SELECT date FROM trades WHERE id = 1001').fetchone()[0],
+                         '2025-08-18T23:00:00')
+        self.assertEqual(format_timestamp('2025-08-18T22:12:54'), '2025-08-18 22:12:54')
+
+
+class TestBackendHistoryPages(unittest.TestCase):
+    def test_trades_cursor_headers_and_ndjson(self):
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+        from app import app
+        client = app.test_client()
+        everything = client.get('/api/trades?format=ndjson&fields=id')
+        self.assertEqual(everything.mimetype, 'application/x-ndjson')
+        all_ids = [json.loads(line)['id'] for line in everything.get_data(as_text=True).splitlines()]
+
+        ids, url = [], '/api/trades?limit=1&fields=id'
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.get_json())
+            link = response.headers.get('Link')
+            url = link[1:link.index('>')] if link else None
+        self.assertEqual(ids, all_ids)
+
+        history = client.get('/api/trading/history?limit=1').get_json()
+        self.assertTrue(history['success'])
+        self.assertIn('side', history['trades'][0])
+        self.assertEqual(client.get('/api/trades?order=up').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
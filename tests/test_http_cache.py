@@ -0,0 +1,146 @@
+"""
+Testes do cache HTTP (ETag, GET condicional e compressão)
+"""
+
+import os
+import sys
+import gzip
+import json
+import sqlite3
+import tempfile
+import unittest
+
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from http_cache import DataVersions, ResponseCache, file_version
+
+
+class TestDataVersions(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 't.db')
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('CREATE TABLE trades (id INTEGER PRIMARY KEY AUTOINCREMENT, symbol TEXT)')
+        self.versions = DataVersions(self.db_path, {'trades': 'SELECT MAX(id) FROM trades',
+                                                    'missing': 'SELECT MAX(id) FROM nada'})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def insert(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("INSERT INTO trades (symbol) VALUES ('DOGEUSDT')")
+
+    def test_tables_are_queried_only_after_a_write(self):
+        self.assertEqual(self.versions.get('trades'), ((None,),))
+        self.assertEqual(self.versions.get('trades'), ((None,),))
+        self.assertEqual((self.versions.hits, self.versions.misses), (1, 1))
+
+        self.insert()
+        self.assertEqual(self.versions.get('trades'), ((1,),))
+        self.assertEqual(self.versions.misses, 2)
+        self.assertEqual(self.versions.get('missing'), (None,))  # tabela ausente não derruba a rota
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.version = 1
+        self.renders = 0
+        self.cache = ResponseCache(min_compress_bytes=100)
+        self.app = Flask(__name__)
+        self.cache.init_app(self.app)
+
+        @self.app.route('/api/trades')
+        @self.cache.conditional(lambda: self.version)
+        def trades():
+            self.renders += 1
+            return jsonify([{'id': i, 'symbol': 'DOGEUSDT', 'price': 0.1} for i in range(50)])
+
+        @self.app.route('/api/broken')
+        @self.cache.conditional(lambda: self.version)
+        def broken():
+            self.renders += 1
+            return jsonify({'error': 'banco indisponível'}), 500
+
+        @self.app.route('/api/big')
+        def big():
+            return jsonify({'rows': ['x' * 20] * 50})
+
+        self.client = self.app.test_client()
+
+    def test_etag_304_and_invalidation(self):
+        first = self.client.get('/api/trades?limit=50')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.headers['Cache-Control'], 'no-cache')
+        etag = first.headers['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+
+        not_modified = self.client.get('/api/trades?limit=50', headers={'If-None-Match': etag})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.data, b'')
+        self.assertEqual(self.renders, 1)
+
+        other_args = self.client.get('/api/trades?limit=10', headers={'If-None-Match': etag})
+        self.assertEqual(other_args.status_code, 200)  # ETag depende dos parâmetros
+
+        self.version = 2  # novo trade
+        changed = self.client.get('/api/trades?limit=50', headers={'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+        self.assertEqual(self.renders, 3)
+        self.assertEqual(self.cache.not_modified, 1)
+
+    def test_rendered_body_is_shared_between_clients(self):
+        self.client.get('/api/trades')
+        body = self.client.get('/api/trades').get_json()
+        self.assertEqual(len(body), 50)
+        self.assertEqual(self.renders, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_gzip_when_accepted_and_large(self):
+        plain = self.client.get('/api/trades')
+        compressed = self.client.get('/api/trades', headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed.headers['Vary'])
+        self.assertLess(len(compressed.data), len(plain.data))
+        self.assertEqual(json.loads(gzip.decompress(compressed.data)), plain.get_json())
+
+        other = self.client.get('/api/big', headers={'Accept-Encoding': 'gzip'})  # rota sem ETag
+        self.assertEqual(other.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('ETag', other.headers)
+        self.assertEqual(len(json.loads(gzip.decompress(other.data))['rows']), 50)
+
+    def test_errors_are_not_cached(self):
+        self.assertEqual(self.client.get('/api/broken').status_code, 500)
+        self.assertEqual(self.client.get('/api/broken').status_code, 500)
+        self.assertEqual(self.renders, 2)
+        self.assertNotIn('ETag', self.client.get('/api/broken').headers)
+
+    def test_file_version_follows_mtime(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'meta.json')
+            self.assertIsNone(file_version(path))
+            with open(path, 'w') as f:
+                f.write('{}')
+            before = file_version(path)
+            os.utime(path, ns=(1, 1))
+            self.assertNotEqual(file_version(path), before)
+
+
+class TestBackendConditionalGet(unittest.TestCase):
+    def test_dashboard_endpoints_answer_304(self):
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+        from app import app
+        client = app.test_client()
+        for path in ('/api/model/info', '/api/trades?limit=5'):
+            first = client.get(path)
+            self.assertEqual(first.status_code, 200)
+            again = client.get(path, headers={'If-None-Match': first.headers['ETag']})
+            self.assertEqual(again.status_code, 304, path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,218 @@
+"""
+Testes para o daemon de ingestão (offline, com a fonte de replay)
+"""
+
+import unittest
+import sqlite3
+import tempfile
+import json
+import time
+import os
+import sys
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ingest_daemon import (IngestDaemon, ReplaySource, BinanceStreamSource, RestPollingSource,
+                           PriceCache, LiveCandles, DbWriter, TickSink, Tick)
+from candles import get_candles
+
+START_TS = 1_754_006_400.0  # 2025-08-01 00:00 UTC
+
+
+def _records(n, symbols=('DOGEUSDT', 'PEPEUSDT'), step=0.5):
+    return [{'symbol': symbols[i % len(symbols)], 'ts': START_TS + i * step,
+             'price': 1.0 + (i % 100) / 1000, 'volume': float(i)} for i in range(n)]
+
+
+class SlowSink(TickSink):
+    """Consumidor lento para exercitar a fila limitada"""
+    name = 'slow'
+    overflow = 'drop_oldest'
+
+    def __init__(self):
+        self.seen = 0
+
+    def handle(self, ticks):
+        time.sleep(0.01)
+        self.seen += len(ticks)
+
+
+class TestIngestDaemon(unittest.TestCase):
+    """Testes do daemon de ingestão"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'test.db')
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('''
+                CREATE TABLE prices (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    symbol TEXT,
+                    coin_id TEXT,
+                    timestamp DATETIME NOT NULL,
+                    price REAL NOT NULL,
+                    volume REAL DEFAULT 0,
+                    high REAL DEFAULT 0,
+                    low REAL DEFAULT 0
+                )
+            ''')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _run(self, source, sinks, **kwargs):
+        daemon = IngestDaemon([source], sinks, **kwargs)
+        daemon.start()
+        self.assertTrue(daemon.wait_sources(30))
+        self.assertTrue(daemon.drain(30))
+        daemon.stop()
+        return daemon
+
+    def test_replay_fans_out_to_all_sinks(self):
+        """Replay chega ao cache, aos candles ao vivo e ao banco"""
+        records = _records(20000)
+        cache, live, writer = PriceCache(), LiveCandles(keep=1000), DbWriter(self.db_path)
+        started = time.perf_counter()
+        daemon = self._run(ReplaySource(records=records), [cache, live, writer])
+        elapsed = time.perf_counter() - started
+
+        self.assertGreater(len(records) / elapsed, 1000)  # milhares de ticks/s offline
+        self.assertEqual(cache.get('DOGEUSDT').ts, records[-2]['ts'])
+        self.assertEqual(cache.snapshot()['PEPEUSDT'], records[-1]['price'])
+
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM prices').fetchone()[0], 20000)
+            stored = get_candles(conn, 'DOGEUSDT', '1m', limit=1000)
+        live_bars = live.get('DOGEUSDT', '1m', limit=1000)
+        self.assertEqual(len(stored), len(live_bars))
+        self.assertEqual(sum(b['ticks'] for b in live_bars), 10000)
+        self.assertEqual(stored[-1]['close'], live_bars[-1]['close'])
+
+        m = daemon.metrics()
+        self.assertEqual(m['ticks_total'], 20000)
+        self.assertEqual(m['sinks']['db_writer']['processed'], 20000)
+        self.assertEqual(m['sinks']['db_writer']['dropped'], 0)
+        self.assertIn('p99_ms', m['sinks']['price_cache']['lag'])
+
+    def test_replay_file_and_rejects(self):
+        """JSONL com timestamp ISO; ticks inválidos são rejeitados"""
+        path = os.path.join(self.tmpdir.name, 'ticks.jsonl')
+        with open(path, 'w') as f:
+            f.write(json.dumps({'symbol': 'dogeusdt', 'timestamp': '2025-08-01 00:00:30', 'price': 0.2}) + '\n')
+            f.write(json.dumps({'symbol': 'DOGEUSDT', 'timestamp': '2025-08-01T00:01:10Z', 'price': 0}) + '\n')
+            f.write('\n')
+            f.write(json.dumps({'symbol': 'DOGEUSDT', 'timestamp': '2025-08-01T00:01:10Z', 'price': 0.21}) + '\n')
+        daemon = self._run(ReplaySource(path), [DbWriter(self.db_path)])
+
+        self.assertEqual(daemon.metrics()['sources']['replay'], {'events': 2, 'rejected': 1, 'errors': 0, 'restarts': 0})
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute('SELECT symbol, timestamp, price FROM prices ORDER BY id').fetchall()
+        # Sem fuso = hora local (como os demais escritores); com fuso, convertido para a local
+        utc = datetime(2025, 8, 1, 0, 1, 10, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+        self.assertEqual(rows, [('DOGEUSDT', '2025-08-01 00:00:30.000000', 0.2),
+                                ('DOGEUSDT', utc.strftime('%Y-%m-%d %H:%M:%S.%f'), 0.21)])
+
+    def test_db_writer_on_backend_schema(self):
+        """prices do init_database (sem high/low): grava só as colunas existentes, em hora local"""
+        db_path = os.path.join(self.tmpdir.name, 'fresh.db')
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('''
+                CREATE TABLE prices (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    symbol TEXT NOT NULL,
+                    timestamp DATETIME NOT NULL,
+                    price REAL NOT NULL,
+                    volume REAL DEFAULT 0,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+        daemon = self._run(ReplaySource(records=_records(10)), [DbWriter(db_path)])
+        self.assertEqual(daemon.metrics()['sinks']['db_writer']['failed'], 0)
+        with sqlite3.connect(db_path) as conn:
+            first = conn.execute('SELECT timestamp FROM prices ORDER BY id LIMIT 1').fetchone()[0]
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM prices').fetchone()[0], 10)
+            self.assertEqual(sum(c['ticks'] for c in get_candles(conn, 'DOGEUSDT', '1m')), 5)
+        self.assertEqual(first, datetime.fromtimestamp(START_TS).strftime('%Y-%m-%d %H:%M:%S.%f'))
+
+    def test_db_writer_candle_failure_does_not_duplicate_ticks(self):
+        """Falha em update_candles depois do commit não regrava o lote; o próximo lote agrega os ticks"""
+        import candles
+        writer = DbWriter(self.db_path)
+        ticks = [Tick('DOGEUSDT', START_TS + i, 1.0 + i / 100, 1.0) for i in range(3)]
+        real_update = candles.update_candles
+        calls = []
+
+        def locked_once(conn):
+            calls.append(1)
+            if len(calls) == 1:
+                raise sqlite3.OperationalError('database is locked')
+            return real_update(conn)
+
+        with patch('ingest_daemon.update_candles', side_effect=locked_once):
+            writer.handle(ticks)
+            with sqlite3.connect(self.db_path) as conn:
+                self.assertEqual(conn.execute('SELECT COUNT(*) FROM prices').fetchone()[0], 3)
+            writer.handle([Tick('DOGEUSDT', START_TS + 3, 1.05, 1.0)])
+        writer.close()
+        self.assertEqual(writer.written, 4)
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM prices').fetchone()[0], 4)
+            self.assertEqual(sum(c['ticks'] for c in get_candles(conn, 'DOGEUSDT', '1m')), 4)
+
+    def test_bounded_queue_drops_oldest(self):
+        """Consumidor lento com drop_oldest descarta em vez de crescer sem limite"""
+        slow = SlowSink()
+        daemon = self._run(ReplaySource(records=_records(5000)), [slow], queue_size=100, max_batch=10)
+        m = daemon.metrics()['sinks']['slow']
+        self.assertLessEqual(m['max_queue_depth'], 100)
+        self.assertGreater(m['dropped'], 0)
+        self.assertEqual(slow.seen + m['dropped'], 5000)
+
+    def test_replay_speed(self):
+        """speed respeita o intervalo original (escalado)"""
+        records = _records(11, step=1.0)  # 10 s de dados
+        started = time.perf_counter()
+        self._run(ReplaySource(records=records, speed=50.0), [PriceCache()])
+        self.assertGreaterEqual(time.perf_counter() - started, 0.19)
+
+    def test_source_failure_restarts(self):
+        """Fonte que cai é reiniciada; o daemon continua recebendo"""
+
+        class Flaky(ReplaySource):
+            name = 'flaky'
+            calls = 0
+
+            def run(self, emit, stop):
+                Flaky.calls += 1
+                if Flaky.calls == 1:
+                    raise ConnectionError('caiu')
+                super().run(emit, stop)
+
+        cache = PriceCache()
+        daemon = self._run(Flaky(records=_records(10)), [cache], restart_delay_s=0.01)
+        self.assertEqual(daemon.metrics()['sources']['flaky']['errors'], 1)
+        self.assertIsNotNone(cache.get('DOGEUSDT'))
+
+    def test_exchange_message_parsing(self):
+        """Eventos do stream e do REST viram o mesmo Tick"""
+        ticker = {'stream': 'dogeusdt@ticker', 'data': {
+            'e': '24hrTicker', 'E': 1754006430000, 's': 'DOGEUSDT', 'c': '0.2000',
+            'v': '1000', 'h': '0.21', 'l': '0.19'}}
+        kline = {'e': 'kline', 'E': 1754006430000, 's': 'DOGEUSDT', 'k': {
+            't': 1754006400000, 'o': '0.19', 'c': '0.2000', 'h': '0.21', 'l': '0.19', 'v': '1000'}}
+        rest = {'symbol': 'DOGEUSDT', 'closeTime': 1754006430000, 'lastPrice': '0.2000',
+                'volume': '1000', 'highPrice': '0.21', 'lowPrice': '0.19'}
+        expected = Tick('DOGEUSDT', START_TS + 30, 0.2, 1000.0, 0.21, 0.19)
+        for tick in (BinanceStreamSource.parse_message(ticker), BinanceStreamSource.parse_message(kline),
+                     RestPollingSource.parse_ticker(rest)):
+            self.assertEqual((tick.symbol, tick.ts, tick.price, tick.volume, tick.high, tick.low),
+                             (expected.symbol, expected.ts, expected.price, expected.volume, expected.high, expected.low))
+        self.assertIsNone(BinanceStreamSource.parse_message({'result': None, 'id': 1}))
+        self.assertEqual(BinanceStreamSource(['DOGEUSDT', 'PEPEUSDT']).stream_url,
+                         'wss://stream.binance.com:9443/stream?streams=dogeusdt@ticker/pepeusdt@ticker')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+"""
+Testes da instrumentação (métricas Prometheus do backend)
+"""
+
+import os
+import sys
+import json
+import tempfile
+import subprocess
+import unittest
+
+import pandas as pd
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from instrumentation import (Histogram, MetricsRegistry, InstrumentedExchange, SystemSampler, connect,
+                             instrument_app, render_workers, slowest_routes, snapshot_path, write_snapshot)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeExchange:
+    id = 'fake'
+    markets = {'DOGE/USDT': {}}
+
+    def fetch_ticker(self, symbol):
+        return {'symbol': symbol, 'last': 0.1}
+
+    def create_order(self, *args, **kwargs):
+        raise RuntimeError("saldo insuficiente")
+
+
+class FakeCache:
+    hits, misses = 3, 1
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_histogram_buckets_and_quantile(self):
+        histogram = Histogram((0.01, 0.1, 1.0))
+        for value in (0.005, 0.01, 0.05, 0.5, 3.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 1, 1, 1])
+        self.assertEqual(histogram.quantile(0.4), 0.01)
+        self.assertEqual(histogram.quantile(0.8), 1.0)
+        self.assertEqual(histogram.quantile(1.0), float('inf'))
+        self.assertIsNone(Histogram().quantile(0.5))
+
+    def test_render_prometheus_text(self):
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.inc('orders_total', help='Ordens', side='buy')
+        registry.inc('orders_total', 2, side='buy')
+        registry.set('queue_depth', 4)
+        registry.observe('latency_seconds', 0.05, route='/api/x"y')
+        registry.observe('latency_seconds', 0.5, route='/api/x"y')
+        registry.track_cache('prices', FakeCache())
+        text = registry.render()
+
+        self.assertIn('# HELP mocove_orders_total Ordens\n# TYPE mocove_orders_total counter', text)
+        self.assertIn('mocove_orders_total{side="buy"} 3\n', text)
+        self.assertIn('mocove_queue_depth 4\n', text)
+        self.assertIn('mocove_latency_seconds_bucket{route="/api/x\\"y",le="0.1"} 1\n', text)
+        self.assertIn('mocove_latency_seconds_bucket{route="/api/x\\"y",le="1"} 2\n', text)
+        self.assertIn('mocove_latency_seconds_bucket{route="/api/x\\"y",le="+Inf"} 2\n', text)
+        self.assertIn('mocove_latency_seconds_count{route="/api/x\\"y"} 2\n', text)
+        self.assertIn('mocove_cache_hit_ratio{cache="prices"} 0.75\n', text)
+        self.assertIn(f'mocove_process_info{{pid="{os.getpid()}"}} 1\n', text)
+
+    def test_render_workers_aggregates_snapshots(self):
+        """Contadores e histogramas somados entre workers; gauges só dos vivos, por worker"""
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.inc('orders_total', side='buy')
+        registry.set('queue_depth', 4)
+        registry.observe('latency_seconds', 0.05, route='/api/x')
+        registry.track_cache('prices', FakeCache())
+        exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+        exited.wait()
+        with tempfile.TemporaryDirectory() as tmp:
+            write_snapshot(registry, tmp)
+            old = dict(registry.snapshot(), pid=exited.pid, worker='1')
+            with open(snapshot_path(tmp, exited.pid), 'w', encoding='utf-8') as f:
+                json.dump(old, f)
+            text = render_workers(tmp)
+
+        self.assertIn('mocove_orders_total{side="buy"} 2\n', text)
+        self.assertIn('mocove_latency_seconds_count{route="/api/x"} 2\n', text)
+        self.assertIn('mocove_latency_seconds_bucket{route="/api/x",le="0.1"} 2\n', text)
+        self.assertIn('mocove_cache_hits_total{cache="prices"} 6\n', text)
+        self.assertEqual(text.count('mocove_queue_depth{'), 1)
+        self.assertEqual(text.count('mocove_process_info{'), 1)
+        self.assertIn(f'pid="{os.getpid()}"', text)
+
+
+class TestInstrumentedLayers(unittest.TestCase):
+    def test_connection_times_every_statement(self):
+        registry = MetricsRegistry()
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = connect(os.path.join(tmp, 't.db'), registry)
+            conn.execute('CREATE TABLE t (x INTEGER)')
+            conn.executemany('INSERT INTO t VALUES (?)', [(1,), (2,)])
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) FROM t')
+            self.assertEqual(cursor.fetchone()[0], 2)
+            self.assertEqual(len(pd.read_sql_query('SELECT * FROM t', conn)), 2)
+            conn.close()
+        self.assertEqual(registry.histogram('db_query_duration_seconds', op='create').count, 1)
+        self.assertEqual(registry.histogram('db_query_duration_seconds', op='insert').count, 1)
+        self.assertEqual(registry.histogram('db_query_duration_seconds', op='select').count, 2)
+
+    def test_exchange_proxy_counts_calls_and_errors(self):
+        registry = MetricsRegistry()
+        exchange = InstrumentedExchange(FakeExchange(), registry)
+        self.assertEqual(exchange.fetch_ticker('DOGE/USDT')['last'], 0.1)
+        self.assertIn('DOGE/USDT', exchange.markets)
+        with self.assertRaises(RuntimeError):
+            exchange.create_order('DOGE/USDT', 'market', 'buy', 1)
+        exchange.timeout = 5000
+        self.assertEqual(exchange.wrapped.timeout, 5000)
+
+        text = registry.render()
+        self.assertIn('mocove_exchange_calls_total{exchange="fake",method="fetch_ticker",outcome="ok"} 1', text)
+        self.assertIn('mocove_exchange_calls_total{exchange="fake",method="create_order",outcome="RuntimeError"} 1',
+                      text)
+        self.assertEqual(registry.histogram('exchange_call_duration_seconds', exchange='fake',
+                                            method='fetch_ticker').count, 1)
+
+    def test_middleware_labels_by_route_rule(self):
+        registry, clock = MetricsRegistry(), FakeClock()
+        app = Flask(__name__)
+        instrument_app(app, registry, clock=clock)
+
+        @app.route('/api/coins/<symbol>')
+        def coin(symbol):
+            clock.now += 0.2
+            return symbol
+
+        client = app.test_client()
+        client.get('/api/coins/DOGE')
+        client.get('/api/coins/PEPE')
+        client.get('/missing')
+        histogram = registry.histogram('http_request_duration_seconds', route='/api/coins/<symbol>',
+                                       method='GET', status=200)
+        self.assertEqual(histogram.count, 2)
+        self.assertAlmostEqual(histogram.sum, 0.4)
+        self.assertEqual(registry.histogram('http_request_duration_seconds', route='<unmatched>',
+                                            method='GET', status=404).count, 1)
+        slowest = slowest_routes(registry)
+        self.assertEqual((slowest[0]['route'], slowest[0]['count'], slowest[0]['p95_ms_upper']),
+                         ('/api/coins/<symbol>', 2, 250.0))
+
+    def test_system_sampler_publishes_gauges(self):
+        registry = MetricsRegistry()
+        sampler = SystemSampler(registry, sampler=lambda: {'cpu_percent': 12.5, 'memory_percent': 40.0,
+                                                           'process_rss_bytes': 1024, 'load1': None,
+                                                           'source': 'teste'})
+        values = sampler.sample()
+        self.assertEqual(sampler.last, values)
+        text = registry.render()
+        self.assertIn('mocove_system_cpu_percent 12.5\n', text)
+        self.assertIn('mocove_system_memory_percent 40\n', text)
+        self.assertNotIn('system_load1', text)
+
+
+class TestBackendMetrics(unittest.TestCase):
+    def test_metrics_endpoint_and_real_system_metrics(self):
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+        from app import app
+        client = app.test_client()
+        client.get('/api/trading/mode')
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        self.assertIn('route="/api/trading/mode"', response.get_data(as_text=True))
+
+        data = client.get('/api/system/metrics').get_json()['metrics']
+        self.assertIn(data['system_source'], ('psutil', 'proc'))
+        self.assertIn('shared_state', data['caches'])
+        self.assertTrue(1 <= len(data['slowest_routes']) <= 5)
+        self.assertIsNotNone(data['slowest_routes'][0]['p95_ms_upper'])
+
+
+if __name__ == '__main__':
+    unittest.main()
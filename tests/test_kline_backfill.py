@@ -0,0 +1,176 @@
+"""
+Testes para o backfill de klines contra um servidor local falso
+"""
+
+import unittest
+import sqlite3
+import tempfile
+import threading
+import json
+import time
+import os
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from kline_backfill import KlineBackfill, RateLimiter, INTERVAL_MS, load_klines
+
+DAY_MS = 86_400_000
+START_MS = 1_754_006_400_000  # 2025-08-01 00:00 UTC
+
+
+class FakeKlineServer:
+    """Servidor /api/v3/klines determinístico, com falhas e 429 configuráveis"""
+
+    def __init__(self):
+        self.requests = []
+        self.failing_symbols = set()
+        self.throttle_next = 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                q = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                with server.lock:
+                    server.requests.append(q)
+                    throttle = server.throttle_next > 0
+                    if throttle:
+                        server.throttle_next -= 1
+                if throttle:
+                    self.send_response(429)
+                    self.send_header('Retry-After', '0.05')
+                    self.end_headers()
+                    return
+                if q['symbol'] in server.failing_symbols:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                step = INTERVAL_MS[q['interval']]
+                start, end, limit = int(q['startTime']), int(q['endTime']), int(q['limit'])
+                now = int(time.time() * 1000)
+                first = -(-start // step) * step
+                klines = []
+                for t in range(first, min(end, now) + 1, step):
+                    price = 1.0 + (t // step) % 100 / 1000
+                    klines.append([t, str(price), str(price * 1.01), str(price * 0.99), str(price),
+                                   "100.0", t + step - 1, "100.0", 7, "0", "0", "0"])
+                    if len(klines) >= limit:
+                        break
+                body = json.dumps(klines).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class TestKlineBackfill(unittest.TestCase):
+    """Testes do KlineBackfill"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'test.db')
+        self.server = FakeKlineServer()
+
+    def tearDown(self):
+        self.server.close()
+        self.tmpdir.cleanup()
+
+    def _backfill(self, **kwargs):
+        params = dict(base_url=self.server.url, max_workers=4, weight_per_minute=600000, max_attempts=2)
+        params.update(kwargs)
+        return KlineBackfill(self.db_path, **params)
+
+    def _count(self, sql='SELECT COUNT(*) FROM klines'):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(sql).fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_full_backfill(self):
+        """Baixa o período inteiro em blocos de 1000 klines sem duplicatas"""
+        report = self._backfill().run(['DOGEUSDT', 'PEPEUSDT'], ['1m', '5m'], START_MS, START_MS + DAY_MS)
+
+        # 1m: 1440 klines em 2 blocos; 5m: 288 klines em 1 bloco (grade fixa, pode somar um bloco)
+        self.assertEqual(report.failed, {})
+        self.assertEqual(report.completed, report.planned)
+        self.assertEqual(report.requests, report.planned)
+        conn = sqlite3.connect(self.db_path)
+        df = load_klines(conn, 'DOGEUSDT', '1m', START_MS, START_MS + DAY_MS)
+        conn.close()
+        self.assertEqual(len(df), 1440)
+        self.assertTrue(df['open_time'].is_monotonic_increasing)
+        self.assertEqual(self._count("SELECT COUNT(*) FROM backfill_chunks WHERE status != 'done'"), 0)
+
+    def test_resume_after_failure(self):
+        """Reexecução baixa só os blocos que falharam"""
+        self.server.failing_symbols.add('PEPEUSDT')
+        first = self._backfill().run(['DOGEUSDT', 'PEPEUSDT'], ['1m'], START_MS, START_MS + 2 * DAY_MS)
+        self.assertTrue(first.failed)
+        self.assertTrue(all(c.symbol == 'PEPEUSDT' for c in first.failed))
+        doge_rows = self._count()
+
+        self.server.failing_symbols.clear()
+        self.server.requests.clear()
+        second = self._backfill().run(['DOGEUSDT', 'PEPEUSDT'], ['1m'], START_MS, START_MS + 2 * DAY_MS)
+        self.assertEqual(second.failed, {})
+        self.assertEqual(second.completed, len(first.failed))
+        self.assertEqual(second.skipped, first.completed)
+        self.assertTrue(all(q['symbol'] == 'PEPEUSDT' for q in self.server.requests))
+        self.assertEqual(self._count(), 2 * doge_rows)
+
+    def test_upsert_is_idempotent(self):
+        """Refazer blocos já gravados não duplica klines"""
+        self._backfill().run(['DOGEUSDT'], ['15m'], START_MS, START_MS + 3 * DAY_MS)
+        rows = self._count()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE backfill_chunks SET status = 'pending'")
+        conn.commit()
+        conn.close()
+        self._backfill().run(['DOGEUSDT'], ['15m'], START_MS, START_MS + 3 * DAY_MS)
+        self.assertEqual(self._count(), rows)
+
+    def test_open_chunk_stays_pending(self):
+        """O bloco que contém o momento atual é baixado de novo na próxima vez"""
+        now = int(time.time() * 1000)
+        report = self._backfill().run(['DOGEUSDT'], ['1h'], now - 2 * DAY_MS)
+        self.assertEqual(report.failed, {})
+        self.assertEqual(self._count("SELECT COUNT(*) FROM backfill_chunks WHERE status = 'pending'"), 1)
+
+    def test_rate_limit_response_is_retried(self):
+        """HTTP 429 pausa o orçamento e o bloco é refeito"""
+        self.server.throttle_next = 1
+        report = self._backfill(max_workers=1).run(['DOGEUSDT'], ['1h'], START_MS, START_MS + DAY_MS)
+        self.assertEqual(report.failed, {})
+        self.assertEqual(report.requests, report.planned + 1)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Testes do RateLimiter"""
+
+    def test_budget_is_respected(self):
+        limiter = RateLimiter(weight_per_minute=1200, burst=2)  # 20/s
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.acquire(1)
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Testes para a configuração de logging compartilhada (fila, JSON, amostragem)
+"""
+
+import unittest
+import logging
+import tempfile
+import json
+import os
+import sys
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logging_setup import (setup_logging, shutdown_logging, render_log_line, parse_sample_rates, next_worker_id,
+                           worker_log_file)
+
+
+class TestLoggingSetup(unittest.TestCase):
+    """Testes do setup_logging"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.tmpdir.name, 'agent.log')
+
+    def tearDown(self):
+        shutdown_logging()
+        self.tmpdir.cleanup()
+
+    def _lines(self):
+        shutdown_logging()  # drena a fila
+        with open(self.log_file, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def test_json_records_with_extra(self):
+        """Registros são gravados em JSON com campos extras"""
+        setup_logging(log_file=self.log_file, console=False, sample='')
+        logging.getLogger('Agent').info('ciclo %d', 3, extra={'symbol': 'DOGEUSDT'})
+
+        lines = self._lines()
+        self.assertEqual(lines[0]['msg'], 'ciclo 3')
+        self.assertEqual(lines[0]['logger'], 'Agent')
+        self.assertEqual(lines[0]['symbol'], 'DOGEUSDT')
+
+    def test_sampling_by_level(self):
+        """INFO amostrado 1 a cada 5; WARNING nunca é amostrado"""
+        setup_logging(log_file=self.log_file, console=False, sample='INFO:5')
+        log = logging.getLogger('Agent')
+        for i in range(20):
+            log.info('símbolo %d', i)
+        for i in range(3):
+            log.warning('alerta %d', i)
+
+        msgs = [l['msg'] for l in self._lines()]
+        self.assertEqual(msgs, ['símbolo 0', 'símbolo 5', 'símbolo 10', 'símbolo 15',
+                                'alerta 0', 'alerta 1', 'alerta 2'])
+
+    def test_render_and_parse(self):
+        line = json.dumps({'ts': '2025-08-18T10:00:00.123', 'level': 'INFO', 'msg': 'ok'})
+        self.assertEqual(render_log_line(line), '2025-08-18 10:00:00,123 - INFO - ok')
+        self.assertEqual(render_log_line('texto antigo'), 'texto antigo')
+        self.assertEqual(parse_sample_rates('DEBUG:10, info:2'), {logging.DEBUG: 10, logging.INFO: 2})
+
+    def test_worker_log_files(self):
+        self.assertEqual(worker_log_file('/var/log/backend.log', 0), '/var/log/backend.w0.log')
+        self.assertIsNone(worker_log_file(None, 0))
+        self.assertEqual(next_worker_id([0, 2]), 1)
+        self.assertEqual(next_worker_id([]), 0)
+
+    def test_backend_import_keeps_root_logger(self):
+        """Importar o app não reconfigura o logging de quem importa (testes, launcher)"""
+        root_dir = os.path.join(os.path.dirname(__file__), '..')
+        code = ("import logging, sys; sys.path.insert(0, 'backend'); marker = logging.NullHandler(); "
+                "logging.getLogger().addHandler(marker); import app; "
+                "print(logging.getLogger().handlers == [marker])")
+        env = dict(os.environ, DB_PATH=os.path.join(self.tmpdir.name, 'backend.db'))
+        out = subprocess.run([sys.executable, '-c', code], cwd=root_dir, env=env, capture_output=True, text=True)
+        self.assertEqual(out.stdout.strip().splitlines()[-1], 'True', out.stderr[-2000:])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+"""
+Testes para o harness de replay de mercado (exchange falsa, probe e relatório)
+"""
+
+import unittest
+import subprocess
+import tempfile
+import textwrap
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from market_replay import FakeExchange, ReplayHarness, compare_reports, PROBE_OUT_ENV, PROBE_SIGNALS_ENV, ROOT
+from exchange_config import apply_exchange_url, EXCHANGE_URL_ENV
+from ingest_daemon import Tick
+
+try:
+    import ccxt
+    HAS_CCXT = True
+except ImportError:
+    HAS_CCXT = False
+
+START_TS = 1_754_006_400.0  # 2025-08-01 00:00 UTC
+
+# Agente mínimo: consulta o backend, "decide" e envia a ordem pela exchange via ccxt
+FAKE_AGENT = '''
+import time
+import ccxt
+import requests
+import os
+from exchange_config import apply_exchange_url
+
+
+def decide(opportunity, client):
+    client.create_order(symbol=opportunity['symbol'], type='market', side='buy', amount=10)
+
+
+def main():
+    api = os.environ['MOCOVE_API_BASE']
+    client = apply_exchange_url(ccxt.binance({'apiKey': 'k', 'secret': 's', 'options': {'defaultType': 'spot'}}))
+    orders = 0
+    while True:
+        data = requests.get(f"{api}/api/market_data", params={'symbol': 'DOGEUSDT'}, timeout=5).json()
+        if orders < 3 and 'price' in data:
+            decide({'symbol': 'DOGEUSDT', 'action': 'buy', 'price': data['price']}, client)
+            orders += 1
+        time.sleep(0.2)
+'''
+
+
+def _ticks(n, step=1.0):
+    return [Tick('DOGEUSDT', START_TS + i * step, 0.2 + (i % 50) / 1e4, 5e6) for i in range(n)]
+
+
+@unittest.skipUnless(HAS_CCXT, "ccxt não instalado")
+class TestFakeExchange(unittest.TestCase):
+    """Exchange falsa vista pelo ccxt"""
+
+    def setUp(self):
+        self.exchange = FakeExchange(['DOGEUSDT', 'PEPEUSDT'], starting_balance=100).start()
+        self.client = apply_exchange_url(
+            ccxt.binance({'apiKey': 'k', 'secret': 's', 'options': {'defaultType': 'spot'}}), self.exchange.url)
+
+    def tearDown(self):
+        self.exchange.stop()
+
+    def test_ticker_follows_replay(self):
+        self.exchange.handle([Tick('DOGEUSDT', START_TS, 0.2), Tick('DOGEUSDT', START_TS + 60, 0.21),
+                              Tick('DOGEUSDT', START_TS + 120, 0.123456789)])
+        ticker = self.client.fetch_ticker('DOGEUSDT')
+        self.assertEqual(ticker['last'], 0.12345679)  # grade de 8 casas
+        self.assertEqual((ticker['high'], ticker['open']), (0.21, 0.2))
+        self.assertEqual(self.exchange.calls['GET /api/v3/ticker/24hr'], 1)
+
+    def test_market_orders_and_balances(self):
+        self.exchange.handle([Tick('DOGEUSDT', START_TS, 0.25)])
+        order = self.client.create_order(symbol='DOGEUSDT', type='market', side='buy', amount=200)
+        self.assertEqual((order['status'], order['cost']), ('closed', 50.0))
+        balance = self.client.fetch_balance()
+        self.assertEqual((balance['USDT']['free'], balance['DOGE']['free']), (50.0, 200.0))
+
+        with self.assertRaises(ccxt.InsufficientFunds):
+            self.client.create_order(symbol='DOGEUSDT', type='market', side='buy', amount=1000)
+        with self.assertRaises(ccxt.InsufficientFunds):
+            self.client.create_order(symbol='DOGEUSDT', type='market', side='sell', amount=300)
+        self.assertEqual(len(self.exchange.orders), 1)
+
+    def test_tick_publication_lookup(self):
+        self.exchange.handle([Tick('DOGEUSDT', START_TS, 0.2)])
+        published = self.exchange.tick_published_at('DOGEUSDT', 0.2, before=1e12)
+        self.assertIsNotNone(published)
+        self.assertIsNone(self.exchange.tick_published_at('DOGEUSDT', 0.3, before=1e12))
+        self.assertIsNone(self.exchange.tick_published_at('DOGEUSDT', 0.2, before=published - 1))
+
+
+class TestReplayHelpers(unittest.TestCase):
+    """URL da exchange, probe e comparação de relatórios"""
+
+    @unittest.skipUnless(HAS_CCXT, "ccxt não instalado")
+    def test_apply_exchange_url(self):
+        os.environ.pop(EXCHANGE_URL_ENV, None)
+        client = apply_exchange_url(ccxt.binance())
+        self.assertEqual(client.urls['api']['public'], 'https://api.binance.com/api/v3')
+        apply_exchange_url(client, 'http://127.0.0.1:9999')
+        self.assertEqual(client.urls['api']['public'], 'http://127.0.0.1:9999/api/v3')
+        self.assertEqual(client.urls['api']['fapiPublic'], 'http://127.0.0.1:9999/fapi/v1')
+
+    def test_probe_counts_sqlite_and_signals(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, 'probe_target.py'), 'w') as f:
+                f.write(textwrap.dedent('''
+                    import sqlite3
+
+                    class Agent:
+                        def act(self, opportunity):
+                            return opportunity['symbol']
+
+                    def main():
+                        conn = sqlite3.connect(':memory:')
+                        conn.execute('CREATE TABLE t (x)')
+                        conn.executemany('INSERT INTO t VALUES (?)', [(1,), (2,)])
+                        conn.execute('SELECT * FROM t').fetchall()
+                        Agent().act({'symbol': 'DOGEUSDT', 'action': 'buy', 'price': 0.2})
+                '''))
+            out = os.path.join(tmp, 'probe.json')
+            env = {**os.environ, 'PYTHONPATH': os.pathsep.join([ROOT, tmp]), PROBE_OUT_ENV: out,
+                   PROBE_SIGNALS_ENV: 'probe_target:Agent.act'}
+            subprocess.run([sys.executable, os.path.join(ROOT, 'market_replay.py'), 'probe', 'probe_target:main'],
+                           env=env, cwd=tmp, check=True, timeout=60)
+            with open(out) as f:
+                counters = json.load(f)
+
+        self.assertEqual(counters['sqlite_connections'], 1)
+        self.assertEqual(counters['sqlite_statements'].get('INSERT'), 2)
+        self.assertEqual(counters['sqlite_statements'].get('SELECT'), 1)
+        self.assertEqual([(s['symbol'], s['action'], s['price']) for s in counters['signals']],
+                         [('DOGEUSDT', 'buy', 0.2)])
+
+    def test_settle_waits_for_in_flight_orders(self):
+        exchange = FakeExchange(['DOGEUSDT'])
+        harness = ReplayHarness([Tick('DOGEUSDT', START_TS, 0.2)], settle_timeout_s=10)
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, 'agent.probe.json'), 'w') as f:
+                json.dump({'signals': [{'symbol': 'DOGEUSDT'}, {'symbol': 'DOGEUSDT'}]}, f)
+            exchange.orders.append({'symbol': 'DOGEUSDT'})
+            late = threading.Timer(0.5, exchange.orders.append, [{'symbol': 'DOGEUSDT'}])
+            late.start()
+            started = time.monotonic()
+            harness._settle(tmp, ['agent'], exchange)
+            late.join()
+
+            self.assertEqual(len(exchange.orders), 2)
+            self.assertGreaterEqual(time.monotonic() - started, 0.5)
+
+            # Sinal que nunca vira ordem: desiste no timeout em vez de travar o replay
+            harness.settle_timeout_s = 0.3
+            with open(os.path.join(tmp, 'agent.probe.json'), 'w') as f:
+                json.dump({'signals': [{'symbol': 'DOGEUSDT'}] * 3}, f)
+            harness._settle(tmp, ['agent'], exchange)
+            self.assertEqual(len(exchange.orders), 2)
+
+    def test_compare_reports(self):
+        base = {'wall_s': 10, 'latency_ms': {'tick_to_order': {'count': 5, 'p95': 100.0}},
+                'exchange_calls': {'GET /api/v3/ticker/24hr': 100},
+                'processes': {'backend': {'http': {'GET exchange/api/v3/ticker/24hr': 100},
+                                          'sqlite_statements': {'SELECT': 500}}}}
+        self.assertEqual(compare_reports(base, base), [])
+
+        slower = json.loads(json.dumps(base))
+        slower['latency_ms']['tick_to_order']['p95'] = 180.0
+        slower['processes']['backend']['sqlite_statements']['SELECT'] = 900
+        regressions = compare_reports(base, slower)
+        self.assertEqual(len(regressions), 2)
+        self.assertIn('tick_to_order', regressions[0])
+        self.assertIn('backend.sqlite', regressions[1])
+
+        noise = json.loads(json.dumps(base))
+        noise['latency_ms']['tick_to_order']['p95'] = 104.0  # abaixo do mínimo absoluto
+        self.assertEqual(compare_reports(base, noise), [])
+
+
+@unittest.skipUnless(HAS_CCXT, "ccxt não instalado")
+class TestReplayHarness(unittest.TestCase):
+    """Backend real + agente mínimo em processos separados contra o replay"""
+
+    def test_end_to_end_latency_and_counts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, 'fake_agent.py'), 'w') as f:
+                f.write(FAKE_AGENT)
+            harness = ReplayHarness(_ticks(3600), speed=600, agents=['fake_agent:main'], warmup_s=600,
+                                    workdir=os.path.join(tmp, 'run'), extra_env={'PYTHONPATH': tmp},
+                                    signals={'fake_agent:main': ['fake_agent:decide']})
+            report = harness.run().to_dict()
+
+        self.assertEqual(report['ticks'], 3000)
+        self.assertEqual(report['ingest']['sinks']['db_writer']['processed'], 3000)
+        self.assertGreaterEqual(report['orders'], 1)
+        self.assertEqual(report['signals'], report['orders'])
+        self.assertEqual(report['latency_ms']['signal_to_order']['count'], report['orders'])
+        self.assertEqual(report['latency_ms']['tick_to_order']['count'], report['orders'])
+        self.assertGreater(report['processes']['fake_agent']['http']['GET backend/api/market_data'], 0)
+        self.assertGreater(report['processes']['backend']['http']['GET exchange/api/v3/ticker/24hr'], 0)
+        self.assertGreater(report['processes']['backend']['sqlite_statements']['INSERT'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Testes para a pontuação cross-sectional de oportunidades
+"""
+
+import unittest
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from opportunity_scoring import (
+    CrossSectionalScorer, build_feature_matrix, matrix_from_tickers, register_scorer, BUY, HOLD
+)
+
+
+def snapshot(change, volume=0.0, prices=(1.0, 1.0, 1.0)):
+    return ({'price': 1.0, 'change_24h': change, 'volume': volume}, [{'price': p} for p in prices])
+
+
+class TestRulesScorer(unittest.TestCase):
+    """Regras vetorizadas equivalentes a SimpleAgent.analyze_market"""
+
+    def setUp(self):
+        self.scorer = CrossSectionalScorer('rules')
+
+    def test_rule_table(self):
+        snapshots = {
+            'STRONG': snapshot(9.0, volume=2e6),             # 0.4 + 0.2 + 0.3 -> 0.9
+            'MODERATE': snapshot(3.5),                      # 0.2
+            'DROP': snapshot(-2.5, prices=(1.0, 1.0, 1.1)),  # 0.2 + 0.2 + 0.4 -> 0.8
+            'LATERAL': snapshot(1.5),                       # 0.0 * 0.3
+            'STABLE': snapshot(0.2),
+            'EMPTY': ({'price': 1.0, 'change_24h': 9.0}, []),
+        }
+        table = self.scorer.score_snapshots(snapshots)
+        result = {table.features.symbols[i]: (table.action(i), round(float(table.confidence[i]), 4))
+                  for i in range(len(snapshots))}
+
+        self.assertEqual(result['STRONG'], ('buy', 0.9))
+        self.assertEqual(result['MODERATE'], ('buy', 0.2))
+        self.assertEqual(result['DROP'], ('sell', 0.8))
+        self.assertEqual(result['LATERAL'], ('hold', 0.0))
+        self.assertEqual(result['STABLE'], ('hold', 0.1))
+        self.assertEqual(result['EMPTY'], ('hold', 0.0))
+
+        # Ranking: maior confiança primeiro
+        self.assertEqual(table.features.symbols[table.order()[0]], 'STRONG')
+        self.assertEqual(int(table.rank[table.features.symbols.index('STRONG')]), 0)
+
+    def test_zscores_relative_to_universe(self):
+        fm = build_feature_matrix({s: snapshot(c) for s, c in [('A', -1.0), ('B', 0.0), ('C', 1.0)]})
+        z = fm.zscores()
+        np.testing.assert_allclose(z[:, 1], [-1.2247, 0.0, 1.2247], atol=1e-4)
+
+
+class TestPluggableScorers(unittest.TestCase):
+
+    def test_register_custom_scorer(self):
+        register_scorer('always_buy', lambda fm, z: (np.full(len(fm.symbols), BUY), np.ones(len(fm.symbols))))
+        table = CrossSectionalScorer('always_buy').score_snapshots({'A': snapshot(0.0)})
+        self.assertEqual(table.action(0), 'buy')
+
+    def test_unknown_scorer(self):
+        with self.assertRaises(ValueError):
+            CrossSectionalScorer('does_not_exist')
+
+    def test_matrix_from_tickers(self):
+        tickers = {
+            'DOGE/USDT': {'last': 0.2, 'percentage': 9.0, 'baseVolume': 5e6, 'quoteVolume': 1e6},
+            'PEPE/USDT': {'last': 1e-6, 'percentage': 1.0, 'baseVolume': 1e9, 'quoteVolume': 10.0},
+            'DOGE/BTC': {'last': 1e-6, 'percentage': 2.0, 'baseVolume': 1.0, 'quoteVolume': 1e6},
+            'WIF/USDT:USDT': {'last': 2.0, 'percentage': 9.0, 'baseVolume': 5e6, 'quoteVolume': 1e7},
+        }
+        fm = matrix_from_tickers(tickers, 'USDT', min_quote_volume=1000)
+        self.assertEqual(fm.symbols, ['DOGEUSDT'])
+        table = CrossSectionalScorer('rules').score(fm)
+        self.assertEqual(table.action(0), 'buy')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,255 @@
+"""
+Testes do gerenciador de ordens (order_manager)
+"""
+
+import os
+import sys
+import time
+import asyncio
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from order_manager import (Order, OrderManager, OrderStateStore, SimulatedFillExchange, InvalidTransition, NEW,
+                           SUBMITTED, PARTIALLY_FILLED, FILLED, CANCELLED, REJECTED)
+from paper_exchange import PaperExchange
+
+
+class ScriptedExchange:
+    """Responde create_order/fetch_order com respostas ccxt pré-definidas"""
+
+    def __init__(self, created, fetched=None, delay=0.0, fail=None):
+        self.created, self.fetched = created, list(fetched or [])
+        self.delay, self.fail = delay, fail
+        self.calls = []
+        self.release = threading.Event()
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        self.calls.append(('create_order', symbol, side, amount, (params or {}).get('clientOrderId')))
+        if self.delay:
+            self.release.wait(self.delay)
+        if self.fail:
+            raise self.fail
+        return dict(self.created)
+
+    def fetch_order(self, id, symbol=None):
+        self.calls.append(('fetch_order', id))
+        return dict(self.fetched.pop(0)) if self.fetched else dict(self.created)
+
+
+def make_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE trades (id INTEGER PRIMARY KEY AUTOINCREMENT, date DATETIME NOT NULL, "
+                 "type TEXT NOT NULL, symbol TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL, "
+                 "total REAL NOT NULL, status TEXT DEFAULT 'completed')")
+    conn.commit()
+    conn.close()
+
+
+def paper():
+    ex = PaperExchange(balances={'USDT': 1000.0, 'DOGE': 500.0})
+    ex.update_price('DOGE/USDT', 0.1)
+    return ex
+
+
+class TestOrderManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'orders.db')
+        make_db(self.db_path)
+        self.managers = []
+
+    def tearDown(self):
+        for manager in self.managers:
+            manager.close()
+        self.tmp.cleanup()
+
+    def manager(self, exchange, **kwargs):
+        kwargs.setdefault('db_path', self.db_path)
+        kwargs.setdefault('flush_interval_s', 60)
+        manager = OrderManager(exchange, **kwargs)
+        self.managers.append(manager)
+        return manager
+
+    def rows(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute('SELECT type, symbol, amount, price, total, status FROM trades').fetchall()
+        finally:
+            conn.close()
+
+    def test_market_orders_walk_the_state_machine_and_persist_in_one_batch(self):
+        persisted = []
+        manager = self.manager(paper(), on_persist=persisted.append)
+        buy = manager.submit('DOGE/USDT', 'buy', quote_amount=10)
+        sell = manager.submit('DOGE/USDT', 'sell', amount=50)
+        self.assertTrue(buy.wait(2) and sell.wait(2))
+
+        self.assertEqual([s for s, _ in buy.history], [NEW, SUBMITTED, FILLED])
+        self.assertAlmostEqual(buy.cost, 10.0)
+        self.assertAlmostEqual(sell.filled, 50.0)
+        self.assertEqual(self.rows(), [])  # ainda no lote
+        self.assertEqual(manager.flush(), 2)
+        self.assertEqual(persisted, [2])
+        rows = sorted(self.rows())
+        self.assertEqual([(r[0], r[5]) for r in rows], [('buy', 'completed'), ('sell', 'completed')])
+        self.assertAlmostEqual(rows[0][4], 10.0)
+        self.assertTrue(buy.persisted)
+        stats = manager.stats()
+        self.assertEqual((stats['submitted'], stats['states'], stats['in_flight']), (2, {FILLED: 2}, 0))
+        self.assertIsNotNone(stats['latency_ms']['p95'])
+
+    def test_idempotency_key_returns_the_same_order(self):
+        exchange = ScriptedExchange({'id': 'x1', 'status': 'closed', 'filled': 5, 'cost': 0.5, 'average': 0.1})
+        manager = self.manager(exchange)
+        first = manager.submit('DOGE/USDT', 'buy', amount=5, idempotency_key='sinal-1')
+        again = manager.submit('DOGE/USDT', 'buy', amount=5, idempotency_key='sinal-1')
+        self.assertIs(first, again)
+        first.wait(2)
+        self.assertEqual(len([c for c in exchange.calls if c[0] == 'create_order']), 1)
+        self.assertEqual(manager.stats()['duplicates'], 1)
+        self.assertEqual(manager.get('sinal-1').exchange_order_id, 'x1')
+        self.assertTrue(exchange.calls[0][4].startswith('mcv'))
+
+    def test_submit_does_not_block_and_in_flight_is_bounded(self):
+        exchange = ScriptedExchange({'id': 'x1', 'status': 'closed', 'filled': 1, 'cost': 1}, delay=5)
+        manager = self.manager(exchange, max_in_flight=1)
+        start = time.perf_counter()
+        slow = manager.submit('DOGE/USDT', 'buy', amount=1)
+        self.assertLess(time.perf_counter() - start, 0.05)
+        self.assertIn(slow.state, (NEW, SUBMITTED))
+
+        refused = manager.submit('DOGE/USDT', 'buy', amount=1)
+        self.assertEqual(refused.state, REJECTED)
+        self.assertTrue(refused.wait(0))
+        self.assertEqual(manager.stats()['backpressure'], 1)
+
+        exchange.release.set()
+        self.assertTrue(slow.wait(2))
+        self.assertEqual(manager.submit('DOGE/USDT', 'buy', amount=1).wait(2), True)
+
+    def test_partial_fill_is_reconciled_until_filled(self):
+        exchange = ScriptedExchange(
+            {'id': 'x9', 'status': 'open', 'filled': 4, 'cost': 0.4, 'average': 0.1},
+            fetched=[{'id': 'x9', 'status': 'open', 'filled': 7, 'cost': 0.7},
+                     {'id': 'x9', 'status': 'closed', 'filled': 10, 'cost': 1.05}])
+        done = []
+        manager = self.manager(exchange, on_done=done.append)
+        order = manager.submit('DOGE/USDT', 'buy', amount=10)
+        self.assertFalse(order.wait(0.2))
+        self.assertEqual(order.state, PARTIALLY_FILLED)
+        self.assertEqual(manager.reconcile(), 0)
+        self.assertAlmostEqual(order.filled, 7)
+        self.assertEqual(manager.reconcile(), 1)
+        self.assertEqual(order.state, FILLED)
+        self.assertAlmostEqual(order.average, 0.105)
+        self.assertEqual(done, [order])
+        manager.flush()
+        self.assertEqual(len(self.rows()), 1)  # uma linha por ordem, não por execução parcial
+        self.assertEqual(manager.reconcile(), 0)
+
+    def test_failures_reject_without_rows_and_cancel_keeps_partial(self):
+        failing = self.manager(ScriptedExchange({}, fail=RuntimeError("Account has insufficient balance")))
+        order = failing.submit('DOGE/USDT', 'sell', amount=1)
+        self.assertTrue(order.wait(2))
+        self.assertEqual((order.state, order.error), (REJECTED, "Account has insufficient balance"))
+
+        partial = self.manager(ScriptedExchange({'id': 'c1', 'status': 'canceled', 'filled': 2, 'cost': 0.2}))
+        cancelled = partial.submit('DOGE/USDT', 'buy', amount=5)
+        cancelled.wait(2)
+        self.assertEqual(cancelled.state, CANCELLED)
+        failing.flush()
+        partial.flush()
+        self.assertEqual([r[2] for r in self.rows()], [2.0])
+
+        with self.assertRaises(ValueError):
+            failing.submit('DOGE/USDT', 'hold', amount=1)
+        with self.assertRaises(InvalidTransition):
+            failing._transition(order, SUBMITTED)
+
+    def test_failed_flush_keeps_rows_for_the_next_batch(self):
+        db_path = os.path.join(self.tmp.name, 'late.db')
+        manager = self.manager(paper(), db_path=db_path)
+        manager.submit('DOGE/USDT', 'buy', quote_amount=5).wait(2)
+        self.assertEqual(manager.flush(), 0)  # tabela trades ainda não existe
+        make_db(db_path)
+        self.assertEqual(manager.flush(), 1)
+
+    def test_fees_are_persisted_in_quote_currency(self):
+        in_base = self.manager(ScriptedExchange({'id': 'f1', 'status': 'closed', 'filled': 100, 'cost': 10,
+                                                 'average': 0.1, 'fee': {'cost': 0.1, 'currency': 'DOGE'}}))
+        in_quote = self.manager(ScriptedExchange({'id': 'f2', 'status': 'closed', 'filled': 100, 'cost': 12,
+                                                  'average': 0.12, 'fee': {'cost': 0.012, 'currency': 'USDT'}}))
+        in_base.submit('DOGE/USDT', 'buy', amount=100).wait(2)
+        in_quote.submit('DOGE/USDT', 'sell', amount=100).wait(2)
+        in_base.flush()
+        in_quote.flush()  # coluna fee criada no primeiro lote
+        conn = sqlite3.connect(self.db_path)
+        try:
+            fees = conn.execute('SELECT type, fee FROM trades ORDER BY id').fetchall()
+        finally:
+            conn.close()
+        self.assertEqual([side for side, _ in fees], ['buy', 'sell'])
+        self.assertAlmostEqual(fees[0][1], 0.01)
+        self.assertAlmostEqual(fees[1][1], 0.012)
+
+    def test_state_store_follows_transitions_across_processes(self):
+        store = OrderStateStore(self.db_path)
+        exchange = ScriptedExchange({'id': 's1', 'status': 'open', 'filled': 2, 'cost': 0.2},
+                                    [{'id': 's1', 'status': 'closed', 'filled': 5, 'cost': 0.5, 'average': 0.1}])
+        manager = self.manager(exchange, state_store=store)
+        order = manager.submit('DOGE/USDT', 'buy', amount=5, idempotency_key='sinal-7')
+        deadline = time.monotonic() + 2
+        while order.state != PARTIALLY_FILLED and time.monotonic() < deadline:
+            time.sleep(0.01)
+        other = OrderStateStore(self.db_path)  # outro processo lendo o mesmo banco
+        self.assertEqual(other.get('sinal-7')['state'], PARTIALLY_FILLED)
+        manager.reconcile()
+        self.assertEqual((other.get('sinal-7')['state'], other.get('sinal-7')['filled']), (FILLED, 5.0))
+        store.save([Order(key='sinal-7', client_order_id='x', symbol='DOGE/USDT', side='buy')])
+        self.assertEqual(other.get('sinal-7')['state'], FILLED)  # terminal não volta atrás
+        manager.flush()
+        self.assertTrue(other.get('sinal-7')['persisted'])
+        self.assertEqual(other.stats()['states'], {FILLED: 1})
+
+    def test_simulated_fill_exchange_uses_last_price(self):
+        exchange = SimulatedFillExchange(paper())
+        manager = self.manager(exchange)
+        order = manager.submit('DOGE/USDT', 'buy', quote_amount=2)
+        order.wait(2)
+        self.assertEqual(order.state, FILLED)
+        self.assertAlmostEqual(order.filled, 20.0)
+
+
+class TestAgentOrderPolling(unittest.TestCase):
+    """Agente II: resposta 202 do backend é ordem pendente, não ordem falha"""
+
+    def setUp(self):
+        with patch.object(threading.Thread, 'start'):  # o módulo do agente inicia o auto-treino no import
+            import ai_trading_agent_II
+        self.client = ai_trading_agent_II.ExchangeClient('http://backend', None, False,
+                                                         order_poll_s=0.01, order_timeout_s=1)
+
+    def trade(self, polls):
+        pending = {'key': 'k', 'state': SUBMITTED, 'filled': 0.0}
+        with patch.object(self.client, '_sync_post_json', return_value=pending), \
+                patch.object(self.client, '_sync_get_json', side_effect=lambda *a, **kw: polls.pop(0) if polls else {}):
+            return asyncio.run(self.client.trade('buy', 'DOGEUSDT', 10))
+
+    def test_pending_order_is_polled_until_terminal(self):
+        # {} = consulta caiu em outro worker (404) ou falhou: continua consultando
+        result = self.trade([{}, {'key': 'k', 'state': PARTIALLY_FILLED, 'filled': 20.0},
+                             {'key': 'k', 'state': FILLED, 'filled': 50.0}])
+        self.assertEqual((result['state'], result['filled']), (FILLED, 50.0))
+        self.assertEqual(self.trade([{'key': 'k', 'state': CANCELLED, 'filled': 0.0}]), {})
+
+    def test_order_still_pending_after_timeout_is_not_a_fill(self):
+        self.assertEqual(self.trade([]), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+"""
+Testes do motor de paper trading (paper_exchange)
+"""
+
+import os
+import sys
+import json
+import logging
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from paper_exchange import (PaperExchange, BookConfig, InsufficientFunds, InvalidOrder, OrderNotFound,
+                            BadSymbol, db_price_source)
+
+
+def make_exchange(**kwargs):
+    defaults = dict(balances={'USDT': 10000.0, 'DOGE': 10000.0}, book=BookConfig(depth_usd=100))
+    ex = PaperExchange(**{**defaults, **kwargs})
+    ex.update_price('DOGEUSDT', 0.2, ts=1000)
+    return ex
+
+
+class TestPaperExchange(unittest.TestCase):
+    def test_market_order_walks_book_with_fees(self):
+        ex = make_exchange()
+        small = ex.create_market_buy_order('DOGE/USDT', 100)
+        self.assertEqual(small['status'], 'closed')
+        self.assertAlmostEqual(small['average'], 0.2 * (1 + 2.5 / 10000))
+        self.assertAlmostEqual(small['fee']['cost'], small['cost'] * 0.001)
+
+        # 2000 DOGE ≈ 400 USD: atravessa vários níveis de 100 USD -> preço médio pior
+        big = ex.create_market_buy_order('DOGEUSDT', 2000)
+        self.assertEqual(big['status'], 'closed')
+        self.assertGreater(big['average'], small['average'])
+        self.assertGreater(len(big['trades']), 3)
+        balance = ex.fetch_balance()
+        self.assertAlmostEqual(balance['DOGE']['total'], 12100)
+        spent = small['cost'] + small['fee']['cost'] + big['cost'] + big['fee']['cost']
+        self.assertAlmostEqual(balance['USDT']['total'], 10000 - spent)
+        self.assertAlmostEqual(balance['USDT']['used'], 0)
+
+    def test_market_order_partial_when_book_exhausted(self):
+        ex = make_exchange(book=BookConfig(depth_usd=100, levels=3))
+        order = ex.create_market_sell_order('DOGEUSDT', 5000)
+        self.assertEqual(order['status'], 'expired')
+        self.assertAlmostEqual(order['filled'], sum(t['amount'] for t in order['trades']))
+        self.assertLess(order['filled'], 5000)
+        # Liquidez consumida só volta na próxima atualização
+        self.assertEqual(ex.create_market_sell_order('DOGEUSDT', 10)['filled'], 0)
+        ex.update_price('DOGEUSDT', 0.2, ts=1001)
+        self.assertEqual(ex.create_market_sell_order('DOGEUSDT', 10)['status'], 'closed')
+        self.assertAlmostEqual(ex.fetch_balance()['DOGE']['total'], 10000 - order['filled'] - 10)
+
+    def test_buy_with_cost_spends_exact_quote(self):
+        ex = make_exchange()
+        order = ex.create_market_buy_order_with_cost('DOGEUSDT', 50)
+        self.assertEqual(order['status'], 'closed')
+        self.assertAlmostEqual(order['cost'], 50)
+        self.assertAlmostEqual(order['amount'], order['filled'])
+        self.assertAlmostEqual(ex.fetch_balance()['USDT']['total'], 10000 - 50 * 1.001)
+
+    def test_limit_rests_and_fills_as_maker_in_parts(self):
+        ex = make_exchange()
+        order = ex.create_limit_buy_order('DOGEUSDT', 2000, 0.19)
+        self.assertEqual(order['status'], 'open')
+        self.assertAlmostEqual(ex.fetch_balance()['USDT']['used'], 2000 * 0.19 * 1.001)
+
+        ex.update_price('DOGEUSDT', 0.195, ts=1001)  # ainda acima do limite
+        self.assertEqual(ex.fetch_order(order['id'])['filled'], 0)
+        ex.update_price('DOGEUSDT', 0.1899, ts=1002)
+        partial = ex.fetch_order(order['id'])
+        self.assertEqual(partial['status'], 'open')
+        self.assertGreater(partial['filled'], 0)
+        for ts in range(1003, 1010):
+            ex.update_price('DOGEUSDT', 0.1899, ts=ts)
+        done = ex.fetch_order(order['id'])
+        self.assertEqual(done['status'], 'closed')
+        self.assertAlmostEqual(done['average'], 0.19)
+        self.assertTrue(all(t['takerOrMaker'] == 'maker' for t in done['trades']))
+        balance = ex.fetch_balance()
+        self.assertAlmostEqual(balance['USDT']['used'], 0)
+        self.assertAlmostEqual(balance['USDT']['total'], 10000 - 2000 * 0.19 * 1.001)
+
+    def test_stop_loss_triggers_on_cross(self):
+        ex = make_exchange()
+        stop = ex.create_order('DOGEUSDT', 'stop_loss', 'sell', 100, None, {'stopPrice': 0.18})
+        ex.update_price('DOGEUSDT', 0.185, ts=1001)
+        self.assertEqual(ex.fetch_order(stop['id'])['status'], 'open')
+        ex.update_price('DOGEUSDT', 0.179, ts=1002)
+        filled = ex.fetch_order(stop['id'])
+        self.assertEqual(filled['status'], 'closed')
+        self.assertLess(filled['average'], 0.179)
+
+    def test_oco_fill_cancels_sibling_and_releases_reserve(self):
+        ex = make_exchange()
+        limit_leg, stop_leg = ex.create_oco_order('DOGEUSDT', 'sell', 1000, 0.21, 0.19)
+        self.assertAlmostEqual(ex.fetch_balance()['DOGE']['used'], 1000)
+        ex.update_price('DOGEUSDT', 0.189, ts=1001)
+        self.assertEqual(ex.fetch_order(stop_leg['id'])['status'], 'closed')
+        self.assertEqual(ex.fetch_order(limit_leg['id'])['status'], 'canceled')
+        balance = ex.fetch_balance()
+        self.assertAlmostEqual(balance['DOGE']['total'], 9000)
+        self.assertAlmostEqual(balance['DOGE']['used'], 0)
+
+        legs = ex.create_oco_order('DOGEUSDT', 'sell', 500, 0.21, 0.17)
+        ex.cancel_order(legs[0]['id'])
+        self.assertEqual([ex.fetch_order(l['id'])['status'] for l in legs], ['canceled', 'canceled'])
+        self.assertAlmostEqual(ex.fetch_balance()['DOGE']['free'], 9000)
+        with self.assertRaises(OrderNotFound):
+            ex.cancel_order(legs[1]['id'])
+
+    def test_fok_and_ioc(self):
+        ex = make_exchange(book=BookConfig(depth_usd=100, levels=3))
+        fok = ex.create_order('DOGEUSDT', 'limit', 'buy', 5000, 0.21, {'timeInForce': 'FOK'})
+        self.assertEqual((fok['status'], fok['filled']), ('expired', 0))
+        ioc = ex.create_order('DOGEUSDT', 'limit', 'buy', 5000, 0.21, {'timeInForce': 'IOC'})
+        self.assertEqual(ioc['status'], 'expired')
+        self.assertGreater(ioc['filled'], 0)
+        self.assertEqual(ex.fetch_open_orders('DOGEUSDT'), [])
+        self.assertAlmostEqual(ex.fetch_balance()['USDT']['used'], 0)
+
+    def test_simulated_latency_fills_at_later_price(self):
+        ex = make_exchange(latency_s=0.5, realtime=False)
+        order = ex.create_market_buy_order('DOGEUSDT', 100)
+        self.assertEqual(order['status'], 'open')
+        ex.update_price('DOGEUSDT', 0.21, ts=1000.2)
+        self.assertEqual(ex.fetch_order(order['id'])['status'], 'open')
+        ex.update_price('DOGEUSDT', 0.22, ts=1000.6)
+        filled = ex.fetch_order(order['id'])
+        self.assertEqual(filled['status'], 'closed')
+        self.assertGreater(filled['average'], 0.22)
+
+    def test_rejections(self):
+        ex = make_exchange()
+        with self.assertRaises(InsufficientFunds):
+            ex.create_market_buy_order('DOGEUSDT', 10 ** 7)
+        with self.assertRaises(InsufficientFunds):
+            ex.create_limit_sell_order('DOGEUSDT', 20000, 0.3)
+        with self.assertRaises(InvalidOrder):
+            ex.create_order('DOGEUSDT', 'limit', 'buy', 10)
+        with self.assertRaises(BadSymbol):
+            ex.fetch_ticker('PEPEUSDT')
+        self.assertEqual(ex.fetch_balance()['total'], {'DOGE': 10000.0, 'USDT': 10000.0})
+
+    def test_ticker_and_db_price_source(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'prices.db')
+            conn = sqlite3.connect(db_path)
+            conn.execute('CREATE TABLE prices (id INTEGER PRIMARY KEY AUTOINCREMENT, symbol TEXT, '
+                         'timestamp DATETIME, price REAL, volume REAL)')
+            conn.executemany('INSERT INTO prices (symbol, timestamp, price, volume) VALUES (?, ?, ?, ?)',
+                             [('DOGE/USDT', '2025-01-01 00:00:00', 0.2, 1), ('DOGEUSDT', '2025-01-01 00:00:01', 0.25, 1)])
+            conn.commit()
+            conn.close()
+            ex = PaperExchange(price_source=db_price_source(db_path))
+            ticker = ex.fetch_ticker('DOGE/USDT')
+            self.assertEqual(ticker['last'], 0.25)
+            self.assertLess(ticker['bid'], ticker['last'])
+            self.assertGreater(ticker['ask'], ticker['last'])
+            self.assertIsNone(db_price_source(db_path)('PEPEUSDT'))
+
+    def test_backend_paper_mode_executes_through_engine(self):
+        import app as backend
+        paper = make_exchange()
+        with patch.object(backend, 'exchange', paper), patch.object(backend, 'PAPER_TRADING', True):
+            client = backend.app.test_client()
+            response = client.post('/api/execute_trade', json={'type': 'buy', 'symbol': 'DOGE/USDT', 'amount': 100})
+            self.assertEqual(response.status_code, 200)
+            order = json.loads(response.data)['order']
+            self.assertEqual(order['info']['source'], 'paper')
+            self.assertEqual(order['filled'], 100)
+            self.assertAlmostEqual(paper.fetch_balance()['DOGE']['total'], 10100)
+
+
+class TestPaperServing(unittest.TestCase):
+    """Com MOCOVE_EXCHANGE=paper o backend roda com um worker (estado da exchange é por processo)"""
+
+    def test_worker_count_forced_to_one(self):
+        from serve_backend import worker_count
+        with patch.dict(os.environ, {'MOCOVE_EXCHANGE': 'paper'}):
+            self.assertEqual(worker_count(4), 1)
+        with patch.dict(os.environ, {'MOCOVE_EXCHANGE': 'binance'}):
+            self.assertEqual(worker_count(4), 4)
+
+    def test_gunicorn_conf_forces_one_worker(self):
+        import gunicorn_conf
+        server = type('Arbiter', (), {'num_workers': 4, 'log': logging.getLogger('test')})()
+        with patch.dict(os.environ, {'MOCOVE_EXCHANGE': 'paper'}):
+            gunicorn_conf.on_starting(server)
+        self.assertEqual(server.num_workers, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Testes da busca paralela de parâmetros (param_sweep)
+"""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backtest import StrategyParams, backtest, strategy_signals
+from param_sweep import FeatureCache, normalize_space, sweep_model, sweep_strategy
+from test_backtest import synthetic_candles
+
+
+def synthetic_raw(n, coins=('DOGEUSDT', 'PEPEUSDT')):
+    """Formato de extract_data_from_db, moedas intercaladas no tempo"""
+    frames = []
+    for k, coin in enumerate(coins):
+        c = synthetic_candles(n, seed=10 + k)
+        frames.append(pd.DataFrame({'coin_id': coin, 'timestamp': pd.to_datetime(c['ts'], unit='s', utc=True),
+                                    'price': c['close'], 'volume': c['volume'], 'high': c['high'],
+                                    'low': c['low'], 'close': c['close']}))
+    return pd.concat(frames).sort_values(['coin_id', 'timestamp'], kind='stable').reset_index(drop=True)
+
+
+class TestStrategySweep(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.candles = {'AAAUSDT': synthetic_candles(2000, seed=1), 'BBBUSDT': synthetic_candles(2000, seed=2)}
+
+    def test_grid_leaderboard_is_ranked_and_best_matches_backtest(self):
+        space = {'sl_atr_mult': [1.0, 2.5], 'tp_rr': [1.2, 2.0]}
+        result = sweep_strategy(self.candles, space, method='grid', objective='pnl_usd', min_trades=1, workers=1)
+        board = result.leaderboard
+        self.assertEqual(len(board), 4)
+        self.assertEqual(board['rank'].tolist(), [1, 2, 3, 4])
+        self.assertTrue(board['score'].is_monotonic_decreasing)
+        self.assertEqual(result.best, {'sl_atr_mult': board['param_sl_atr_mult'][0], 'tp_rr': board['param_tp_rr'][0]})
+
+        params = StrategyParams(**{k: v for k, v in result.config.items()})
+        pnl = sum(backtest(c, params, symbol=s).metrics['pnl_usd'] for s, c in self.candles.items())
+        self.assertAlmostEqual(board['pnl_usd'][0], pnl, places=9)
+        self.assertAlmostEqual(board['score'][0], pnl / 2, places=9)
+
+    def test_min_trades_ranks_unscored_last(self):
+        space = {'min_confidence': [0.5, 0.99]}  # 0.99: nenhum sinal passa
+        result = sweep_strategy(self.candles, space, method='grid', min_trades=1, workers=1)
+        self.assertTrue(np.isnan(result.leaderboard['score'].iloc[-1]))
+        self.assertEqual(result.best, {'min_confidence': 0.5})
+
+    def test_random_and_bayes_respect_bounds(self):
+        space = {'sl_atr_mult': (1.0, 3.0), 'rsi_period': (7, 14), 'sma_fast': [3, 5]}
+        for method in ('random', 'bayes'):
+            result = sweep_strategy(self.candles, space, method=method, n_trials=9, min_trades=0, workers=1)
+            board = result.leaderboard
+            self.assertEqual(len(board), 9, method)
+            self.assertTrue(board['param_sl_atr_mult'].between(1.0, 3.0).all())
+            self.assertTrue(board['param_rsi_period'].between(7, 14).all())
+            self.assertTrue(all(float(v).is_integer() for v in board['param_rsi_period']))
+            self.assertTrue(board['param_sma_fast'].isin([3, 5]).all())
+            keys = board[['param_sl_atr_mult', 'param_rsi_period', 'param_sma_fast']].apply(tuple, axis=1)
+            self.assertEqual(keys.nunique(), 9)
+
+    def test_parallel_matches_serial(self):
+        space = {'sl_atr_mult': (1.0, 3.0), 'tp_rr': (1.0, 2.5)}
+        serial = sweep_strategy(self.candles, space, method='bayes', n_trials=8, min_trades=0, workers=1,
+                                batch_size=2)
+        parallel = sweep_strategy(self.candles, space, method='bayes', n_trials=8, min_trades=0, workers=2)
+        pd.testing.assert_frame_equal(serial.leaderboard, parallel.leaderboard)
+        self.assertEqual(serial.best, parallel.best)
+
+    def test_cached_signals_match_uncached(self):
+        c = self.candles['AAAUSDT']
+        cache = {}
+        for params in (StrategyParams(), StrategyParams(sma_fast=3, sl_atr_mult=2.0), StrategyParams()):
+            cached = strategy_signals(c, params, cache=cache)
+            fresh = strategy_signals(c, params)
+            for key in fresh:
+                np.testing.assert_array_equal(cached[key], fresh[key])
+        self.assertIn(('sma', 3), cache)
+
+    def test_invalid_space(self):
+        with self.assertRaises(ValueError):
+            sweep_strategy(self.candles, {'nao_existe': [1]}, workers=1)
+        with self.assertRaises(ValueError):
+            sweep_strategy(self.candles, {'tp_rr': (1.0, 2.0)}, method='grid', workers=1)
+        with self.assertRaises(ValueError):
+            normalize_space({'tp_rr': (2.0, 1.0)})
+        self.assertEqual(normalize_space({'tp_rr': {'low': 1, 'high': 3}}), {'tp_rr': (1, 3)})
+
+
+class TestModelSweep(unittest.TestCase):
+    def test_cv_gap_cache_reuse_and_outputs(self):
+        raw = synthetic_raw(700)
+        space = {'n_estimators': [10], 'max_depth': [4], 'future_window': [5, 10], 'buy_p': [0.4, 0.6]}
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_dir = os.path.join(tmp, 'cache')
+            first = sweep_model(raw, space, method='grid', cv_splits=3, cv_gap=2, workers=1, cache_dir=cache_dir)
+            board = first.leaderboard
+            self.assertEqual(len(board), 4)
+            self.assertTrue(board['score'].notna().all())
+            self.assertEqual((board['folds'] == 3).all(), True)
+            # gap em linhas = future_window x 2 moedas intercaladas (maior que cv_gap)
+            gaps = dict(zip(board['param_future_window'], board['gap']))
+            self.assertEqual(gaps, {5: 10, 10: 20})
+            # 1 features + 2 datasets calculados; os demais candidatos reusam
+            self.assertEqual((first.meta['cache_misses'], first.meta['cache_hits']), (3, 5))
+            self.assertEqual(first.config['sell_threshold'], -first.config['buy_threshold'])
+            self.assertEqual(first.config['thresholds']['buy_p'], first.best['buy_p'])
+
+            second = sweep_model(raw, space, method='grid', cv_splits=3, cv_gap=2, workers=1, cache_dir=cache_dir)
+            self.assertEqual(second.meta['cache_misses'], 0)
+            pd.testing.assert_frame_equal(first.leaderboard, second.leaderboard)
+
+            first.save(os.path.join(tmp, 'out'))
+            saved = pd.read_csv(os.path.join(tmp, 'out', 'leaderboard.csv'))
+            self.assertEqual(len(saved), 4)
+            with open(os.path.join(tmp, 'out', 'best_config.json'), encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['best'], first.best)
+
+    def test_fingerprint_tracks_content(self):
+        raw = synthetic_raw(50)
+        changed = raw.copy()
+        changed.loc[10, 'price'] *= 1.01
+        self.assertEqual(FeatureCache.fingerprint(raw), FeatureCache.fingerprint(raw.copy()))
+        self.assertNotEqual(FeatureCache.fingerprint(raw), FeatureCache.fingerprint(changed))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,238 @@
+"""
+Testes do livro incremental de P&L (pnl_ledger)
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from pnl_ledger import PnLLedger, bucket_keys, ensure_fee_column
+
+NOW = datetime(2024, 5, 2, 15, 30)
+
+
+def clock():
+    return NOW
+
+
+def make_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date DATETIME NOT NULL,
+            type TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            amount REAL NOT NULL,
+            price REAL NOT NULL,
+            total REAL NOT NULL,
+            status TEXT DEFAULT 'completed',
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+    return conn
+
+
+def insert(conn, date, side, symbol, amount, price, status='completed', fee=None):
+    if fee is None:
+        conn.execute('INSERT INTO trades (date, type, symbol, amount, price, total, status) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                     (date, side, symbol, amount, price, amount * price, status))
+    else:
+        conn.execute('INSERT INTO trades (date, type, symbol, amount, price, total, status, fee) '
+                     'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', (date, side, symbol, amount, price, amount * price, status, fee))
+    conn.commit()
+
+
+class TestPnLLedger(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'ledger.db')
+        self.conn = make_db(self.db_path)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def ledger(self):
+        return PnLLedger(self.db_path, clock=clock)
+
+    def test_average_cost_carries_across_days(self):
+        insert(self.conn, '2024-05-01 10:00:00', 'buy', 'DOGE/USDT', 100, 1.0)
+        insert(self.conn, '2024-05-01 11:00:00', 'buy', 'DOGE/USDT', 100, 2.0)
+        insert(self.conn, '2024-05-02 09:00:00', 'sell', 'DOGE/USDT', 50, 3.0)
+        ledger = self.ledger()
+        self.assertEqual(ledger.sync(), 3)
+
+        # Custo médio 1,5; venda de 50 a 3,0 realiza 75 hoje (compras foram ontem)
+        self.assertAlmostEqual(ledger.daily_realized(), 75.0)
+        self.assertAlmostEqual(ledger.daily_realized('2024-05-01'), 0.0)
+        exposure = ledger.exposure('DOGE/USDT')
+        self.assertAlmostEqual(exposure['quantity'], 150)
+        self.assertAlmostEqual(exposure['avg_cost'], 1.5)
+        self.assertAlmostEqual(exposure['cost_basis'], 225.0)
+        self.assertEqual(ledger.exposure('PEPE/USDT')['quantity'], 0.0)
+
+        insert(self.conn, '2024-05-02 10:00:00', 'sell', 'DOGE/USDT', 500, 1.0)  # só 150 em carteira
+        ledger.sync()
+        self.assertAlmostEqual(ledger.daily_realized(), 75.0 - 75.0)
+        self.assertEqual(ledger.positions(), {})
+        today = ledger.day_totals()
+        self.assertEqual((today['trades'], today['wins'], today['losses']), (2, 1, 1))
+
+    def test_incremental_sync_matches_rebuild_and_survives_restart(self):
+        prices = [1.0, 1.2, 0.9, 1.5, 1.1, 1.3]
+        ledger = self.ledger()
+        for i, price in enumerate(prices):
+            insert(self.conn, f'2024-05-02 1{i}:00:00', 'buy' if i % 2 == 0 else 'sell', 'DOGE/USDT', 10, price)
+            ledger.sync()
+        incremental = ledger.daily_realized()
+        self.assertEqual(ledger.sync(), 0)
+
+        self.assertAlmostEqual(self.ledger().daily_realized(), incremental)  # estado recarregado do banco
+        self.assertEqual(ledger.rebuild(), len(prices))
+        self.assertAlmostEqual(ledger.daily_realized(), incremental)
+        self.assertAlmostEqual(incremental, 10 * (0.2 + 0.6 + 0.2))
+
+    def test_two_instances_never_apply_a_trade_twice(self):
+        first, second = self.ledger(), self.ledger()
+        insert(self.conn, '2024-05-02 10:00:00', 'buy', 'DOGE/USDT', 10, 1.0)
+        insert(self.conn, '2024-05-02 11:00:00', 'sell', 'DOGE/USDT', 10, 2.0)
+        self.assertEqual(first.sync(), 2)
+        self.assertEqual(second.sync(), 0)  # outro processo já aplicou; só recarrega
+        self.assertAlmostEqual(second.daily_realized(), 10.0)
+
+        insert(self.conn, '2024-05-02 12:00:00', 'buy', 'DOGE/USDT', 5, 1.0)
+        self.assertEqual(second.sync(), 1)
+        first.sync()
+        self.assertAlmostEqual(first.exposure('DOGE/USDT')['quantity'], 5)
+        count = self.conn.execute("SELECT SUM(trades) FROM pnl_buckets WHERE period = 'day'").fetchone()[0]
+        self.assertEqual(count, 3)
+
+    def test_skips_non_completed_trades(self):
+        insert(self.conn, '2024-05-02 10:00:00', 'buy', 'DOGE/USDT', 10, 1.0, status='pending')
+        insert(self.conn, '2024-05-02 10:05:00', 'buy', 'DOGE/USDT', 10, 1.0, status=None)
+        ledger = self.ledger()
+        self.assertEqual(ledger.sync(), 1)
+        self.assertAlmostEqual(ledger.exposure('DOGE/USDT')['quantity'], 10)
+        self.assertEqual(ledger.sync(), 0)  # cursor avançou além do pendente
+
+    def test_hour_and_day_buckets(self):
+        self.assertEqual(bucket_keys('2024-05-01T13:45:10'), {'day': '2024-05-01', 'hour': '2024-05-01 13:00'})
+        insert(self.conn, '2024-05-01 13:10:00', 'buy', 'DOGE/USDT', 10, 1.0)
+        insert(self.conn, '2024-05-01 13:50:00', 'buy', 'PEPE/USDT', 10, 2.0)
+        insert(self.conn, '2024-05-02 14:00:00', 'sell', 'DOGE/USDT', 10, 1.5)
+        ledger = self.ledger()
+        ledger.sync()
+
+        hours = ledger.buckets('hour')
+        self.assertEqual([(h['bucket'], h['side'], h['trades']) for h in hours],
+                         [('2024-05-01 13:00', 'buy', 2), ('2024-05-02 14:00', 'sell', 1)])
+        self.assertAlmostEqual(hours[0]['amount'], 20)
+        days = ledger.buckets('day', since=ledger.days_ago(0))
+        self.assertEqual(len(days), 1)
+        self.assertAlmostEqual(days[0]['realized_pnl'], 5.0)
+        self.assertEqual(days[0]['first_trade'], '2024-05-02 14:00:00')
+        with self.assertRaises(ValueError):
+            ledger.buckets('week')
+
+    def test_missing_trades_table_is_not_an_error(self):
+        path = os.path.join(self.tmp.name, 'empty.db')
+        ledger = PnLLedger(path, clock=clock)
+        self.assertEqual(ledger.sync(), 0)
+        self.assertEqual(ledger.daily_realized(), 0.0)
+        self.assertIsNone(ledger.performance()['best_trade'])
+        self.assertIsNone(ledger.sharpe_ratio())
+
+    def test_performance_stats_fees_and_drawdown(self):
+        ledger = self.ledger()  # cria a coluna fee na tabela trades
+        insert(self.conn, '2024-04-30 10:00:00', 'buy', 'DOGE/USDT', 100, 1.0, fee=1.0)
+        insert(self.conn, '2024-04-30 11:00:00', 'sell', 'DOGE/USDT', 40, 1.5, fee=0.5)   # +20
+        insert(self.conn, '2024-05-01 10:00:00', 'sell', 'DOGE/USDT', 20, 0.5, fee=0.25)  # -10
+        insert(self.conn, '2024-05-02 10:00:00', 'sell', 'DOGE/USDT', 40, 0.5)            # -20
+        ledger.sync()
+
+        perf = ledger.performance(days=3)
+        self.assertEqual((perf['total_trades'], perf['closed_trades'], perf['profitable_trades']), (4, 3, 1))
+        self.assertAlmostEqual(perf['win_rate'], 33.33)
+        self.assertAlmostEqual(perf['fees'], 1.75)
+        self.assertAlmostEqual(perf['realized_pnl'], -10.0)
+        self.assertAlmostEqual(perf['total_profit'], -11.75)
+        self.assertEqual((perf['best_trade'], perf['worst_trade'], perf['current_streak']), (20.0, -20.0, -2))
+        # Curva líquida: -1, 18.5 (pico), 8.25, -11.75
+        self.assertAlmostEqual(perf['max_drawdown'], 30.25)
+        self.assertEqual([d['date'] for d in perf['daily_pnl']], ['2024-04-30', '2024-05-01', '2024-05-02'])
+        self.assertAlmostEqual(perf['daily_pnl'][0]['pnl'], 18.5)
+        self.assertAlmostEqual(sum(b['fees'] for b in ledger.buckets('day', since='2024-05-01')), 0.25)
+
+        # Sharpe das três diárias líquidas (18.5, -10.25, -20), anualizado
+        daily = [18.5, -10.25, -20.0]
+        mean = sum(daily) / 3
+        std = (sum((x - mean) ** 2 for x in daily) / 2) ** 0.5
+        self.assertAlmostEqual(perf['sharpe_ratio'], mean / std * 365 ** 0.5)
+
+        # Estado persistido: outra instância e a reconstrução chegam aos mesmos números
+        self.assertEqual(self.ledger().performance(days=3), perf)
+        ledger.rebuild()
+        self.assertEqual(ledger.performance(days=3), perf)
+
+    def test_existing_ledger_without_stats_is_migrated(self):
+        insert(self.conn, '2024-05-02 10:00:00', 'buy', 'DOGE/USDT', 10, 1.0)
+        insert(self.conn, '2024-05-02 11:00:00', 'sell', 'DOGE/USDT', 10, 2.0)
+        self.ledger().sync()
+        self.conn.execute('DELETE FROM pnl_stats')  # livro criado antes dos acumulados
+        self.conn.commit()
+        perf = self.ledger().performance(days=1)
+        self.assertEqual((perf['total_trades'], perf['best_trade']), (2, 10.0))
+        self.assertEqual(perf['daily_pnl'], [{'date': '2024-05-02', 'pnl': 10.0}])
+        self.assertFalse(ensure_fee_column(sqlite3.connect(os.path.join(self.tmp.name, 'vazio.db'))))
+
+
+class TestSecurityManagerLedger(unittest.TestCase):
+    def test_daily_pnl_and_exposure_come_from_ledger(self):
+        from security import TradingSecurityManager
+
+        today = datetime.now().strftime('%Y-%m-%d')
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'sec.db')
+            conn = make_db(db_path)
+            insert(conn, f'{today} 00:00:01', 'buy', 'DOGE/USDT', 100, 1.0)
+            insert(conn, f'{today} 00:00:02', 'sell', 'DOGE/USDT', 40, 0.5)
+
+            manager = TradingSecurityManager(db_path)
+            manager.max_symbol_exposure = 80.0
+            manager.daily_loss_limit = 40.0
+            self.assertAlmostEqual(manager.calculate_daily_pnl(), -20.0)
+            ok, _, exposure = manager.check_symbol_exposure('DOGE/USDT', 30.0)
+            self.assertFalse(ok)
+            self.assertAlmostEqual(exposure, 60.0)
+            self.assertTrue(manager.check_symbol_exposure('DOGE/USDT', 30.0, 'SELL')[0])
+
+            insert(conn, f'{today} 00:00:03', 'sell', 'DOGE/USDT', 60, 0.5)
+            self.assertAlmostEqual(manager.calculate_daily_pnl(), -50.0)
+            self.assertFalse(manager.check_daily_limits()[0])
+            conn.close()
+
+
+
+class TestBackendPerformance(unittest.TestCase):
+    def test_performance_endpoint_serves_ledger_stats(self):
+        from app import app
+        client = app.test_client()
+        response = client.get('/api/performance?days=7')
+        self.assertEqual(response.status_code, 200)
+        perf = response.get_json()['performance']
+        self.assertEqual(len(perf['daily_pnl']), 7)
+        for key in ('total_trades', 'win_rate', 'fees', 'total_profit', 'max_drawdown', 'sharpe_ratio'):
+            self.assertIn(key, perf)
+        again = client.get('/api/performance?days=7', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+Testes para o estado único de posições abertas
+"""
+
+import unittest
+import sqlite3
+import tempfile
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from position_state import PositionState
+
+
+class TestPositionState(unittest.TestCase):
+    """Testes do PositionState"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'test.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _create_trades(self, rows):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            CREATE TABLE trades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date DATETIME NOT NULL,
+                type TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                amount REAL NOT NULL,
+                price REAL NOT NULL,
+                total REAL NOT NULL,
+                status TEXT DEFAULT 'completed'
+            )
+        ''')
+        conn.executemany('INSERT INTO trades (date, type, symbol, amount, price, total) VALUES (?, ?, ?, ?, ?, ?)',
+                         [(d, t, s, a, p, a * p) for d, t, s, a, p in rows])
+        conn.commit()
+        conn.close()
+
+    def test_bootstrap_from_local_trades(self):
+        """Reconstrói posições abertas pela tabela trades, sem backend"""
+        self._create_trades([
+            ('2025-01-01T10:00:00', 'buy', 'DOGEUSDT', 10, 1.0),
+            ('2025-01-01T11:00:00', 'buy', 'DOGEUSDT', 10, 2.0),
+            ('2025-01-01T12:00:00', 'buy', 'PEPEUSDT', 5, 1.0),
+            ('2025-01-01T13:00:00', 'sell', 'PEPEUSDT', 5, 1.2),
+        ])
+        state = PositionState(db_path=self.db_path)
+        self.assertEqual(state.symbols(), ['DOGEUSDT'])
+        self.assertAlmostEqual(state.get('DOGEUSDT')['buy_price'], 1.5)
+        self.assertEqual(state.get('DOGEUSDT')['quantity'], 20)
+
+    def test_closed_positions_are_not_resurrected_on_restart(self):
+        """Depois da carga inicial, JSON legado e trades não recriam posições vendidas"""
+        import json
+        legacy = os.path.join(self.tmpdir.name, 'portfolio_positions.json')
+        with open(legacy, 'w', encoding='utf-8') as f:
+            json.dump({'positions': [{'symbol': 'MEMEUSDT', 'buy_price': 0.01, 'quantity': 100.0}]}, f)
+        self._create_trades([('2025-01-01T10:00:00', 'buy', 'API3USDT', 10, 1.0)])
+
+        # JSON legado tem prioridade sobre a reconstrução pelos trades
+        state = PositionState(db_path=self.db_path, legacy_json=legacy)
+        self.assertEqual(state.symbols(), ['MEMEUSDT'])
+        state.close('MEMEUSDT')
+        self.assertEqual(PositionState(db_path=self.db_path, legacy_json=legacy).symbols(), [])
+
+        self.db_path = os.path.join(self.tmpdir.name, 'trades_only.db')
+        self._create_trades([('2025-01-01T10:00:00', 'buy', 'API3USDT', 10, 1.0)])
+        state = PositionState(db_path=self.db_path)
+        self.assertEqual(state.symbols(), ['API3USDT'])
+        state.on_fill('API3USDT', 'sell', 1.1, 10)
+        self.assertEqual(PositionState(db_path=self.db_path).symbols(), [])
+
+    def test_fills_survive_restart(self):
+        """Compra e venda atualizam o estado e persistem no banco"""
+        state = PositionState(db_path=self.db_path)
+        self.assertNotIn('DOGEUSDT', state)
+
+        state.on_fill('DOGEUSDT', 'buy', 0.2, 50, trade_id='1')
+        state.on_fill('SHIBUSDT', 'buy', 0.00001, 1e6, trade_id='2')
+        self.assertIn('DOGEUSDT', state)
+
+        state.on_fill('SHIBUSDT', 'sell', 0.000011, 1e6)
+        reloaded = PositionState(db_path=self.db_path)
+        self.assertEqual(reloaded.symbols(), ['DOGEUSDT'])
+
+    def test_partial_sell_reduces_quantity(self):
+        """Venda parcial (ordem cancelada/expirada com filled > 0) não fecha a posição inteira"""
+        state = PositionState(db_path=self.db_path)
+        state.on_fill('DOGEUSDT', 'buy', 0.2, 100, trade_id='1')
+        remaining = state.on_fill('DOGEUSDT', 'sell', 0.25, 40)
+        self.assertAlmostEqual(remaining['quantity'], 60)
+        self.assertAlmostEqual(remaining['buy_price'], 0.2)
+        self.assertAlmostEqual(PositionState(db_path=self.db_path).get('DOGEUSDT')['quantity'], 60)
+
+        self.assertIsNone(state.on_fill('DOGEUSDT', 'sell', 0.25, 60))
+        self.assertNotIn('DOGEUSDT', state)
+        self.assertEqual(state.store.count(), 0)
+        self.assertIsNone(state.on_fill('PEPEUSDT', 'sell', 1.0, 5))  # sem posição: nada a fazer
+
+    def test_close_during_update_is_not_undone(self):
+        """Venda (close) no meio de uma atualização de preços do monitor não ressuscita a posição"""
+        state = PositionState(db_path=self.db_path)
+        state.on_fill('DOGEUSDT', 'buy', 0.2, 100, trade_id='1')
+        refresh = dict(state.get('DOGEUSDT'), current_price=0.21)
+        upsert, entered, release = state.store.upsert, threading.Event(), threading.Event()
+
+        def slow_upsert(records, **kwargs):
+            entered.set()
+            release.wait(0.5)
+            return upsert(records, **kwargs)
+
+        with patch.object(state.store, 'upsert', side_effect=slow_upsert):
+            updater = threading.Thread(target=state.update, args=([refresh],))
+            updater.start()
+            self.assertTrue(entered.wait(2))
+            closer = threading.Thread(target=state.close, args=('DOGEUSDT', 0.21))
+            closer.start()
+            closer.join(0.1)
+            release.set()
+            updater.join(2)
+            closer.join(2)
+
+        self.assertNotIn('DOGEUSDT', state)
+        self.assertEqual(state.store.count(), 0)
+        self.assertEqual(PositionState(db_path=self.db_path).symbols(), [])
+
+    def test_shared_with_portfolio_monitor(self):
+        """PortfolioMonitor e agente compartilham o mesmo estado"""
+        from portfolio_monitor import PortfolioMonitor
+
+        state = PositionState(db_path=self.db_path)
+        monitor = PortfolioMonitor(state=state, portfolio_file=os.path.join(self.tmpdir.name, 'none.json'))
+        monitor.add_position('PEPEUSDT', 1.0, 10.0, trade_id='1')
+        self.assertIn('PEPEUSDT', state)
+
+        monitor.reduce_position('PEPEUSDT', 4.0, 1.1)
+        self.assertEqual(monitor.positions['PEPEUSDT'].quantity, 6.0)
+        self.assertEqual(state.get('PEPEUSDT')['quantity'], 6.0)
+
+        monitor.remove_position('PEPEUSDT')
+        self.assertNotIn('PEPEUSDT', state)
+        self.assertEqual(state.store.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
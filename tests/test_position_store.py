@@ -0,0 +1,121 @@
+"""
+Testes para o armazenamento de posições do portfólio em SQLite
+"""
+
+import unittest
+import json
+import tempfile
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from position_store import PositionStore
+
+
+class TestPositionStore(unittest.TestCase):
+    """Testes do PositionStore"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'test.db')
+        self.store = PositionStore(self.db_path)
+        self.position = {
+            'symbol': 'DOGEUSDT',
+            'buy_price': 0.2,
+            'quantity': 50.0,
+            'buy_date': '2025-08-18T22:12:54',
+            'trade_id': '123',
+        }
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_upsert_and_load(self):
+        """Testa inserção e leitura de posição"""
+        self.assertEqual(self.store.upsert([self.position]), 1)
+        positions = self.store.load_all()
+        self.assertEqual(len(positions), 1)
+        self.assertEqual(positions[0]['symbol'], 'DOGEUSDT')
+        self.assertEqual(positions[0]['peak_price'], 0.2)
+
+    def test_unchanged_rows_are_skipped(self):
+        """Testa que linhas idênticas não são reescritas"""
+        self.store.upsert([self.position])
+        self.assertEqual(self.store.upsert([self.position]), 0)
+
+        changed = dict(self.position, current_price=0.21)
+        self.assertEqual(self.store.upsert([changed]), 1)
+        self.assertEqual(self.store.get('DOGEUSDT')['current_price'], 0.21)
+
+    def test_history_is_append_only(self):
+        """Testa eventos de auditoria: open, new_peak, trailing_stop e close"""
+        self.store.upsert([self.position])
+        self.store.upsert([dict(self.position, current_price=0.25, peak_price=0.25)])
+        self.store.upsert([dict(self.position, current_price=0.19, peak_price=0.25,
+                                trailing_stop_triggered=True)])
+        self.assertTrue(self.store.delete('DOGEUSDT', current_price=0.19))
+
+        events = [h['event'] for h in reversed(self.store.history('DOGEUSDT'))]
+        self.assertEqual(events, ['open', 'new_peak', 'trailing_stop', 'close'])
+        self.assertEqual(self.store.count(), 0)
+
+    def test_import_json_once(self):
+        """Testa importação única do portfolio_positions.json"""
+        json_path = os.path.join(self.tmpdir.name, 'portfolio_positions.json')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump({'positions': [dict(self.position, current_price=0.22)]}, f)
+
+        self.assertEqual(self.store.import_json(json_path), 1)
+        self.assertEqual(self.store.import_json(json_path), 0)
+        self.assertEqual(self.store.get('DOGEUSDT')['current_price'], 0.22)
+        self.assertEqual(self.store.history('DOGEUSDT')[0]['event'], 'import')
+
+        # Posição fechada depois da importação não volta do JSON
+        self.store.delete('DOGEUSDT')
+        self.assertEqual(PositionStore(self.db_path).import_json(json_path), 0)
+        self.assertEqual(self.store.count(), 0)
+
+
+class TestPortfolioMonitorPersistence(unittest.TestCase):
+    """Testa que o PortfolioMonitor persiste pico e trailing stop no banco"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'test.db')
+        self.json_path = os.path.join(self.tmpdir.name, 'portfolio_positions.json')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_peak_survives_reload(self):
+        from portfolio_monitor import PortfolioMonitor
+
+        monitor = PortfolioMonitor(db_path=self.db_path, portfolio_file=self.json_path)
+        monitor.add_position('PEPEUSDT', 1.0, 10.0, trade_id='1')
+        monitor.positions['PEPEUSDT'].update_current_price(1.5)
+        monitor.save_positions()
+
+        reloaded = PortfolioMonitor(db_path=self.db_path, portfolio_file=self.json_path)
+        position = reloaded.positions['PEPEUSDT']
+        self.assertEqual(position.peak_price, 1.5)
+        self.assertEqual(position.current_price, 1.5)
+
+        reloaded.remove_position('PEPEUSDT')
+        self.assertEqual(reloaded.store.count(), 0)
+
+    def test_closed_legacy_positions_stay_closed_after_restart(self):
+        from portfolio_monitor import PortfolioMonitor
+
+        with open(self.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'positions': [{'symbol': 'MEMEUSDT', 'buy_price': 0.01, 'quantity': 100.0}]}, f)
+        monitor = PortfolioMonitor(db_path=self.db_path, portfolio_file=self.json_path)
+        self.assertIn('MEMEUSDT', monitor.positions)
+        monitor.remove_position('MEMEUSDT')
+
+        restarted = PortfolioMonitor(db_path=self.db_path, portfolio_file=self.json_path)
+        self.assertEqual(restarted.positions, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Testes para a exportação colunar do histórico de preços
+"""
+
+import unittest
+import sqlite3
+import tempfile
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+if HAS_PYARROW:
+    from candles import update_candles
+    from tick_archive import archive_old_ticks, read_ticks
+    from price_export import (iter_price_batches, iter_export_bytes, stream_export, export_prices,
+                              read_export, RAW_SCHEMA, CANDLE_SCHEMA)
+
+
+@unittest.skipUnless(HAS_PYARROW, "pyarrow não instalado")
+class TestPriceExport(unittest.TestCase):
+    """Testes do price_export"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'test.db')
+        self.archive_dir = os.path.join(self.tmpdir.name, 'archive')
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute('''
+            CREATE TABLE prices (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                coin_id TEXT,
+                timestamp DATETIME,
+                price REAL,
+                symbol TEXT,
+                volume REAL DEFAULT 0,
+                high REAL DEFAULT 0,
+                low REAL DEFAULT 0
+            )
+        ''')
+        today = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        rows = []
+        for days_ago in (40, 35, 1):
+            for minute in range(4):
+                ts = (today - timedelta(days=days_ago) + timedelta(minutes=minute)).isoformat(sep=' ')
+                rows.append(('DOGEUSDT', ts, 1.0 + minute, 100.0, 1.5 + minute if minute else 0))
+                rows.append(('SHIBUSDT', ts, 0.01, 50.0, 0))
+        self.conn.executemany('INSERT INTO prices (symbol, timestamp, price, volume, high) VALUES (?, ?, ?, ?, ?)', rows)
+        self.conn.commit()
+        update_candles(self.conn)
+        archive_old_ticks(self.conn, horizon_days=30, archive_dir=self.archive_dir)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def test_raw_export_spans_both_tiers(self):
+        """Arrow IPC com ticks arquivados + recentes, igual ao read_ticks"""
+        data = b''.join(stream_export(self.db_path, ['DOGEUSDT'], archive_dir=self.archive_dir))
+        table = read_export(data)
+        self.assertEqual(table.schema, RAW_SCHEMA)
+
+        expected = read_ticks(self.conn, 'DOGEUSDT', archive_dir=self.archive_dir)
+        df = table.to_pandas()
+        self.assertEqual(list(df['id']), list(expected['id']))
+        self.assertEqual(list(df['timestamp']), list(expected['timestamp']))
+        # high = 0 vira nulo
+        self.assertEqual(int(df['high'].isna().sum()), 3)
+
+    def test_batches_are_bounded(self):
+        """Nenhum lote passa de batch_rows"""
+        batches = list(iter_price_batches(self.conn, batch_rows=3, archive_dir=self.archive_dir))
+        self.assertTrue(all(b.num_rows <= 3 for b in batches))
+        self.assertEqual(sum(b.num_rows for b in batches), 24)
+        symbols = [s for b in batches for s in b.column('symbol').to_pylist()]
+        self.assertEqual(symbols, sorted(symbols))
+
+    def test_range_filter(self):
+        """start/end filtram as duas camadas"""
+        start = (datetime.now() - timedelta(days=36)).strftime('%Y-%m-%d 00:00:00')
+        end = (datetime.now() - timedelta(days=2)).strftime('%Y-%m-%d 00:00:00')
+        batches = list(iter_price_batches(self.conn, ['SHIBUSDT'], start, end, archive_dir=self.archive_dir))
+        self.assertEqual(sum(b.num_rows for b in batches), 4)
+
+    def test_candle_export_parquet(self):
+        """Candles exportados em Parquet"""
+        path = os.path.join(self.tmpdir.name, 'candles.parquet')
+        rows = export_prices(self.conn, path, ['DOGEUSDT'], resolution='1h', fmt='parquet',
+                             archive_dir=self.archive_dir)
+        self.assertEqual(rows, 3)
+        table = read_export(path, 'parquet')
+        self.assertEqual(table.schema, CANDLE_SCHEMA)
+        self.assertEqual(table.column('ticks').to_pylist(), [4, 4, 4])
+
+    def test_empty_export_is_valid_stream(self):
+        """Consulta sem resultado ainda gera um stream válido"""
+        data = b''.join(iter_export_bytes(iter([]), RAW_SCHEMA, 'arrow'))
+        self.assertEqual(read_export(data).num_rows, 0)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            list(stream_export(self.db_path, resolution='2m'))
+        with self.assertRaises(ValueError):
+            list(stream_export(self.db_path, fmt='csv'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Testes do pipeline pré-trade (checagens concorrentes e caches do TradingSecurityManager)
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import security
+from security import TTLCache, TradingSecurityManager
+
+LATENCY_S = 0.1
+
+
+class FakeExchange:
+    def __init__(self, usdt=500.0, change=2.0, volume=5e6, fail_balance=False):
+        self.usdt, self.change, self.volume = usdt, change, volume
+        self.fail_balance = fail_balance
+        self.calls = []
+
+    def fetch_balance(self):
+        self.calls.append('fetch_balance')
+        time.sleep(LATENCY_S)
+        if self.fail_balance:
+            raise RuntimeError("timeout")
+        return {'USDT': {'free': self.usdt}, 'BUSD': {'free': 0.0}}
+
+    def fetch_ticker(self, symbol):
+        self.calls.append('fetch_ticker')
+        time.sleep(LATENCY_S)
+        return {'last': 0.1, 'percentage': self.change, 'baseVolume': self.volume}
+
+    def create_market_buy_order(self, symbol, amount):
+        return {'id': '1', 'symbol': symbol, 'amount': amount}
+
+
+def without_timing(checks):
+    """Veredito e mensagens, sem timestamps e latências"""
+    validations = {name: {k: v for k, v in check.items() if k not in ('latency_ms', 'balance_info')}
+                   for name, check in checks['validations'].items()}
+    return checks['overall_status'], checks['errors'], checks['warnings'], validations
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_expiry_invalidation_and_failures(self):
+        now = [0.0]
+        cache = TTLCache(5.0, clock=lambda: now[0])
+        loads = []
+        loader = lambda: loads.append(1) or len(loads)
+        self.assertEqual(cache.get('k', loader), 1)
+        now[0] = 4.9
+        self.assertEqual(cache.get('k', loader), 1)
+        now[0] = 5.0
+        self.assertEqual(cache.get('k', loader), 2)
+        cache.invalidate('k')
+        self.assertEqual(cache.get('k', loader), 3)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+        def failing():
+            raise RuntimeError("rede")
+        with self.assertRaises(RuntimeError):
+            cache.get('x', failing)
+        self.assertEqual(cache.get('x', loader), 4)  # falha não ficou em cache
+
+        disabled = TTLCache(0)
+        disabled.get('k', loader)
+        disabled.get('k', loader)
+        self.assertEqual(len(loads), 6)
+
+
+class TestRiskPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'risk.db')
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE trades (id INTEGER PRIMARY KEY AUTOINCREMENT, date DATETIME NOT NULL, "
+                     "type TEXT NOT NULL, symbol TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL, "
+                     "total REAL NOT NULL, status TEXT DEFAULT 'completed')")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def manager(self, parallel=True, cached=True):
+        manager = TradingSecurityManager(self.db_path)
+        manager.parallel_checks = parallel
+        if not cached:
+            manager.balance_cache.ttl_s = manager.ticker_cache.ttl_s = 0
+        return manager
+
+    def test_parallel_verdicts_match_sequential(self):
+        scenarios = [
+            ({'symbol': 'DOGE/USDT', 'amount': 20, 'action': 'BUY'}, {}),
+            ({'symbol': 'DOGE/USDT', 'amount': 500, 'action': 'BUY'}, {}),
+            ({'symbol': 'DOGE/USDT', 'amount': 20, 'action': 'BUY'}, {'usdt': 1.0}),
+            ({'symbol': 'DOGE/USDT', 'amount': 20, 'action': 'SELL'}, {'change': 25.0, 'volume': 10}),
+            ({'symbol': 'DOGE/USDT', 'amount': 20, 'action': 'BUY'}, {'fail_balance': True}),
+        ]
+        for trade, market in scenarios:
+            sequential = self.manager(parallel=False, cached=False).comprehensive_risk_check(
+                trade, FakeExchange(**market))
+            parallel = self.manager().comprehensive_risk_check(trade, FakeExchange(**market))
+            self.assertEqual(without_timing(parallel), without_timing(sequential), trade)
+            self.assertEqual(list(parallel['validations']), ['amount', 'daily_limits', 'exposure', 'balance', 'market'])
+
+    def test_exchange_checks_overlap_and_warm_cache_skips_network(self):
+        manager = self.manager()
+        exchange = FakeExchange()
+        trade = {'symbol': 'DOGE/USDT', 'amount': 20, 'action': 'BUY'}
+
+        cold = manager.comprehensive_risk_check(trade, exchange)
+        self.assertEqual(cold['overall_status'], 'APPROVED')
+        self.assertLess(cold['latency_ms'], 2 * LATENCY_S * 1000 * 0.9)  # as duas chamadas em paralelo
+        self.assertGreaterEqual(cold['validations']['balance']['latency_ms'], LATENCY_S * 1000 * 0.9)
+
+        warm = manager.comprehensive_risk_check(trade, exchange)
+        self.assertEqual(sorted(exchange.calls), ['fetch_balance', 'fetch_ticker'])
+        self.assertEqual(without_timing(warm), without_timing(cold))
+        self.assertLess(warm['latency_ms'], LATENCY_S * 1000 / 2)
+
+        manager.invalidate_caches()
+        manager.comprehensive_risk_check(trade, exchange)
+        self.assertEqual(len(exchange.calls), 4)
+
+    def test_secure_trade_invalidates_caches(self):
+        manager = self.manager()
+        exchange = FakeExchange()
+        trade = {'symbol': 'DOGE/USDT', 'amount': 20, 'action': 'BUY', 'price': 0.1}
+        with patch.object(security, 'security_manager', manager), \
+                patch.object(manager, 'log_security_event'):
+            self.assertTrue(security.execute_secure_trade(trade, exchange)['success'])
+            self.assertTrue(security.execute_secure_trade(trade, exchange)['success'])
+        self.assertEqual(exchange.calls.count('fetch_balance'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
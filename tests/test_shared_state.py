@@ -0,0 +1,136 @@
+"""
+Testes do estado compartilhado entre workers (shared_state) e do uso no backend
+"""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from shared_state import SharedState
+from order_manager import Order, OrderStateStore, FILLED, SUBMITTED
+
+
+class TestSharedState(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'state.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_writes_are_visible_to_other_connections(self):
+        a, b = SharedState(self.db_path), SharedState(self.db_path)
+        self.assertIsNone(b.get('use_testnet'))
+        a.set('use_testnet', False)
+        self.assertEqual(a.get('use_testnet'), False)
+        self.assertEqual(b.get('use_testnet'), False)
+        b.set('use_testnet', True)
+        b.set('limits', {'max': 3})
+        self.assertEqual(a.snapshot(), {'use_testnet': True, 'limits': {'max': 3}})
+
+    def test_claim_is_granted_once(self):
+        a, b = SharedState(self.db_path), SharedState(self.db_path)
+        self.assertIsNone(a.claim('order:k1', 101))
+        self.assertEqual(b.claim('order:k1', 202), 101)
+        self.assertEqual(a.claim('order:k1', 101), 101)
+        self.assertIsNone(b.claim('order:k2', 202))
+
+    def test_expired_claims_are_released(self):
+        a = SharedState(self.db_path, claim_ttl_s=0)
+        self.assertIsNone(a.claim('order:k1', 1))
+        self.assertIsNone(SharedState(self.db_path, claim_ttl_s=0).claim('order:k1', 2))
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "requer fork")
+    def test_connection_is_reopened_after_fork(self):
+        state = SharedState(self.db_path)
+        state.set('generation', 1)
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                state.set('generation', 2)
+                os.write(write_fd, json.dumps(state.claim('order:child', os.getpid())).encode())
+                code = 0
+            finally:
+                os._exit(code)
+        os.close(write_fd)
+        _, status = os.waitpid(pid, 0)
+        claimed = os.read(read_fd, 100)
+        os.close(read_fd)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertEqual(json.loads(claimed), None)
+        self.assertEqual(state.get('generation'), 2)
+        self.assertEqual(state.claim('order:child', os.getpid()), pid)
+
+
+class TestBackendSharedState(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        import app as backend
+        cls.backend = backend
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state = SharedState(os.path.join(self.tmp.name, 'state.db'))
+        self.other_worker = SharedState(self.state.db_path)
+        self.other_orders = OrderStateStore(self.state.db_path)
+        self.patchers = [patch.object(self.backend, 'shared_state', self.state),
+                         patch.object(self.backend, 'order_states', OrderStateStore(self.state.db_path))]
+        for patcher in self.patchers:
+            patcher.start()
+        self.use_testnet = self.backend.USE_TESTNET
+        self.client = self.backend.app.test_client()
+
+    def tearDown(self):
+        for patcher in reversed(self.patchers):
+            patcher.stop()
+        self.backend.apply_trading_mode(self.use_testnet)
+        self.tmp.cleanup()
+
+    def test_mode_written_by_another_worker_is_applied(self):
+        self.other_worker.set('use_testnet', not self.use_testnet)
+        data = self.client.get('/api/trading/mode').get_json()
+        self.assertEqual(data['config']['testnet_mode'], (not self.use_testnet))
+        self.assertEqual(self.backend.USE_TESTNET, (not self.use_testnet))
+
+    def test_order_key_claimed_by_another_worker_is_refused(self):
+        self.other_worker.claim('order:sinal-42', 999999)
+        response = self.client.post('/api/orders', json={'symbol': 'DOGE/USDT', 'side': 'buy', 'amount': 1},
+                                    headers={'Idempotency-Key': 'sinal-42'})
+        self.assertEqual(response.status_code, 409)
+        self.assertIsNone(self.backend.order_manager.get('sinal-42'))
+
+    def _order_of_other_worker(self, key, state):
+        """Ordem recebida e gravada pelo "outro worker" (pid fictício)"""
+        self.other_worker.claim(f'order:{key}', 999999)
+        order = Order(key=key, client_order_id='mcv1', symbol='DOGE/USDT', side='buy', amount=10, state=state,
+                      filled=10.0 if state == FILLED else 0.0, average=0.1 if state == FILLED else None)
+        self.other_orders.save([order])
+
+    def test_order_of_another_worker_is_served_from_the_db(self):
+        self._order_of_other_worker('sinal-43', SUBMITTED)
+        response = self.client.get('/api/orders/sinal-43')
+        self.assertEqual((response.status_code, response.get_json()['state']), (200, SUBMITTED))
+        retry = self.client.post('/api/orders', json={'symbol': 'DOGE/USDT', 'side': 'buy', 'amount': 10},
+                                 headers={'Idempotency-Key': 'sinal-43'})
+        self.assertEqual(retry.status_code, 202)
+
+        self._order_of_other_worker('sinal-44', FILLED)
+        retry = self.client.post('/api/execute_trade', json={'type': 'buy', 'symbol': 'DOGE/USDT', 'amount': 10},
+                                 headers={'Idempotency-Key': 'sinal-44'})
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.get_json()['order_state']['filled'], 10.0)
+        self.assertIsNone(self.backend.order_manager.get('sinal-44'))
+        stats = self.client.get('/api/orders/stats').get_json()['all_workers']
+        self.assertEqual(stats['states'], {SUBMITTED: 1, FILLED: 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
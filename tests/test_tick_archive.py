@@ -0,0 +1,145 @@
+"""
+Testes para o arquivamento de ticks em Parquet e a leitura em duas camadas
+"""
+
+import unittest
+import sqlite3
+import tempfile
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from candles import rebuild_candles, get_candles
+from tick_archive import archive_old_ticks, archive_table, read_ticks, archive_stats
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+@unittest.skipUnless(HAS_PYARROW, "pyarrow não instalado")
+class TestTickArchive(unittest.TestCase):
+    """Testes do tick_archive"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.archive_dir = os.path.join(self.tmpdir.name, 'archive')
+        self.conn = sqlite3.connect(os.path.join(self.tmpdir.name, 'test.db'))
+        self.conn.execute('''
+            CREATE TABLE prices (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                coin_id TEXT,
+                timestamp DATETIME,
+                price REAL,
+                symbol TEXT,
+                volume REAL DEFAULT 0,
+                high REAL DEFAULT 0,
+                low REAL DEFAULT 0
+            )
+        ''')
+        self.today = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        rows = []
+        for days_ago in (40, 35, 1):
+            for minute in range(3):
+                ts = self.today - timedelta(days=days_ago) + timedelta(minutes=minute)
+                rows.append(('DOGE/USDT', ts.isoformat(sep=' '), 1.0 + minute, 100.0))
+        self.conn.executemany('INSERT INTO prices (symbol, timestamp, price, volume) VALUES (?, ?, ?, ?)', rows)
+        # Tick antigo sem símbolo (só coin_id)
+        self.conn.execute("INSERT INTO prices (coin_id, timestamp, price) VALUES ('SHIBUSDT', ?, 0.01)",
+                          ((self.today - timedelta(days=50)).isoformat(sep=' '),))
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def _count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM prices').fetchone()[0]
+
+    def test_archive_moves_old_ticks_and_keeps_candles(self):
+        """Ticks antigos vão para Parquet; candles continuam no SQLite"""
+        result = archive_old_ticks(self.conn, horizon_days=30, archive_dir=self.archive_dir)
+
+        self.assertEqual(result['prices']['rows'], 7)
+        self.assertEqual(result['prices']['files'], 3)
+        self.assertEqual(self._count(), 3)
+        self.assertEqual(archive_stats(self.archive_dir)['prices']['symbols'], 2)
+        self.assertTrue(os.path.isdir(os.path.join(self.archive_dir, 'prices', 'symbol=DOGE%2FUSDT')))
+        self.assertEqual(len(get_candles(self.conn, 'DOGE/USDT', '1h', limit=100)), 3)
+
+    def test_read_spans_both_tiers(self):
+        """read_ticks junta SQLite e Parquet em ordem cronológica"""
+        before = read_ticks(self.conn, 'DOGE/USDT', archive_dir=self.archive_dir)
+        archive_old_ticks(self.conn, horizon_days=30, archive_dir=self.archive_dir)
+        after = read_ticks(self.conn, 'DOGE/USDT', archive_dir=self.archive_dir)
+
+        self.assertEqual(list(after['id']), list(before['id']))
+        self.assertEqual(list(after['timestamp']), list(before['timestamp']))
+        self.assertTrue(after['timestamp'].is_monotonic_increasing)
+
+        latest = read_ticks(self.conn, 'DOGE/USDT', limit=5, archive_dir=self.archive_dir)
+        self.assertEqual(list(latest['id']), list(before['id'][-5:]))
+
+        window = read_ticks(self.conn, 'DOGE/USDT', archive_dir=self.archive_dir,
+                            start=self.today - timedelta(days=36), end=self.today - timedelta(days=30))
+        self.assertEqual(len(window), 3)
+
+        legacy = read_ticks(self.conn, 'SHIBUSDT', archive_dir=self.archive_dir)
+        self.assertEqual(len(legacy), 1)
+        self.assertEqual(legacy['symbol'].iloc[0], 'SHIBUSDT')
+
+    def test_interrupted_archive_does_not_duplicate(self):
+        """Parquet gravado mas DELETE perdido: rerun regrava e o leitor não duplica"""
+        cutoff = (self.today - timedelta(days=30)).strftime('%Y-%m-%d 00:00:00')
+        snapshot = self.conn.execute('SELECT * FROM prices').fetchall()
+        archive_table(self.conn, 'prices', cutoff, self.archive_dir)
+        # Simula queda antes do DELETE: as linhas voltam com os mesmos ids
+        self.conn.executemany('INSERT OR IGNORE INTO prices VALUES (?, ?, ?, ?, ?, ?, ?, ?)', snapshot)
+        self.conn.commit()
+
+        self.assertEqual(len(read_ticks(self.conn, 'DOGE/USDT', archive_dir=self.archive_dir)), 9)
+        archive_table(self.conn, 'prices', cutoff, self.archive_dir)
+        self.assertEqual(archive_stats(self.archive_dir)['prices']['files'], 3)
+        self.assertEqual(self._count(), 3)
+        self.assertEqual(len(read_ticks(self.conn, 'DOGE/USDT', archive_dir=self.archive_dir)), 9)
+
+    def test_rebuild_keeps_archived_candles(self):
+        """rebuild não apaga candles cujos ticks já foram arquivados"""
+        archive_old_ticks(self.conn, horizon_days=30, archive_dir=self.archive_dir)
+        before = get_candles(self.conn, 'DOGE/USDT', '1m', limit=100)
+        rebuild_candles(self.conn)
+        self.assertEqual(get_candles(self.conn, 'DOGE/USDT', '1m', limit=100), before)
+        self.assertEqual(len(before), 9)
+
+
+    def test_backend_schema_without_coin_id(self):
+        """prices criada por init_database (sem coin_id/high/low): arquiva e lê as duas camadas"""
+        conn = sqlite3.connect(os.path.join(self.tmpdir.name, 'fresh.db'))
+        conn.execute('''
+            CREATE TABLE prices (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                symbol TEXT NOT NULL,
+                timestamp DATETIME NOT NULL,
+                price REAL NOT NULL,
+                volume REAL DEFAULT 0,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.executemany('INSERT INTO prices (symbol, timestamp, price) VALUES (?, ?, ?)',
+                         [('DOGE/USDT', (self.today - timedelta(days=days)).isoformat(sep=' '), 1.0)
+                          for days in (40, 1)])
+        conn.commit()
+        try:
+            self.assertEqual(len(read_ticks(conn, 'DOGE/USDT', archive_dir=self.archive_dir)), 2)
+            self.assertEqual(archive_old_ticks(conn, 30, self.archive_dir)['prices']['rows'], 1)
+            ticks = read_ticks(conn, 'DOGE/USDT', archive_dir=self.archive_dir)
+            self.assertEqual(list(ticks['id']), [1, 2])
+        finally:
+            conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+Testes para a varredura concorrente da watchlist
+"""
+
+import unittest
+import time
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from watchlist_scanner import WatchlistScanner
+
+
+class TestWatchlistScanner(unittest.TestCase):
+    """Testes do WatchlistScanner"""
+
+    def test_partial_results_on_deadline(self):
+        """Símbolo lento não bloqueia o ciclo além do prazo"""
+        def scan_fn(symbol):
+            if symbol == 'SLOWUSDT':
+                time.sleep(2)
+            return {'symbol': symbol, 'confidence': 0.7}
+
+        scanner = WatchlistScanner(scan_fn, max_workers=4, deadline_s=0.5)
+        try:
+            result = scanner.scan(['DOGEUSDT', 'SLOWUSDT', 'PEPEUSDT'])
+        finally:
+            scanner.shutdown()
+
+        self.assertLess(result.elapsed_s, 1.5)
+        self.assertEqual(set(result.results), {'DOGEUSDT', 'PEPEUSDT'})
+        self.assertEqual(result.timed_out, ['SLOWUSDT'])
+
+    def test_errors_are_collected(self):
+        """Exceções por símbolo não derrubam a varredura"""
+        def scan_fn(symbol):
+            if symbol == 'BADUSDT':
+                raise ValueError('falha')
+            return None
+
+        scanner = WatchlistScanner(scan_fn, max_workers=2)
+        try:
+            result = scanner.scan(['DOGEUSDT', 'BADUSDT'])
+        finally:
+            scanner.shutdown()
+
+        self.assertIn('BADUSDT', result.errors)
+        self.assertIsNone(result.results['DOGEUSDT'])
+
+
+if __name__ == '__main__':
+    unittest.main()
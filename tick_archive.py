@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Tick Archive - Retenção em camadas dos ticks (SQLite recente + Parquet)
+Ticks mais antigos que o horizonte configurado saem de prices/market_data e
+vão para partições Parquet comprimidas por símbolo e por dia. Os candles
+(price_candles) continuam no SQLite, então o histórico agregado não muda.
+
+Layout em disco (diretório base, ex. ./runtime/archive):
+    prices/symbol=DOGEUSDT/date=2025-08-18/part-000000001234-000000005678.parquet
+    market_data/symbol=DOGEUSDT/date=2025-08-18/part-....parquet
+
+O nome do arquivo vem do intervalo de ids arquivados: se a compactação cair
+entre gravar o Parquet e apagar do SQLite, a próxima execução regrava o mesmo
+arquivo, e o leitor descarta ids repetidos entre as camadas.
+
+read_ticks() lê as duas camadas como um só DataFrame (treino e API histórica).
+Uso do job (diário, via cron/agendador):
+    python tick_archive.py --horizon-days 30 --vacuum
+
+Requer pyarrow para gravar/ler as partições.
+"""
+
+import os
+import sqlite3
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import quote, unquote
+
+import pandas as pd
+
+from candles import price_columns, update_candles
+
+log = logging.getLogger("TickArchive")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB_PATH = os.getenv('DB_PATH', os.path.join(ROOT, 'memecoin.db'))
+ARCHIVE_DIR = os.getenv('MOCOVE_ARCHIVE_DIR', os.path.join(ROOT, 'runtime', 'archive'))
+HORIZON_DAYS = int(os.getenv('MOCOVE_ARCHIVE_HORIZON_DAYS', 30))
+
+# Linhas (faixa de ids) lidas do SQLite por vez durante a compactação
+CHUNK_ROWS = 250000
+
+# Tabela -> (expressão do símbolo, filtros por símbolo). Cada filtro vira um
+# ramo do UNION ALL para que ORDER BY timestamp use o índice (symbol, timestamp)
+ARCHIVED_TABLES = {
+    # Ticks antigos guardam o símbolo em coin_id
+    'prices': ('COALESCE(symbol, coin_id)', ['symbol = :symbol', 'symbol IS NULL AND coin_id = :symbol']),
+    'market_data': ('symbol', ['symbol = :symbol']),
+}
+
+
+def table_symbol_sql(conn: sqlite3.Connection, table: str):
+    """(expressão do símbolo, filtros) da tabela; sem coin_id (schema do backend) só a coluna symbol"""
+    symbol_expr, symbol_filters = ARCHIVED_TABLES[table]
+    if table == 'prices' and 'coin_id' not in price_columns(conn):
+        return 'symbol', ['symbol = :symbol']
+    return symbol_expr, symbol_filters
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("pyarrow não instalado (pip install pyarrow)") from e
+    return pyarrow, pyarrow.parquet
+
+
+def parse_timestamps(values: pd.Series) -> pd.Series:
+    """Converte timestamps do SQLite (ISO-8601 ou epoch em ms) em datetime64; inválidos viram NaT"""
+    numeric = pd.to_numeric(values, errors='coerce')
+    parsed = pd.to_datetime(values.where(numeric.isna()), format='ISO8601', errors='coerce')
+    if numeric.notna().any():
+        parsed = parsed.fillna(pd.to_datetime(numeric, unit='ms', errors='coerce'))
+    return parsed.astype('datetime64[us]')
+
+
+def archive_cutoff(horizon_days: int = HORIZON_DAYS, now: Optional[datetime] = None) -> str:
+    """Início do dia (horizonte) a partir do qual os ticks ficam no SQLite"""
+    day = ((now or datetime.now()) - timedelta(days=horizon_days)).date()
+    return f"{day.isoformat()} 00:00:00"
+
+
+def _partition_dir(archive_dir: str, table: str, symbol: str, day: str) -> str:
+    return os.path.join(archive_dir, table, f"symbol={quote(symbol, safe='')}", f"date={day}")
+
+
+def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def archive_table(conn: sqlite3.Connection, table: str = 'prices', cutoff: Optional[str] = None,
+                  archive_dir: str = ARCHIVE_DIR, chunk_rows: int = CHUNK_ROWS) -> Dict:
+    """Move as linhas com timestamp < cutoff para Parquet e apaga do SQLite.
+
+    Retorna {'rows': ..., 'files': ..., 'bytes': ...}.
+    """
+    if table not in ARCHIVED_TABLES:
+        raise ValueError(f"Tabela não arquivável: {table}")
+    pa, pq = _require_pyarrow()
+    cutoff = cutoff or archive_cutoff()
+    symbol_expr, _ = table_symbol_sql(conn, table)
+
+    if table == 'prices':
+        # Candles ficam no SQLite: agrega tudo antes de tirar os ticks
+        update_candles(conn)
+
+    stats = {'rows': 0, 'files': 0, 'bytes': 0}
+    lo, hi = conn.execute(f'SELECT MIN(id), MAX(id) FROM {table} WHERE timestamp < ?', (cutoff,)).fetchone()
+    if lo is None:
+        return stats
+
+    start = lo - 1
+    while start < hi:
+        end = start + chunk_rows
+        df = pd.read_sql_query(
+            f'SELECT *, {symbol_expr} AS _symbol FROM {table} '
+            f'WHERE id > ? AND id <= ? AND timestamp < ? AND {symbol_expr} IS NOT NULL',
+            conn, params=(start, end, cutoff)
+        )
+        start = end
+        if df.empty:
+            continue
+
+        df['symbol'] = df.pop('_symbol')
+        df['timestamp'] = parse_timestamps(df['timestamp'])
+        # Timestamps ilegíveis ficam no SQLite
+        df = df[df['timestamp'].notna()]
+
+        for (symbol, day), part in df.groupby([df['symbol'], df['timestamp'].dt.normalize()], sort=False):
+            part = part.sort_values('timestamp')
+            directory = _partition_dir(archive_dir, table, symbol, day.strftime('%Y-%m-%d'))
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{part['id'].min():012d}-{part['id'].max():012d}.parquet")
+            pq.write_table(pa.Table.from_pandas(part, preserve_index=False), path + '.tmp', compression='zstd')
+            os.replace(path + '.tmp', path)
+            stats['files'] += 1
+            stats['bytes'] += os.path.getsize(path)
+
+        with conn:
+            conn.executemany(f'DELETE FROM {table} WHERE id = ?', ((int(i),) for i in df['id']))
+        stats['rows'] += len(df)
+
+    return stats
+
+
+def archive_old_ticks(conn: sqlite3.Connection, horizon_days: int = HORIZON_DAYS,
+                      archive_dir: str = ARCHIVE_DIR, tables: Iterable[str] = tuple(ARCHIVED_TABLES),
+                      vacuum: bool = False) -> Dict[str, Dict]:
+    """Job de compactação: arquiva as tabelas e opcionalmente devolve o espaço ao disco"""
+    cutoff = archive_cutoff(horizon_days)
+    result = {}
+    for table in tables:
+        if not _table_exists(conn, table):
+            continue
+        result[table] = archive_table(conn, table, cutoff, archive_dir)
+        log.info(f"🗄️ {table}: {result[table]['rows']} linhas antes de {cutoff} arquivadas "
+                 f"em {result[table]['files']} arquivos")
+    if vacuum:
+        conn.execute('VACUUM')
+    return result
+
+
+def archived_symbols(archive_dir: str = ARCHIVE_DIR, table: str = 'prices') -> List[str]:
+    """Símbolos com alguma partição arquivada"""
+    base = os.path.join(archive_dir, table)
+    if not os.path.isdir(base):
+        return []
+    return sorted(unquote(d[len('symbol='):]) for d in os.listdir(base) if d.startswith('symbol='))
+
+
+def partition_files(archive_dir: str, table: str, symbol: Optional[str],
+                start: Optional[pd.Timestamp], end: Optional[pd.Timestamp]) -> List[str]:
+    """Arquivos Parquet das partições que cruzam o intervalo, em ordem cronológica"""
+    base = os.path.join(archive_dir, table)
+    if not os.path.isdir(base):
+        return []
+    if symbol is not None:
+        symbol_dirs = [f"symbol={quote(symbol, safe='')}"]
+    else:
+        symbol_dirs = [d for d in os.listdir(base) if d.startswith('symbol=')]
+
+    first_day = start.strftime('%Y-%m-%d') if start is not None else None
+    last_day = end.strftime('%Y-%m-%d') if end is not None else None
+    files = []
+    for symbol_dir in symbol_dirs:
+        directory = os.path.join(base, symbol_dir)
+        if not os.path.isdir(directory):
+            continue
+        for date_dir in os.listdir(directory):
+            day = date_dir[len('date='):]
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            for name in os.listdir(os.path.join(directory, date_dir)):
+                if name.endswith('.parquet'):
+                    files.append((day, name, os.path.join(directory, date_dir, name)))
+    return [path for _, _, path in sorted(files)]
+
+
+def read_ticks(conn: sqlite3.Connection, symbol: Optional[str] = None, start=None, end=None,
+               limit: Optional[int] = None, table: str = 'prices',
+               archive_dir: str = ARCHIVE_DIR) -> pd.DataFrame:
+    """Lê ticks das duas camadas (SQLite + Parquet) como um só DataFrame.
+
+    `timestamp` vem como datetime64 e `symbol` já resolvido (coin_id nos ticks
+    antigos). Com limit, devolve os `limit` mais recentes do intervalo.
+    Resultado em ordem cronológica.
+    """
+    if table not in ARCHIVED_TABLES:
+        raise ValueError(f"Tabela não arquivável: {table}")
+    symbol_expr, symbol_filters = table_symbol_sql(conn, table)
+    start_ts = pd.Timestamp(start) if start is not None else None
+    end_ts = pd.Timestamp(end) if end is not None else None
+    for ts in (start_ts, end_ts):
+        if ts is not None and ts.tzinfo is not None:
+            raise ValueError("Use timestamps sem fuso (mesma convenção do banco)")
+
+    # Camada recente (SQLite)
+    where, params = '', {}
+    if start_ts is not None:
+        where += ' AND timestamp >= :start'
+        params['start'] = start_ts.isoformat(sep=' ')
+    if end_ts is not None:
+        where += ' AND timestamp <= :end'
+        params['end'] = end_ts.isoformat(sep=' ')
+    if limit is not None:
+        where += ' ORDER BY timestamp DESC LIMIT :limit'
+        params['limit'] = int(limit)
+    if symbol is not None:
+        params['symbol'] = symbol
+    branches = [
+        f'SELECT * FROM (SELECT *, {symbol_expr} AS _symbol FROM {table} WHERE {condition}{where})'
+        for condition in (symbol_filters if symbol is not None else ['1 = 1'])
+    ]
+    recent = pd.read_sql_query(' UNION ALL '.join(branches), conn, params=params)
+    recent['symbol'] = recent.pop('_symbol')
+    recent['timestamp'] = parse_timestamps(recent['timestamp'])
+    frames = [recent]
+
+    # Camada arquivada (Parquet), da mais nova para a mais antiga quando há limit
+    files = partition_files(archive_dir, table, symbol, start_ts, end_ts)
+    if files and (limit is None or len(recent) < limit):
+        _, pq = _require_pyarrow()
+        needed = None if limit is None else limit - len(recent)
+        archived = []
+        for path in (reversed(files) if limit is not None else files):
+            part = pq.read_table(path).to_pandas()
+            part['timestamp'] = part['timestamp'].astype('datetime64[us]')
+            if start_ts is not None:
+                part = part[part['timestamp'] >= start_ts]
+            if end_ts is not None:
+                part = part[part['timestamp'] <= end_ts]
+            archived.append(part)
+            if needed is not None:
+                needed -= len(part)
+                if needed <= 0:
+                    break
+        frames.extend(archived)
+
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return recent.iloc[0:0]
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    # Mesmo id nas duas camadas só acontece se a compactação foi interrompida
+    df = df.drop_duplicates('id').sort_values(['timestamp', 'id'], kind='stable')
+    if limit is not None:
+        df = df.tail(limit)
+    return df.reset_index(drop=True)
+
+
+def archive_stats(archive_dir: str = ARCHIVE_DIR) -> Dict[str, Dict]:
+    """Arquivos, bytes e símbolos por tabela arquivada"""
+    stats = {}
+    for table in ARCHIVED_TABLES:
+        base = os.path.join(archive_dir, table)
+        if not os.path.isdir(base):
+            continue
+        files = total = 0
+        symbols = set()
+        for directory, _, names in os.walk(base):
+            for name in names:
+                if name.endswith('.parquet'):
+                    files += 1
+                    total += os.path.getsize(os.path.join(directory, name))
+                    symbols.add(unquote(os.path.relpath(directory, base).split(os.sep)[0][len('symbol='):]))
+        stats[table] = {'files': files, 'bytes': total, 'symbols': len(symbols)}
+    return stats
+
+
+def main():
+    """Arquiva os ticks antigos do memecoin.db"""
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Arquivamento de ticks antigos em Parquet")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='Caminho do banco SQLite')
+    parser.add_argument('--archive-dir', default=ARCHIVE_DIR)
+    parser.add_argument('--horizon-days', type=int, default=HORIZON_DAYS,
+                        help='Dias de ticks mantidos no SQLite')
+    parser.add_argument('--vacuum', action='store_true', help='VACUUM no fim para liberar espaço')
+    parser.add_argument('--stats', action='store_true', help='Só mostrar o tamanho do arquivo')
+    args = parser.parse_args()
+
+    if not args.stats:
+        conn = sqlite3.connect(args.db, timeout=30)
+        try:
+            for table, s in archive_old_ticks(conn, args.horizon_days, args.archive_dir, vacuum=args.vacuum).items():
+                print(f"🗄️ {table}: {s['rows']} linhas -> {s['files']} arquivos ({s['bytes'] / 1e6:.1f} MB)")
+        finally:
+            conn.close()
+    for table, s in archive_stats(args.archive_dir).items():
+        print(f"📦 {table}: {s['files']} arquivos, {s['symbols']} símbolos, {s['bytes'] / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
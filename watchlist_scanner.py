@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Watchlist Scanner - Varredura concorrente da watchlist
+Executa a análise de cada símbolo num pool de threads, com prazo por ciclo,
+devolvendo resultados parciais quando alguns símbolos não respondem a tempo.
+"""
+
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+log = logging.getLogger("WatchlistScanner")
+
+
+def build_session(pool_size: int = 16) -> requests.Session:
+    """Cria sessão HTTP keep-alive compartilhada entre as threads do scanner"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+@dataclass
+class ScanResult:
+    """Resultado de uma varredura da watchlist"""
+    results: Dict[str, Optional[Dict]] = field(default_factory=dict)
+    timed_out: List[str] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+    elapsed_s: float = 0.0
+
+    @property
+    def completed(self) -> int:
+        return len(self.results)
+
+
+class WatchlistScanner:
+    """Executa scan_fn(symbol) concorrentemente para toda a watchlist"""
+
+    def __init__(self, scan_fn: Callable[[str], Optional[Dict]], max_workers: int = 8,
+                 deadline_s: float = 15.0):
+        self.scan_fn = scan_fn
+        self.max_workers = max(1, int(max_workers))
+        self.deadline_s = deadline_s
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scan")
+
+    def scan(self, symbols: List[str]) -> ScanResult:
+        """Analisa todos os símbolos e retorna o que terminou dentro do prazo"""
+        start = time.perf_counter()
+        result = ScanResult()
+        futures = {self.executor.submit(self.scan_fn, symbol): symbol for symbol in symbols}
+
+        done, pending = wait(futures, timeout=self.deadline_s)
+
+        for future in done:
+            symbol = futures[future]
+            try:
+                result.results[symbol] = future.result()
+            except Exception as e:
+                result.errors[symbol] = str(e)
+
+        for future in pending:
+            # Símbolos que ainda não começaram são cancelados; os que estão em
+            # andamento terminam em segundo plano e são descartados
+            future.cancel()
+            result.timed_out.append(futures[future])
+
+        result.elapsed_s = time.perf_counter() - start
+        if result.timed_out:
+            log.warning(f"⏱️ {len(result.timed_out)} símbolos excederam o prazo de {self.deadline_s:.1f}s: "
+                        f"{', '.join(result.timed_out[:5])}...")
+        return result
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)